@@ -0,0 +1,102 @@
+"""
+Đo tốc độ chu kỳ TradingBot.run_once không cần mạng (không Binance, không OpenAI)
+
+Chạy: python scripts/benchmark_cycle.py [--cycles 2000] [--backend stub|replay] [--latency-ms 0]
+- Nến: chuỗi giá giả lập, mỗi chu kỳ trượt thêm một nến
+- ChatGPT: backend 'stub' (quy tắc RSI/MA) hoặc 'replay' (file ghi bởi LLM_BACKEND=record)
+- Database, file log: thư mục tạm; lệnh không được gửi (chỉ đếm số lần đủ điều kiện đặt lệnh)
+In ra số chu kỳ mỗi giây và độ trễ p50 / p99.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.advice_cache import AdviceCache  # noqa: E402
+from src.chatgpt_advisor import ChatGPTAdvisor  # noqa: E402
+from src.guarded_advisor import GuardedAdvisor  # noqa: E402
+from src.llm_backend import ReplayBackend, StubBackend  # noqa: E402
+from src.main import TradingBot  # noqa: E402
+from src import config  # noqa: E402
+
+
+WINDOW = 100  # số nến mỗi chu kỳ (như DataCollector)
+
+
+class OfflineDataCollector:
+    """Thay DataCollector: trả về cửa sổ nến giả lập, trượt một nến mỗi lần gọi"""
+
+    def __init__(self, cycles, seed=42):
+        rng = np.random.default_rng(seed)
+        n = cycles + WINDOW
+        close = 40000 + np.cumsum(rng.standard_normal(n) * 50)
+        self.candles = pd.DataFrame({
+            'timestamp': pd.date_range('2024-01-01', periods=n, freq='15min'),
+            'open': close + rng.standard_normal(n) * 5,
+            'high': close + rng.random(n) * 30,
+            'low': close - rng.random(n) * 30,
+            'close': close,
+            'volume': rng.random(n) * 10,
+        })
+        self.position = 0
+
+    def get_realtime_data(self, symbol, interval=None):
+        window = self.candles.iloc[self.position:self.position + WINDOW].reset_index(drop=True)
+        self.position += 1
+        return {'candles': window, 'current_price': float(window['close'].iloc[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cycles', type=int, default=2000)
+    parser.add_argument('--backend', choices=['stub', 'replay'], default='stub')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Độ trễ giả lập của backend 'stub'")
+    parser.add_argument('--record-file', default=None, help="File bản ghi cho backend 'replay'")
+    args = parser.parse_args()
+
+    stub = StubBackend(latency_ms=args.latency_ms)
+    backend = stub if args.backend == 'stub' else ReplayBackend(args.record_file, missing=stub)
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        # Không ghi gì vào data/ của bot thật
+        config.LOG_FILE = os.path.join(tmp, 'trading_logs.txt')
+        config.DATABASE_FILE = os.path.join(tmp, 'trading_history.db')
+        config.CANDLE_DB_FILE = os.path.join(tmp, 'candles.db')
+        config.ADVICE_CACHE_DB_FILE = ''
+        bot = TradingBot()
+        bot.data_collector = OfflineDataCollector(args.cycles)
+        bot.advisor = ChatGPTAdvisor(cache=AdviceCache(db_file=''), backend=backend)
+        bot.advisor_guard = GuardedAdvisor(bot.advisor)
+        orders = []
+        bot._execute_trade = lambda recommendation, *a, **k: orders.append(recommendation)
+
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(args.cycles):
+            t0 = time.perf_counter()
+            bot.run_once()
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+        bot.database_logger.close()
+
+    latencies = np.array(latencies) * 1000
+    print(f"📊 {args.cycles} chu kỳ run_once, backend {args.backend} (độ trễ {args.latency_ms:g} ms)")
+    print(f"   Tốc độ: {args.cycles / elapsed:,.0f} chu kỳ/giây")
+    print(f"   p50: {np.percentile(latencies, 50):.3f} ms | p99: {np.percentile(latencies, 99):.3f} ms")
+    print(f"   Lệnh đủ điều kiện: {len(orders)} | cache: {bot.advisor.cache.stats()['hit_rate']}% | "
+          f"dự phòng: {bot.advisor_guard.fallbacks}")
+    if isinstance(backend, ReplayBackend):
+        print(f"   Replay: {backend.hits} khớp, {backend.misses} thiếu (trả lời bằng stub)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Đo tốc độ truy vấn báo cáo trên database lớn: schema cũ (v1) so với schema mới
+(cột ts_ms + index phủ)
+
+Chạy: python scripts/benchmark_database.py [--rows 10000000] [--trades 1000000]
+1. Tạo database giả lập ở phiên bản 1 (timestamp TEXT, không index)
+2. Đo các truy vấn kiểu cũ
+3. Nâng cấp tại chỗ lên phiên bản mới nhất (đo thời gian migration)
+4. Đo lại các truy vấn kiểu mới
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db_migrations import days_ago_ms, migrate  # noqa: E402
+
+
+BATCH = 100_000
+
+
+def fill(conn, table, columns, rows, make_row, start):
+    """Chèn `rows` dòng giả lập, thời gian trải đều trong 365 ngày gần nhất"""
+    placeholders = ', '.join('?' * len(columns))
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    step = timedelta(days=365) / max(rows, 1)
+    for offset in range(0, rows, BATCH):
+        batch = []
+        for i in range(offset, min(offset + BATCH, rows)):
+            batch.append(make_row(i, (start + step * i).isoformat()))
+        conn.executemany(sql, batch)
+        conn.commit()
+
+
+def build(path, rows, trades):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    migrate(conn, target=1)
+    start = datetime.now() - timedelta(days=365)
+    fill(conn, 'analysis_data',
+         ['timestamp', 'symbol', 'price', 'ma', 'rsi', 'atr', 'recommendation', 'confidence'],
+         rows, lambda i, ts: (ts, 'BTCUSDT', 43000 + i % 500, 42900.0, 50.0, 200.0, 'HOLD', 60), start)
+    fill(conn, 'trading_history',
+         ['timestamp', 'symbol', 'side', 'quantity', 'entry_price', 'pnl', 'status'],
+         trades, lambda i, ts: (ts, 'BTCUSDT', 'BUY' if i % 2 else 'SELL', 0.01, 43000.0,
+                                (i % 7) - 3.0, 'FILLED'), start)
+    fill(conn, 'performance', ['timestamp', 'total_trades', 'total_pnl', 'account_balance'],
+         trades, lambda i, ts: (ts, i, 0.0, 10000.0 + i % 100), start)
+    conn.close()
+
+
+LEGACY_QUERIES = {
+    'Báo cáo 7 ngày (trading_history)': (
+        "SELECT timestamp, pnl, entry_price, quantity, side FROM trading_history "
+        "WHERE timestamp >= ? AND entry_price > 0 ORDER BY timestamp ASC", 'text7'),
+    'Số dư mới nhất (performance)': (
+        "SELECT account_balance FROM performance ORDER BY timestamp DESC LIMIT 1", None),
+    'Phân tích 1 ngày (analysis_data)': (
+        "SELECT COUNT(*), AVG(rsi) FROM analysis_data WHERE timestamp >= ?", 'text1'),
+}
+
+NEW_QUERIES = {
+    'Báo cáo 7 ngày (trading_history)': (
+        "SELECT timestamp, pnl, entry_price, quantity, side FROM trading_history "
+        "WHERE ts_ms >= ? AND entry_price > 0 ORDER BY ts_ms ASC", 'ms7'),
+    'Số dư mới nhất (performance)': (
+        "SELECT account_balance FROM performance ORDER BY ts_ms DESC LIMIT 1", None),
+    'Phân tích 1 ngày (analysis_data)': (
+        "SELECT COUNT(*), AVG(rsi) FROM analysis_data WHERE ts_ms >= ?", 'ms1'),
+}
+
+
+def run_queries(conn, queries, repeat=3):
+    args = {
+        'text7': ((datetime.now() - timedelta(days=7)).isoformat(),),
+        'text1': ((datetime.now() - timedelta(days=1)).isoformat(),),
+        'ms7': (days_ago_ms(7),),
+        'ms1': (days_ago_ms(1),),
+        None: (),
+    }
+    timings = {}
+    for name, (sql, arg) in queries.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(sql, args[arg]).fetchall()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best * 1000
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10_000_000, help="Số dòng analysis_data")
+    parser.add_argument('--trades', type=int, default=1_000_000, help="Số dòng trading_history/performance")
+    parser.add_argument('--db', default=None, help="Đường dẫn file (mặc định: file tạm)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    print(f"🛠️ Tạo database giả lập: {args.rows:,} phân tích, {args.trades:,} giao dịch → {path}")
+    start = time.perf_counter()
+    build(path, args.rows, args.trades)
+    print(f"   Xong sau {time.perf_counter() - start:.1f}s\n")
+
+    conn = sqlite3.connect(path)
+    legacy = run_queries(conn, LEGACY_QUERIES)
+
+    start = time.perf_counter()
+    migrate(conn)
+    print(f"🔧 Migration tại chỗ: {time.perf_counter() - start:.1f}s\n")
+    new = run_queries(conn, NEW_QUERIES)
+    conn.close()
+
+    print(f"{'Truy vấn':<36}{'Cũ (ms)':>12}{'Mới (ms)':>12}{'Nhanh hơn':>12}")
+    print("-" * 72)
+    for name in LEGACY_QUERIES:
+        print(f"{name:<36}{legacy[name]:>12.2f}{new[name]:>12.2f}{legacy[name] / new[name]:>11.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Đo thời gian tính chỉ báo: kernel NumPy so với đường tính cũ (pandas / pandas_ta)
+
+Chạy: python scripts/benchmark_indicators.py [--sizes 100 10000 1000000]
+In ra thời gian trung bình mỗi lần gọi (ms) cho từng kích thước dữ liệu.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import indicator_kernels as kernels  # noqa: E402
+
+
+def make_data(n, seed=42):
+    """Tạo chuỗi giá giả lập n nến"""
+    rng = np.random.default_rng(seed)
+    close = 40000 + np.cumsum(rng.standard_normal(n) * 50)
+    high = close + rng.random(n) * 30
+    low = close - rng.random(n) * 30
+    return pd.DataFrame({'high': high, 'low': low, 'close': close})
+
+
+def load_reference():
+    """
+    Hàm tính cũ để so sánh: pandas_ta nếu có cài, ngược lại dùng công thức
+    pandas tương đương (rma = ewm(alpha=1/n, min_periods=n))
+    """
+    try:
+        import pandas_ta as ta
+        return 'pandas_ta', {
+            'SMA': lambda df: df['close'].rolling(15).mean(),
+            'EMA': lambda df: ta.ema(df['close'], length=26),
+            'RSI': lambda df: ta.rsi(df['close'], length=14),
+            'ATR': lambda df: ta.atr(high=df['high'], low=df['low'], close=df['close'], length=14),
+            'MACD': lambda df: ta.macd(df['close']),
+            'ROLL MAX/MIN': lambda df: (df['high'].rolling(100).max(), df['low'].rolling(100).min()),
+        }
+    except ImportError:
+        pass
+
+    def rma(s, n):
+        return s.ewm(alpha=1.0 / n, min_periods=n).mean()
+
+    def rsi(df):
+        diff = df['close'].diff()
+        gain, loss = diff.clip(lower=0), diff.clip(upper=0).abs()
+        return 100 * rma(gain, 14) / (rma(gain, 14) + rma(loss, 14))
+
+    def atr(df):
+        prev_close = df['close'].shift(1)
+        tr = pd.concat([df['high'] - df['low'], (df['high'] - prev_close).abs(),
+                        (df['low'] - prev_close).abs()], axis=1).max(axis=1)
+        return rma(tr, 14)
+
+    def macd(df):
+        close = df['close']
+        line = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+        return line, line.ewm(span=9, adjust=False).mean()
+
+    return 'pandas', {
+        'SMA': lambda df: df['close'].rolling(15).mean(),
+        'EMA': lambda df: df['close'].ewm(span=26, adjust=False).mean(),
+        'RSI': rsi,
+        'ATR': atr,
+        'MACD': macd,
+        'ROLL MAX/MIN': lambda df: (df['high'].rolling(100).max(), df['low'].rolling(100).min()),
+    }
+
+
+NUMPY_KERNELS = {
+    'SMA': lambda a: kernels.sma(a['close'], 15),
+    'EMA': lambda a: kernels.ema(a['close'], 26, sma_seed=True),
+    'RSI': lambda a: kernels.rsi(a['close'], 14),
+    'ATR': lambda a: kernels.atr(a['high'], a['low'], a['close'], 14),
+    'MACD': lambda a: kernels.macd(a['close']),
+    'ROLL MAX/MIN': lambda a: (kernels.rolling_max(a['high'], 100), kernels.rolling_min(a['low'], 100)),
+}
+
+
+def time_call(func, arg, min_time=0.2):
+    """Thời gian trung bình mỗi lần gọi (ms), lặp tới khi đủ min_time giây"""
+    func(arg)  # khởi động
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        func(arg)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / runs * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10_000, 1_000_000])
+    args = parser.parse_args()
+
+    ref_name, reference = load_reference()
+    print(f"📊 So sánh kernel NumPy với {ref_name} (ms / lần gọi)\n")
+    print(f"{'Chỉ báo':<14}{'Số nến':>10}{'NumPy':>12}{ref_name:>12}{'Nhanh hơn':>12}")
+    print("-" * 60)
+    for n in args.sizes:
+        df = make_data(n)
+        arrays = {col: np.ascontiguousarray(df[col].to_numpy()) for col in df.columns}
+        for name, kernel in NUMPY_KERNELS.items():
+            t_numpy = time_call(kernel, arrays)
+            t_ref = time_call(reference[name], df)
+            print(f"{name:<14}{n:>10}{t_numpy:>12.4f}{t_ref:>12.4f}{t_ref / t_numpy:>11.1f}x")
+        print()
+
+
+if __name__ == '__main__':
+    main()
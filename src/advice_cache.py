@@ -0,0 +1,217 @@
+"""
+Module cache khuyến nghị ChatGPT
+- Khóa = symbol + các "ô" (bucket) lượng tử hóa của giá, MA, RSI, ATR: thị trường
+  gần như không đổi giữa hai chu kỳ thì dùng lại khuyến nghị, không gọi API
+- Trong bộ nhớ: LRU (OrderedDict) + thời gian sống (TTL)
+- Ghi xuống SQLite nên cache còn nguyên sau khi khởi động lại bot
+"""
+
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from . import config
+
+
+def _bucket(value, width):
+    """Số thứ tự ô chứa value với độ rộng ô width"""
+    return int(math.floor(float(value) / width)) if width > 0 else float(value)
+
+
+def make_key(symbol, current_price, ma, rsi, atr, price_pct=None, rsi_width=None):
+    """
+    Khóa cache cho một trạng thái thị trường
+
+    - Giá: ô theo thang log, mỗi ô rộng price_pct % (giá BTC hay giá altcoin như nhau)
+    - MA, ATR: so với giá (%), cùng độ rộng price_pct
+    - RSI: ô rộng rsi_width điểm
+
+    Args:
+        price_pct: Độ rộng ô giá (%) - mặc định config.ADVICE_CACHE_PRICE_BUCKET_PCT
+        rsi_width: Độ rộng ô RSI - mặc định config.ADVICE_CACHE_RSI_BUCKET
+
+    Returns:
+        str, hoặc None nếu dữ liệu không hợp lệ (không cache)
+    """
+    price_pct = config.ADVICE_CACHE_PRICE_BUCKET_PCT if price_pct is None else price_pct
+    rsi_width = config.ADVICE_CACHE_RSI_BUCKET if rsi_width is None else rsi_width
+    try:
+        values = [float(current_price), float(ma), float(rsi), float(atr)]
+    except (TypeError, ValueError):
+        return None
+    if values[0] <= 0 or any(math.isnan(v) or math.isinf(v) for v in values):
+        return None
+    price, ma, rsi, atr = values
+    price_bucket = _bucket(math.log(price), math.log1p(price_pct / 100))
+    ma_bucket = _bucket((price - ma) / price * 100, price_pct)
+    atr_bucket = _bucket(atr / price * 100, price_pct)
+    rsi_bucket = _bucket(rsi, rsi_width)
+    return f"{symbol.upper()}|{price_bucket}|{ma_bucket}|{rsi_bucket}|{atr_bucket}"
+
+
+class AdviceCache:
+    """
+    Cache LRU + TTL cho khuyến nghị, lưu xuống SQLite
+
+    Ví dụ:
+        cache = AdviceCache()
+        key = make_key('BTCUSDT', 43250, 42800, 72.5, 250)
+        advice = cache.get(key)
+        if advice is None:
+            advice = ...  # gọi ChatGPT
+            cache.put(key, advice)
+    """
+
+    def __init__(self, db_file=None, ttl_seconds=None, max_entries=None, clock=None):
+        """
+        Args:
+            db_file: File SQLite (mặc định config.ADVICE_CACHE_DB_FILE, None/'' = chỉ bộ nhớ)
+            ttl_seconds: Thời gian sống mỗi mục (mặc định config.ADVICE_CACHE_TTL_SECONDS)
+            max_entries: Số mục tối đa (mặc định config.ADVICE_CACHE_MAX_ENTRIES)
+            clock: Hàm trả về thời gian hiện tại (giây, epoch) - để test
+        """
+        self.db_file = config.ADVICE_CACHE_DB_FILE if db_file is None else db_file
+        self.ttl = config.ADVICE_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = max_entries or config.ADVICE_CACHE_MAX_ENTRIES
+        self.clock = clock or time.time
+        self._entries = OrderedDict()  # key -> (created_at, advice)
+        self._lock = threading.Lock()
+        # Thống kê
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if self.db_file:
+            self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ==== SQLite ====
+    def _connect(self):
+        return sqlite3.connect(self.db_file)
+
+    def _load(self):
+        """Tạo bảng và nạp các mục còn hạn (mới nhất) vào bộ nhớ"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_file)), exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS advice_cache (
+                        key TEXT PRIMARY KEY,
+                        created_at REAL NOT NULL,
+                        advice TEXT NOT NULL
+                    ) WITHOUT ROWID
+                ''')
+                if self.ttl:
+                    conn.execute('DELETE FROM advice_cache WHERE created_at < ?',
+                                 (self.clock() - self.ttl,))
+                conn.commit()
+                rows = conn.execute('SELECT key, created_at, advice FROM advice_cache '
+                                    'ORDER BY created_at DESC LIMIT ?', (self.max_entries,)).fetchall()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"⚠️ Không đọc được cache khuyến nghị: {e}")
+            return
+        for key, created_at, advice in reversed(rows):
+            self._entries[key] = (created_at, json.loads(advice))
+
+    def _persist(self, upserts=(), delete=()):
+        if not self.db_file:
+            return
+        try:
+            conn = self._connect()
+            try:
+                if delete:
+                    conn.executemany('DELETE FROM advice_cache WHERE key = ?', [(k,) for k in delete])
+                if upserts:
+                    conn.executemany('INSERT OR REPLACE INTO advice_cache (key, created_at, advice) '
+                                     'VALUES (?, ?, ?)', upserts)
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"⚠️ Lỗi ghi cache khuyến nghị: {e}")
+
+    # ==== API ====
+    def get(self, key, record_miss=True):
+        """
+        Khuyến nghị đã cache (bản sao) hoặc None nếu chưa có / hết hạn
+
+        Args:
+            record_miss: False khi chỉ tra trước (lần tra sau sẽ đếm miss), tránh đếm hai lần
+        """
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and self.clock() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if record_miss:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key, advice):
+        """Lưu khuyến nghị (chỉ các trường có thể ghi JSON)"""
+        self.put_many([(key, advice)])
+
+    def put_many(self, entries):
+        """Lưu nhiều khuyến nghị [(key, advice)], ghi SQLite trong một transaction"""
+        self._persist(*self._store(entries))
+
+    async def put_many_async(self, entries):
+        """
+        Như put_many nhưng ghi SQLite trong thread phụ (asyncio.to_thread):
+        dùng trong coroutine, không chặn event loop bằng I/O ổ đĩa
+        """
+        upserts, evicted = self._store(entries)
+        if self.db_file and (upserts or evicted):
+            await asyncio.to_thread(self._persist, upserts, evicted)
+
+    def _store(self, entries):
+        """Cập nhật bộ nhớ; trả về (các dòng cần ghi, các key bị loại)"""
+        created_at = self.clock()
+        upserts, evicted = [], []
+        with self._lock:
+            for key, advice in entries:
+                if key is None:
+                    continue
+                advice = {k: v for k, v in advice.items()
+                          if isinstance(v, (str, int, float, bool, type(None)))}
+                self._entries[key] = (created_at, advice)
+                self._entries.move_to_end(key)
+                upserts.append((key, created_at, json.dumps(advice, ensure_ascii=False)))
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+                self.evictions += 1
+        return upserts, evicted
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._entries)
+            self._entries.clear()
+        self._persist(delete=keys)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0.0,
+        }
@@ -0,0 +1,74 @@
+"""
+Module định dạng câu trả lời có cấu trúc của ChatGPT
+- ChatGPT trả về JSON {recommendation, confidence, reason} theo JSON schema
+  (structured outputs) thay vì đoạn văn tự do: câu trả lời ngắn, ít token, nhanh hơn
+- Kiểm tra hợp lệ khi parse: khuyến nghị ngoài BUY/SELL/HOLD hoặc JSON hỏng
+  -> None (advisor coi là lỗi, không đoán từ khóa trong văn bản)
+"""
+
+import json
+
+from . import config
+
+RECOMMENDATIONS = ('BUY', 'SELL', 'HOLD')
+
+ADVICE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'recommendation': {'type': 'string', 'enum': list(RECOMMENDATIONS)},
+        'confidence': {'type': 'number', 'minimum': 0, 'maximum': 100},
+        'reason': {'type': 'string'},
+    },
+    'required': ['recommendation', 'confidence', 'reason'],
+    'additionalProperties': False,
+}
+
+
+def response_format(mode=None):
+    """
+    Tham số response_format cho chat.completions.create
+
+    Args:
+        mode: 'json_schema' (model hỗ trợ structured outputs, vd gpt-4o-mini) hoặc
+            'json_object' (model cũ) - mặc định config.ADVISOR_RESPONSE_FORMAT
+    """
+    mode = mode or config.ADVISOR_RESPONSE_FORMAT
+    if mode == 'json_object':
+        return {'type': 'json_object'}
+    return {
+        'type': 'json_schema',
+        'json_schema': {'name': 'trading_advice', 'strict': True, 'schema': ADVICE_SCHEMA},
+    }
+
+
+def validate_advice(entry):
+    """
+    dict đã decode -> advice chuẩn, hoặc None nếu sai định dạng
+
+    Confidence bị kẹp vào [0, 100]; confidence không phải số -> 0.
+    """
+    if not isinstance(entry, dict):
+        return None
+    recommendation = str(entry.get('recommendation', '')).strip().upper()
+    if recommendation not in RECOMMENDATIONS:
+        return None
+    try:
+        confidence = min(max(float(entry.get('confidence', 0)), 0.0), 100.0)
+    except (TypeError, ValueError):
+        confidence = 0.0
+    return {
+        'recommendation': recommendation,
+        'reason': str(entry.get('reason', '')).strip(),
+        'confidence': confidence,
+        'raw_response': json.dumps(entry, ensure_ascii=False),
+        'source': 'llm',
+    }
+
+
+def parse_advice(text):
+    """Câu trả lời JSON của ChatGPT -> advice, hoặc None nếu không hợp lệ"""
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    return validate_advice(data)
@@ -17,9 +17,10 @@ import os
 import signal
 import threading
 import time
-from typing import List, Dict
 
+from .conversation_memory import ConversationMemory
 from .main import TradingBot
+from .scheduler import create_scheduler
 
 
 # Thời gian chờ giữa các chu kỳ phân tích (phút)
@@ -34,16 +35,15 @@ except (ImportError, AttributeError):
 def trading_loop(bot: TradingBot, stop_event: threading.Event, interval_minutes: float) -> None:
     """Chạy chu kỳ phân tích + giao dịch liên tục cho tới khi stop_event được kích hoạt."""
 
+    scheduler = create_scheduler(interval_minutes, getattr(bot, "candle_interval", None))
     print("\n🚀 Bắt đầu chế độ AUTO TRADING (không cần menu).")
-    print(f"⏱️ Chu kỳ phân tích: {interval_minutes} phút\n")
+    print(f"⏱️ Chu kỳ phân tích: {scheduler.period_ms / 60_000:g} phút (theo mốc đóng nến)\n")
 
     try:
-        while not stop_event.is_set():
-            bot.run_once()
-
-            # Đợi tới chu kỳ tiếp theo (có thể bị ngắt bởi stop_event)
-            if stop_event.wait(interval_minutes * 60):
-                break
+        bot.run_cycle()
+        # Chạy ngay sau mỗi mốc đóng nến (có thể bị ngắt bởi stop_event)
+        while scheduler.wait_next(stop_event=stop_event) is not None:
+            bot.run_cycle()
     except Exception as exc:
         print(f"❌ Lỗi trong trading_loop: {exc}")
     finally:
@@ -57,17 +57,13 @@ def chat_loop(bot: TradingBot, stop_event: threading.Event) -> None:
         print("⚠️ Không thể khởi tạo phiên chat vì ChatGPT Advisor chưa sẵn sàng.")
         return
 
-    history: List[Dict[str, str]] = [
-        {
-            "role": "system",
-            "content": (
-                "Bạn là trợ lý giao dịch AI thân thiện, sử dụng tiếng Việt đơn giản,"
-                " ưu tiên giải thích dễ hiểu cho học sinh cấp 3. Luôn nhắc nhở rằng"
-                " đây là môi trường học tập với Binance Testnet và không đưa lời khuyên"
-                " đầu tư thực tế."
-            ),
-        }
-    ]
+    # Lịch sử có ngân sách token: lượt cũ được tóm tắt, prompt mỗi lượt không phình ra
+    history = ConversationMemory(
+        "Bạn là trợ lý giao dịch AI thân thiện, sử dụng tiếng Việt đơn giản,"
+        " ưu tiên giải thích dễ hiểu cho học sinh cấp 3. Luôn nhắc nhở rằng"
+        " đây là môi trường học tập với Binance Testnet và không đưa lời khuyên"
+        " đầu tư thực tế."
+    )
 
     instructions = (
         "\n💬 Phiên chat với trợ lý AI đã sẵn sàng!\n"
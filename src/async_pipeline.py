@@ -0,0 +1,312 @@
+"""
+Module chạy chu kỳ giao dịch bằng asyncio
+- I/O độc lập chạy đồng thời: ticker và nến của một symbol, và mọi symbol trong chu kỳ
+- Binance qua AsyncClient (aiohttp), ChatGPT qua AsyncOpenAI: chờ mạng không giữ thread
+- Tính chỉ báo (CPU) chạy trong thread pool riêng, không chặn event loop
+- Mỗi giai đoạn có timeout riêng: một request treo không kéo cả chu kỳ
+- Event loop chạy trên một thread nền cố định (client async gắn với loop đó)
+"""
+
+import asyncio
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from binance import AsyncClient
+
+from .batch_advisor import AdviceBatcher, BatchAdvisor
+from .binance_client import REQUEST_WEIGHTS, get_rate_limiter
+from .candle_store import MAX_KLINES_PER_REQUEST, klines_to_dataframe
+from .multi_symbol import CycleReport
+from . import config
+
+
+class StageTimeout(Exception):
+    """Một giai đoạn của chu kỳ vượt quá timeout"""
+
+    def __init__(self, stage, timeout):
+        super().__init__(f"giai đoạn '{stage}' quá {timeout:g}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+def default_timeouts():
+    """Timeout (giây) của từng giai đoạn, lấy từ config"""
+    return {
+        'market': config.PIPELINE_TIMEOUT_MARKET_SECONDS,
+        'indicators': config.PIPELINE_TIMEOUT_INDICATORS_SECONDS,
+        'advisor': config.PIPELINE_TIMEOUT_ADVISOR_SECONDS,
+        'order': config.PIPELINE_TIMEOUT_ORDER_SECONDS,
+    }
+
+
+class AsyncTradingPipeline:
+    """
+    Chu kỳ phân tích + giao dịch của TradingBot chạy trên asyncio
+
+    Mỗi symbol: (ticker ‖ nến) -> chỉ báo (thread pool) -> ChatGPT -> risk + lệnh.
+    Nhiều symbol chạy xen kẽ trên cùng event loop, giới hạn bởi semaphore và
+    ngân sách request weight dùng chung (RateLimiter).
+
+    Ví dụ:
+        pipeline = AsyncTradingPipeline(bot)
+        report = pipeline.run_cycle(['BTCUSDT', 'ETHUSDT'])
+        pipeline.close()
+    """
+
+    def __init__(self, bot, binance_client=None, timeouts=None, max_concurrency=None, advice_mode=None):
+        """
+        Args:
+            bot: TradingBot (dùng data_collector, indicators, advisor, database_logger,
+                _decide_and_execute)
+            binance_client: AsyncClient (mặc định tạo Testnet client khi cần)
+            timeouts: dict giai đoạn -> giây, ghi đè default_timeouts()
+            max_concurrency: Số symbol chạy đồng thời (mặc định config.PIPELINE_MAX_CONCURRENCY)
+            advice_mode: 'packed' = gom các symbol vào prompt chung, 'concurrent' = mỗi
+                symbol một request (mặc định config.ADVISOR_BATCH_MODE)
+        """
+        self.bot = bot
+        self._binance = binance_client
+        self._owns_binance = binance_client is None
+        self.timeouts = {**default_timeouts(), **(timeouts or {})}
+        self.max_concurrency = max_concurrency or config.PIPELINE_MAX_CONCURRENCY
+        self.limiter = get_rate_limiter()
+        self._cpu_pool = ThreadPoolExecutor(max_workers=config.PIPELINE_CPU_WORKERS,
+                                            thread_name_prefix='pipeline-cpu')
+        self._tasks = {}  # symbol -> asyncio.Task đang chạy
+        advice_mode = advice_mode or config.ADVISOR_BATCH_MODE
+        self.batcher = (AdviceBatcher(BatchAdvisor(bot.advisor, mode='packed'))
+                        if advice_mode == 'packed' else None)
+        self._semaphore = None
+
+        self._loop = asyncio.new_event_loop()
+        # Lời gọi đồng bộ còn lại (SQLite, đặt lệnh) chạy trong thread pool mặc định của loop
+        self._loop.set_default_executor(ThreadPoolExecutor(
+            max_workers=max(4, self.max_concurrency), thread_name_prefix='pipeline-io'))
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name='AsyncTradingPipeline', daemon=True)
+        self._thread.start()
+
+    # ==== Điều khiển từ thread khác ====
+    def run(self, coro):
+        """Chạy coroutine trên event loop của pipeline, chờ kết quả"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def run_once(self, symbol):
+        """Một chu kỳ cho một symbol (đồng bộ)"""
+        return self.run(self._run_symbol(symbol))
+
+    def run_cycle(self, symbols):
+        """
+        Một chu kỳ cho mọi symbol, chờ tối đa config.CYCLE_LATENCY_SLO_SECONDS
+
+        Returns:
+            CycleReport
+        """
+        return self.run(self._cycle(list(dict.fromkeys(symbols))))
+
+    def close(self):
+        """Đóng client async, dừng event loop và thread pool"""
+        if self._loop.is_closed():
+            return
+        try:
+            self.run(self._close_clients())
+        except Exception as e:
+            print(f"⚠️ Lỗi đóng client async: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop.close()
+        self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _close_clients(self):
+        for task in self._tasks.values():
+            task.cancel()
+        if self.batcher is not None:
+            self.batcher.cancel()
+        if self._binance is not None and self._owns_binance:
+            await self._binance.close_connection()
+            self._binance = None
+        advisor_client = getattr(self.bot.advisor, 'async_client', None)
+        if advisor_client is not None:
+            await advisor_client.close()
+            self.bot.advisor.async_client = None
+
+    # ==== Chu kỳ ====
+    async def _cycle(self, symbols):
+        started = time.monotonic()
+        report = CycleReport(results={})
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = {}
+        for symbol in symbols:
+            previous = self._tasks.get(symbol)
+            if previous is not None and not previous.done():
+                report.busy.append(symbol)
+                continue
+            task = asyncio.create_task(self._run_limited(symbol), name=f'cycle-{symbol}')
+            self._tasks[symbol] = task
+            tasks[task] = symbol
+
+        slo = config.CYCLE_LATENCY_SLO_SECONDS
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=slo if slo and slo > 0 else None)
+        else:
+            done, pending = set(), set()
+        for task in done:
+            report.results[tasks[task]] = task.result()
+            if task.result() is None:
+                report.failed.append(tasks[task])
+        report.late = sorted(tasks[task] for task in pending)
+        report.busy.sort()
+        report.failed.sort()
+        report.duration = time.monotonic() - started
+
+        if report.late:
+            print(f"⚠️ Chu kỳ vượt SLO {slo:g}s: {len(report.late)} symbol chưa xong "
+                  f"({', '.join(report.late)})")
+        print(f"🧮 Chu kỳ async {len(symbols)} symbol: {report.duration:.1f}s, "
+              f"đặt lệnh {len(report.executed)}, không có kết quả {len(report.failed)}")
+        return report
+
+    async def _run_limited(self, symbol):
+        async with self._semaphore:
+            return await self._run_symbol(symbol)
+
+    async def _stage(self, name, awaitable, timings):
+        """Chạy một giai đoạn với timeout riêng, ghi thời gian (ms) vào timings"""
+        started = time.perf_counter()
+        timeout = self.timeouts.get(name)
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            raise StageTimeout(name, timeout) from None
+        finally:
+            timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    async def _run_symbol(self, symbol):
+        """
+        Một chu kỳ cho một symbol
+
+        Returns:
+            dict kết quả như TradingBot.run_once (thêm 'stage_ms', 'latency_ms'), None nếu lỗi
+        """
+        bot = self.bot
+        loop = asyncio.get_running_loop()
+        timings = {}
+        started = time.perf_counter()
+        try:
+            # Bước 1: giá ticker và nến tải đồng thời
+            price, candles = await self._stage('market', self._fetch_market(symbol), timings)
+            if candles.empty:
+                print(f"⚠️ {symbol}: Không có dữ liệu!")
+                return None
+
+            # Bước 2: chỉ báo (CPU) trong thread pool
+            indicators = await self._stage('indicators', loop.run_in_executor(
+                self._cpu_pool, partial(
+                    bot.indicators.get_all_indicators, candles,
+                    ma_period=config.MA_PERIOD,
+                    rsi_period=config.RSI_PERIOD,
+                    atr_period=config.ATR_PERIOD)), timings)
+
+            # Bước 3: ChatGPT (gom chung prompt với các symbol khác nếu 'packed')
+            # - quá hạn / lỗi / circuit breaker ngắt thì dùng tín hiệu quy tắc (xem guarded_advisor)
+            analyze = self.batcher.analyze if self.batcher else bot.advisor.analyze_market_async
+            try:
+                advice = await self._stage('advisor', bot.advisor_guard.analyze_async(
+                    symbol, indicators, analyze=analyze), timings)
+            except StageTimeout as e:
+                bot.advisor_guard.breaker.record_failure()
+                advice = bot.advisor_guard.fallback(symbol, indicators, f"ChatGPT quá hạn {e.timeout:g}s")
+            print(f"🤖 {symbol}: {advice['recommendation']}")
+
+            # Ghi qua hàng đợi nền (write-behind) - không chờ đĩa
+            bot.database_logger.save_analysis_data(indicators, advice, symbol=symbol)
+
+            # Bước 4 + 5: risk + đặt lệnh (REST đồng bộ) trong thread; lệnh dùng giá ticker mới nhất
+            order_indicators = dict(indicators, current_price=price) if price else None
+            result = await self._stage('order', asyncio.to_thread(
+                bot._decide_and_execute, symbol, indicators, advice, order_indicators), timings)
+        except StageTimeout as e:
+            if e.stage == 'order':
+                print(f"⚠️ {symbol}: {e} - lệnh có thể vẫn đang được gửi, kiểm tra lại trên sàn")
+            else:
+                print(f"⏱️ {symbol}: {e}, bỏ qua chu kỳ này")
+            return None
+        except Exception as e:
+            print(f"❌ {symbol}: Lỗi trong chu kỳ async: {e}")
+            traceback.print_exc()
+            return None
+
+        result['stage_ms'] = timings
+        result['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    # ==== Dữ liệu thị trường ====
+    async def _client(self):
+        if self._binance is None:
+            self._binance = await AsyncClient.create(
+                api_key=config.BINANCE_API_KEY,
+                api_secret=config.BINANCE_SECRET_KEY,
+                testnet=True  # QUAN TRỌNG: Chỉ dùng Testnet
+            )
+        return self._binance
+
+    async def _fetch_market(self, symbol):
+        """
+        Returns:
+            tuple (giá ticker hoặc None, DataFrame nến)
+        """
+        interval = self.bot.candle_interval
+        stream = self.bot.data_collector._stream_for(symbol, interval)
+        if stream is not None:
+            # Đang streaming: đọc bộ nhớ, không gọi mạng
+            return stream.get_price(), stream.get_candles(limit=100)
+        return await asyncio.gather(self._fetch_price(symbol),
+                                    self._fetch_candles(symbol, interval))
+
+    async def _fetch_price(self, symbol):
+        try:
+            client = await self._client()
+            await self.limiter.acquire_async(REQUEST_WEIGHTS['/api/v3/ticker/price'])
+            ticker = await client.get_symbol_ticker(symbol=symbol)
+            return float(ticker['price'])
+        except Exception as e:
+            print(f"❌ Lỗi lấy giá {symbol}: {e}")
+            return None
+
+    async def _get_klines(self, **params):
+        client = await self._client()
+        await self.limiter.acquire_async(REQUEST_WEIGHTS['/api/v3/klines'])
+        return await client.get_klines(**params)
+
+    async def _fetch_candles(self, symbol, interval, limit=100):
+        """
+        Nến mới nhất; có kho nến cục bộ thì chỉ tải phần nến mới (một request)
+        rồi đọc từ kho, giống DataCollector.get_candles
+        """
+        store = self.bot.data_collector.candle_store
+        if store is None:
+            klines = await self._get_klines(symbol=symbol, interval=interval, limit=limit)
+            return klines_to_dataframe(klines)
+
+        _, last_open, count = await asyncio.to_thread(store.get_time_range, symbol, interval)
+        if last_open is None:
+            klines = await self._get_klines(symbol=symbol, interval=interval,
+                                            limit=min(limit, MAX_KLINES_PER_REQUEST))
+        else:
+            klines = await self._get_klines(symbol=symbol, interval=interval,
+                                            startTime=last_open, limit=MAX_KLINES_PER_REQUEST)
+            if len(klines) >= MAX_KLINES_PER_REQUEST or count + len(klines) <= limit:
+                # Thiếu nhiều (nhiều trang hoặc cần tải bù lịch sử): dùng sync đầy đủ
+                await asyncio.to_thread(store.sync, self.bot.data_collector.client,
+                                        symbol, interval, limit)
+                klines = []
+
+        def save_and_load():
+            store.upsert_klines(symbol, interval, klines)
+            return store.load(symbol, interval, limit=limit)
+
+        return await asyncio.to_thread(save_and_load)
@@ -0,0 +1,407 @@
+"""
+Module Backtest - kiểm tra chiến lược trên dữ liệu lịch sử
+- Phát lại từng nến đã lưu (CandleStore) theo thứ tự thời gian
+- Dùng CHÍNH các quy tắc tín hiệu (strategy_signals) và RiskOrderManager như khi chạy thật
+- Mô phỏng khớp lệnh market với phí giao dịch và trượt giá
+- Xuất danh sách lệnh + đường cong vốn theo đúng cấu trúc bảng
+  trading_history / performance trong database
+
+Chỉ báo được tính tăng dần (IncrementalIndicators) nên vài tháng dữ liệu 1m
+chỉ mất vài giây, thay vì gọi generate_signals trên DataFrame lớn dần mỗi nến.
+"""
+
+import argparse
+import math
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .incremental_indicators import IncrementalIndicators
+from . import indicator_kernels as kernels
+from .risk_manager import RiskOrderManager
+from .strategy_signals import evaluate_rules, generate_signals_vectorized, long_ma_period
+from . import config
+
+
+# Cột giống bảng trading_history / performance (trừ id tự tăng)
+TRADE_COLUMNS = [
+    'timestamp', 'order_id', 'symbol', 'side', 'quantity', 'entry_price', 'exit_price',
+    'stop_loss', 'take_profit', 'status', 'pnl', 'pnl_percent'
+]
+PERFORMANCE_COLUMNS = [
+    'timestamp', 'total_trades', 'winning_trades', 'losing_trades', 'total_pnl',
+    'win_rate', 'avg_win', 'avg_loss', 'profit_factor', 'account_balance'
+]
+
+MS_PER_YEAR = 365 * 24 * 60 * 60 * 1000
+
+
+def _bar_times(candles):
+    """Thời điểm đóng nến (datetime64) để gắn vào lệnh và đường cong vốn"""
+    if 'close_time' in candles.columns:
+        return pd.to_datetime(candles['close_time'].to_numpy() + 1, unit='ms')
+    if 'open_time' in candles.columns:
+        return pd.to_datetime(candles['open_time'].to_numpy(), unit='ms')
+    if 'datetime' in candles.columns:
+        return pd.DatetimeIndex(candles['datetime'])
+    return pd.DatetimeIndex(candles.index)
+
+
+def compute_metrics(equity, trade_pnls, bar_ms=None):
+    """
+    Tính các chỉ số đánh giá chiến lược
+
+    Args:
+        equity: mảng số dư theo từng nến
+        trade_pnls: mảng PnL của các lệnh đã đóng
+        bar_ms: độ dài một nến (ms) để quy đổi Sharpe theo năm
+
+    Returns:
+        dict: sharpe, max_drawdown (%), profit_factor, return_percent...
+    """
+    equity = np.asarray(equity, dtype=float)
+    pnls = np.asarray(trade_pnls, dtype=float)
+
+    sharpe = 0.0
+    if len(equity) > 2:
+        returns = np.diff(equity) / equity[:-1]
+        std = returns.std()
+        if std > 0:
+            periods = MS_PER_YEAR / bar_ms if bar_ms else 1.0
+            sharpe = float(returns.mean() / std * math.sqrt(periods))
+
+    max_drawdown = 0.0
+    if len(equity):
+        peaks = np.maximum.accumulate(equity)
+        max_drawdown = float(((peaks - equity) / peaks).max() * 100)
+
+    gross_win = pnls[pnls > 0].sum()
+    gross_loss = -pnls[pnls < 0].sum()
+    if gross_loss > 0:
+        profit_factor = float(gross_win / gross_loss)
+    else:
+        profit_factor = float('inf') if gross_win > 0 else 0.0
+
+    start = equity[0] if len(equity) else 0.0
+    end = equity[-1] if len(equity) else 0.0
+    return {
+        'total_trades': int(len(pnls)),
+        'winning_trades': int((pnls > 0).sum()),
+        'losing_trades': int((pnls < 0).sum()),
+        'win_rate': round(float((pnls > 0).mean() * 100), 2) if len(pnls) else 0.0,
+        'total_pnl': round(float(pnls.sum()), 2),
+        'final_balance': round(float(end), 2),
+        'return_percent': round(float((end - start) / start * 100), 2) if start else 0.0,
+        'max_drawdown': round(max_drawdown, 2),
+        'sharpe': round(sharpe, 3),
+        'profit_factor': round(profit_factor, 3),
+    }
+
+
+class Backtester:
+    """
+    Backtest theo sự kiện (từng nến một)
+
+    Mỗi nến:
+    1. Kiểm tra stop loss / take profit của vị thế đang mở (theo high/low của nến)
+    2. Cập nhật chỉ báo tăng dần và áp dụng quy tắc tín hiệu
+    3. Nếu có BUY/SELL: RiskOrderManager kiểm tra điều kiện và tính khối lượng
+    4. Khớp lệnh market tại giá đóng cửa (+ trượt giá, + phí)
+    """
+
+    def __init__(self, symbol=None, initial_balance=None, fee_rate=None,
+                 slippage_bps=None, signal_confidence=None, fib_tolerance=0.005,
+                 indicator_params=None, stop_loss_percent=None, take_profit_percent=None,
+                 vectorized=False):
+        """
+        Args:
+            symbol: Mã giao dịch (chỉ dùng để ghi vào kết quả)
+            initial_balance: Vốn ban đầu (USDT)
+            fee_rate: Phí mỗi chiều giao dịch (0.001 = 0.1%)
+            slippage_bps: Trượt giá mỗi lệnh (basis points)
+            signal_confidence: Độ tin cậy gán cho tín hiệu (để qua check_risk_conditions)
+            fib_tolerance: Khoảng cách tối đa giữa giá và mức Fibonacci
+            indicator_params: dict tham số cho IncrementalIndicators (ma_period, macd_fast...)
+            stop_loss_percent, take_profit_percent: Nếu truyền vào thì dùng stop loss /
+                take profit theo % cố định thay vì theo ATR (mặc định của RiskOrderManager)
+            vectorized: True = tính toàn bộ tín hiệu một lần bằng generate_signals_vectorized
+                (nhanh hơn, cho kết quả giống hệt; dùng khi tối ưu tham số)
+        """
+        self.symbol = symbol or config.TRADE_SYMBOL
+        self.initial_balance = initial_balance or config.INITIAL_BALANCE
+        self.fee_rate = config.BACKTEST_FEE_RATE if fee_rate is None else fee_rate
+        slippage_bps = config.BACKTEST_SLIPPAGE_BPS if slippage_bps is None else slippage_bps
+        self.slippage = slippage_bps / 10_000
+        self.signal_confidence = (config.BACKTEST_SIGNAL_CONFIDENCE
+                                  if signal_confidence is None else signal_confidence)
+        self.fib_tolerance = fib_tolerance
+        self.indicator_params = dict(indicator_params or {})
+        self.stop_loss_percent = stop_loss_percent
+        self.take_profit_percent = take_profit_percent
+        self.vectorized = vectorized
+
+    def _make_engine(self):
+        params = dict(self.indicator_params)
+        ma_period = params.get('ma_period') or config.MA_PERIOD
+        params.setdefault('ma_long_period', long_ma_period(ma_period))
+        return IncrementalIndicators(**params)
+
+    def _precompute(self, candles):
+        """Tín hiệu + MA/RSI/ATR cho mọi nến (chế độ vectorized)"""
+        params = self.indicator_params
+        signals = generate_signals_vectorized(
+            candles, ma_period=params.get('ma_period'), macd_fast=params.get('macd_fast'),
+            macd_slow=params.get('macd_slow'), macd_signal=params.get('macd_signal'),
+            fib_lookback=params.get('fib_lookback'), fib_tolerance=self.fib_tolerance
+        )
+        close = candles['close']
+        return (
+            signals['recommendation'].to_numpy(),
+            kernels.sma(close, params.get('ma_period') or config.MA_PERIOD),
+            kernels.rsi(close, params.get('rsi_period') or config.RSI_PERIOD),
+            kernels.atr(candles['high'], candles['low'], close,
+                        params.get('atr_period') or config.ATR_PERIOD),
+        )
+
+    def run(self, candles):
+        """
+        Chạy backtest trên DataFrame nến (định dạng DataCollector.get_candles)
+
+        Returns:
+            dict: {
+                'trades': DataFrame cột giống trading_history,
+                'equity': DataFrame cột giống performance (mỗi nến một dòng),
+                'summary': dict các chỉ số (sharpe, max_drawdown, profit_factor...)
+            }
+        """
+        started = time.perf_counter()
+        engine = None if self.vectorized else self._make_engine()
+        precomputed = ([values.tolist() for values in self._precompute(candles)]
+                       if self.vectorized else None)
+        risk = RiskOrderManager(account_balance=self.initial_balance, verbose=False)
+        fixed_stops = self.stop_loss_percent is not None or self.take_profit_percent is not None
+        if self.stop_loss_percent is not None:
+            risk.stop_loss_percent = self.stop_loss_percent
+        if self.take_profit_percent is not None:
+            risk.take_profit_percent = self.take_profit_percent
+
+        # list số thực Python: truy cập từng phần tử nhanh hơn nhiều so với ndarray
+        opens = candles['open'].to_numpy(dtype=float).tolist()
+        highs = candles['high'].to_numpy(dtype=float).tolist()
+        lows = candles['low'].to_numpy(dtype=float).tolist()
+        closes = candles['close'].to_numpy(dtype=float).tolist()
+        n = len(closes)
+
+        balance = float(self.initial_balance)
+        position = None
+        trades = []
+        gross_win = gross_loss = 0.0
+        wins = losses = 0
+
+        equity = np.empty(n)
+        stats = np.zeros((n, 5))  # total, wins, losses, gross_win, gross_loss
+
+        def close_position(price, bar, status):
+            nonlocal balance, position, gross_win, gross_loss, wins, losses
+            qty = position['quantity']
+            if position['side'] == 'BUY':
+                fill = price * (1 - self.slippage)
+                pnl = (fill - position['entry_price']) * qty
+            else:
+                fill = price * (1 + self.slippage)
+                pnl = (position['entry_price'] - fill) * qty
+            pnl -= fill * qty * self.fee_rate + position['entry_fee']
+            balance += pnl
+            if pnl > 0:
+                wins += 1
+                gross_win += pnl
+            elif pnl < 0:
+                losses += 1
+                gross_loss -= pnl
+            notional = position['entry_price'] * qty
+            trades.append([
+                position['bar'], f"BT-{len(trades) + 1}", self.symbol, position['side'], qty,
+                position['entry_price'], fill, position['stop_loss'], position['take_profit'],
+                status, pnl, pnl / notional * 100 if notional else 0.0
+            ])
+            position = None
+
+        for i in range(n):
+            high, low, close = highs[i], lows[i], closes[i]
+
+            # 1. Stop loss / take profit trong nến (ưu tiên stop - giả định bất lợi)
+            if position is not None:
+                if position['side'] == 'BUY':
+                    if low <= position['stop_loss']:
+                        close_position(min(opens[i], position['stop_loss']), i, 'STOP_LOSS')
+                    elif high >= position['take_profit']:
+                        close_position(max(opens[i], position['take_profit']), i, 'TAKE_PROFIT')
+                else:
+                    if high >= position['stop_loss']:
+                        close_position(max(opens[i], position['stop_loss']), i, 'STOP_LOSS')
+                    elif low <= position['take_profit']:
+                        close_position(min(opens[i], position['take_profit']), i, 'TAKE_PROFIT')
+
+            # 2. Chỉ báo + tín hiệu tại giá đóng cửa
+            if precomputed is not None:
+                recommendation = precomputed[0][i]
+            else:
+                prev_macd = (engine.macd.macd, engine.macd.signal)
+                engine.update(high, low, close)
+                if engine.bars >= 10:
+                    rules = evaluate_rules(
+                        close, engine.sma.value, engine.sma_long.value,
+                        prev_macd, (engine.macd.macd, engine.macd.signal),
+                        engine.fibonacci(), fib_tolerance=self.fib_tolerance
+                    )
+                    recommendation = rules['recommendation']
+                else:
+                    recommendation = 'HOLD'
+
+            # Tín hiệu ngược chiều: đóng vị thế đang mở
+            if (position is not None and recommendation in ('BUY', 'SELL')
+                    and recommendation != position['side']):
+                close_position(close, i, 'SIGNAL_EXIT')
+
+            # 3-4. Mở vị thế mới
+            if position is None and recommendation in ('BUY', 'SELL'):
+                if precomputed is not None:
+                    ma, rsi, atr = (values[i] for values in precomputed[1:])
+                else:
+                    ma, rsi, atr = engine.sma.value, engine.rsi.value, engine.atr.value
+                indicators = {'current_price': close, 'ma': ma, 'rsi': rsi, 'atr': atr}
+                advice = {'recommendation': recommendation, 'confidence': self.signal_confidence}
+                can_execute, _ = risk.check_risk_conditions(indicators, advice)
+                if can_execute:
+                    fill = close * (1 + self.slippage if recommendation == 'BUY' else 1 - self.slippage)
+                    risk.account_balance = balance
+                    info = risk.calculate_position_size(
+                        entry_price=fill, signal=recommendation,
+                        current_atr=None if fixed_stops or atr != atr else atr
+                    )
+                    # Không dùng đòn bẩy: giá trị lệnh tối đa bằng số dư
+                    quantity = min(info['quantity'], balance / (fill * (1 + self.fee_rate))) if info else 0
+                    if quantity > 0:
+                        position = {
+                            'bar': i, 'side': recommendation, 'quantity': quantity,
+                            'entry_price': fill, 'entry_fee': fill * quantity * self.fee_rate,
+                            'stop_loss': info['stop_loss'], 'take_profit': info['take_profit'],
+                        }
+
+            # Đường cong vốn (mark-to-market)
+            value = balance
+            if position is not None:
+                qty = position['quantity']
+                if position['side'] == 'BUY':
+                    value += (close - position['entry_price']) * qty
+                else:
+                    value += (position['entry_price'] - close) * qty
+            equity[i] = value
+            stats[i] = (wins + losses, wins, losses, gross_win, gross_loss)
+
+        # Vị thế còn mở khi hết dữ liệu: đóng tại giá cuối
+        if position is not None:
+            close_position(closes[-1], n - 1, 'END_OF_DATA')
+            equity[-1] = balance
+            stats[-1] = (wins + losses, wins, losses, gross_win, gross_loss)
+
+        times = _bar_times(candles)
+        result = {
+            'trades': self._trades_frame(trades, times),
+            'equity': self._equity_frame(stats, equity, times),
+        }
+        bar_ms = None
+        if n > 1:
+            bar_ms = float(np.median((times[1:] - times[:-1]).total_seconds()) * 1000)
+        summary = compute_metrics(equity, result['trades']['pnl'].to_numpy(), bar_ms)
+        summary['bars'] = n
+        summary['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+        result['summary'] = summary
+        return result
+
+    @staticmethod
+    def _trades_frame(trades, times):
+        df = pd.DataFrame(trades, columns=TRADE_COLUMNS)
+        if not df.empty:
+            df['timestamp'] = [times[i].isoformat() for i in df['timestamp']]
+        return df
+
+    @staticmethod
+    def _equity_frame(stats, equity, times):
+        total, wins, losses, gross_win, gross_loss = stats.T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_win = np.where(wins > 0, gross_win / wins, 0.0)
+            avg_loss = np.where(losses > 0, -gross_loss / losses, 0.0)
+            win_rate = np.where(total > 0, wins / total * 100, 0.0)
+            profit_factor = np.where(gross_loss > 0, gross_win / gross_loss, 0.0)
+        return pd.DataFrame({
+            'timestamp': np.datetime_as_string(times.to_numpy().astype('datetime64[s]')),
+            'total_trades': total.astype(int),
+            'winning_trades': wins.astype(int),
+            'losing_trades': losses.astype(int),
+            'total_pnl': np.round(gross_win - gross_loss, 2),
+            'win_rate': np.round(win_rate, 2),
+            'avg_win': np.round(avg_win, 2),
+            'avg_loss': np.round(avg_loss, 2),
+            'profit_factor': np.round(profit_factor, 2),
+            'account_balance': np.round(equity, 2),
+        }, columns=PERFORMANCE_COLUMNS)
+
+    @staticmethod
+    def export_to_database(result, db_file):
+        """
+        Ghi kết quả backtest vào một database riêng (cùng cấu trúc bảng với bot thật)
+        để xem lại bằng ReportingMonitoring.
+        """
+        from .db_migrations import migrate
+
+        conn = sqlite3.connect(db_file)
+        try:
+            migrate(conn)  # tạo bảng nếu chưa có
+            for table, frame in (('trading_history', result['trades']), ('performance', result['equity'])):
+                frame = frame.copy()
+                # Thời gian nến là UTC: tự tính ts_ms thay vì để trigger hiểu là giờ máy
+                times = pd.to_datetime(frame['timestamp']).astype('datetime64[ms]')
+                frame['ts_ms'] = times.astype('int64')
+                frame.to_sql(table, conn, if_exists='append', index=False)
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"✅ Đã lưu kết quả backtest vào {db_file}")
+
+
+def main():
+    """Chạy backtest trên nến đã lưu trong CandleStore"""
+    from .candle_store import CandleStore
+
+    parser = argparse.ArgumentParser(description="Backtest chiến lược trên nến đã lưu")
+    parser.add_argument('--symbol', default=config.TRADE_SYMBOL)
+    parser.add_argument('--interval', default='1m')
+    parser.add_argument('--days', type=float, default=90, help="Số ngày gần nhất cần chạy")
+    parser.add_argument('--fee', type=float, default=None, help="Phí mỗi chiều (vd 0.001)")
+    parser.add_argument('--slippage-bps', type=float, default=None)
+    parser.add_argument('--output-db', default=None, help="Lưu kết quả vào file SQLite")
+    args = parser.parse_args()
+
+    store = CandleStore()
+    start = int((datetime.now() - timedelta(days=args.days)).timestamp() * 1000)
+    candles = store.load(args.symbol, args.interval, start_time=start)
+    if candles.empty:
+        print("⚠️ Chưa có nến trong kho. Hãy chạy bot (hoặc DataCollector.get_candles) để tải dữ liệu trước.")
+        return
+
+    backtester = Backtester(symbol=args.symbol, fee_rate=args.fee, slippage_bps=args.slippage_bps)
+    result = backtester.run(candles)
+
+    print(f"\n📊 BACKTEST {args.symbol} {args.interval} - {len(candles)} nến")
+    for key, value in result['summary'].items():
+        print(f"   {key}: {value}")
+    if args.output_db:
+        Backtester.export_to_database(result, args.output_db)
+
+
+if __name__ == '__main__':
+    main()
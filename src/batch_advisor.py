@@ -0,0 +1,295 @@
+"""
+Module phân tích nhiều symbol bằng ChatGPT trong một lượt
+- 'packed': gộp chỉ báo của nhiều symbol vào MỘT prompt, ChatGPT trả JSON
+  theo từng symbol -> 50 symbol chỉ tốn 2 request (ADVISOR_BATCH_SIZE = 25)
+- 'concurrent': mỗi symbol một request, chạy đồng thời (giới hạn semaphore)
+- Gặp giới hạn tần suất (429) / lỗi tạm thời: chờ lũy thừa (theo Retry-After nếu
+  có) và MỌI request đang chạy cùng tạm dừng tới hết thời gian chờ
+- Symbol đã có trong cache (AdviceCache) không được gửi lại
+"""
+
+import asyncio
+import json
+import random
+import time
+
+import openai
+
+from .advice_format import validate_advice
+from . import config
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError,
+                    openai.APIConnectionError, openai.InternalServerError)
+
+
+class RetryPolicy:
+    """
+    Thử lại request OpenAI với backoff lũy thừa + jitter
+
+    Thời gian chờ sau lỗi 429 được dùng chung: các request khác cũng chờ
+    tới cooldown_until trước khi gửi, tránh dồn thêm request vào giới hạn.
+    """
+
+    def __init__(self, max_retries=None, base_delay=None, max_delay=None):
+        self.max_retries = config.ADVISOR_MAX_RETRIES if max_retries is None else max_retries
+        self.base_delay = config.ADVISOR_RETRY_BASE_SECONDS if base_delay is None else base_delay
+        self.max_delay = config.ADVISOR_RETRY_MAX_SECONDS if max_delay is None else max_delay
+        self.cooldown_until = 0.0  # time.monotonic()
+        self.retries = 0
+
+    def delay_for(self, error, attempt):
+        """Số giây chờ trước lần thử thứ attempt + 1"""
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), self.max_delay)
+        except ValueError:
+            pass
+        delay = self.base_delay * (2 ** attempt)
+        return min(delay + random.uniform(0, delay / 2), self.max_delay)
+
+    async def run(self, make_call):
+        """
+        Args:
+            make_call: Hàm không tham số trả về awaitable (gọi lại mỗi lần thử)
+        """
+        attempt = 0
+        while True:
+            wait = self.cooldown_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await make_call()
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.delay_for(e, attempt)
+                if isinstance(e, openai.RateLimitError):
+                    self.cooldown_until = max(self.cooldown_until, time.monotonic() + delay)
+                print(f"⏳ ChatGPT {type(e).__name__}, thử lại sau {delay:.1f}s "
+                      f"({attempt + 1}/{self.max_retries})")
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+
+
+def snapshot(symbol, current_price, ma, rsi, atr):
+    """Dữ liệu chỉ báo của một symbol cho batch"""
+    return {'symbol': symbol, 'current_price': current_price, 'ma': ma, 'rsi': rsi, 'atr': atr}
+
+
+def build_batch_messages(snapshots):
+    """Một prompt cho nhiều symbol, yêu cầu trả về JSON theo symbol"""
+    lines = [
+        f"{s['symbol']}: giá={s['current_price']:.6g}, MA({config.MA_PERIOD})={s['ma']:.6g}, "
+        f"RSI={s['rsi']:.2f}, ATR={s['atr']:.6g}"
+        for s in snapshots
+    ]
+    return [
+        {
+            "role": "system",
+            "content": "Bạn là chuyên gia phân tích thị trường tiền điện tử. Với mỗi cặp, "
+                       "đưa ra khuyến nghị BUY, SELL hoặc HOLD dựa trên dữ liệu kỹ thuật. "
+                       "Chỉ trả lời bằng một JSON object."
+        },
+        {
+            "role": "user",
+            "content": "Dữ liệu kỹ thuật:\n" + "\n".join(lines) + "\n\n"
+                       "Trả về JSON object: khóa là symbol, giá trị là "
+                       '{"recommendation": "BUY|SELL|HOLD", "confidence": 0-100, '
+                       '"reason": "tối đa 2 câu tiếng Việt"}.'
+        }
+    ]
+
+
+def parse_batch_response(text, symbols):
+    """
+    Tách câu trả lời JSON của prompt gộp thành khuyến nghị từng symbol
+
+    Returns:
+        dict: symbol -> advice (symbol thiếu / sai định dạng không có trong dict)
+    """
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    data = {str(k).upper(): v for k, v in data.items()}
+    results = {}
+    for symbol in symbols:
+        advice = validate_advice(data.get(symbol.upper()))
+        if advice is not None:
+            results[symbol] = advice
+    return results
+
+
+class BatchAdvisor:
+    """
+    Phân tích một danh sách symbol qua ChatGPTAdvisor
+
+    Ví dụ:
+        batch = BatchAdvisor(advisor)
+        results = batch.analyze([snapshot('BTCUSDT', 43250, 42800, 72.5, 250), ...])
+        results['BTCUSDT']['recommendation']
+    """
+
+    def __init__(self, advisor, mode=None, batch_size=None, max_concurrency=None, retry=None):
+        """
+        Args:
+            advisor: ChatGPTAdvisor (model, cache, analyze_market_async)
+            mode: 'packed' hoặc 'concurrent' (mặc định config.ADVISOR_BATCH_MODE)
+            batch_size: Số symbol mỗi prompt gộp (mặc định config.ADVISOR_BATCH_SIZE)
+            max_concurrency: Số request đồng thời (mặc định config.ADVISOR_MAX_CONCURRENCY)
+            retry: RetryPolicy dùng chung
+        """
+        self.advisor = advisor
+        self.mode = mode or config.ADVISOR_BATCH_MODE
+        if self.mode not in ('packed', 'concurrent'):
+            raise ValueError(f"mode không hợp lệ: {self.mode}")
+        self.batch_size = batch_size or config.ADVISOR_BATCH_SIZE
+        self.max_concurrency = max_concurrency or config.ADVISOR_MAX_CONCURRENCY
+        self.retry = retry or getattr(advisor, 'retry', None) or RetryPolicy()
+
+    def analyze(self, snapshots):
+        """Bản đồng bộ của analyze_async (client async tạm thời cho lần gọi này)"""
+        async def run():
+            async with self.advisor.backend.async_client() as client:
+                return await self.analyze_async(snapshots, client=client)
+        return asyncio.run(run())
+
+    async def analyze_async(self, snapshots, client=None):
+        """
+        Args:
+            snapshots: list dict từ snapshot()
+            client: AsyncOpenAI (mặc định client async của advisor)
+
+        Returns:
+            dict: symbol -> advice (luôn đủ mọi symbol; lỗi -> HOLD, confidence 0)
+        """
+        advisor = self.advisor
+        results = {}
+        misses = []
+        for item in snapshots:
+            key = advisor._cache_key(**item)
+            cached = advisor._from_cache(key)
+            if cached is not None:
+                results[item['symbol']] = cached
+            else:
+                misses.append((key, item))
+        if not misses:
+            return results
+
+        client = client or advisor._get_async_client()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def limited(make_call):
+            async with semaphore:
+                return await make_call()
+
+        if self.mode == 'concurrent':
+            advices = await asyncio.gather(*(
+                limited(lambda item=item: advisor.analyze_market_async(**item, client=client, retry=self.retry))
+                for _, item in misses))
+            for (_, item), advice in zip(misses, advices):
+                results[item['symbol']] = advice
+            return results
+
+        chunks = [misses[i:i + self.batch_size] for i in range(0, len(misses), self.batch_size)]
+        chunk_results = await asyncio.gather(*(
+            limited(lambda chunk=chunk: self._packed_request(client, [item for _, item in chunk]))
+            for chunk in chunks), return_exceptions=True)
+        fresh = []
+        for chunk, parsed in zip(chunks, chunk_results):
+            if isinstance(parsed, Exception):
+                print(f"❌ Lỗi gọi ChatGPT (batch {len(chunk)} symbol): {parsed}")
+                parsed = {}
+            for key, item in chunk:
+                advice = parsed.get(item['symbol'])
+                if advice is None:
+                    results[item['symbol']] = advisor._error_advice('Không có khuyến nghị trong câu trả lời batch')
+                else:
+                    results[item['symbol']] = advice
+                    fresh.append((key, advice))
+        await advisor._remember_async(fresh)
+        print(f"🤖 ChatGPT batch: {len(misses)} symbol / {len(chunks)} request, "
+              f"cache {len(snapshots) - len(misses)}")
+        return results
+
+    async def _packed_request(self, client, items):
+        response = await self.retry.run(lambda: client.chat.completions.create(
+            model=self.advisor.model,
+            messages=build_batch_messages(items),
+            temperature=0.3,
+            max_tokens=min(4000, 60 + 90 * len(items)),
+            response_format={"type": "json_object"}
+        ))
+        return parse_batch_response(response.choices[0].message.content,
+                                    [item['symbol'] for item in items])
+
+
+class AdviceBatcher:
+    """
+    Gom các lời gọi analyze() gần nhau (trong window_ms) thành một batch
+
+    Dùng trong AsyncTradingPipeline: mỗi symbol vẫn gọi riêng, nhưng các symbol
+    xong bước chỉ báo cùng lúc được gửi chung một prompt.
+    """
+
+    def __init__(self, batch_advisor, window_ms=None):
+        self.batch_advisor = batch_advisor
+        self.window = (config.ADVISOR_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self._pending = []  # (snapshot, Future)
+        self._timer = None
+        self._tasks = set()  # giữ tham chiếu tới các batch đang chạy (tránh bị thu gom rác)
+
+    async def analyze(self, symbol, current_price, ma, rsi, atr):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((snapshot(symbol, current_price, ma, rsi, atr), future))
+        if len(self._pending) >= self.batch_advisor.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._timer = None
+        self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def cancel(self):
+        """Hủy hẹn giờ và các batch đang chạy (gọi khi đóng pipeline)"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for task in list(self._tasks):
+            task.cancel()
+        for _, future in self._pending:
+            future.cancel()
+        self._pending = []
+
+    async def _run(self, batch):
+        try:
+            results = await self.batch_advisor.analyze_async([item for item, _ in batch])
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            print(f"❌ Lỗi batch ChatGPT: {e}")
+            results = {}
+        for item, future in batch:
+            if not future.done():  # có thể đã bị hủy do timeout
+                advice = results.get(item['symbol'])
+                future.set_result(advice or self.batch_advisor.advisor._error_advice())
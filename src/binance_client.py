@@ -0,0 +1,129 @@
+"""
+Module cung cấp MỘT Binance client dùng chung cho toàn bộ bot
+- Mỗi Client mới tự tạo session HTTP và bắt tay TLS riêng (ping khi khởi tạo)
+- Dùng chung một client: giữ kết nối (HTTP keep-alive) qua connection pool
+  của requests, không mở kết nối mới cho mỗi module / mỗi lần tạo báo cáo
+- Các module nhận client qua tham số `client=`, mặc định lấy client dùng chung
+- Mọi request REST trừ "weight" từ một ngân sách chung (RateLimiter), kể cả khi
+  nhiều symbol chạy song song
+"""
+
+import threading
+from urllib.parse import urlsplit
+
+from binance.client import Client
+from requests.adapters import HTTPAdapter
+
+from . import config
+from .rate_limiter import RateLimiter
+
+
+_client = None
+_limiter = None
+_lock = threading.Lock()
+
+# Weight của các endpoint bot dùng (theo tài liệu Binance Spot API), mặc định 1
+REQUEST_WEIGHTS = {
+    '/api/v3/klines': 2,
+    '/api/v3/ticker/price': 2,
+    '/api/v3/ticker/bookTicker': 2,
+    '/api/v3/account': 20,
+    '/api/v3/exchangeInfo': 20,
+    '/api/v3/openOrders': 6,
+}
+
+
+def request_weight(url):
+    """Weight ước tính của một request Binance theo đường dẫn"""
+    parts = urlsplit(url)
+    weight = REQUEST_WEIGHTS.get(parts.path, 1)
+    # Ticker / bookTicker / openOrders không kèm symbol: trả mọi symbol, weight cao hơn
+    if parts.path in ('/api/v3/ticker/price', '/api/v3/ticker/bookTicker') and 'symbol' not in parts.query:
+        weight = 4
+    elif parts.path == '/api/v3/openOrders' and 'symbol' not in parts.query:
+        weight = 80
+    return weight
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter trừ weight từ RateLimiter chung trước khi gửi request"""
+
+    def __init__(self, limiter, **kwargs):
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        self.limiter.acquire(request_weight(request.url))
+        return super().send(request, **kwargs)
+
+
+def get_rate_limiter():
+    """Ngân sách weight dùng chung (config.BINANCE_WEIGHT_PER_MINUTE)"""
+    global _limiter
+    if _limiter is None:
+        with _lock:
+            if _limiter is None:
+                _limiter = RateLimiter.per_minute(config.BINANCE_WEIGHT_PER_MINUTE)
+    return _limiter
+
+
+def create_client(pool_size=None, limiter=None):
+    """
+    Tạo Binance Testnet client với connection pool keep-alive
+
+    Args:
+        pool_size: số kết nối giữ sẵn cho mỗi host (mặc định config.BINANCE_HTTP_POOL_SIZE)
+        limiter: RateLimiter cho mọi request (mặc định get_rate_limiter())
+    """
+    client = Client(
+        api_key=config.BINANCE_API_KEY,
+        api_secret=config.BINANCE_SECRET_KEY,
+        testnet=True  # QUAN TRỌNG: Chỉ dùng Testnet
+    )
+    pool_size = pool_size or config.BINANCE_HTTP_POOL_SIZE
+    adapter = RateLimitedAdapter(limiter or get_rate_limiter(),
+                                 pool_connections=pool_size, pool_maxsize=pool_size)
+    client.session.mount('https://', adapter)
+    client.session.mount('http://', adapter)
+    return client
+
+
+def get_client():
+    """Client dùng chung (tạo ở lần gọi đầu tiên, an toàn khi gọi từ nhiều thread)"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = create_client()
+    return _client
+
+
+def set_client(client):
+    """Dùng một client có sẵn làm client chung (vd: client giả khi test)"""
+    global _client
+    with _lock:
+        _client = client
+
+
+def reset_client():
+    """Đóng session và bỏ client chung (lần gọi get_client sau sẽ tạo mới)"""
+    global _client
+    with _lock:
+        if _client is not None and hasattr(_client, 'close_connection'):
+            _client.close_connection()
+        _client = None
+
+
+def get_free_balances(client):
+    """
+    Số dư khả dụng (> 0) của tài khoản
+
+    Returns:
+        dict: {'USDT': 10000.0, 'BTC': 0.01, ...}
+    """
+    account = client.get_account()
+    return {
+        balance['asset']: float(balance['free'])
+        for balance in account['balances']
+        if float(balance['free']) > 0
+    }
@@ -0,0 +1,250 @@
+"""
+Module lưu trữ nến (candle) cục bộ bằng SQLite
+- Lưu nến theo khóa (symbol, interval, open_time)
+- Chỉ tải thêm các nến MỚI từ Binance (dùng startTime)
+- Giữ được hàng nghìn nến lịch sử mà không cần tải lại
+"""
+
+import sqlite3
+import os
+import pandas as pd
+from . import config
+
+
+# Các cột của một kline Binance (theo đúng thứ tự API trả về)
+KLINE_COLUMNS = [
+    'open_time', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_volume', 'trades',
+    'taker_buy_base', 'taker_buy_quote', 'ignore'
+]
+
+# Số nến tối đa Binance trả về cho một lần gọi get_klines
+MAX_KLINES_PER_REQUEST = 1000
+
+# Độ dài (ms) của từng khung thời gian Binance
+INTERVAL_MS = {
+    '1s': 1_000,
+    '1m': 60_000,
+    '3m': 3 * 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 60 * 60_000,
+    '2h': 2 * 60 * 60_000,
+    '4h': 4 * 60 * 60_000,
+    '6h': 6 * 60 * 60_000,
+    '8h': 8 * 60 * 60_000,
+    '12h': 12 * 60 * 60_000,
+    '1d': 24 * 60 * 60_000,
+    '3d': 3 * 24 * 60 * 60_000,
+    '1w': 7 * 24 * 60 * 60_000,
+}
+
+
+def interval_to_ms(interval):
+    """Đổi khung thời gian ('1m', '15m', '1h'...) sang mili-giây."""
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Khung thời gian không hỗ trợ: {interval}")
+    return INTERVAL_MS[interval]
+
+
+def klines_to_dataframe(klines):
+    """
+    Chuyển danh sách kline (list các list như Binance trả về) thành DataFrame
+
+    Cột số được ép kiểu float, thêm cột 'datetime' từ open_time.
+    """
+    df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
+    for col in ['open', 'high', 'low', 'close', 'volume',
+                'quote_volume', 'taker_buy_base', 'taker_buy_quote']:
+        df[col] = pd.to_numeric(df[col])
+    df['open_time'] = df['open_time'].astype('int64')
+    df['close_time'] = df['close_time'].astype('int64')
+    df['trades'] = df['trades'].astype('int64')
+    df['datetime'] = pd.to_datetime(df['open_time'], unit='ms')
+    return df
+
+
+class CandleStore:
+    """
+    Kho lưu nến cục bộ (SQLite)
+
+    Mỗi nến được lưu một lần theo khóa (symbol, interval, open_time).
+    Nến cuối cùng (đang hình thành) sẽ được ghi đè ở lần đồng bộ sau.
+    """
+
+    def __init__(self, db_file=None):
+        """
+        Args:
+            db_file: Đường dẫn file SQLite (mặc định config.CANDLE_DB_FILE)
+        """
+        self.db_file = db_file or config.CANDLE_DB_FILE
+        # (symbol, interval) mà Binance đã hết lịch sử cũ hơn: không tải bù endTime nữa
+        self._history_exhausted = set()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_file)), exist_ok=True)
+        self._init_database()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_file)
+
+    def _init_database(self):
+        """Tạo bảng candles nếu chưa có"""
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS candles (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    open_time INTEGER NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    volume REAL,
+                    close_time INTEGER,
+                    quote_volume REAL,
+                    trades INTEGER,
+                    taker_buy_base REAL,
+                    taker_buy_quote REAL,
+                    PRIMARY KEY (symbol, interval, open_time)
+                ) WITHOUT ROWID
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def upsert_klines(self, symbol, interval, klines):
+        """
+        Ghi (hoặc ghi đè) danh sách kline vào kho
+
+        Args:
+            symbol: Mã giao dịch
+            interval: Khung thời gian
+            klines: list các kline dạng Binance (list 12 phần tử)
+
+        Returns:
+            int: Số nến đã ghi
+        """
+        if not klines:
+            return 0
+        rows = [
+            (symbol, interval, int(k[0]), float(k[1]), float(k[2]), float(k[3]),
+             float(k[4]), float(k[5]), int(k[6]), float(k[7]), int(k[8]),
+             float(k[9]), float(k[10]))
+            for k in klines
+        ]
+        conn = self._connect()
+        try:
+            conn.executemany('''
+                INSERT OR REPLACE INTO candles
+                (symbol, interval, open_time, open, high, low, close, volume,
+                 close_time, quote_volume, trades, taker_buy_base, taker_buy_quote)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+        finally:
+            conn.close()
+        return len(rows)
+
+    def get_time_range(self, symbol, interval):
+        """
+        Returns:
+            tuple: (open_time nhỏ nhất, open_time lớn nhất, số nến) - (None, None, 0) nếu trống
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute('''
+                SELECT MIN(open_time), MAX(open_time), COUNT(*)
+                FROM candles WHERE symbol = ? AND interval = ?
+            ''', (symbol, interval)).fetchone()
+        finally:
+            conn.close()
+        return row[0], row[1], row[2]
+
+    def load(self, symbol, interval, limit=None, start_time=None, end_time=None):
+        """
+        Đọc nến từ kho, sắp xếp tăng dần theo open_time
+
+        Args:
+            limit: Chỉ lấy `limit` nến MỚI NHẤT (None = tất cả)
+            start_time / end_time: Lọc theo open_time (ms, bao gồm 2 đầu)
+
+        Returns:
+            DataFrame cùng định dạng với DataCollector.get_candles
+        """
+        query = '''
+            SELECT open_time, open, high, low, close, volume, close_time,
+                   quote_volume, trades, taker_buy_base, taker_buy_quote, 0
+            FROM candles
+            WHERE symbol = ? AND interval = ?
+        '''
+        params = [symbol, interval]
+        if start_time is not None:
+            query += ' AND open_time >= ?'
+            params.append(int(start_time))
+        if end_time is not None:
+            query += ' AND open_time <= ?'
+            params.append(int(end_time))
+        query += ' ORDER BY open_time DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(int(limit))
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+        rows.reverse()
+        return klines_to_dataframe(rows)
+
+    def sync(self, client, symbol, interval, limit=100):
+        """
+        Đồng bộ kho với Binance, chỉ tải phần còn thiếu
+
+        - Kho trống: tải `limit` nến gần nhất
+        - Kho có dữ liệu: tải từ open_time cuối cùng (startTime) đến hiện tại
+          (nến cuối được tải lại vì lúc trước có thể chưa đóng)
+        - Kho có ít hơn `limit` nến: tải bù phần cũ hơn (endTime); nếu Binance trả ít
+          hơn số yêu cầu thì lịch sử đã hết, các lần sau không tải bù nữa
+
+        Args:
+            client: binance Client (hoặc đối tượng có get_klines)
+
+        Returns:
+            int: Số nến đã tải từ Binance
+        """
+        first_open, last_open, count = self.get_time_range(symbol, interval)
+        fetched = 0
+
+        if last_open is None:
+            requested = min(limit, MAX_KLINES_PER_REQUEST)
+            klines = client.get_klines(symbol=symbol, interval=interval, limit=requested)
+            if len(klines) < requested:
+                self._history_exhausted.add((symbol, interval))
+            return self.upsert_klines(symbol, interval, klines)
+
+        # Tải nến mới từ open_time cuối cùng, theo từng trang 1000 nến
+        start_time = last_open
+        while True:
+            klines = client.get_klines(symbol=symbol, interval=interval,
+                                       startTime=start_time,
+                                       limit=MAX_KLINES_PER_REQUEST)
+            fetched += self.upsert_klines(symbol, interval, klines)
+            if len(klines) < MAX_KLINES_PER_REQUEST:
+                break
+            start_time = int(klines[-1][0]) + 1
+
+        # Tải bù lịch sử nếu kho còn ít hơn số nến yêu cầu
+        _, _, count = self.get_time_range(symbol, interval)
+        missing = limit - count
+        if missing > 0 and (symbol, interval) not in self._history_exhausted:
+            requested = min(missing, MAX_KLINES_PER_REQUEST)
+            klines = client.get_klines(symbol=symbol, interval=interval,
+                                       endTime=first_open - 1, limit=requested)
+            if len(klines) < requested:
+                self._history_exhausted.add((symbol, interval))
+            fetched += self.upsert_klines(symbol, interval, klines)
+
+        return fetched
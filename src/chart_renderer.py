@@ -0,0 +1,223 @@
+"""
+Module vẽ biểu đồ equity curve ngoài luồng chính
+- Vẽ trong một process riêng (backend Agg, không dùng pyplot), GUI không bị khựng
+- Tái sử dụng một Figure cố định thay vì tạo figure mới mỗi chu kỳ (không rò bộ nhớ)
+- Chuỗi dài được giảm mẫu bằng LTTB về cỡ số pixel chiều ngang
+- Dữ liệu không đổi (cùng hash) thì bỏ qua, không vẽ lại
+"""
+
+import atexit
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import config
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: chọn `threshold` điểm giữ được hình dạng đường
+
+    Args:
+        x, y: mảng cùng độ dài (x tăng dần)
+        threshold: số điểm muốn giữ
+
+    Returns:
+        np.ndarray: chỉ số các điểm được giữ (tăng dần, luôn có điểm đầu và cuối)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        # Trung bình của bucket kế tiếp (bucket cuối: chính điểm cuối)
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, n) if i < threshold - 3 else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # Điểm tạo tam giác lớn nhất với điểm đã chọn trước đó và trung bình bucket sau
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def downsample(cycles, balances, signals, max_points):
+    """
+    Giảm mẫu chuỗi equity còn khoảng max_points điểm, luôn giữ các điểm BUY/SELL
+
+    Returns:
+        tuple (cycles, balances, signals) dạng numpy
+    """
+    keep = lttb_indices(cycles, balances, max_points)
+    if len(keep) < len(cycles):
+        marked = np.flatnonzero(np.isin(signals, ('BUY', 'SELL')))
+        keep = np.union1d(keep, marked)
+    return cycles[keep], balances[keep], signals[keep]
+
+
+# ==== Phần chạy trong process vẽ ====
+_figures = {}
+
+
+def _get_figure(width_px, height_px, dpi):
+    """Figure dùng lại theo kích thước (mỗi process chỉ giữ vài figure)"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    key = (width_px, height_px, dpi)
+    fig = _figures.get(key)
+    if fig is None:
+        fig = Figure(figsize=(width_px / dpi, height_px / dpi), dpi=dpi)
+        FigureCanvasAgg(fig)
+        fig.add_subplot(111)
+        _figures[key] = fig
+    return fig
+
+
+def draw_equity_chart(cycles, balances, signals, output_file, width_px, height_px, dpi,
+                      max_annotations):
+    """Vẽ equity curve ra file PNG trên figure dùng lại (chạy được cả trong lẫn ngoài process vẽ)"""
+    fig = _get_figure(width_px, height_px, dpi)
+    ax = fig.axes[0]
+    ax.clear()
+
+    cycles = np.asarray(cycles, dtype=float)
+    balances = np.asarray(balances, dtype=float)
+    signals = np.asarray(signals, dtype=object)
+
+    ax.plot(cycles, balances, color='#2ecc71', linewidth=3, solid_capstyle='round')
+    ax.scatter(cycles, balances, color='#1abc9c', s=40, edgecolor='black', linewidths=0.5, zorder=3)
+
+    # Marker BUY/SELL; chỉ ghi số chu kỳ khi ít điểm (đọc được và không tốn thời gian)
+    has_marker = False
+    for side, marker, color, text_color, offset in (
+            ('BUY', '^', '#00b894', '#006442', 6), ('SELL', 'v', '#e17055', '#6c1a07', -10)):
+        mask = signals == side
+        if not mask.any():
+            continue
+        has_marker = True
+        ax.scatter(cycles[mask], balances[mask], marker=marker, color=color, s=70,
+                   edgecolor='black', linewidths=0.6, zorder=4, label=side)
+        if mask.sum() <= max_annotations:
+            for cx, cy in zip(cycles[mask], balances[mask]):
+                ax.annotate(f"{int(cx)}", (cx, cy), textcoords="offset points", xytext=(0, offset),
+                            ha='center', fontsize=8, color=text_color)
+    if has_marker:
+        ax.legend(loc='upper left')
+
+    ax.set_title('📈 Đường Cong Vốn Theo Chu Kỳ', fontsize=18, fontweight='bold')
+    ax.set_xlabel('Chu kỳ chạy bot', fontsize=14)
+    ax.set_ylabel('Số dư tài khoản (USDT)', fontsize=14)
+    ax.tick_params(labelsize=12)
+    ax.grid(True, alpha=0.3)
+    ax.fill_between(cycles, balances, alpha=0.15, color='#2ecc71')
+    y_min = balances.min() * 0.995 if len(balances) else 0
+    y_max = balances.max() * 1.005 if len(balances) else 1
+    if y_min == y_max:
+        delta = y_min * 0.01 if y_min != 0 else 1
+        y_min -= delta
+        y_max += delta
+    ax.set_ylim(y_min, y_max)
+
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=dpi)
+    return output_file
+
+
+class EquityChartRenderer:
+    """
+    Vẽ equity curve trong process riêng, có cache theo hash dữ liệu
+
+    Process vẽ được tạo khi cần (spawn, không fork từ process đang chạy Tk/thread);
+    nếu không tạo được thì vẽ ngay trong process hiện tại.
+    """
+
+    def __init__(self, use_process=None, width_px=None, height_px=None, dpi=None):
+        self.use_process = config.CHART_RENDER_PROCESS if use_process is None else use_process
+        self.width_px = width_px or config.CHART_WIDTH_PX
+        self.height_px = height_px or config.CHART_HEIGHT_PX
+        self.dpi = dpi or config.CHART_DPI
+        self._executor = None
+        self._last_hash = None
+        self._lock = threading.Lock()
+        self.renders = 0  # số lần thực sự vẽ (để theo dõi)
+        atexit.register(self.close)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def _hash(self, cycles, balances, signals, output_file):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(cycles.tobytes())
+        digest.update(balances.tobytes())
+        digest.update('\0'.join(signals.tolist()).encode())
+        digest.update(f"{output_file}|{self.width_px}x{self.height_px}@{self.dpi}".encode())
+        return digest.hexdigest()
+
+    def render(self, cycles, balances, signals=None, output_file=None):
+        """
+        Vẽ equity curve ra file PNG
+
+        Args:
+            cycles: trục x (số chu kỳ)
+            balances: số dư tương ứng
+            signals: 'BUY' / 'SELL' / '' cho từng điểm (tuỳ chọn)
+            output_file: file PNG (mặc định config.EQUITY_CURVE_FILE)
+
+        Returns:
+            bool: True nếu đã vẽ lại, False nếu dữ liệu không đổi (file cũ vẫn đúng)
+        """
+        output_file = output_file or config.EQUITY_CURVE_FILE
+        cycles = np.asarray(cycles, dtype=float)
+        balances = np.asarray(balances, dtype=float)
+        if signals is None:
+            signals = [''] * len(cycles)
+        signals = np.asarray([str(s or '').upper() for s in signals], dtype=object)
+
+        with self._lock:
+            digest = self._hash(cycles, balances, signals, output_file)
+            if digest == self._last_hash and os.path.exists(output_file):
+                return False
+
+            cycles, balances, signals = downsample(cycles, balances, signals, self.width_px)
+            args = (cycles, balances, signals, output_file, self.width_px, self.height_px,
+                    self.dpi, config.CHART_MAX_ANNOTATIONS)
+            if self.use_process:
+                try:
+                    self._get_executor().submit(draw_equity_chart, *args).result()
+                except Exception as e:
+                    print(f"⚠️ Process vẽ biểu đồ lỗi, vẽ trực tiếp: {e}")
+                    self._shutdown_executor()
+                    self.use_process = False
+                    draw_equity_chart(*args)
+            else:
+                draw_equity_chart(*args)
+            self._last_hash = digest
+            self.renders += 1
+            return True
+
+    def _shutdown_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def close(self):
+        """Tắt process vẽ"""
+        self._shutdown_executor()
@@ -3,10 +3,14 @@ Module tích hợp ChatGPT API để đưa ra khuyến nghị giao dịch
 Phù hợp cho học sinh cấp 3 - AI phân tích thị trường
 """
 
-from openai import OpenAI
+from .advice_cache import AdviceCache, make_key
+from .advice_format import parse_advice, response_format
+from .batch_advisor import BatchAdvisor, RetryPolicy
+from .conversation_memory import ConversationMemory
+from .llm_backend import LLMBackend, create_backend
 from . import config
 import json
-import re
+import threading
 
 
 class ChatGPTAdvisor:
@@ -17,21 +21,39 @@ class ChatGPTAdvisor:
     1. Nhận dữ liệu kỹ thuật (MA, RSI, ATR)
     2. Tạo prompt thông minh
     3. Gửi đến ChatGPT API
-    4. Parse kết quả (BUY/SELL/HOLD)
+    4. Parse kết quả JSON có cấu trúc (BUY/SELL/HOLD + độ tin cậy)
     5. Trả về khuyến nghị + lý do
     """
     
-    def __init__(self):
-        """Khởi tạo OpenAI client"""
+    def __init__(self, cache=None, backend=None):
+        """
+        Khởi tạo OpenAI client
+
+        Args:
+            cache: AdviceCache (mặc định tạo mới nếu config.ADVICE_CACHE_ENABLED bật)
+            backend: LLMBackend hoặc tên backend (mặc định config.LLM_BACKEND) -
+                'replay' / 'stub' chạy không cần mạng (xem llm_backend)
+        """
+        if cache is None and config.ADVICE_CACHE_ENABLED:
+            cache = AdviceCache()
+        self.cache = cache
+        self.retry = RetryPolicy()  # backoff dùng chung cho mọi request async
+        self.async_client = None  # AsyncOpenAI, tạo khi lần đầu dùng (trong event loop)
+        self.model = config.OPENAI_MODEL
+        self.client = None
+        self.backend = None
         try:
-            self.client = OpenAI(api_key=config.OPENAI_API_KEY)
-            self.model = config.OPENAI_MODEL
-            print("✅ ChatGPT Advisor đã sẵn sàng")
+            self.backend = backend if isinstance(backend, LLMBackend) else create_backend(backend)
+            self.client = self.backend.client()
+            if self.backend.name == 'openai':
+                print("✅ ChatGPT Advisor đã sẵn sàng")
+            else:
+                print(f"✅ ChatGPT Advisor đã sẵn sàng (backend: {self.backend.name})")
         except Exception as e:
             print(f"❌ Lỗi khởi tạo ChatGPT: {e}")
             print("💡 Hãy kiểm tra OPENAI_API_KEY trong file .env")
     
-    def analyze_market(self, symbol, current_price, ma, rsi, atr):
+    def analyze_market(self, symbol, current_price, ma, rsi, atr, timeout=None):
         """
         Phân tích thị trường bằng ChatGPT
         
@@ -41,73 +63,166 @@ class ChatGPTAdvisor:
             ma: Giá trị Moving Average
             rsi: Giá trị RSI
             atr: Giá trị ATR
+            timeout: Hạn chót (giây) cho request, không tự thử lại (xem guarded_advisor)
         
         Returns:
             dict: {
                 'recommendation': 'BUY'/'SELL'/'HOLD',
                 'reason': 'Lý do giải thích',
-                'confidence': 0-100 (độ tin cậy)
+                'confidence': 0-100 (độ tin cậy),
+                'cached': True nếu lấy từ cache (thị trường gần như không đổi),
+                'source': 'llm' / 'cache' / 'error'
             }
         """
+        key = self._cache_key(symbol, current_price, ma, rsi, atr)
+        cached = self._from_cache(key)
+        if cached is not None:
+            return cached
         try:
-            # Tạo prompt từ template
-            prompt = config.TRADING_PROMPT.format(
-                symbol=symbol,
-                current_price=current_price,
-                ma_value=ma,
-                rsi_value=rsi,
-                atr_value=atr,
-                ma_period=config.MA_PERIOD
-            )
-            
+            client = self.client
+            if timeout:
+                client = client.with_options(timeout=timeout, max_retries=0)
             # Gửi đến ChatGPT
-            response = self.client.chat.completions.create(
+            response = client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Bạn là chuyên gia phân tích thị trường tiền điện tử. Nhiệm vụ: phân tích dữ liệu kỹ thuật và đưa ra khuyến nghị: BUY, SELL, hoặc HOLD. Luôn nhắc nhở về rủi ro khi đầu tư."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=200
+                messages=self._build_messages(symbol, current_price, ma, rsi, atr),
+                temperature=0.3,
+                max_tokens=config.ADVISOR_MAX_TOKENS,
+                response_format=response_format()
             )
+            return self._remember(key, self._to_advice(response.choices[0].message.content))
             
-            # Lấy kết quả
-            advice_text = response.choices[0].message.content
-            
-            # Parse kết quả (tìm BUY/SELL/HOLD)
-            recommendation = self._parse_recommendation(advice_text)
-            confidence = self._extract_confidence(advice_text)
-            
-            result = {
-                'recommendation': recommendation,
-                'reason': advice_text,
-                'confidence': confidence,
-                'raw_response': advice_text
-            }
-            
-            print(f"🤖 ChatGPT khuyến nghị: {recommendation}")
-            return result
-            
         except Exception as e:
             print(f"❌ Lỗi gọi ChatGPT API: {e}")
-            return {
-                'recommendation': 'HOLD',
-                'reason': 'Không thể kết nối ChatGPT API',
-                'confidence': 0
+            return self._error_advice(f"Lỗi gọi ChatGPT API: {type(e).__name__}")
+
+    async def analyze_market_async(self, symbol, current_price, ma, rsi, atr, client=None, retry=None):
+        """
+        Như analyze_market nhưng dùng AsyncOpenAI: không chặn event loop,
+        nhiều symbol có thể chờ ChatGPT cùng lúc (xem async_pipeline)
+
+        Args:
+            client: AsyncOpenAI (mặc định client async của advisor)
+            retry: RetryPolicy (mặc định self.retry) - thử lại khi gặp 429 / lỗi tạm thời
+        """
+        key = self._cache_key(symbol, current_price, ma, rsi, atr)
+        cached = self._from_cache(key)
+        if cached is not None:
+            return cached
+        try:
+            client = client or self._get_async_client()
+            response = await (retry or self.retry).run(
+                lambda: client.chat.completions.create(
+                    model=self.model,
+                    messages=self._build_messages(symbol, current_price, ma, rsi, atr),
+                    temperature=0.3,
+                    max_tokens=config.ADVISOR_MAX_TOKENS,
+                    response_format=response_format()
+                ))
+            advice = self._to_advice(response.choices[0].message.content)
+            await self._remember_async([(key, advice)])
+            return advice
+
+        except Exception as e:
+            print(f"❌ Lỗi gọi ChatGPT API: {e}")
+            return self._error_advice(f"Lỗi gọi ChatGPT API: {type(e).__name__}")
+
+    def analyze_batch(self, snapshots, mode=None):
+        """
+        Phân tích nhiều symbol trong một lượt (xem batch_advisor)
+
+        Args:
+            snapshots: list dict {symbol, current_price, ma, rsi, atr}
+            mode: 'packed' (một prompt cho nhiều symbol) hoặc 'concurrent'
+
+        Returns:
+            dict: symbol -> khuyến nghị
+        """
+        return BatchAdvisor(self, mode=mode).analyze(snapshots)
+
+    def _get_async_client(self):
+        """AsyncOpenAI dùng chung, tạo khi lần đầu dùng (trong event loop)"""
+        if self.async_client is None:
+            self.async_client = self.backend.async_client()
+        return self.async_client
+
+    def _cache_key(self, symbol, current_price, ma, rsi, atr):
+        return make_key(symbol, current_price, ma, rsi, atr) if self.cache is not None else None
+
+    def _from_cache(self, key, record_miss=True):
+        """Khuyến nghị đã cache cho key (None nếu không có)"""
+        if key is None:
+            return None
+        advice = self.cache.get(key, record_miss=record_miss)
+        if advice is not None:
+            advice['cached'] = True
+            advice['source'] = 'cache'
+            print(f"♻️ Dùng lại khuyến nghị đã cache: {advice['recommendation']}")
+        return advice
+
+    def _remember(self, key, advice):
+        """Lưu khuyến nghị vừa nhận vào cache (chỉ câu trả lời hợp lệ)"""
+        if key is not None and advice.get('source') != 'error':
+            self.cache.put(key, advice)
+        return advice
+
+    async def _remember_async(self, entries):
+        """Như _remember cho nhiều (key, advice), ghi SQLite ngoài event loop"""
+        entries = [(key, advice) for key, advice in entries
+                   if key is not None and advice.get('source') != 'error']
+        if entries:
+            await self.cache.put_many_async(entries)
+
+    def _build_messages(self, symbol, current_price, ma, rsi, atr):
+        """Messages gửi ChatGPT cho một lần phân tích"""
+        # Tạo prompt từ template
+        prompt = config.TRADING_PROMPT.format(
+            symbol=symbol,
+            current_price=current_price,
+            ma_value=ma,
+            rsi_value=rsi,
+            atr_value=atr,
+            ma_period=config.MA_PERIOD
+        )
+        return [
+            {
+                "role": "system",
+                "content": "Bạn là chuyên gia phân tích thị trường tiền điện tử. Nhiệm vụ: phân tích dữ liệu kỹ thuật và đưa ra khuyến nghị: BUY, SELL, hoặc HOLD. Luôn nhắc nhở về rủi ro khi đầu tư."
+            },
+            {
+                "role": "user",
+                "content": prompt
             }
+        ]
+
+    def _to_advice(self, advice_text):
+        """Parse câu trả lời JSON của ChatGPT thành dict khuyến nghị (sai định dạng -> lỗi)"""
+        result = parse_advice(advice_text)
+        if result is None:
+            print(f"❌ Câu trả lời ChatGPT không đúng định dạng JSON: {advice_text!r:.200}")
+            result = self._error_advice('Câu trả lời ChatGPT không đúng định dạng')
+            result['raw_response'] = advice_text
+            return result
+
+        print(f"🤖 ChatGPT khuyến nghị: {result['recommendation']} ({result['confidence']:.0f}%)")
+        return result
+
+    @staticmethod
+    def _error_advice(reason='Không thể kết nối ChatGPT API'):
+        return {
+            'recommendation': 'HOLD',
+            'reason': reason,
+            'confidence': 0,
+            'source': 'error'
+        }
 
     def chat_with_user(self, history, user_message, *, temperature=0.6, max_tokens=400):
         """Trả lời hội thoại tự nhiên với người dùng.
 
         Args:
-            history (list[dict]): Danh sách tin nhắn hội thoại theo định dạng OpenAI
-                (mỗi phần tử có `role` và `content`). Nên bắt đầu bằng thông điệp hệ thống.
+            history (ConversationMemory | list[dict]): Bộ nhớ hội thoại có ngân sách token
+                (khuyên dùng), hoặc danh sách tin nhắn theo định dạng OpenAI (mỗi phần tử
+                có `role` và `content`, nên bắt đầu bằng thông điệp hệ thống).
             user_message (str): Nội dung người dùng muốn hỏi.
             temperature (float): Mức độ sáng tạo của mô hình.
             max_tokens (int): Số token tối đa trong câu trả lời.
@@ -119,8 +234,11 @@ class ChatGPTAdvisor:
         if not hasattr(self, 'client') or self.client is None:
             raise RuntimeError("ChatGPT client chưa được khởi tạo. Kiểm tra OPENAI_API_KEY.")
 
+        if isinstance(history, ConversationMemory):
+            return self._chat_with_memory(history, user_message, temperature, max_tokens)
+
         if not isinstance(history, list):
-            raise ValueError("history phải là list messages")
+            raise ValueError("history phải là list messages hoặc ConversationMemory")
 
         try:
             messages = history + [{"role": "user", "content": user_message}]
@@ -147,33 +265,51 @@ class ChatGPTAdvisor:
 
         except Exception as e:
             raise RuntimeError(f"Không thể trò chuyện với ChatGPT: {e}")
-    
-    def _parse_recommendation(self, text):
-        """
-        Tách khuyến nghị từ text ChatGPT
-        
-        Tìm từ khóa: BUY, SELL, HOLD (không phân biệt hoa thường)
-        """
-        text_upper = text.upper()
-        
-        if 'BUY' in text_upper or 'MUA' in text_upper:
-            return 'BUY'
-        elif 'SELL' in text_upper or 'BÁN' in text_upper:
-            return 'SELL'
-        else:
-            return 'HOLD'
-    
-    def _extract_confidence(self, text):
+
+    def _chat_with_memory(self, memory, user_message, temperature, max_tokens):
         """
-        Trích xuất độ tin cậy từ text (nếu có)
-        Mặc định 70%
+        Một lượt chat với ConversationMemory: prompt gồm thông điệp hệ thống cố định
+        + tóm tắt + vài lượt gần nhất; tóm tắt lại lịch sử chạy nền sau khi đã có câu trả lời
         """
-        # Tìm số phần trăm
-        percent_match = re.search(r'(\d+)%', text)
-        if percent_match:
-            return int(percent_match.group(1))
-        return 70  # Mặc định
-    
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=memory.messages(user_message),
+                temperature=temperature,
+                max_tokens=max_tokens,
+                # Qua extra_body: SDK openai cũ (chưa có tham số prompt_cache_key) vẫn gửi được
+                extra_body={'prompt_cache_key': memory.cache_key}
+            )
+            reply = response.choices[0].message.content.strip()
+        except Exception as e:
+            raise RuntimeError(f"Không thể trò chuyện với ChatGPT: {e}")
+
+        memory.add(user_message, reply)
+        if memory.needs_compaction():
+            threading.Thread(target=memory.compact, args=(self._summarize_conversation,),
+                             name='chat-summary', daemon=True).start()
+        return reply
+
+    def _summarize_conversation(self, previous_summary, messages):
+        """Tóm tắt các lượt chat cũ (gộp với tóm tắt trước đó) bằng ChatGPT"""
+        transcript = "\n".join(
+            f"{'Người dùng' if m['role'] == 'user' else 'Trợ lý'}: {m['content']}" for m in messages)
+        if previous_summary:
+            transcript = f"Tóm tắt trước đó:\n{previous_summary}\n\nHội thoại tiếp theo:\n{transcript}"
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system",
+                 "content": "Tóm tắt hội thoại dưới đây bằng tiếng Việt, dạng gạch đầu dòng ngắn: giữ "
+                            "câu hỏi chính của người dùng, thông tin về bot/vị thế đã nhắc tới và các "
+                            "kết luận quan trọng. Không thêm thông tin mới."},
+                {"role": "user", "content": transcript}
+            ],
+            temperature=0.2,
+            max_tokens=config.CHAT_SUMMARY_MAX_TOKENS
+        )
+        return response.choices[0].message.content
+
 
 if __name__ == '__main__':
     # Test module
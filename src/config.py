@@ -12,16 +12,70 @@ load_dotenv()
 # ============ BINANCE TESTNET API ============
 BINANCE_API_KEY = os.getenv('BINANCE_API_KEY', '0CRX3A5G1WMSeZMp8mJgaJL6uQVg9lISFoaumgdf4vMzJF3mTYpm291QGHl7G5ng')
 BINANCE_SECRET_KEY = os.getenv('BINANCE_SECRET_KEY', 'MyomWeTwb573WnIAr7nBQ7yq6vsOVl6h2kC8Zqu6FNgU069xBbjfqi1dZrd5qwJg')
+# Thời gian sống của cache exchange info (filter LOT_SIZE/MIN_NOTIONAL...) - giây
+EXCHANGE_INFO_TTL_SECONDS = float(os.getenv('EXCHANGE_INFO_TTL_SECONDS', '3600'))
+# Số kết nối HTTP keep-alive giữ sẵn trong client Binance dùng chung
+BINANCE_HTTP_POOL_SIZE = int(os.getenv('BINANCE_HTTP_POOL_SIZE', '10'))
+# Ngân sách request weight mỗi phút dùng chung cho mọi thread (Binance Spot: 6000, để dư an toàn)
+BINANCE_WEIGHT_PER_MINUTE = int(os.getenv('BINANCE_WEIGHT_PER_MINUTE', '1200'))
 
 # ============ OPENAI CHATGPT API ============
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 
 # Model: dùng gpt-4o-mini để tiết kiệm, hoặc gpt-4o
 OPENAI_MODEL = 'gpt-4o-mini'  # 'gpt-4o-mini' or 'gpt-4o'
+# Backend LLM: 'openai' (thật), 'record' (thật + ghi lại), 'replay' (đọc bản ghi, không mạng),
+# 'stub' (quy tắc RSI/MA giả lập, không mạng) - dùng cho backtest, benchmark, CI
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'openai')
+LLM_STUB_LATENCY_MS = float(os.getenv('LLM_STUB_LATENCY_MS', '0'))  # Độ trễ giả lập của 'stub'
+# Cache khuyến nghị: cùng symbol + giá/MA/RSI/ATR rơi vào cùng "ô" thì dùng lại, không gọi API
+ADVICE_CACHE_ENABLED = os.getenv('ADVICE_CACHE_ENABLED', '1') == '1'
+ADVICE_CACHE_TTL_SECONDS = float(os.getenv('ADVICE_CACHE_TTL_SECONDS', '900'))
+ADVICE_CACHE_MAX_ENTRIES = int(os.getenv('ADVICE_CACHE_MAX_ENTRIES', '1000'))
+ADVICE_CACHE_PRICE_BUCKET_PCT = float(os.getenv('ADVICE_CACHE_PRICE_BUCKET_PCT', '0.25'))  # Độ rộng ô giá/MA/ATR (%)
+ADVICE_CACHE_RSI_BUCKET = float(os.getenv('ADVICE_CACHE_RSI_BUCKET', '2'))                 # Độ rộng ô RSI (điểm)
+# Phân tích nhiều symbol: 'packed' = gộp nhiều symbol vào một prompt JSON, 'concurrent' = mỗi symbol một request
+ADVISOR_BATCH_MODE = os.getenv('ADVISOR_BATCH_MODE', 'packed')
+ADVISOR_BATCH_SIZE = int(os.getenv('ADVISOR_BATCH_SIZE', '25'))               # Số symbol mỗi prompt gộp
+ADVISOR_BATCH_WINDOW_MS = float(os.getenv('ADVISOR_BATCH_WINDOW_MS', '100'))  # Thời gian gom symbol trong pipeline
+ADVISOR_MAX_CONCURRENCY = int(os.getenv('ADVISOR_MAX_CONCURRENCY', '8'))      # Số request ChatGPT đồng thời
+# Thử lại khi gặp 429 / lỗi tạm thời: chờ lũy thừa từ BASE tới tối đa MAX giây
+ADVISOR_MAX_RETRIES = int(os.getenv('ADVISOR_MAX_RETRIES', '3'))
+ADVISOR_RETRY_BASE_SECONDS = float(os.getenv('ADVISOR_RETRY_BASE_SECONDS', '1'))
+ADVISOR_RETRY_MAX_SECONDS = float(os.getenv('ADVISOR_RETRY_MAX_SECONDS', '20'))
+# Câu trả lời có cấu trúc: 'json_schema' (structured outputs) hoặc 'json_object' (model cũ)
+ADVISOR_RESPONSE_FORMAT = os.getenv('ADVISOR_RESPONSE_FORMAT', 'json_schema')
+ADVISOR_MAX_TOKENS = int(os.getenv('ADVISOR_MAX_TOKENS', '120'))  # JSON ngắn, không cần đoạn văn dài
+# Ngân sách thời gian cho ChatGPT mỗi lần phân tích: quá hạn / lỗi -> tín hiệu quy tắc
+ADVISOR_DEADLINE_SECONDS = float(os.getenv('ADVISOR_DEADLINE_SECONDS', '8'))
+ADVISOR_SLOW_SECONDS = float(os.getenv('ADVISOR_SLOW_SECONDS', '5'))               # Chậm hơn mức này tính là lỗi
+ADVISOR_BREAKER_FAILURES = int(os.getenv('ADVISOR_BREAKER_FAILURES', '3'))        # Lỗi/chậm liên tiếp để ngắt
+ADVISOR_BREAKER_RESET_SECONDS = float(os.getenv('ADVISOR_BREAKER_RESET_SECONDS', '120'))
+# Độ tin cậy gán cho tín hiệu quy tắc dự phòng (check_risk_conditions cần >= 50)
+ADVISOR_FALLBACK_CONFIDENCE = float(os.getenv('ADVISOR_FALLBACK_CONFIDENCE', '60'))
+# Chat với trợ lý: ngân sách token cho lịch sử (tóm tắt + lượt gần đây); vượt thì gộp lượt cũ vào tóm tắt
+CHAT_MAX_HISTORY_TOKENS = int(os.getenv('CHAT_MAX_HISTORY_TOKENS', '1200'))
+CHAT_KEEP_RECENT_TOKENS = int(os.getenv('CHAT_KEEP_RECENT_TOKENS', '500'))   # Giữ nguyên văn sau khi gộp
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv('CHAT_SUMMARY_MAX_TOKENS', '200'))
 
 # ============ TRADING CONFIGURATION ============
 # Symbol để trade
 TRADE_SYMBOL = 'BTCUSDT'
+# Danh sách symbol chạy song song mỗi chu kỳ (vd "BTCUSDT,ETHUSDT,BNBUSDT"), mặc định chỉ TRADE_SYMBOL
+TRADE_SYMBOLS = [s.strip().upper() for s in os.getenv('TRADE_SYMBOLS', TRADE_SYMBOL).split(',') if s.strip()]
+# Số thread phân tích đồng thời khi chạy nhiều symbol
+MULTI_SYMBOL_WORKERS = int(os.getenv('MULTI_SYMBOL_WORKERS', '8'))
+# Thời gian tối đa cho một chu kỳ (mọi symbol) - symbol chưa xong bị báo trễ
+CYCLE_LATENCY_SLO_SECONDS = float(os.getenv('CYCLE_LATENCY_SLO_SECONDS', '60'))
+# Chạy chu kỳ bằng asyncio (AsyncClient + AsyncOpenAI): I/O độc lập chạy đồng thời
+ASYNC_PIPELINE_ENABLED = os.getenv('ASYNC_PIPELINE_ENABLED', '0') == '1'
+PIPELINE_MAX_CONCURRENCY = int(os.getenv('PIPELINE_MAX_CONCURRENCY', '32'))  # Số symbol chạy đồng thời
+PIPELINE_CPU_WORKERS = int(os.getenv('PIPELINE_CPU_WORKERS', str(os.cpu_count() or 1)))  # Thread tính chỉ báo
+# Timeout từng giai đoạn (giây): dữ liệu thị trường, chỉ báo, ChatGPT, risk + đặt lệnh
+PIPELINE_TIMEOUT_MARKET_SECONDS = float(os.getenv('PIPELINE_TIMEOUT_MARKET_SECONDS', '10'))
+PIPELINE_TIMEOUT_INDICATORS_SECONDS = float(os.getenv('PIPELINE_TIMEOUT_INDICATORS_SECONDS', '5'))
+PIPELINE_TIMEOUT_ADVISOR_SECONDS = float(os.getenv('PIPELINE_TIMEOUT_ADVISOR_SECONDS', '20'))
+PIPELINE_TIMEOUT_ORDER_SECONDS = float(os.getenv('PIPELINE_TIMEOUT_ORDER_SECONDS', '15'))
 
 # Chỉ số kỹ thuật
 MA_PERIOD = 15          # Moving Average
@@ -33,6 +87,8 @@ MACD_SLOW = int(os.getenv('MACD_SLOW', '26'))
 MACD_SIGNAL = int(os.getenv('MACD_SIGNAL', '9'))
 # Fibonacci lookback window (periods)
 FIB_LOOKBACK = int(os.getenv('FIB_LOOKBACK', '100'))
+# Cách tính chỉ báo: 'numpy' (nhanh, mặc định) hoặc 'pandas_ta' (cần cài pandas-ta)
+INDICATOR_BACKEND = os.getenv('INDICATOR_BACKEND', 'numpy')
 
 # Quản lý rủi ro
 INITIAL_BALANCE = float(os.getenv('INITIAL_BALANCE', '10000'))  # Số dư ban đầu (USDT)
@@ -42,8 +98,33 @@ TAKE_PROFIT_PERCENT = 3.0 # Take profit 3%
 # Ngưỡng ATR so với giá để chặn biến động quá lớn (mặc định 25%)
 ATR_VOLATILITY_THRESHOLD = float(os.getenv('ATR_VOLATILITY_THRESHOLD', '0.25'))
 
+# ============ BACKTEST ============
+BACKTEST_FEE_RATE = float(os.getenv('BACKTEST_FEE_RATE', '0.001'))        # Phí mỗi chiều (0.1% Binance spot)
+BACKTEST_SLIPPAGE_BPS = float(os.getenv('BACKTEST_SLIPPAGE_BPS', '2'))    # Trượt giá mỗi lệnh (basis points)
+# Độ tin cậy gán cho tín hiệu quy tắc khi backtest (check_risk_conditions cần >= 50)
+BACKTEST_SIGNAL_CONFIDENCE = float(os.getenv('BACKTEST_SIGNAL_CONFIDENCE', '70'))
+# Số tiến trình chạy song song khi tối ưu tham số (mặc định = số nhân CPU)
+OPTIMIZER_WORKERS = int(os.getenv('OPTIMIZER_WORKERS', str(os.cpu_count() or 1)))
+# Xếp hạng: Sharpe làm tròn theo bước này; cùng bậc thì so drawdown rồi profit factor
+OPTIMIZER_SHARPE_BUCKET = float(os.getenv('OPTIMIZER_SHARPE_BUCKET', '0.25'))
+
 # Chu kỳ phân tích (phút)
 TRADING_INTERVAL_MINUTES = 5  # Mặc định 5 phút (đã rút ngắn từ 15 phút)
+# Khung nến dùng để phân tích mỗi chu kỳ
+TRADING_CANDLE_INTERVAL = os.getenv('TRADING_CANDLE_INTERVAL', '15m')
+# Chạy chu kỳ ngay sau khi nến TRADING_CANDLE_INTERVAL đóng (0 = mốc cố định mỗi TRADING_INTERVAL_MINUTES)
+SCHEDULE_ON_CANDLE_CLOSE = os.getenv('SCHEDULE_ON_CANDLE_CLOSE', '1') == '1'
+SCHEDULER_CLOSE_OFFSET_SECONDS = float(os.getenv('SCHEDULER_CLOSE_OFFSET_SECONDS', '1'))  # Chờ sàn chốt nến
+SCHEDULER_MISSED_POLICY = os.getenv('SCHEDULER_MISSED_POLICY', 'skip')  # 'skip' hoặc 'catch_up'
+
+# ============ WEBSOCKET STREAMING ============
+# Bật chế độ stream: nhận kline + bookTicker qua WebSocket, đọc dữ liệu từ bộ nhớ
+DATA_STREAM_ENABLED = os.getenv('DATA_STREAM_ENABLED', '0') == '1'
+BINANCE_WS_URL = os.getenv('BINANCE_WS_URL', 'wss://stream.testnet.binance.vision')
+STREAM_BUFFER_SIZE = int(os.getenv('STREAM_BUFFER_SIZE', '1000'))  # Số nến giữ trong bộ nhớ
+STREAM_RECONNECT_SECONDS = float(os.getenv('STREAM_RECONNECT_SECONDS', '5'))
+# Quá số giây này không nhận được message thì dữ liệu stream bị coi là cũ -> dùng REST
+STREAM_STALE_SECONDS = float(os.getenv('STREAM_STALE_SECONDS', '30'))
 
 # ============ LOGGING & REPORTING ============
 # Đường dẫn thư mục data (tương đối từ project root)
@@ -54,11 +135,36 @@ LOG_FILE = os.path.join(DATA_DIR, 'trading_logs.txt')
 DATABASE_FILE = os.path.join(DATA_DIR, 'trading_history.db')
 REPORT_HTML_FILE = os.path.join(DATA_DIR, 'trading_report.html')
 EQUITY_CURVE_FILE = os.path.join(DATA_DIR, 'duong_cong_von.png')
+# Kho nến cục bộ: chỉ tải nến mới từ Binance thay vì tải lại toàn bộ mỗi chu kỳ
+CANDLE_STORE_ENABLED = os.getenv('CANDLE_STORE_ENABLED', '1') == '1'
+CANDLE_DB_FILE = os.path.join(DATA_DIR, 'candles.db')
+ADVICE_CACHE_DB_FILE = os.path.join(DATA_DIR, 'advice_cache.db')
+LLM_RECORD_FILE = os.getenv('LLM_RECORD_FILE', os.path.join(DATA_DIR, 'llm_recordings.jsonl'))
+# Ghi database qua hàng đợi + thread nền (write-behind), gom nhiều dòng trong một transaction
+DB_WRITE_BEHIND = os.getenv('DB_WRITE_BEHIND', '1') == '1'
+DB_WRITE_QUEUE_SIZE = int(os.getenv('DB_WRITE_QUEUE_SIZE', '10000'))  # Số dòng tối đa chờ ghi
+DB_WRITE_BATCH_SIZE = int(os.getenv('DB_WRITE_BATCH_SIZE', '500'))    # Số dòng mỗi transaction
+# Hàng đợi đầy quá số giây này -> ghi thẳng (đồng bộ) thay vì chặn vòng giao dịch
+DB_WRITE_PUT_TIMEOUT = float(os.getenv('DB_WRITE_PUT_TIMEOUT', '0.05'))
+DB_FLUSH_TIMEOUT_SECONDS = float(os.getenv('DB_FLUSH_TIMEOUT_SECONDS', '5'))  # Chờ tối đa khi flush
+# Báo cáo tính một lần mỗi chu kỳ rồi dùng chung cho console / HTML / GUI;
+# tự làm mới khi có lệnh mới hoặc quá số giây này (0 = chỉ làm mới khi có lệnh mới)
+REPORT_SNAPSHOT_TTL_SECONDS = float(os.getenv('REPORT_SNAPSHOT_TTL_SECONDS', '60'))
+# Vẽ equity curve trong process riêng (Agg), giảm mẫu về số pixel chiều ngang
+CHART_RENDER_PROCESS = os.getenv('CHART_RENDER_PROCESS', '1') == '1'
+CHART_WIDTH_PX = int(os.getenv('CHART_WIDTH_PX', '1400'))
+CHART_HEIGHT_PX = int(os.getenv('CHART_HEIGHT_PX', '800'))
+CHART_DPI = int(os.getenv('CHART_DPI', '100'))
+CHART_MAX_ANNOTATIONS = int(os.getenv('CHART_MAX_ANNOTATIONS', '40'))  # Ghi số chu kỳ khi ít marker
 # Kích cỡ biểu đồ trên tab báo cáo (px)
 REPORT_CHART_MIN_WIDTH = int(os.getenv('REPORT_CHART_MIN_WIDTH', '600'))
 REPORT_CHART_MAX_WIDTH = int(os.getenv('REPORT_CHART_MAX_WIDTH', '900'))
 REPORT_CHART_MAX_HEIGHT = int(os.getenv('REPORT_CHART_MAX_HEIGHT', '650'))
 REPORT_CHART_TARGET_HEIGHT = int(os.getenv('REPORT_CHART_TARGET_HEIGHT', '480'))
+# Hàng đợi cập nhật GUI: thread nền gửi sự kiện, Tk rút theo lô mỗi GUI_BUS_INTERVAL_MS
+GUI_BUS_INTERVAL_MS = int(os.getenv('GUI_BUS_INTERVAL_MS', '50'))
+GUI_BUS_MAX_EVENTS = int(os.getenv('GUI_BUS_MAX_EVENTS', '500'))  # Sự kiện tối đa mỗi lượt
+GUI_LOG_CAPACITY = int(os.getenv('GUI_LOG_CAPACITY', '100000'))  # Số dòng log giữ trong bộ nhớ
 
 # ============ PROMPT CHO CHATGPT ============
 TRADING_PROMPT = """
@@ -71,15 +177,9 @@ Moving Average ({ma_period}): {ma_value}
 RSI: {rsi_value}
 ATR: {atr_value}
 
-Yêu cầu:
-1. Phân tích tình hình thị trường (giá đang trong xu hướng nào?)
-2. RSI cho thấy gì? (quá mua/quá bán?)
-3. MA cho thấy gì? (kháng cự/hỗ trợ?)
-4. ATR cho thấy biến động như thế nào?
-
-KHÔNG ĐƯỢC đưa ra khuyến nghị cụ thể Mua/Bán.
-Chỉ phân tích dữ liệu và giải thích ý nghĩa.
+Xem xét xu hướng giá so với MA, RSI (quá mua/quá bán) và biến động theo ATR.
 
-Trả lời bằng tiếng Việt, ngắn gọn (3-4 câu).
+Chỉ trả lời bằng một JSON object:
+{{"recommendation": "BUY|SELL|HOLD", "confidence": 0-100, "reason": "tối đa 2 câu tiếng Việt"}}
 """
 
@@ -0,0 +1,193 @@
+"""
+Module bộ nhớ hội thoại cho chat_with_user
+- Đếm token từng tin nhắn (tiktoken nếu có cài, không thì ước lượng theo số byte)
+- Khi lịch sử vượt ngân sách token: gộp các lượt cũ vào một bản tóm tắt cuốn chiếu,
+  chỉ giữ nguyên văn các lượt gần nhất -> kích thước prompt mỗi lượt có giới hạn
+- Thông điệp hệ thống luôn đứng đầu và không đổi: phần đầu prompt giống hệt nhau
+  giữa các lượt nên OpenAI dùng được prompt caching
+"""
+
+import hashlib
+import threading
+
+from . import config
+
+# Token phụ cho mỗi tin nhắn (role, phân cách) theo định dạng chat của OpenAI
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+
+
+def count_tokens(text):
+    """Số token của text (tiktoken nếu có, không thì ~4 byte UTF-8 / token)"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('o200k_base')
+        except Exception:  # chưa cài tiktoken / không tải được bảng mã
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return (len(text.encode('utf-8')) + 3) // 4
+
+
+def message_tokens(message):
+    return count_tokens(message.get('content') or '') + MESSAGE_OVERHEAD_TOKENS
+
+
+def extractive_summary(previous, messages, max_tokens):
+    """
+    Tóm tắt không cần gọi API: giữ câu hỏi / câu trả lời rút gọn của từng lượt,
+    bỏ bớt phần cũ nhất khi vượt max_tokens
+    """
+    lines = [previous] if previous else []
+    for message in messages:
+        who = 'Người dùng' if message['role'] == 'user' else 'Trợ lý'
+        content = ' '.join((message.get('content') or '').split())
+        lines.append(f"- {who}: {content[:160]}{'…' if len(content) > 160 else ''}")
+    while len(lines) > 1 and count_tokens('\n'.join(lines)) > max_tokens:
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+class ConversationMemory:
+    """
+    Lịch sử chat có ngân sách token
+
+    Ví dụ:
+        memory = ConversationMemory("Bạn là trợ lý giao dịch...")
+        reply = advisor.chat_with_user(memory, "RSI là gì?")
+        memory.stats()   # {'turns': 2, 'history_tokens': ..., 'summarized_turns': 0, ...}
+    """
+
+    def __init__(self, system_prompt, max_history_tokens=None, keep_recent_tokens=None,
+                 summary_max_tokens=None):
+        """
+        Args:
+            system_prompt: Thông điệp hệ thống (cố định, luôn đứng đầu prompt)
+            max_history_tokens: Ngân sách token cho tóm tắt + các lượt gần đây
+                (mặc định config.CHAT_MAX_HISTORY_TOKENS)
+            keep_recent_tokens: Sau khi gộp, giữ nguyên văn các lượt gần nhất tới mức này
+                (mặc định config.CHAT_KEEP_RECENT_TOKENS)
+            summary_max_tokens: Độ dài tối đa của bản tóm tắt (mặc định config.CHAT_SUMMARY_MAX_TOKENS)
+        """
+        self.system_message = {'role': 'system', 'content': system_prompt}
+        self.max_history_tokens = max_history_tokens or config.CHAT_MAX_HISTORY_TOKENS
+        self.keep_recent_tokens = keep_recent_tokens or config.CHAT_KEEP_RECENT_TOKENS
+        self.summary_max_tokens = summary_max_tokens or config.CHAT_SUMMARY_MAX_TOKENS
+        # Khóa prompt caching: cùng thông điệp hệ thống -> cùng khóa
+        self.cache_key = 'chat-' + hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:16]
+        self.system_tokens = message_tokens(self.system_message)
+        self.summary = ''
+        self.summary_tokens = 0
+        self.summarized_turns = 0
+        self._turns = []  # [(message, tokens)]
+        self._lock = threading.RLock()
+        self._compacting = False
+        self._generation = 0  # tăng khi clear(): bỏ kết quả tóm tắt đang chạy
+
+    def __len__(self):
+        return len(self._turns)
+
+    @property
+    def history_tokens(self):
+        return self.summary_tokens + sum(tokens for _, tokens in self._turns)
+
+    def messages(self, user_message=None):
+        """
+        Messages gửi ChatGPT: hệ thống -> tóm tắt (nếu có) -> các lượt gần đây -> câu hỏi mới
+        """
+        with self._lock:
+            messages = [self.system_message]
+            if self.summary:
+                messages.append({'role': 'system',
+                                 'content': f"Tóm tắt phần hội thoại trước:\n{self.summary}"})
+            messages.extend(message for message, _ in self._turns)
+        if user_message is not None:
+            messages.append({'role': 'user', 'content': user_message})
+        return messages
+
+    def prompt_tokens(self, user_message=''):
+        """Ước lượng số token đầu vào của lượt tiếp theo"""
+        return (self.system_tokens + self.history_tokens
+                + message_tokens({'content': user_message}))
+
+    def add(self, user_message, reply):
+        """Ghi một lượt hỏi - đáp"""
+        with self._lock:
+            for message in ({'role': 'user', 'content': user_message},
+                            {'role': 'assistant', 'content': reply}):
+                self._turns.append((message, message_tokens(message)))
+
+    def needs_compaction(self):
+        return self.history_tokens > self.max_history_tokens
+
+    def compact(self, summarizer=None):
+        """
+        Gộp các lượt cũ vào bản tóm tắt, giữ nguyên văn các lượt gần nhất
+        (ít nhất lượt hỏi - đáp cuối cùng)
+
+        Args:
+            summarizer: Hàm (tóm tắt cũ, list messages) -> tóm tắt mới, vd gọi ChatGPT;
+                lỗi hoặc None -> tóm tắt trích đoạn (extractive_summary)
+        """
+        # Chỉ giữ khóa khi chọn / thay các lượt: gọi summarizer (mạng) ngoài khóa,
+        # messages() / add() của lượt chat tiếp theo không phải chờ
+        with self._lock:
+            if self._compacting or not self.needs_compaction():
+                return False
+            recent, recent_tokens = 0, 0
+            for _, tokens in reversed(self._turns):
+                if recent >= 2 and recent_tokens + tokens > self.keep_recent_tokens:
+                    break
+                recent += 1
+                recent_tokens += tokens
+            old = [message for message, _ in self._turns[:len(self._turns) - recent]]
+            if not old:
+                return False
+            previous = self.summary
+            generation = self._generation
+            self._compacting = True
+
+        try:
+            summary = None
+            if summarizer is not None:
+                try:
+                    summary = summarizer(previous, old)
+                except Exception as e:
+                    print(f"⚠️ Không tóm tắt được hội thoại bằng ChatGPT: {e}")
+            if not summary:
+                summary = extractive_summary(previous, old, self.summary_max_tokens)
+        except BaseException:
+            with self._lock:
+                self._compacting = False
+            raise
+
+        with self._lock:
+            self._compacting = False
+            if self._generation != generation:
+                return False  # clear() trong lúc tóm tắt
+            self.summary = summary.strip()
+            self.summary_tokens = message_tokens({'content': self.summary}) if self.summary else 0
+            self.summarized_turns += len(old)
+            # Chỉ bỏ các lượt đã tóm tắt; lượt thêm vào trong lúc chờ vẫn giữ nguyên
+            self._turns = self._turns[len(old):]
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._turns = []
+            self.summary = ''
+            self.summary_tokens = 0
+            self.summarized_turns = 0
+
+    def stats(self):
+        return {
+            'turns': len(self),
+            'history_tokens': self.history_tokens,
+            'summary_tokens': self.summary_tokens,
+            'summarized_turns': self.summarized_turns,
+            'prompt_tokens': self.prompt_tokens(),
+        }
@@ -7,7 +7,9 @@ import pandas as pd
 import sqlite3
 import time
 from datetime import datetime
-from binance.client import Client
+from .binance_client import get_client
+from .candle_store import CandleStore, klines_to_dataframe
+from .market_stream import MarketStream
 from . import config
 
 
@@ -19,15 +21,23 @@ class DataCollector:
     - Lưu vào SQLite database
     """
     
-    def __init__(self):
-        """Khởi tạo kết nối với Binance Testnet"""
+    def __init__(self, candle_store=None, client=None):
+        """
+        Khởi tạo kết nối với Binance Testnet
+
+        Args:
+            candle_store: CandleStore dùng chung (mặc định tạo mới nếu
+                config.CANDLE_STORE_ENABLED bật)
+            client: Binance client dùng chung (mặc định binance_client.get_client())
+        """
+        if candle_store is None and config.CANDLE_STORE_ENABLED:
+            candle_store = CandleStore()
+        self.candle_store = candle_store
+        self.stream = None
+
         try:
             # Binance Testnet - AN TOÀN, không dùng tiền thật!
-            self.client = Client(
-                api_key=config.BINANCE_API_KEY,
-                api_secret=config.BINANCE_SECRET_KEY,
-                testnet=True  # QUAN TRỌNG: dùng Testnet
-            )
+            self.client = client or get_client()
             print("✅ Kết nối thành công với Binance Testnet")
         except Exception as e:
             print(f"❌ Lỗi kết nối Binance: {e}")
@@ -59,6 +69,9 @@ class DataCollector:
         """
         Lấy dữ liệu candle (nến) từ Binance
         
+        Nếu bật kho nến cục bộ, chỉ các nến mới hơn open_time cuối cùng
+        được tải từ Binance; phần còn lại đọc từ SQLite.
+        
         Args:
             symbol: Mã giao dịch
             interval: Khung thời gian (1m, 5m, 15m, 1h, 1d...)
@@ -74,6 +87,14 @@ class DataCollector:
                 - volume: Khối lượng giao dịch
         """
         try:
+            if self.candle_store is not None:
+                # Chỉ tải phần nến mới, phần còn lại đọc từ kho cục bộ
+                fetched = self.candle_store.sync(self.client, symbol, interval, limit=limit)
+                df = self.candle_store.load(symbol, interval, limit=limit)
+                print(f"✅ Lấy được {len(df)} candle {interval} cho {symbol} "
+                      f"(tải mới {fetched} candle)")
+                return df
+
             # Lấy dữ liệu từ Binance
             klines = self.client.get_klines(
                 symbol=symbol,
@@ -82,21 +103,7 @@ class DataCollector:
             )
             
             # Chuyển thành DataFrame để dễ xử lý
-            df = pd.DataFrame(klines, columns=[
-                'open_time', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 
-                'taker_buy_base', 'taker_buy_quote', 'ignore'
-            ])
-            
-            # Chuyển sang kiểu số thực
-            df['open'] = pd.to_numeric(df['open'])
-            df['high'] = pd.to_numeric(df['high'])
-            df['low'] = pd.to_numeric(df['low'])
-            df['close'] = pd.to_numeric(df['close'])
-            df['volume'] = pd.to_numeric(df['volume'])
-            
-            # Chuyển open_time thành datetime
-            df['datetime'] = pd.to_datetime(df['open_time'], unit='ms')
+            df = klines_to_dataframe(klines)
             
             print(f"✅ Lấy được {len(df)} candle {interval} cho {symbol}")
             return df
@@ -105,10 +112,72 @@ class DataCollector:
             print(f"❌ Lỗi lấy candle: {e}")
             return pd.DataFrame()  # Trả về DataFrame rỗng
     
+    def start_stream(self, symbol='BTCUSDT', interval='1m', url=None):
+        """
+        Bật chế độ streaming WebSocket cho một symbol/khung thời gian
+
+        Nến lịch sử được nạp sẵn một lần (từ kho nến/REST), sau đó mọi cập nhật
+        đến qua WebSocket. Nến đã đóng được ghi vào kho nến cục bộ.
+
+        Returns:
+            MarketStream: stream đang chạy
+        """
+        self.stop_stream()
+
+        on_closed = None
+        if self.candle_store is not None:
+            store = self.candle_store
+
+            def on_closed(sym, itv, kline):
+                store.upsert_klines(sym, itv, [kline])
+
+        stream = MarketStream(symbol, interval, url=url, on_candle_closed=on_closed,
+                              backfill=self._backfill_klines)
+        seed = self.get_candles(symbol, interval, limit=min(config.STREAM_BUFFER_SIZE, 1000))
+        if not seed.empty:
+            stream.seed(seed)
+        stream.start()
+        self.stream = stream
+        print(f"📡 Đã bật streaming {symbol} {interval}")
+        return stream
+
+    def stop_stream(self):
+        """Tắt chế độ streaming (nếu đang bật)"""
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream = None
+
+    def _backfill_klines(self, symbol, interval, since_open_time):
+        """
+        Nến từ since_open_time tới hiện tại (bù phần bị lỡ khi stream mất kết nối)
+
+        Có kho nến: đồng bộ kho (CandleStore.sync) rồi đọc lại; không có: REST startTime.
+        """
+        if self.candle_store is not None:
+            self.candle_store.sync(self.client, symbol, interval,
+                                   limit=min(config.STREAM_BUFFER_SIZE, 1000))
+            return self.candle_store.load(symbol, interval, start_time=since_open_time)
+        return self.client.get_klines(symbol=symbol, interval=interval,
+                                      startTime=since_open_time, limit=1000)
+
+    def _stream_for(self, symbol, interval):
+        """
+        Trả về stream đang chạy nếu khớp symbol/interval và dữ liệu còn mới
+        (đang kết nối, message gần nhất chưa quá STREAM_STALE_SECONDS); None -> dùng REST
+        """
+        stream = self.stream
+        if (stream is not None and stream.symbol == symbol.upper()
+                and stream.interval == interval and stream.is_ready()):
+            return stream
+        return None
+    
     def get_realtime_data(self, symbol='BTCUSDT', interval='1m'):
         """
         Hàm tiện ích: Lấy dữ liệu real-time mới nhất
         
+        Khi đang streaming đúng symbol/interval, dữ liệu được đọc từ bộ nhớ
+        (không gọi mạng); ngược lại dùng REST như bình thường.
+        
         Returns:
             dict: {
                 'price': giá hiện tại,
@@ -116,6 +185,16 @@ class DataCollector:
                 'timestamp': thời gian lấy
             }
         """
+        stream = self._stream_for(symbol, interval)
+        if stream is None and self.stream is not None and self.stream.symbol == symbol.upper():
+            print(f"⚠️ Stream {self.stream.symbol} mất kết nối / dữ liệu cũ, dùng REST")
+        if stream is not None:
+            return {
+                'timestamp': datetime.now(),
+                'price': stream.get_price(),
+                'candles': stream.get_candles(limit=100)
+            }
+
         data = {
             'timestamp': datetime.now(),
             'price': self.get_current_price(symbol),
@@ -4,12 +4,21 @@ Module Database & Logger
 - Lưu dữ liệu phân tích
 - Lưu kết quả và báo cáo
 - Cung cấp phản hồi hiệu quả cho AI
+
+Ghi dữ liệu kiểu write-behind: các lệnh INSERT được đưa vào hàng đợi và một
+thread nền ghi theo lô (một transaction cho nhiều dòng) trên một kết nối WAL
+mở sẵn, nên vòng giao dịch không phải chờ fsync của ổ đĩa.
 """
 
+import atexit
+import queue
 import sqlite3
 import json
+import threading
+import time
 from datetime import datetime
 import os
+from .db_migrations import migrate, to_ms, days_ago_ms
 from . import config
 
 
@@ -24,79 +33,199 @@ class DatabaseLogger:
     4. Tạo báo cáo và phản hồi cho AI
     """
     
-    def __init__(self, db_file=None):
+    def __init__(self, db_file=None, client=None, async_writes=None):
         """
         Khởi tạo Database Logger
         
         Args:
             db_file: Đường dẫn file database (mặc định từ config)
+            client: Binance client dùng chung (chỉ cần khi phải lấy giá ticker)
+            async_writes: True = ghi nền qua hàng đợi (mặc định config.DB_WRITE_BEHIND),
+                False = ghi ngay trên kết nối dùng chung
         """
         self.db_file = db_file or config.DATABASE_FILE
+        self.client = client
+        self.async_writes = config.DB_WRITE_BEHIND if async_writes is None else async_writes
         # Đảm bảo thư mục data tồn tại
         os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
         self._init_database()
+
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._queue = None
+        self._writer = None
+        self._closed = False
+        self._trade_listeners = []
+        if self.async_writes:
+            self._queue = queue.Queue(maxsize=config.DB_WRITE_QUEUE_SIZE)
+            self._writer = threading.Thread(target=self._writer_loop, name='db-writer', daemon=True)
+            self._writer.start()
+            # Ghi nốt dữ liệu còn trong hàng đợi khi chương trình thoát
+            atexit.register(self.close)
         print("✅ Database & Logger đã sẵn sàng")
+
+    def add_trade_listener(self, callback):
+        """Đăng ký hàm được gọi (không tham số) mỗi khi một lệnh giao dịch được ghi"""
+        self._trade_listeners.append(callback)
+
+    def _connect(self):
+        """Kết nối ghi dùng lâu dài: WAL + synchronous=NORMAL (ít fsync hơn, vẫn an toàn)"""
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    # ==== GHI DỮ LIỆU (WRITE-BEHIND) ====
+    def write(self, sql, params=()):
+        """
+        Ghi một câu lệnh INSERT/UPDATE
+
+        Chế độ nền: chỉ đưa vào hàng đợi rồi trả về ngay. Hàng đợi đầy quá
+        DB_WRITE_PUT_TIMEOUT giây, hoặc thread nền đã dừng -> ghi thẳng trên kết nối
+        dùng chung (chậm hơn nhưng không chặn vô hạn, không mất dữ liệu).
+        """
+        if self._closed:
+            raise RuntimeError("DatabaseLogger đã đóng")
+        if self._queue is not None:
+            if self._writer.is_alive():
+                try:
+                    self._queue.put((sql, params), timeout=config.DB_WRITE_PUT_TIMEOUT)
+                    return
+                except queue.Full:
+                    print("⚠️ Hàng đợi ghi database đầy, ghi trực tiếp")
+            else:
+                self._drain_queue()
+        self._write_sync(sql, params)
+
+    def _write_sync(self, sql, params):
+        """Ghi ngay trên kết nối dùng chung (chế độ đồng bộ / dự phòng)"""
+        with self._conn_lock:
+            if self._conn is None:
+                self._conn = self._connect()
+            with self._conn:
+                self._conn.execute(sql, params)
+
+    def _drain_queue(self):
+        """Thread nền đã dừng: ghi đồng bộ các dòng còn kẹt trong hàng đợi"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is not None:
+                    self._write_sync(*item)
+            except Exception as e:
+                print(f"❌ Lỗi ghi database: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _writer_loop(self):
+        """Thread nền: gom các lệnh trong hàng đợi và ghi theo lô trong một transaction"""
+        try:
+            conn = self._connect()
+        except Exception as e:
+            # Thread dừng; write()/flush() thấy thread chết và chuyển sang ghi đồng bộ
+            print(f"❌ Thread ghi database không kết nối được, chuyển sang ghi đồng bộ: {e}")
+            return
+        batch_size = config.DB_WRITE_BATCH_SIZE
+        running = True
+        while running:
+            items = [self._queue.get()]
+            while len(items) < batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            writes = []
+            waiters = []
+            for item in items:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    writes.append(item)
+
+            try:
+                if writes:
+                    self._write_batch(conn, writes)
+            except Exception as e:
+                print(f"❌ Lỗi thread ghi database: {e}")
+            finally:
+                for waiter in waiters:
+                    waiter.set()
+                for _ in items:
+                    self._queue.task_done()
+        conn.close()
+
+    def _write_batch(self, conn, writes):
+        try:
+            with conn:
+                for sql, params in writes:
+                    conn.execute(sql, params)
+        except Exception as e:
+            # Lỗi một dòng không làm mất cả lô: ghi lại từng dòng
+            print(f"⚠️ Lỗi ghi lô database ({len(writes)} dòng), ghi lại từng dòng: {e}")
+            for sql, params in writes:
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                except Exception as row_error:
+                    print(f"❌ Lỗi ghi database: {row_error}")
+
+    def flush(self, timeout=None):
+        """
+        Chờ tới khi mọi dữ liệu đã đưa vào hàng đợi được ghi xuống database
+
+        Args:
+            timeout: Số giây chờ tối đa (mặc định config.DB_FLUSH_TIMEOUT_SECONDS)
+
+        Returns:
+            bool: True nếu đã ghi xong trong thời gian timeout
+        """
+        if self._queue is None or self._closed:
+            return True
+        timeout = config.DB_FLUSH_TIMEOUT_SECONDS if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        while not done.wait(0.05):
+            if not self._writer.is_alive():
+                self._drain_queue()
+                return True
+            if time.monotonic() >= deadline:
+                return False
+        return True
+
+    def close(self):
+        """Ghi nốt hàng đợi, dừng thread nền và đóng kết nối (gọi khi tắt bot)"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._queue is not None:
+            if self._writer.is_alive():
+                self._queue.put(None)
+                self._writer.join()
+            self._drain_queue()
+            atexit.unregister(self.close)
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
     
     def _init_database(self):
-        """Khởi tạo các bảng trong database"""
+        """Khởi tạo / nâng cấp các bảng trong database (xem db_migrations)"""
         try:
             conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            # Bảng lưu dữ liệu phân tích
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS analysis_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    symbol TEXT,
-                    price REAL,
-                    ma REAL,
-                    rsi REAL,
-                    atr REAL,
-                    recommendation TEXT,
-                    reason TEXT,
-                    confidence REAL,
-                    raw_response TEXT
-                )
-            ''')
-            
-            # Bảng lưu lịch sử giao dịch
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS trading_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    order_id TEXT,
-                    symbol TEXT,
-                    side TEXT,
-                    quantity REAL,
-                    entry_price REAL,
-                    exit_price REAL,
-                    stop_loss REAL,
-                    take_profit REAL,
-                    status TEXT,
-                    pnl REAL,
-                    pnl_percent REAL
-                )
-            ''')
-            
-            # Bảng lưu kết quả performance
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS performance (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    total_trades INTEGER,
-                    winning_trades INTEGER,
-                    losing_trades INTEGER,
-                    total_pnl REAL,
-                    win_rate REAL,
-                    avg_win REAL,
-                    avg_loss REAL,
-                    profit_factor REAL,
-                    account_balance REAL
-                )
-            ''')
-            
-            conn.commit()
+            conn.execute('PRAGMA journal_mode=WAL')
+            migrate(conn)
             conn.close()
             
         except Exception as e:
@@ -112,17 +241,17 @@ class DatabaseLogger:
             symbol: Mã giao dịch
         """
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            timestamp = datetime.now().isoformat()
+            now = datetime.now()
+            timestamp = now.isoformat()
             
-            cursor.execute('''
+            self.write('''
                 INSERT INTO analysis_data 
-                (timestamp, symbol, price, ma, rsi, atr, recommendation, reason, confidence, raw_response)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (timestamp, ts_ms, symbol, price, ma, rsi, atr, recommendation, reason, confidence,
+                 raw_response, source)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 timestamp,
+                to_ms(now),
                 symbol,
                 indicators.get('current_price'),
                 indicators.get('ma'),
@@ -131,12 +260,10 @@ class DatabaseLogger:
                 advice.get('recommendation'),
                 advice.get('reason'),
                 advice.get('confidence'),
-                advice.get('raw_response', '')
+                advice.get('raw_response', ''),
+                advice.get('source', 'llm')
             ))
             
-            conn.commit()
-            conn.close()
-            
             print(f"✅ Đã lưu dữ liệu phân tích: {advice.get('recommendation')}")
             
         except Exception as e:
@@ -151,10 +278,8 @@ class DatabaseLogger:
             position_info: Thông tin về vị thế (stop loss, take profit)
         """
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            timestamp = datetime.now().isoformat()
+            now = datetime.now()
+            timestamp = now.isoformat()
             
             # Lấy thông tin từ order_info
             order_id = order_info.get('orderId', '')
@@ -173,9 +298,9 @@ class DatabaseLogger:
             else:
                 # Fallback: lấy giá hiện tại từ ticker
                 try:
-                    from .trade_executor import TradeExecutor
-                    temp_executor = TradeExecutor()
-                    ticker = temp_executor.client.get_symbol_ticker(symbol=symbol)
+                    from .binance_client import get_client
+                    client = self.client or get_client()
+                    ticker = client.get_symbol_ticker(symbol=symbol)
                     price = float(ticker['price']) if ticker else 0.0
                 except:
                     price = 0.0
@@ -184,12 +309,13 @@ class DatabaseLogger:
             stop_loss = position_info.get('stop_loss', 0) if position_info else 0
             take_profit = position_info.get('take_profit', 0) if position_info else 0
             
-            cursor.execute('''
+            self.write('''
                 INSERT INTO trading_history 
-                (timestamp, order_id, symbol, side, quantity, entry_price, stop_loss, take_profit, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (timestamp, ts_ms, order_id, symbol, side, quantity, entry_price, stop_loss, take_profit, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 timestamp,
+                to_ms(now),
                 str(order_id),
                 symbol,
                 side,
@@ -200,10 +326,9 @@ class DatabaseLogger:
                 order_info.get('status', 'FILLED')
             ))
             
-            conn.commit()
-            conn.close()
-            
             print(f"✅ Đã lưu lệnh giao dịch: {side} {quantity} {symbol}")
+            for callback in self._trade_listeners:
+                callback()
             
         except Exception as e:
             print(f"❌ Lỗi lưu lệnh: {e}")
@@ -216,13 +341,14 @@ class DatabaseLogger:
             dict: Thông tin performance gần đây
         """
         try:
+            self.flush()
             conn = sqlite3.connect(self.db_file)
             cursor = conn.cursor()
             
             # Lấy báo cáo mới nhất
             cursor.execute('''
                 SELECT * FROM performance 
-                ORDER BY timestamp DESC 
+                ORDER BY ts_ms DESC 
                 LIMIT 1
             ''')
             
@@ -234,8 +360,8 @@ class DatabaseLogger:
                     COUNT(*) as total,
                     SUM(CASE WHEN status = 'FILLED' THEN 1 ELSE 0 END) as filled
                 FROM trading_history
-                WHERE timestamp >= datetime('now', '-7 days')
-            ''')
+                WHERE ts_ms >= ?
+            ''', (days_ago_ms(7),))
             
             recent_stats = cursor.fetchone()
             
@@ -267,6 +393,7 @@ class DatabaseLogger:
     def export_to_json(self, output_file='trading_data.json'):
         """Xuất dữ liệu ra file JSON"""
         try:
+            self.flush()
             conn = sqlite3.connect(self.db_file)
             
             # Lấy tất cả analysis data
@@ -0,0 +1,334 @@
+"""
+Module quản lý phiên bản cấu trúc database (schema migrations)
+- Phiên bản hiện tại lưu trong PRAGMA user_version của file SQLite
+- Mỗi migration chạy trong một transaction, nâng cấp database cũ ngay tại chỗ
+- Database mới: chạy lần lượt tất cả migration
+
+Lịch sử:
+1. Các bảng gốc: analysis_data, trading_history, performance, orders
+2. Cột ts_ms (epoch mili-giây, UTC) + index phủ (covering index) cho truy vấn
+   theo khoảng thời gian, trigger tự điền ts_ms cho các lệnh INSERT cũ
+3. Bảng tổng hợp theo ngày daily_trade_stats, được trigger cập nhật O(1) mỗi khi
+   trading_history thêm / sửa / xóa một giao dịch (xem performance_stats)
+4. daily_trade_stats tách theo symbol (khóa day, symbol) để báo cáo nhiều cặp
+   tính được unrealized PnL theo giá của từng cặp; index phủ thêm cột symbol
+5. Cột analysis_data.source: nguồn khuyến nghị ('llm', 'cache', 'fallback' - tín hiệu
+   quy tắc khi ChatGPT chậm / lỗi, 'error')
+"""
+
+from datetime import datetime
+
+
+# Bảng có cột timestamp (TEXT, giờ máy dạng isoformat) cần thêm ts_ms
+TIMESTAMPED_TABLES = ('analysis_data', 'trading_history', 'performance', 'orders')
+
+# ts_ms tính từ timestamp TEXT (giờ địa phương) -> epoch ms UTC
+TS_MS_FROM_TEXT = "CAST(ROUND((julianday({col}, 'utc') - 2440587.5) * 86400000) AS INTEGER)"
+
+DAY_MS = 86_400_000
+
+
+def now_ms():
+    """Thời điểm hiện tại dạng epoch mili-giây"""
+    return int(datetime.now().timestamp() * 1000)
+
+
+def to_ms(value):
+    """datetime hoặc chuỗi isoformat (giờ máy) -> epoch mili-giây"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return int(round(value.timestamp() * 1000))
+
+
+def days_ago_ms(days):
+    """Mốc thời gian `days` ngày trước (epoch ms) cho điều kiện ts_ms >= ?"""
+    return now_ms() - int(float(days) * 86_400_000)
+
+
+def _v1_base_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            symbol TEXT,
+            price REAL,
+            ma REAL,
+            rsi REAL,
+            atr REAL,
+            recommendation TEXT,
+            reason TEXT,
+            confidence REAL,
+            raw_response TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS trading_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            order_id TEXT,
+            symbol TEXT,
+            side TEXT,
+            quantity REAL,
+            entry_price REAL,
+            exit_price REAL,
+            stop_loss REAL,
+            take_profit REAL,
+            status TEXT,
+            pnl REAL,
+            pnl_percent REAL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS performance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            total_trades INTEGER,
+            winning_trades INTEGER,
+            losing_trades INTEGER,
+            total_pnl REAL,
+            win_rate REAL,
+            avg_win REAL,
+            avg_loss REAL,
+            profit_factor REAL,
+            account_balance REAL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id TEXT,
+            symbol TEXT,
+            side TEXT,
+            quantity REAL,
+            price REAL,
+            status TEXT,
+            timestamp TEXT
+        )
+    ''')
+
+
+def _v2_epoch_ms_and_indexes(conn):
+    for table in TIMESTAMPED_TABLES:
+        columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if 'ts_ms' not in columns:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN ts_ms INTEGER')
+        conn.execute(f'UPDATE {table} SET ts_ms = {TS_MS_FROM_TEXT.format(col="timestamp")} '
+                     f'WHERE ts_ms IS NULL')
+        # INSERT không ghi ts_ms (code cũ, pandas.to_sql...) vẫn được điền tự động
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fill_ts_ms
+            AFTER INSERT ON {table} WHEN NEW.ts_ms IS NULL
+            BEGIN
+                UPDATE {table} SET ts_ms = {TS_MS_FROM_TEXT.format(col="NEW.timestamp")}
+                WHERE id = NEW.id;
+            END
+        ''')
+
+    # Index phủ: truy vấn báo cáo đọc hết cột cần thiết ngay từ index, không đọc bảng
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_analysis_ts ON analysis_data (ts_ms)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_trading_ts ON trading_history '
+                 '(ts_ms, entry_price, pnl, quantity, side)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_performance_ts ON performance '
+                 '(ts_ms, account_balance, total_pnl)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_orders_ts ON orders (ts_ms)')
+
+
+def _stats_day(row):
+    """Ngày (UTC, số ngày từ epoch) của một dòng trading_history"""
+    ts_ms = f"COALESCE({row}.ts_ms, {TS_MS_FROM_TEXT.format(col=row + '.timestamp')})"
+    return f"({ts_ms} / {DAY_MS})"
+
+
+def _stats_delta(row, sign, by_symbol=False):
+    """
+    Câu lệnh cộng (sign=+1) / trừ (sign=-1) phần đóng góp của một giao dịch vào
+    daily_trade_stats. Chỉ tính giao dịch có entry_price > 0 (giống báo cáo).
+
+    by_symbol: bảng có khóa (day, symbol) - từ migration 4
+    """
+    pnl = f"COALESCE({row}.pnl, 0)"
+    is_open = f"({row}.pnl IS NULL)"
+    direction = f"(CASE WHEN {row}.side = 'BUY' THEN 1 ELSE -1 END)"
+    qty = f"COALESCE({row}.quantity, 0)"
+    day = _stats_day(row)
+    if by_symbol:
+        symbol = f"COALESCE({row}.symbol, '')"
+        key_insert = f"INSERT OR IGNORE INTO daily_trade_stats (day, symbol) VALUES ({day}, {symbol})"
+        key_where = f"day = {day} AND symbol = {symbol}"
+    else:
+        key_insert = f"INSERT OR IGNORE INTO daily_trade_stats (day) VALUES ({day})"
+        key_where = f"day = {day}"
+    return f'''
+        {key_insert};
+        UPDATE daily_trade_stats SET
+            trades = trades + {sign},
+            closed = closed + {sign} * ({row}.pnl IS NOT NULL),
+            wins = wins + {sign} * ({pnl} > 0),
+            losses = losses + {sign} * ({pnl} < 0),
+            sum_win = sum_win + {sign} * MAX({pnl}, 0),
+            sum_loss = sum_loss + {sign} * MIN({pnl}, 0),
+            realized_pnl = realized_pnl + {sign} * {pnl},
+            open_qty = open_qty + {sign} * {is_open} * {direction} * {qty},
+            open_cost = open_cost + {sign} * {is_open} * {direction} * {qty} * {row}.entry_price
+        WHERE {key_where} AND {row}.entry_price > 0;
+    '''
+
+
+def _v3_daily_trade_stats(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_trade_stats (
+            day INTEGER PRIMARY KEY,              -- ts_ms // 86400000 (ngày UTC)
+            trades INTEGER NOT NULL DEFAULT 0,    -- số giao dịch (entry_price > 0)
+            closed INTEGER NOT NULL DEFAULT 0,    -- số giao dịch đã có pnl
+            wins INTEGER NOT NULL DEFAULT 0,
+            losses INTEGER NOT NULL DEFAULT 0,
+            sum_win REAL NOT NULL DEFAULT 0,      -- tổng pnl > 0
+            sum_loss REAL NOT NULL DEFAULT 0,     -- tổng pnl < 0 (số âm)
+            realized_pnl REAL NOT NULL DEFAULT 0,
+            open_qty REAL NOT NULL DEFAULT 0,     -- khối lượng ròng lệnh chưa đóng (BUY +, SELL -)
+            open_cost REAL NOT NULL DEFAULT 0     -- giá trị vào lệnh ròng của lệnh chưa đóng
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        INSERT OR REPLACE INTO daily_trade_stats
+        SELECT
+            ts_ms / 86400000,
+            COUNT(*),
+            SUM(pnl IS NOT NULL),
+            SUM(COALESCE(pnl, 0) > 0),
+            SUM(COALESCE(pnl, 0) < 0),
+            SUM(MAX(COALESCE(pnl, 0), 0)),
+            SUM(MIN(COALESCE(pnl, 0), 0)),
+            SUM(COALESCE(pnl, 0)),
+            SUM((pnl IS NULL) * (CASE WHEN side = 'BUY' THEN 1 ELSE -1 END) * COALESCE(quantity, 0)),
+            SUM((pnl IS NULL) * (CASE WHEN side = 'BUY' THEN 1 ELSE -1 END)
+                * COALESCE(quantity, 0) * entry_price)
+        FROM trading_history
+        WHERE entry_price > 0 AND ts_ms IS NOT NULL
+        GROUP BY ts_ms / 86400000
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trading_stats_insert AFTER INSERT ON trading_history
+        BEGIN {_stats_delta('NEW', 1)} END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trading_stats_update
+        AFTER UPDATE OF pnl, entry_price, quantity, side, ts_ms ON trading_history
+        BEGIN {_stats_delta('OLD', -1)} {_stats_delta('NEW', 1)} END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trading_stats_delete AFTER DELETE ON trading_history
+        BEGIN {_stats_delta('OLD', -1)} END
+    ''')
+
+
+def _v4_trade_stats_by_symbol(conn):
+    for trigger in ('trading_stats_insert', 'trading_stats_update', 'trading_stats_delete'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    conn.execute('DROP TABLE IF EXISTS daily_trade_stats')
+    conn.execute('''
+        CREATE TABLE daily_trade_stats (
+            day INTEGER NOT NULL,                 -- ts_ms // 86400000 (ngày UTC)
+            symbol TEXT NOT NULL DEFAULT '',      -- cặp giao dịch ('' nếu lệnh cũ không có symbol)
+            trades INTEGER NOT NULL DEFAULT 0,
+            closed INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            losses INTEGER NOT NULL DEFAULT 0,
+            sum_win REAL NOT NULL DEFAULT 0,
+            sum_loss REAL NOT NULL DEFAULT 0,
+            realized_pnl REAL NOT NULL DEFAULT 0,
+            open_qty REAL NOT NULL DEFAULT 0,
+            open_cost REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, symbol)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        INSERT INTO daily_trade_stats
+        SELECT
+            ts_ms / 86400000,
+            COALESCE(symbol, ''),
+            COUNT(*),
+            SUM(pnl IS NOT NULL),
+            SUM(COALESCE(pnl, 0) > 0),
+            SUM(COALESCE(pnl, 0) < 0),
+            SUM(MAX(COALESCE(pnl, 0), 0)),
+            SUM(MIN(COALESCE(pnl, 0), 0)),
+            SUM(COALESCE(pnl, 0)),
+            SUM((pnl IS NULL) * (CASE WHEN side = 'BUY' THEN 1 ELSE -1 END) * COALESCE(quantity, 0)),
+            SUM((pnl IS NULL) * (CASE WHEN side = 'BUY' THEN 1 ELSE -1 END)
+                * COALESCE(quantity, 0) * entry_price)
+        FROM trading_history
+        WHERE entry_price > 0 AND ts_ms IS NOT NULL
+        GROUP BY ts_ms / 86400000, COALESCE(symbol, '')
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER trading_stats_insert AFTER INSERT ON trading_history
+        BEGIN {_stats_delta('NEW', 1, by_symbol=True)} END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER trading_stats_update
+        AFTER UPDATE OF pnl, entry_price, quantity, side, ts_ms, symbol ON trading_history
+        BEGIN {_stats_delta('OLD', -1, by_symbol=True)} {_stats_delta('NEW', 1, by_symbol=True)} END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER trading_stats_delete AFTER DELETE ON trading_history
+        BEGIN {_stats_delta('OLD', -1, by_symbol=True)} END
+    ''')
+    # Index phủ thêm symbol: phần ngày lẻ của cửa sổ báo cáo gom theo symbol không cần đọc bảng
+    conn.execute('DROP INDEX IF EXISTS idx_trading_ts')
+    conn.execute('CREATE INDEX idx_trading_ts ON trading_history '
+                 '(ts_ms, entry_price, pnl, quantity, side, symbol)')
+
+
+def _v5_analysis_source(conn):
+    conn.execute('ALTER TABLE analysis_data ADD COLUMN source TEXT')
+
+
+# (phiên bản, mô tả, hàm nâng cấp) - chỉ THÊM vào cuối, không sửa migration đã phát hành
+MIGRATIONS = [
+    (1, 'Bảng gốc', _v1_base_tables),
+    (2, 'Cột ts_ms (epoch ms) + index theo thời gian', _v2_epoch_ms_and_indexes),
+    (3, 'Bảng tổng hợp giao dịch theo ngày', _v3_daily_trade_stats),
+    (4, 'Tổng hợp giao dịch theo ngày và symbol', _v4_trade_stats_by_symbol),
+    (5, 'Nguồn khuyến nghị trong analysis_data', _v5_analysis_source),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn):
+    """Phiên bản schema hiện tại của database"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn, target=None):
+    """
+    Nâng cấp database lên phiên bản `target` (mặc định: mới nhất)
+
+    Mỗi phiên bản chạy trong một transaction: lỗi giữa chừng thì database giữ nguyên.
+
+    Args:
+        conn: sqlite3.Connection
+        target: phiên bản đích
+
+    Returns:
+        list: các phiên bản vừa được áp dụng
+    """
+    target = SCHEMA_VERSION if target is None else target
+    current = get_version(conn)
+    applied = []
+    for version, description, upgrade in MIGRATIONS:
+        if current < version <= target:
+            # BEGIN tường minh: cả lệnh DDL (ALTER/CREATE) cũng nằm trong transaction
+            conn.execute('BEGIN')
+            try:
+                upgrade(conn)
+                conn.execute(f'PRAGMA user_version = {int(version)}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(version)
+            if current > 0:
+                print(f"🔧 Đã nâng cấp database lên phiên bản {version}: {description}")
+    return applied
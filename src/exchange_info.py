@@ -0,0 +1,139 @@
+"""
+Module cache thông tin sàn (exchange info) và filter của từng symbol
+- Tải filter của TẤT CẢ symbol bằng MỘT lần gọi get_exchange_info lúc khởi động
+- Tự làm mới sau một khoảng thời gian (TTL)
+- Phân tích sẵn LOT_SIZE / MIN_NOTIONAL (NOTIONAL) / PRICE_FILTER và số chữ số thập phân
+- Kiểm tra, làm tròn khối lượng và giá ngay tại máy, không cần gọi REST khi đặt lệnh
+"""
+
+import threading
+import time
+from decimal import Decimal
+from math import floor
+
+from . import config
+
+
+def step_precision(step):
+    """Số chữ số thập phân của bước giá/khối lượng ('0.00100000' -> 3)"""
+    exponent = Decimal(str(step)).normalize().as_tuple().exponent
+    return max(0, -exponent)
+
+
+def round_step(value, step, precision=None):
+    """Làm tròn value XUỐNG theo bước step (tránh vượt filter)"""
+    step = float(step)
+    if step <= 0:
+        return float(value)
+    if precision is None:
+        precision = step_precision(step)
+    # Cộng một lượng rất nhỏ để 0.3 / 0.1 = 2.9999999 không bị làm tròn thành 2
+    return float(f"{floor(value / step + 1e-9) * step:.{precision}f}")
+
+
+class SymbolFilters:
+    """Filter đã phân tích sẵn của một symbol"""
+
+    def __init__(self, symbol, filters):
+        """
+        Args:
+            symbol: Mã giao dịch
+            filters: list filter như trong get_symbol_info()['filters']
+        """
+        by_type = {f['filterType']: f for f in filters}
+        lot = by_type.get('LOT_SIZE', {})
+        price = by_type.get('PRICE_FILTER', {})
+        # Binance đã đổi MIN_NOTIONAL thành NOTIONAL trên spot - hỗ trợ cả hai
+        notional = by_type.get('MIN_NOTIONAL') or by_type.get('NOTIONAL') or {}
+
+        self.symbol = symbol
+        self.step_size = float(lot.get('stepSize', '0.00000001'))
+        self.min_qty = float(lot.get('minQty', '0'))
+        self.max_qty = float(lot.get('maxQty', '1e30'))
+        self.qty_precision = step_precision(lot.get('stepSize', '0.00000001'))
+        self.tick_size = float(price.get('tickSize', '0'))
+        self.min_price = float(price.get('minPrice', '0'))
+        self.max_price = float(price.get('maxPrice', '0'))
+        self.price_precision = step_precision(price.get('tickSize', '0.01'))
+        self.min_notional = float(notional.get('minNotional', '0'))
+        self.raw = by_type
+
+    def adjust_quantity(self, quantity, price):
+        """
+        Điều chỉnh quantity theo LOT_SIZE và kiểm tra MIN_NOTIONAL
+
+        Returns:
+            tuple (qty_ok: float, reason: str|None)
+        """
+        adj_qty = round_step(float(quantity), self.step_size, self.qty_precision)
+        if adj_qty < self.min_qty:
+            return 0.0, f"Khối lượng sau điều chỉnh ({adj_qty}) < minQty ({self.min_qty})"
+        if adj_qty > self.max_qty:
+            adj_qty = self.max_qty
+
+        notional = adj_qty * float(price)
+        if notional < self.min_notional:
+            return 0.0, f"Giá trị lệnh ({notional:.2f}) < minNotional ({self.min_notional})"
+        return adj_qty, None
+
+    def round_price(self, price):
+        """Làm tròn giá theo tickSize (dùng cho lệnh LIMIT / stop)"""
+        return round_step(float(price), self.tick_size, self.price_precision)
+
+
+class ExchangeInfoCache:
+    """
+    Cache filter của mọi symbol, làm mới theo TTL
+
+    Ví dụ:
+        cache = ExchangeInfoCache(client)
+        cache.refresh()                       # 1 lần gọi REST lúc khởi động
+        cache.get('BTCUSDT').adjust_quantity(0.0123456, 43000)
+    """
+
+    def __init__(self, client, ttl=None):
+        """
+        Args:
+            client: binance Client
+            ttl: thời gian sống của cache (giây, mặc định config.EXCHANGE_INFO_TTL_SECONDS)
+        """
+        self.client = client
+        self.ttl = config.EXCHANGE_INFO_TTL_SECONDS if ttl is None else ttl
+        self._symbols = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Tải lại exchange info (một lần gọi cho tất cả symbol)"""
+        info = self.client.get_exchange_info()
+        symbols = {
+            s['symbol']: SymbolFilters(s['symbol'], s.get('filters', []))
+            for s in info.get('symbols', [])
+        }
+        with self._lock:
+            self._symbols = symbols
+            self._loaded_at = time.monotonic()
+        return len(symbols)
+
+    def is_stale(self):
+        """True nếu chưa tải hoặc đã quá TTL"""
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def get(self, symbol):
+        """
+        Filter của symbol (tự làm mới nếu cache hết hạn)
+
+        Returns:
+            SymbolFilters hoặc None nếu symbol không tồn tại
+        """
+        if self.is_stale():
+            try:
+                self.refresh()
+            except Exception as e:
+                # Giữ cache cũ nếu không làm mới được (mạng lỗi tạm thời)
+                if not self._symbols:
+                    raise
+                print(f"⚠️ Không làm mới được exchange info, dùng cache cũ: {e}")
+                self._loaded_at = time.monotonic()
+        with self._lock:
+            return self._symbols.get(symbol)
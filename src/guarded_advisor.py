@@ -0,0 +1,217 @@
+"""
+Module bảo vệ chu kỳ giao dịch khỏi ChatGPT chậm / lỗi
+- Mỗi lần gọi có hạn chót (deadline): quá hạn thì không chờ nữa
+- Circuit breaker: lỗi hoặc chậm liên tiếp N lần thì "ngắt" - bỏ qua ChatGPT
+  trong một khoảng thời gian, sau đó thử lại đúng một lần (half-open)
+- Dự phòng cục bộ: khuyến nghị theo quy tắc của strategy_signals.generate_signals
+  (MA / MACD / Fibonacci), tính trong vài mili-giây
+- Khuyến nghị dự phòng có source='fallback' và được ghi vào analysis_data như mọi lần phân tích
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from .strategy_signals import generate_signals
+from . import config
+
+
+class CircuitBreaker:
+    """
+    Cầu dao ba trạng thái: closed (bình thường) -> open (bỏ qua) -> half_open (thử một lần)
+    """
+
+    def __init__(self, failure_threshold=None, reset_seconds=None, clock=None):
+        """
+        Args:
+            failure_threshold: Số lần lỗi/chậm liên tiếp để ngắt (mặc định config.ADVISOR_BREAKER_FAILURES)
+            reset_seconds: Thời gian ngắt trước khi thử lại (mặc định config.ADVISOR_BREAKER_RESET_SECONDS)
+            clock: Hàm thời gian (giây) - để test
+        """
+        self.failure_threshold = failure_threshold or config.ADVISOR_BREAKER_FAILURES
+        self.reset_seconds = config.ADVISOR_BREAKER_RESET_SECONDS if reset_seconds is None else reset_seconds
+        self.clock = clock or time.monotonic
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """True nếu được gọi ChatGPT lúc này"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._probing:
+                self._probing = True  # chỉ một lời gọi thử
+                return True
+            return False
+
+    def release(self):
+        """Trả lại lượt thử half-open mà không đổi trạng thái (lời gọi không nói lên gì về ChatGPT)"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                print("✅ ChatGPT hoạt động lại, đóng circuit breaker")
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+                self._probing = False
+                self.times_opened += 1
+                print(f"🔌 Circuit breaker NGẮT: ChatGPT lỗi/chậm {self.failures} lần, "
+                      f"dùng tín hiệu quy tắc trong {self.reset_seconds:g}s")
+
+
+class GuardedAdvisor:
+    """
+    Bọc ChatGPTAdvisor với deadline + circuit breaker + dự phòng quy tắc
+
+    Ví dụ:
+        guard = GuardedAdvisor(advisor)
+        advice = guard.analyze('BTCUSDT', indicators)   # luôn trả về trong ~deadline
+        advice['source']                                # 'llm' / 'cache' / 'fallback'
+    """
+
+    def __init__(self, advisor, deadline_seconds=None, slow_seconds=None, breaker=None):
+        """
+        Args:
+            advisor: ChatGPTAdvisor
+            deadline_seconds: Hạn chót mỗi lần gọi (mặc định config.ADVISOR_DEADLINE_SECONDS)
+            slow_seconds: Trả lời chậm hơn mức này tính là một lần "lỗi" cho breaker
+                (mặc định config.ADVISOR_SLOW_SECONDS)
+            breaker: CircuitBreaker
+        """
+        self.advisor = advisor
+        self.deadline = config.ADVISOR_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds
+        self.slow_seconds = config.ADVISOR_SLOW_SECONDS if slow_seconds is None else slow_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self.calls = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def _market_args(symbol, indicators):
+        return {
+            'symbol': symbol,
+            'current_price': indicators['current_price'],
+            'ma': indicators['ma'],
+            'rsi': indicators['rsi'],
+            'atr': indicators['atr'],
+        }
+
+    def _cached(self, symbol, indicators):
+        """
+        Khuyến nghị đã cache (None nếu không có): tra trước breaker.allow() để cache
+        không chiếm lượt thử half-open và vẫn dùng được khi breaker đang ngắt
+        """
+        if getattr(self.advisor, 'cache', None) is None:
+            return None
+        key = self.advisor._cache_key(**self._market_args(symbol, indicators))
+        return self.advisor._from_cache(key, record_miss=False)
+
+    def analyze(self, symbol, indicators):
+        """Khuyến nghị cho symbol, không bao giờ chờ quá deadline (đồng bộ)"""
+        cached = self._cached(symbol, indicators)
+        if cached is not None:
+            return cached
+        if not self.breaker.allow():
+            return self.fallback(symbol, indicators, 'circuit breaker đang ngắt')
+        self.calls += 1
+        started = time.perf_counter()
+        try:
+            advice = self.advisor.analyze_market(**self._market_args(symbol, indicators), timeout=self.deadline)
+        except BaseException:
+            self.breaker.release()
+            raise
+        return self._settle(symbol, indicators, advice, time.perf_counter() - started)
+
+    async def analyze_async(self, symbol, indicators, analyze=None):
+        """
+        Như analyze nhưng chạy trên asyncio
+
+        Args:
+            analyze: Coroutine function (mặc định advisor.analyze_market_async)
+        """
+        cached = self._cached(symbol, indicators)
+        if cached is not None:
+            return cached
+        if not self.breaker.allow():
+            return self.fallback(symbol, indicators, 'circuit breaker đang ngắt')
+        analyze = analyze or self.advisor.analyze_market_async
+        self.calls += 1
+        started = time.perf_counter()
+        try:
+            advice = await asyncio.wait_for(analyze(**self._market_args(symbol, indicators)), self.deadline)
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            return self.fallback(symbol, indicators, f"ChatGPT quá hạn {self.deadline:g}s")
+        except BaseException:
+            # Lỗi khác / bị hủy: không kết luận được gì, trả lại lượt thử half-open
+            self.breaker.release()
+            raise
+        return self._settle(symbol, indicators, advice, time.perf_counter() - started)
+
+    def _settle(self, symbol, indicators, advice, elapsed):
+        """Cập nhật breaker theo kết quả; lỗi -> dự phòng"""
+        if advice.get('source') == 'error':
+            self.breaker.record_failure()
+            return self.fallback(symbol, indicators, advice.get('reason') or 'lỗi ChatGPT')
+        if advice.get('source') == 'cache':
+            self.breaker.release()  # không gọi ChatGPT: breaker giữ nguyên trạng thái
+        elif elapsed > self.slow_seconds:
+            print(f"🐢 ChatGPT trả lời chậm: {elapsed:.1f}s")
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return advice
+
+    def fallback(self, symbol, indicators, why):
+        """Khuyến nghị theo quy tắc MA / MACD / Fibonacci trên nến vừa tải"""
+        self.fallbacks += 1
+        candles = indicators.get('raw_data')
+        signals = generate_signals(candles) if candles is not None else {'error': 'no data'}
+        if 'error' in signals:
+            recommendation, details = 'HOLD', {'error': signals['error']}
+        else:
+            recommendation = signals['recommendation']
+            details = {
+                'trend': signals['trend'],
+                'macd_cross': signals['macd']['cross'],
+                'fib_hit': signals['fib_hit'],
+                'entry': signals['entry'],
+                'stop': signals['stop'],
+            }
+        print(f"🛟 {symbol}: dùng tín hiệu quy tắc ({why}) -> {recommendation}")
+        return {
+            'recommendation': recommendation,
+            'reason': f"Dự phòng theo quy tắc MA/MACD/Fibonacci ({why})",
+            'confidence': config.ADVISOR_FALLBACK_CONFIDENCE if recommendation != 'HOLD' else 0,
+            'raw_response': json.dumps(details, ensure_ascii=False, default=float),
+            'source': 'fallback',
+        }
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'fallbacks': self.fallbacks,
+            'breaker_state': self.breaker.state,
+            'breaker_opened': self.breaker.times_opened,
+        }
@@ -6,12 +6,16 @@ Tích hợp vào main.py
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
-import time
 from datetime import datetime
 import traceback
 import os
 import webbrowser
 from . import config
+from .conversation_memory import ConversationMemory
+from .gui_bus import GuiEventBus
+from .scheduler import create_scheduler
+from .log_store import LogStore
+from .log_view import VirtualLogView
 
 
 class TradingBotGUI:
@@ -32,17 +36,30 @@ class TradingBotGUI:
         self.auto_refresh_interval_var = tk.StringVar(value="5")  # phút
         self.cycle_window_var = tk.StringVar(value="All")
         self.log_filter_var = tk.StringVar(value="All")
-        self.log_records = []
+        self.log_store = LogStore(config.GUI_LOG_CAPACITY)
         self.api_status = {
             "binance": tk.StringVar(value="⏳ Kiểm tra Binance..."),
             "openai": tk.StringVar(value="⏳ Kiểm tra OpenAI...")
         }
         self._auto_refresh_job = None
+
+        # Thread nền không chạm vào widget: mọi cập nhật đi qua bus, Tk rút theo lô
+        self.bus = GuiEventBus(root)
+        self.bus.subscribe('log', self._append_logs, batch=True)
+        self.bus.subscribe('cycle', self._show_cycle, coalesce=True)
+        self.bus.subscribe('countdown', self._show_countdown, coalesce=True)
+        self.bus.subscribe('result', self.update_info_from_result, coalesce=True)
+        self.bus.subscribe('report', self.refresh_report, coalesce=True)
+        self.bus.subscribe('stopped', self.stop_bot, coalesce=True)
+        self.bus.subscribe('chart', self._show_chart, coalesce=True)
+        self._chart_thread = None   # thread vẽ equity curve đang chạy
+        self._chart_pending = None  # yêu cầu vẽ đến trong lúc đang vẽ
         
         # Đăng ký callback để bot log vào GUI khi thực thi lệnh
         self.bot.gui_log_callback = self.log
         
         self.setup_gui()
+        self.bus.start()
     
     def setup_gui(self):
         """Thiết lập giao diện"""
@@ -162,6 +179,9 @@ class TradingBotGUI:
         self.last_update_label = tk.Label(status_frame, text="Cập nhật: --", 
                                           bg='#2d2d2d', fg='#aaaaaa')
         self.last_update_label.pack()
+
+        self.countdown_label = tk.Label(status_frame, text="", bg='#2d2d2d', fg='#aaaaaa')
+        self.countdown_label.pack()
     
         # Khởi tạo trạng thái API ban đầu
         self._update_api_status()
@@ -242,17 +262,11 @@ class TradingBotGUI:
         filter_menu.pack(side=tk.LEFT)
         filter_menu.bind("<<ComboboxSelected>>", lambda _ : self._refresh_log_display())
         
-        # Text area for logs
-        self.log_text = scrolledtext.ScrolledText(log_frame, 
-                                                 bg='#1e1e1e', fg='#00ff00',
-                                                 font=('Consolas', 9),
-                                                 wrap=tk.WORD)
-        self.log_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        self.log_text.tag_config('time', foreground='#9CDCFE')
-        self.log_text.tag_config('info', foreground='#E5E5E5')
-        self.log_text.tag_config('success', foreground='#7CFC00')
-        self.log_text.tag_config('warning', foreground='#FFC857')
-        self.log_text.tag_config('error', foreground='#FF6B6B')
+        # Khung log ảo hóa: chỉ vẽ các dòng đang nhìn thấy trong ring buffer
+        self.log_view = VirtualLogView(log_frame, self.log_store, self.auto_scroll_var,
+                                       bg='#1e1e1e', fg='#00ff00',
+                                       font=('Consolas', 9), wrap=tk.NONE)
+        self.log_view.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         # Add initial welcome message
         self.log("🚀 Trading Bot GUI đã khởi động!")
@@ -274,7 +288,7 @@ class TradingBotGUI:
         refresh_frame.pack(fill=tk.X, pady=5)
         
         refresh_btn = tk.Button(refresh_frame, text="🔄 Làm mới báo cáo",
-                               command=self.refresh_report,
+                               command=lambda: self.refresh_report(force=True),
                                bg='#2196F3', fg='white', font=('Arial', 10, 'bold'))
         refresh_btn.pack(side=tk.LEFT, padx=5)
 
@@ -327,16 +341,31 @@ class TradingBotGUI:
         self.refresh_report()
     
     def log(self, message):
-        """Thêm log vào text area"""
+        """Thêm log vào text area (gọi được từ mọi thread, hiển thị ở lượt rút bus kế tiếp)"""
         timestamp = datetime.now().strftime('%H:%M:%S')
-        tag = self._resolve_log_tag(message)
-        self.log_records.append((timestamp, message, tag))
-        self._refresh_log_display()
+        self.bus.post('log', timestamp, message)
+
+    def _append_logs(self, items):
+        """Handler của bus: lưu cả lô log vào ring buffer, khung log chỉ chèn phần mới"""
+        records = []
+        for timestamp, message in items:
+            records.extend(self.log_store.append_message(timestamp, message, self._resolve_log_tag(message)))
+        self.log_view.append(records)
+
+    def _show_cycle(self, cycle):
+        self.cycle_label.config(text=f"Chu kỳ: {cycle}")
+
+    def _show_countdown(self, seconds_left):
+        """Đếm ngược tới chu kỳ kế tiếp (thay cho log mỗi phút khi chờ)"""
+        if seconds_left <= 0:
+            self.countdown_label.config(text="")
+        else:
+            minutes, seconds = divmod(int(seconds_left), 60)
+            self.countdown_label.config(text=f"Chu kỳ kế tiếp sau: {minutes:02d}:{seconds:02d}")
 
     def clear_logs(self):
         """Xóa toàn bộ log khỏi khung hiển thị"""
-        self.log_text.delete('1.0', tk.END)
-        self.log_records.clear()
+        self.log_view.clear()
 
     def _toggle_auto_refresh(self):
         if self.auto_refresh_var.get():
@@ -380,24 +409,8 @@ class TradingBotGUI:
 
     def _refresh_log_display(self):
         """Hiển thị log theo bộ lọc hiện tại"""
-        self.log_text.config(state='normal')
-        self.log_text.delete('1.0', tk.END)
         current_filter = self.log_filter_var.get()
-        for ts, msg, tag in self.log_records:
-            if current_filter != "All":
-                if current_filter == "Info" and tag != 'info':
-                    continue
-                if current_filter == "Warning" and tag != 'warning':
-                    continue
-                if current_filter == "Error" and tag != 'error':
-                    continue
-                if current_filter == "Success" and tag != 'success':
-                    continue
-            self.log_text.insert(tk.END, f"[{ts}] ", ('time',))
-            self.log_text.insert(tk.END, f"{msg}\n", (tag,))
-        if self.auto_scroll_var.get():
-            self.log_text.see(tk.END)
-        self.log_text.config(state='disabled')
+        self.log_view.set_filter(None if current_filter == "All" else current_filter.lower())
     
     def start_bot(self):
         """Bắt đầu bot - THỰC HIỆN GIAO DỊCH THẬT"""
@@ -465,10 +478,10 @@ class TradingBotGUI:
     def run_bot_once(self):
         """Chạy bot một lần"""
         try:
-            result = self.bot.run_once()
+            result = self.bot.run_cycle()
             
             if result:
-                self.update_info_from_result(result)
+                self.bus.post('result', result)
         except Exception as e:
             self.log(f"❌ Lỗi: {e}")
             traceback.print_exc()
@@ -476,71 +489,62 @@ class TradingBotGUI:
     def run_bot_continuous(self):
         """Chạy bot liên tục - THỰC HIỆN GIAO DỊCH THẬT"""
         try:
+            interval_minutes = getattr(self.bot, 'trading_interval', 5)  # Mặc định 5 phút
+            scheduler = create_scheduler(interval_minutes, getattr(self.bot, 'candle_interval', None))
             while self.running:
                 self.cycle_count += 1
-                self.cycle_label.config(text=f"Chu kỳ: {self.cycle_count}")
+                self.bus.post('cycle', self.cycle_count)
                 
                 self.log(f"\n{'='*60}")
                 self.log(f"📊 Chu kỳ #{self.cycle_count} - GIAO DỊCH THẬT")
                 self.log(f"{'='*60}\n")
                 
-                result = self.bot.run_once()
+                result = self.bot.run_cycle()
                 
                 if result:
-                    self.update_info_from_result(result)
+                    self.bus.post('result', result)
                     
-                    # Cập nhật số dư ngay sau khi có lệnh thành công
-                    executed = result.get('executed', False)
-                    if executed:
-                        try:
-                            # Lấy số dư thực tế từ Binance API ngay lập tức
-                            balances = self.bot.executor.get_account_balance()
-                            usdt_balance = balances.get('USDT', 0)
-                            btc_balance = balances.get('BTC', 0)
-                            
-                            # Lấy giá BTC hiện tại
-                            try:
-                                ticker = self.bot.executor.client.get_symbol_ticker(symbol='BTCUSDT')
-                                btc_price = float(ticker['price']) if ticker else 0.0
-                                account_balance = usdt_balance + (btc_balance * btc_price)
-                            except:
-                                account_balance = usdt_balance
-                            
-                            if account_balance > 0:
-                                self.log(f"💰 Số dư hiện tại: ${account_balance:.2f} (USDT: ${usdt_balance:.2f}, BTC: {btc_balance:.6f})")
-                        except Exception as e:
-                            self.log(f"⚠️ Lỗi lấy số dư: {e}")
-                    
-                    # Sinh báo cáo sau mỗi chu kỳ
+                    # Sinh báo cáo sau mỗi chu kỳ: tính MỘT lần (DB + số dư + giá),
+                    # dùng chung cho console, HTML và tab báo cáo
                     try:
-                        summary = self.bot.reporting.generate_summary_report()
+                        snapshot = self.bot.reporting.get_snapshot(days=30, refresh=True)
+                        summary = self.bot.reporting.generate_summary_report(snapshot=snapshot)
+
+                        # Số dư ngay sau khi có lệnh thành công (đã có trong snapshot)
+                        if result.get('executed', False) and summary.get('usdt_balance') is not None:
+                            account_balance = summary.get('account_balance', 0)
+                            if account_balance > 0:
+                                holdings = ''.join(f", {asset}: {amount:.6f}" for asset, amount
+                                                   in (summary.get('asset_balances') or {}).items())
+                                self.log(f"💰 Số dư hiện tại: ${account_balance:.2f} "
+                                         f"(USDT: ${summary['usdt_balance']:.2f}{holdings})")
+
                         if summary:
                             balance = summary.get('account_balance', 0)
                             rec = result.get('recommendation', '')
                             self.equity_history.append((self.cycle_count, balance, rec))
                         self.bot.reporting.plot_equity_curve(equity_points=self.equity_history)
-                        self.bot.reporting.export_html_report()
+                        self.bot.reporting.export_html_report(snapshot=snapshot)
                         self.log(f"📄 Đã cập nhật báo cáo: {config.REPORT_HTML_FILE}, {config.EQUITY_CURVE_FILE}")
-                        # Cập nhật báo cáo trên GUI
-                        self.refresh_report()
+                        # Cập nhật báo cáo trên GUI (Tk main thread vẽ lại)
+                        self.bus.post('report', snapshot)
                     except Exception as e:
                         self.log(f"⚠️ Lỗi tạo báo cáo: {e}")
                 
-                # Đợi 5 phút trước chu kỳ tiếp theo
-                interval_minutes = getattr(self.bot, 'trading_interval', 5)  # Mặc định 5 phút
-                interval_seconds = interval_minutes * 60
-                self.log(f"⏰ Chờ {interval_minutes} phút đến chu kỳ tiếp theo...")
-                for i in range(interval_seconds):
-                    if not self.running:
-                        break
-                    time.sleep(1)
-                    if i % 60 == 0:  # Mỗi phút
-                        self.log(f"⏳ Đang chờ... ({i//60}/{interval_minutes} phút)")
+                # Chờ tới mốc đóng nến kế tiếp (không trôi theo thời gian chạy chu kỳ)
+                self.log(f"⏰ Chờ {scheduler.seconds_until_next():.0f}s đến mốc nến tiếp theo...")
+                tick = scheduler.wait_next(
+                    should_stop=lambda: not self.running,
+                    on_wait=lambda seconds: self.bus.post('countdown', seconds))
+                self.bus.post('countdown', 0)
+                if tick is not None:
+                    self.log(f"⏱️ Nến đóng, thức dậy trễ {tick.drift_ms} ms")
                 
         except Exception as e:
             self.log(f"❌ Lỗi chạy bot: {e}")
             traceback.print_exc()
-            self.stop_bot()
+            self.running = False
+            self.bus.post('stopped')
     
     def update_info_from_result(self, result):
         """Cập nhật thông tin từ kết quả phân tích"""
@@ -580,15 +584,23 @@ class TradingBotGUI:
         except Exception as e:
             messagebox.showerror("Lỗi", f"Không thể mở báo cáo: {e}")
     
-    def refresh_report(self):
-        """Làm mới báo cáo trên GUI"""
+    def refresh_report(self, snapshot=None, force=False):
+        """
+        Làm mới báo cáo trên GUI
+
+        Args:
+            snapshot: ReportSnapshot của chu kỳ vừa chạy (không tính lại)
+            force: True = bỏ snapshot cũ, tính lại (nút "Làm mới")
+        """
         try:
             # Xóa nội dung cũ
             for widget in self.report_frame.winfo_children():
                 widget.destroy()
             
             # Lấy dữ liệu báo cáo
-            report = self.bot.reporting.generate_performance_report(days=30)
+            if snapshot is None:
+                snapshot = self.bot.reporting.get_snapshot(days=30, refresh=force)
+            report = snapshot.report
             
             # Hiển thị báo cáo
             title = tk.Label(self.report_frame, 
@@ -692,49 +704,73 @@ class TradingBotGUI:
             self._append_chat_message("system", "🤖 Xin chào! Hỏi mình bất cứ điều gì về bot và thị trường nhé.")
     
     def update_chart(self):
-        """Cập nhật biểu đồ equity curve"""
+        """
+        Cập nhật biểu đồ equity curve: vẽ PNG ở thread nền (Tk không bị đứng),
+        ảnh được hiển thị khi bus nhận sự kiện 'chart'
+        """
+        cycles_to_show = self.cycle_window_var.get()
+        if cycles_to_show != "All":
+            try:
+                max_points = int(cycles_to_show)
+            except ValueError:
+                max_points = None
+        else:
+            max_points = None
+
+        history = list(self.equity_history)
+        if max_points and len(history) > max_points:
+            history = history[-max_points:]
+
+        if self._chart_thread is not None and self._chart_thread.is_alive():
+            # Đang vẽ: chỉ giữ yêu cầu mới nhất, vẽ tiếp khi lần hiện tại xong
+            self._chart_pending = history
+            return
+        self._start_chart_render(history)
+
+    def _start_chart_render(self, history):
+        self._chart_thread = threading.Thread(target=self._render_chart_worker, args=(history,),
+                                              name='chart-render', daemon=True)
+        self._chart_thread.start()
+
+    def _render_chart_worker(self, history):
+        """Thread nền: vẽ PNG (dữ liệu không đổi thì renderer bỏ qua), báo kết quả qua bus"""
+        try:
+            self.bot.reporting.plot_equity_curve(equity_points=history)
+            self.bus.post('chart', None)
+        except Exception as e:
+            self.bus.post('chart', e)
+
+    def _show_chart(self, error=None):
+        """Handler của bus (thread Tk): hiển thị ảnh biểu đồ vừa vẽ"""
+        if self._chart_pending is not None:
+            history, self._chart_pending = self._chart_pending, None
+            self._start_chart_render(history)
         try:
             # Xóa biểu đồ cũ
             for widget in self.chart_frame.winfo_children():
                 widget.destroy()
             
             chart_file = config.EQUITY_CURVE_FILE
-            try:
-                cycles_to_show = self.cycle_window_var.get()
-                if cycles_to_show != "All":
-                    try:
-                        max_points = int(cycles_to_show)
-                    except ValueError:
-                        max_points = None
-                else:
-                    max_points = None
-
-                history = self.equity_history
-                if max_points and len(history) > max_points:
-                    history = history[-max_points:]
-
-                if not os.path.exists(chart_file) or not history:
-                    self.bot.reporting.plot_equity_curve(equity_points=history)
-                if os.path.exists(chart_file):
-                    self._render_chart_image(chart_file)
-                else:
-                    no_data_label = tk.Label(
-                        self.chart_frame,
-                        text="⚠️ Chưa có dữ liệu để vẽ biểu đồ\nHãy chạy bot ít nhất một chu kỳ",
-                        bg='#2d2d2d',
-                        fg='#ffff00',
-                        font=('Arial', 12)
-                    )
-                    no_data_label.pack(pady=20)
-            except Exception as e:
+            if error is not None:
                 no_data_label = tk.Label(
                     self.chart_frame,
-                    text=f"⚠️ Không thể tạo biểu đồ: {e}",
+                    text=f"⚠️ Không thể tạo biểu đồ: {error}",
                     bg='#2d2d2d',
                     fg='#ff0000',
                     font=('Arial', 12)
                 )
                 no_data_label.pack(pady=20)
+            elif os.path.exists(chart_file):
+                self._render_chart_image(chart_file)
+            else:
+                no_data_label = tk.Label(
+                    self.chart_frame,
+                    text="⚠️ Chưa có dữ liệu để vẽ biểu đồ\nHãy chạy bot ít nhất một chu kỳ",
+                    bg='#2d2d2d',
+                    fg='#ffff00',
+                    font=('Arial', 12)
+                )
+                no_data_label.pack(pady=20)
             self.chart_update_label.config(text=f"Cập nhật: {datetime.now().strftime('%H:%M:%S')}")
         except ImportError:
             # Nếu không có PIL, hiển thị thông báo
@@ -789,14 +825,12 @@ class TradingBotGUI:
         """Khởi tạo lịch sử chat cho ChatGPT"""
         if not self.bot or not getattr(self.bot, 'advisor', None):
             return None
-        return [{
-            "role": "system",
-            "content": (
-                "Bạn là trợ lý giao dịch AI thân thiện, dùng tiếng Việt dễ hiểu cho học sinh cấp 3. "
-                "Giải thích rõ ràng, nhắc người dùng đây là môi trường học tập trên Binance Testnet "
-                "và không đưa lời khuyên đầu tư thực tế."
-            )
-        }]
+        # Lịch sử có ngân sách token: lượt cũ được tóm tắt, prompt mỗi lượt không phình ra
+        return ConversationMemory(
+            "Bạn là trợ lý giao dịch AI thân thiện, dùng tiếng Việt dễ hiểu cho học sinh cấp 3. "
+            "Giải thích rõ ràng, nhắc người dùng đây là môi trường học tập trên Binance Testnet "
+            "và không đưa lời khuyên đầu tư thực tế."
+        )
 
     def _append_chat_message(self, role, message):
         """Hiển thị tin nhắn trên khung chat"""
@@ -828,7 +862,7 @@ class TradingBotGUI:
 
     def send_chat_message(self):
         """Gửi câu hỏi tới ChatGPT"""
-        if not self.chat_history:
+        if self.chat_history is None:
             messagebox.showwarning("Thông báo", "ChatGPT Advisor chưa sẵn sàng.")
             return
 
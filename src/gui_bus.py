@@ -0,0 +1,123 @@
+"""
+Module hàng đợi sự kiện cho GUI (Tkinter KHÔNG an toàn khi gọi từ thread khác)
+- Thread nền chỉ post() sự kiện vào hàng đợi, không chạm vào widget
+- Vòng lặp Tk rút hàng đợi theo lô trên timer (root.after), tối đa N sự kiện mỗi lượt
+- Sự kiện trạng thái (coalesce) chỉ giữ bản mới nhất trong lô
+- Sự kiện dạng lô (batch, vd log) được gộp thành một lần gọi handler
+"""
+
+import queue
+import threading
+
+from . import config
+
+
+class GuiEventBus:
+    """
+    Bus sự kiện thread-safe giữa thread nền và Tk main loop
+
+    Ví dụ:
+        bus = GuiEventBus(root)
+        bus.subscribe('log', append_logs, batch=True)       # handler(list các args)
+        bus.subscribe('cycle', set_cycle, coalesce=True)    # chỉ giá trị cuối
+        bus.start()
+        bus.post('cycle', 5)                                # gọi được từ mọi thread
+    """
+
+    def __init__(self, root, interval_ms=None, max_events=None):
+        """
+        Args:
+            root: Tk root (chỉ cần phương thức after / after_cancel)
+            interval_ms: Chu kỳ rút hàng đợi (mặc định config.GUI_BUS_INTERVAL_MS)
+            max_events: Số sự kiện tối đa xử lý mỗi lượt (mặc định config.GUI_BUS_MAX_EVENTS)
+        """
+        self.root = root
+        self.interval_ms = interval_ms or config.GUI_BUS_INTERVAL_MS
+        self.max_events = max_events or config.GUI_BUS_MAX_EVENTS
+        self._queue = queue.SimpleQueue()
+        self._handlers = {}   # kind -> (handler, mode)
+        self._job = None
+        self._main_thread = threading.get_ident()
+
+    def subscribe(self, kind, handler, coalesce=False, batch=False):
+        """
+        Đăng ký handler cho một loại sự kiện
+
+        Args:
+            kind: Tên loại sự kiện
+            handler: Hàm chạy trên Tk main thread
+            coalesce: Trong một lô chỉ gọi với sự kiện mới nhất
+            batch: Gọi một lần với danh sách args của mọi sự kiện trong lô
+        """
+        mode = 'batch' if batch else 'coalesce' if coalesce else 'each'
+        self._handlers[kind] = (handler, mode)
+
+    def post(self, kind, *args):
+        """Gửi sự kiện (an toàn từ mọi thread, không chặn)"""
+        self._queue.put((kind, args))
+
+    def is_main_thread(self):
+        return threading.get_ident() == self._main_thread
+
+    def start(self):
+        """Bắt đầu rút hàng đợi định kỳ trên Tk main loop"""
+        if self._job is None:
+            self._job = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._job is not None:
+            try:
+                self.root.after_cancel(self._job)
+            except Exception:
+                pass
+            self._job = None
+
+    def _tick(self):
+        self._job = None
+        try:
+            self.drain()
+        finally:
+            self._job = self.root.after(self.interval_ms, self._tick)
+
+    def drain(self):
+        """
+        Xử lý tối đa max_events sự kiện đang chờ (gọi trên Tk main thread)
+
+        Returns:
+            int: số sự kiện đã lấy ra khỏi hàng đợi
+        """
+        events = []
+        for _ in range(self.max_events):
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        # Vị trí sự kiện coalesce cuối cùng, args gộp của sự kiện batch
+        last_index = {}
+        batched = {}
+        for index, (kind, args) in enumerate(events):
+            mode = self._handlers.get(kind, (None, 'each'))[1]
+            if mode == 'coalesce':
+                last_index[kind] = index
+            elif mode == 'batch':
+                batched.setdefault(kind, []).append(args)
+
+        for index, (kind, args) in enumerate(events):
+            handler, mode = self._handlers.get(kind, (None, 'each'))
+            if handler is None:
+                continue
+            try:
+                if mode == 'coalesce':
+                    if last_index[kind] == index:
+                        handler(*args)
+                elif mode == 'batch':
+                    # Gọi ở vị trí sự kiện đầu tiên của loại này trong lô
+                    items = batched.pop(kind, None)
+                    if items is not None:
+                        handler(items)
+                else:
+                    handler(*args)
+            except Exception as e:
+                print(f"⚠️ Lỗi xử lý sự kiện GUI '{kind}': {e}")
+        return len(events)
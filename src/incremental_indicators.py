@@ -0,0 +1,284 @@
+"""
+Module tính chỉ báo kỹ thuật theo kiểu tăng dần (incremental / streaming)
+
+Thay vì tính lại toàn bộ DataFrame mỗi chu kỳ, mỗi chỉ báo giữ một trạng thái
+nhỏ và cập nhật trong thời gian O(1) khi có một nến mới:
+- SMA: tổng trượt (running sum)
+- RSI/ATR: làm mượt kiểu Wilder (RMA) giống pandas_ta
+- EMA/MACD: trạng thái EMA
+- Fibonacci: đỉnh/đáy trượt bằng hàng đợi đơn điệu (monotonic deque)
+
+Giá trị trả về khớp với đường tính theo lô trong TechnicalIndicators.
+"""
+
+from collections import deque
+import math
+
+from . import config
+
+
+NAN = float('nan')
+
+
+class RollingSMA:
+    """Trung bình trượt đơn giản với tổng trượt, O(1) mỗi nến"""
+
+    # Cộng/trừ số thực lặp lại sẽ tích lũy sai số làm tròn,
+    # nên thỉnh thoảng tính lại tổng chính xác từ cửa sổ
+    RESUM_EVERY = 1000
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self._updates = 0
+
+    def update(self, value):
+        self.window.append(value)
+        self.total += value
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        self._updates += 1
+        if self._updates % self.RESUM_EVERY == 0:
+            self.total = math.fsum(self.window)
+        return self.value
+
+    @property
+    def value(self):
+        if len(self.window) < self.period:
+            return NAN
+        return self.total / self.period
+
+
+class EMAState:
+    """EMA không điều chỉnh (pandas ewm(span, adjust=False)), khởi tạo bằng giá trị đầu tiên"""
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = NAN
+
+    def update(self, x):
+        if self.value != self.value:  # chưa có giá trị
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class RMAState:
+    """
+    Làm mượt Wilder như pandas_ta.rma: ewm(alpha=1/length, min_periods=length)
+    (adjust=True) - giữ tử số/mẫu số dạng đệ quy
+    """
+
+    def __init__(self, length):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.mean = NAN
+        self.weight = 0.0
+        self.count = 0
+
+    def update(self, x):
+        if self.count == 0:
+            self.mean = x
+            self.weight = 1.0
+        else:
+            old = self.decay * self.weight
+            self.weight = old + 1.0
+            self.mean = (old * self.mean + x) / self.weight
+        self.count += 1
+        return self.value
+
+    @property
+    def value(self):
+        return self.mean if self.count >= self.length else NAN
+
+
+class RSIState:
+    """RSI theo công thức pandas_ta (RMA của lãi/lỗ)"""
+
+    def __init__(self, period=14):
+        self.gain = RMAState(period)
+        self.loss = RMAState(period)
+        self.prev_close = None
+
+    def update(self, close):
+        if self.prev_close is not None:
+            change = close - self.prev_close
+            self.gain.update(change if change > 0 else 0.0)
+            self.loss.update(-change if change < 0 else 0.0)
+        self.prev_close = close
+        return self.value
+
+    @property
+    def value(self):
+        gain, loss = self.gain.value, self.loss.value
+        if gain != gain or loss != loss or gain + loss == 0:
+            return NAN
+        return 100.0 * gain / (gain + loss)
+
+
+class ATRState:
+    """ATR = RMA của True Range (nến đầu tiên không có True Range)"""
+
+    def __init__(self, period=14):
+        self.rma = RMAState(period)
+        self.prev_close = None
+
+    def update(self, high, low, close):
+        if self.prev_close is not None:
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+            self.rma.update(tr)
+        self.prev_close = close
+        return self.value
+
+    @property
+    def value(self):
+        return self.rma.value
+
+
+class MACDState:
+    """MACD = EMA nhanh - EMA chậm, đường signal = EMA của MACD"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMAState(fast)
+        self.slow = EMAState(slow)
+        self.signal_ema = EMAState(signal)
+        self.macd = NAN
+        self.signal = NAN
+        self.prev_macd = NAN
+        self.prev_signal = NAN
+
+    def update(self, close):
+        self.prev_macd, self.prev_signal = self.macd, self.signal
+        self.macd = self.fast.update(close) - self.slow.update(close)
+        self.signal = self.signal_ema.update(self.macd)
+        return self.macd, self.signal
+
+    @property
+    def hist(self):
+        return self.macd - self.signal
+
+
+class RollingExtremes:
+    """Đỉnh cao nhất / đáy thấp nhất trong `lookback` nến gần nhất (monotonic deque)"""
+
+    def __init__(self, lookback):
+        self.lookback = lookback
+        self._highs = deque()  # (index, high) - high giảm dần
+        self._lows = deque()   # (index, low) - low tăng dần
+        self.count = 0
+
+    def update(self, high, low):
+        i = self.count
+        while self._highs and self._highs[-1][1] <= high:
+            self._highs.pop()
+        self._highs.append((i, high))
+        while self._lows and self._lows[-1][1] >= low:
+            self._lows.pop()
+        self._lows.append((i, low))
+
+        expired = i - self.lookback
+        if self._highs[0][0] <= expired:
+            self._highs.popleft()
+        if self._lows[0][0] <= expired:
+            self._lows.popleft()
+        self.count += 1
+
+    @property
+    def high(self):
+        return self._highs[0][1] if self._highs else None
+
+    @property
+    def low(self):
+        return self._lows[0][1] if self._lows else None
+
+
+class IncrementalIndicators:
+    """
+    Bộ tính chỉ báo tăng dần - cập nhật O(1) cho mỗi nến mới
+
+    Ví dụ:
+        engine = IncrementalIndicators.from_dataframe(df)
+        engine.update(high, low, close)   # khi có nến mới đóng
+        engine.values()                   # dict giống get_all_indicators
+    """
+
+    FIB_RATIOS = [0.0, 0.236, 0.382, 0.5, 0.618, 1.0]
+
+    def __init__(self, ma_period=None, rsi_period=None, atr_period=None,
+                 macd_fast=None, macd_slow=None, macd_signal=None,
+                 fib_lookback=None, ma_long_period=None):
+        """
+        Args:
+            ma_period, rsi_period, atr_period: chu kỳ MA/RSI/ATR (mặc định từ config)
+            macd_fast, macd_slow, macd_signal: tham số MACD (mặc định từ config)
+            fib_lookback: số nến tìm đỉnh/đáy Fibonacci (mặc định config.FIB_LOOKBACK)
+            ma_long_period: chu kỳ MA dài để xác định xu hướng (tùy chọn)
+        """
+        self.ma_period = ma_period or config.MA_PERIOD
+        self.sma = RollingSMA(self.ma_period)
+        self.sma_long = RollingSMA(ma_long_period) if ma_long_period else None
+        self.rsi = RSIState(rsi_period or config.RSI_PERIOD)
+        self.atr = ATRState(atr_period or config.ATR_PERIOD)
+        self.macd = MACDState(macd_fast or config.MACD_FAST,
+                              macd_slow or config.MACD_SLOW,
+                              macd_signal or config.MACD_SIGNAL)
+        self.extremes = RollingExtremes(fib_lookback or config.FIB_LOOKBACK)
+        self.last_close = None
+        self.bars = 0
+
+    @classmethod
+    def from_dataframe(cls, df, **kwargs):
+        """Tạo engine và nạp toàn bộ nến có sẵn (cột high/low/close)"""
+        engine = cls(**kwargs)
+        for high, low, close in zip(df['high'].to_numpy(dtype=float),
+                                    df['low'].to_numpy(dtype=float),
+                                    df['close'].to_numpy(dtype=float)):
+            engine.update(high, low, close)
+        return engine
+
+    def update(self, high, low, close):
+        """Cập nhật tất cả chỉ báo với một nến mới (đã đóng)"""
+        self.sma.update(close)
+        if self.sma_long is not None:
+            self.sma_long.update(close)
+        self.rsi.update(close)
+        self.atr.update(high, low, close)
+        self.macd.update(close)
+        self.extremes.update(high, low)
+        self.last_close = close
+        self.bars += 1
+
+    def fibonacci(self):
+        """Mức Fibonacci hiện tại - cùng định dạng TechnicalIndicators.fibonacci_retracement"""
+        if self.bars < 2:
+            return {'high': None, 'low': None, 'levels': {}}
+        swing_high, swing_low = self.extremes.high, self.extremes.low
+        diff = swing_high - swing_low
+        levels = {r: swing_low + diff * r for r in self.FIB_RATIOS}
+        return {'high': swing_high, 'low': swing_low, 'levels': levels}
+
+    def values(self):
+        """
+        Returns:
+            dict: {
+                'current_price', 'ma', 'rsi', 'atr' (giống get_all_indicators, không có raw_data),
+                'ma_long' (nếu có), 'macd': {'macd', 'signal', 'hist'}, 'fib': {...}
+            }
+        """
+        result = {
+            'current_price': self.last_close,
+            'ma': self.sma.value,
+            'rsi': self.rsi.value,
+            'atr': self.atr.value,
+            'macd': {
+                'macd': self.macd.macd,
+                'signal': self.macd.signal,
+                'hist': self.macd.hist,
+            },
+            'fib': self.fibonacci(),
+        }
+        if self.sma_long is not None:
+            result['ma_long'] = self.sma_long.value
+        return result
@@ -0,0 +1,229 @@
+"""
+Các hàm tính chỉ báo thuần NumPy (kernel) cho đường tính nóng (hot path)
+
+- Làm việc trên mảng float64 liên tục (contiguous), không tạo Series trung gian
+- Kết quả khớp với pandas_ta (RSI/ATR/EMA) và pandas ewm/rolling (SMA/MACD)
+- Không cần import pandas_ta (import rất chậm khi khởi động bot)
+
+Quy ước: NaN chỉ được phép xuất hiện ở ĐẦU chuỗi (vd: kết quả của diff).
+"""
+
+import math
+import numpy as np
+
+
+def as_float_array(values):
+    """Chuyển Series/list/ndarray thành mảng float64 liên tục"""
+    if hasattr(values, 'to_numpy'):
+        values = values.to_numpy(dtype=np.float64)
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _first_valid(x):
+    """Vị trí phần tử hữu hạn đầu tiên (len(x) nếu không có)"""
+    if len(x) and not np.isnan(x[0]):
+        return 0
+    valid = np.flatnonzero(~np.isnan(x))
+    return int(valid[0]) if valid.size else len(x)
+
+
+def _linear_recurrence(u, decay, initial=0.0):
+    """
+    Tính s[t] = decay * s[t-1] + u[t] với s[-1] = initial, hoàn toàn bằng NumPy
+
+    Dùng công thức đóng theo từng khối: trong mỗi khối,
+    s[j] = decay^j * (decay * s_truoc + cumsum(u[i] * decay^-i)).
+    Độ dài khối được chọn để decay^-L không tràn số.
+    """
+    n = len(u)
+    out = np.empty(n, dtype=np.float64)
+    if n == 0:
+        return out
+    if decay == 0.0:
+        out[:] = u
+        return out
+
+    block = max(1, min(n, int(300.0 / -math.log(decay))))
+    powers = decay ** np.arange(block, dtype=np.float64)
+    inv_powers = 1.0 / powers
+
+    carry = float(initial)
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        length = stop - start
+        acc = out[start:stop]  # tính trực tiếp trên vùng nhớ kết quả
+        np.multiply(u[start:stop], inv_powers[:length], out=acc)
+        np.cumsum(acc, out=acc)
+        acc += decay * carry
+        acc *= powers[:length]
+        carry = acc[-1]
+    return out
+
+
+def ewm_mean(values, alpha, adjust=True, min_periods=0):
+    """
+    Trung bình trượt hàm mũ - tương đương pandas Series.ewm(alpha=..., adjust=...).mean()
+
+    Args:
+        values: mảng giá trị (NaN chỉ ở đầu chuỗi)
+        alpha: hệ số làm mượt (0 < alpha <= 1)
+        adjust: True = trọng số chuẩn hóa (pandas mặc định), False = đệ quy thuần
+        min_periods: số quan sát tối thiểu trước khi có giá trị
+    """
+    x = as_float_array(values)
+    n = len(x)
+    out = np.full(n, np.nan)
+    first = _first_valid(x)
+    if first >= n:
+        return out
+
+    decay = 1.0 - alpha
+    data = x[first:]
+    if adjust:
+        # Tổng trọng số (1 - decay^k) / alpha tiến nhanh về 1 / alpha:
+        # chỉ tính lũy thừa cho phần đầu, tránh số dưới chuẩn (denormal) rất chậm
+        numerator = _linear_recurrence(data, decay)
+        denominator = np.full(len(data), 1.0 / alpha)
+        if decay > 0:
+            head = min(len(data), int(40.0 / -math.log(decay)) + 1)
+            k = np.arange(1, head + 1, dtype=np.float64)
+            denominator[:head] = (1.0 - decay ** k) / alpha
+        else:
+            denominator[:] = 1.0
+        out[first:] = numerator / denominator
+    else:
+        out[first] = data[0]
+        out[first + 1:] = _linear_recurrence(alpha * data[1:], decay, initial=data[0])
+
+    if min_periods > 1:
+        out[first:first + min_periods - 1] = np.nan
+    return out
+
+
+def sma(values, period):
+    """Trung bình trượt đơn giản (giống rolling(period).mean())"""
+    x = as_float_array(values)
+    n = len(x)
+    out = np.full(n, np.nan)
+    if period <= 0 or n < period:
+        return out
+    # Trừ đi một giá trị gốc để cumsum không bị mất độ chính xác với giá lớn
+    offset = x[0]
+    csum = np.cumsum(x - offset)
+    out[period - 1] = csum[period - 1] / period
+    out[period:] = (csum[period:] - csum[:-period]) / period
+    out[period - 1:] += offset
+    return out
+
+
+def ema(values, span, adjust=False, sma_seed=False):
+    """
+    EMA theo span (alpha = 2 / (span + 1))
+
+    Args:
+        adjust: giống pandas ewm(adjust=...)
+        sma_seed: True = khởi tạo bằng SMA của `span` giá trị đầu (giống pandas_ta.ema)
+    """
+    x = as_float_array(values)
+    alpha = 2.0 / (span + 1.0)
+    if sma_seed:
+        if len(x) < span:
+            return np.full(len(x), np.nan)
+        seeded = x.copy()
+        seeded[span - 1] = np.nanmean(x[:span])
+        seeded[:span - 1] = np.nan
+        x = seeded
+    return ewm_mean(x, alpha, adjust=adjust)
+
+
+def rma(values, length):
+    """Wilder's moving average giống pandas_ta.rma: ewm(alpha=1/length, min_periods=length)"""
+    return ewm_mean(values, 1.0 / length, adjust=True, min_periods=length)
+
+
+def rsi(close, period=14):
+    """RSI (0-100) theo công thức pandas_ta (không dùng TA-Lib)"""
+    c = as_float_array(close)
+    out = np.full(len(c), np.nan)
+    if len(c) < 2:
+        return out
+    # Nến đầu tiên không có thay đổi giá nên bắt đầu từ phần tử thứ 2
+    change = c[1:] - c[:-1]
+    gain = np.maximum(change, 0.0)
+    loss = np.maximum(-change, 0.0)
+    avg_gain = rma(gain, period)
+    avg_loss = rma(loss, period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        np.divide(100.0 * avg_gain, avg_gain + avg_loss, out=out[1:])
+    return out
+
+
+def true_range(high, low, close):
+    """True Range = max(high-low, |high-prev_close|, |low-prev_close|), phần tử đầu là NaN"""
+    h, l, c = as_float_array(high), as_float_array(low), as_float_array(close)
+    tr = np.empty_like(c)
+    tr[0] = np.nan
+    prev_close = c[:-1]
+    np.maximum(h[1:] - l[1:], np.abs(h[1:] - prev_close), out=tr[1:])
+    np.maximum(tr[1:], np.abs(l[1:] - prev_close), out=tr[1:])
+    return tr
+
+
+def atr(high, low, close, period=14):
+    """ATR = RMA của True Range (giống pandas_ta.atr với mamode='rma')"""
+    tr = true_range(high, low, close)
+    out = np.full(len(tr), np.nan)
+    out[1:] = rma(tr[1:], period)
+    return out
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """
+    MACD với EMA không điều chỉnh (pandas ewm(span, adjust=False))
+
+    Returns:
+        tuple (macd_line, signal_line, hist)
+    """
+    c = as_float_array(close)
+    macd_line = ema(c, fast) - ema(c, slow)
+    signal_line = ema(macd_line, signal)
+    return macd_line, signal_line, macd_line - signal_line
+
+
+def _rolling_extreme(values, window, min_periods, ufunc):
+    """Max/min trượt O(n) bằng thuật toán van Herk/Gil-Werman (prefix + suffix theo khối)"""
+    x = as_float_array(values)
+    n = len(x)
+    out = np.full(n, np.nan)
+    if n == 0 or window <= 0:
+        return out
+    if min_periods is None:
+        min_periods = window
+    window = min(window, n)
+    fill = -np.inf if ufunc is np.maximum else np.inf
+
+    padded_len = -(-n // window) * window
+    padded = np.full(padded_len, fill)
+    padded[:n] = x
+    blocks = padded.reshape(-1, window)
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    # Cửa sổ kết thúc tại i (bắt đầu tại i - window + 1) = ufunc(suffix[start], prefix[i])
+    ufunc(suffix[:n - window + 1], prefix[window - 1:n], out=out[window - 1:])
+    # Các cửa sổ chưa đủ `window` phần tử: lấy cực trị từ đầu chuỗi
+    out[:window - 1] = ufunc.accumulate(x[:window - 1])
+
+    if min_periods > 1:
+        out[:min_periods - 1] = np.nan
+    return out
+
+
+def rolling_max(values, window, min_periods=None):
+    """Giá trị lớn nhất trong `window` phần tử gần nhất (min_periods mặc định = window)"""
+    return _rolling_extreme(values, window, min_periods, np.maximum)
+
+
+def rolling_min(values, window, min_periods=None):
+    """Giá trị nhỏ nhất trong `window` phần tử gần nhất (min_periods mặc định = window)"""
+    return _rolling_extreme(values, window, min_periods, np.minimum)
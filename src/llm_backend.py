@@ -0,0 +1,290 @@
+"""
+Module backend LLM cho ChatGPTAdvisor: chạy được khi không có mạng / API key
+- 'openai': gọi OpenAI thật (mặc định)
+- 'record': gọi OpenAI thật và ghi (hash prompt -> câu trả lời) vào file JSONL
+- 'replay': trả lời từ file đã ghi, không gọi mạng, không có độ trễ - kết quả lặp lại được
+- 'stub': câu trả lời tổng hợp theo quy tắc RSI/MA ngay từ prompt, độ trễ giả lập tùy chỉnh
+Mọi backend có cùng giao diện với client OpenAI (client.chat.completions.create),
+nên advisor, batch_advisor và chat_with_user không cần biết đang dùng backend nào.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+
+from openai import AsyncOpenAI, OpenAI
+
+from . import config
+
+BACKENDS = ('openai', 'record', 'replay', 'stub')
+
+# Tham số request quyết định nội dung câu trả lời (timeout, stream... không tính)
+HASHED_FIELDS = ('model', 'messages', 'temperature', 'max_tokens', 'response_format')
+
+
+def prompt_hash(request):
+    """Hash SHA-256 ổn định của một request chat.completions"""
+    payload = {field: request.get(field) for field in HASHED_FIELDS}
+    text = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _completion(text):
+    """Đối tượng giống ChatCompletion của OpenAI (chỉ các trường advisor dùng)"""
+    message = SimpleNamespace(role='assistant', content=text)
+    return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message, finish_reason='stop')])
+
+
+class _Completions:
+    def __init__(self, backend, is_async, options):
+        self._backend = backend
+        self._is_async = is_async
+        self._options = options
+
+    def create(self, **request):
+        request = dict(self._options, **request)
+        if self._is_async:
+            async def run():
+                return _completion(await self._backend.acomplete(request))
+            return run()
+        return _completion(self._backend.complete(request))
+
+
+class BackendClient:
+    """Client giống OpenAI / AsyncOpenAI bọc quanh một LLMBackend"""
+
+    def __init__(self, backend, is_async=False, options=None):
+        self.backend = backend
+        self.is_async = is_async
+        self.options = options or {}
+        self.chat = SimpleNamespace(completions=_Completions(backend, is_async, self.options))
+
+    def with_options(self, timeout=None, **_):
+        """Như OpenAI.with_options: chỉ giữ timeout (truyền xuống request)"""
+        options = dict(self.options)
+        if timeout is not None:
+            options['timeout'] = timeout
+        return BackendClient(self.backend, self.is_async, options)
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class LLMBackend(ABC):
+    """
+    Giao diện backend: complete(request) -> text câu trả lời
+
+    request là dict tham số của chat.completions.create (model, messages, ...).
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def complete(self, request):
+        """Text câu trả lời cho request (lớp con bắt buộc cài đặt)"""
+
+    async def acomplete(self, request):
+        return self.complete(request)
+
+    def client(self):
+        """Client đồng bộ (như OpenAI)"""
+        return BackendClient(self)
+
+    def async_client(self):
+        """Client async (như AsyncOpenAI) - mỗi lần gọi một client mới"""
+        return BackendClient(self, is_async=True)
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI thật: client() / async_client() là client của thư viện openai"""
+
+    name = 'openai'
+
+    def __init__(self, api_key=None):
+        self.api_key = config.OPENAI_API_KEY if api_key is None else api_key
+        self._client = None
+        self._async = (None, None)  # (event loop, AsyncOpenAI) - client async gắn với loop tạo ra nó
+
+    def client(self):
+        if self._client is None:
+            self._client = OpenAI(api_key=self.api_key)
+        return self._client
+
+    def async_client(self):
+        return AsyncOpenAI(api_key=self.api_key)
+
+    def complete(self, request):
+        response = self.client().chat.completions.create(**request)
+        return response.choices[0].message.content
+
+    async def acomplete(self, request):
+        loop = asyncio.get_running_loop()
+        if self._async[0] is not loop:
+            self._async = (loop, self.async_client())
+        response = await self._async[1].chat.completions.create(**request)
+        return response.choices[0].message.content
+
+
+class RecordingBackend(LLMBackend):
+    """Gọi backend thật và ghi thêm (append) từng cặp hash -> câu trả lời vào file JSONL"""
+
+    name = 'record'
+
+    def __init__(self, path=None, inner=None):
+        self.path = path or config.LLM_RECORD_FILE
+        self.inner = inner or OpenAIBackend()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+    def _save(self, request, text):
+        line = json.dumps({'hash': prompt_hash(request), 'model': request.get('model'),
+                           'response': text}, ensure_ascii=False)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    def complete(self, request):
+        text = self.inner.complete(request)
+        self._save(request, text)
+        return text
+
+    async def acomplete(self, request):
+        text = await self.inner.acomplete(request)
+        self._save(request, text)
+        return text
+
+
+class ReplayBackend(LLMBackend):
+    """
+    Trả lời từ file đã ghi bởi RecordingBackend
+
+    Prompt chưa được ghi -> LookupError (advisor coi như lỗi API), hoặc hỏi
+    backend `missing` nếu có (vd StubBackend).
+    """
+
+    name = 'replay'
+
+    def __init__(self, path=None, missing=None):
+        self.path = path or config.LLM_RECORD_FILE
+        self.missing = missing
+        self.responses = {}
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.responses[entry['hash']] = entry['response']  # lần ghi sau cùng thắng
+
+    def complete(self, request):
+        text = self.responses.get(prompt_hash(request))
+        if text is not None:
+            self.hits += 1
+            return text
+        self.misses += 1
+        if self.missing is not None:
+            return self.missing.complete(request)
+        raise LookupError(f"Prompt chưa được ghi trong {self.path}")
+
+
+# Chỉ báo trong prompt phân tích (TRADING_PROMPT) và prompt gộp (batch_advisor)
+_SINGLE_PATTERNS = {
+    'symbol': r'Symbol:\s*(\S+)',
+    'price': r'Giá hiện tại:\s*\$?([-\d.eE+]+)',
+    'ma': r'Moving Average \(\d+\):\s*([-\d.eE+]+)',
+    'rsi': r'RSI:\s*([-\d.eE+]+)',
+}
+_BATCH_LINE = re.compile(r'^(\S+): giá=([-\d.eE+]+), MA\(\d+\)=([-\d.eE+]+), RSI=([-\d.eE+]+)', re.M)
+
+
+class StubBackend(LLMBackend):
+    """
+    Câu trả lời tổng hợp theo quy tắc, đọc chỉ báo ngay trong prompt
+
+    - RSI < 30 (quá bán) hoặc giá trên MA với RSI < 60 -> BUY
+    - RSI > 70 (quá mua) hoặc giá dưới MA với RSI > 40 -> SELL
+    - còn lại HOLD
+    Cùng prompt luôn cho cùng câu trả lời. latency_ms giả lập độ trễ mạng.
+    """
+
+    name = 'stub'
+
+    def __init__(self, latency_ms=None, sleep=None):
+        self.latency = (config.LLM_STUB_LATENCY_MS if latency_ms is None else latency_ms) / 1000
+        self.sleep = sleep or time.sleep
+        self.calls = 0
+
+    @staticmethod
+    def decide(price, ma, rsi):
+        if rsi < 30 or (price > ma and rsi < 60):
+            recommendation = 'BUY'
+        elif rsi > 70 or (price < ma and rsi > 40):
+            recommendation = 'SELL'
+        else:
+            return {'recommendation': 'HOLD', 'confidence': 50,
+                    'reason': f"Giá sát MA, RSI {rsi:.0f} trung tính."}
+        distance = abs(price - ma) / ma * 100 if ma else 0.0
+        confidence = min(90, 55 + round(abs(rsi - 50) / 2 + distance * 5))
+        side = 'trên' if price >= ma else 'dưới'
+        return {'recommendation': recommendation, 'confidence': confidence,
+                'reason': f"Giá {side} MA {distance:.2f}%, RSI {rsi:.0f}."}
+
+    def answer(self, request):
+        messages = request.get('messages') or []
+        prompt = messages[-1]['content'] if messages else ''
+        batch = _BATCH_LINE.findall(prompt)
+        if batch:
+            return json.dumps({symbol: self.decide(float(price), float(ma), float(rsi))
+                               for symbol, price, ma, rsi in batch}, ensure_ascii=False)
+        values = {}
+        for field, pattern in _SINGLE_PATTERNS.items():
+            match = re.search(pattern, prompt)
+            if match is None:
+                # Không phải prompt phân tích (vd chat_with_user)
+                return "(stub) Chế độ ngoại tuyến: không có ChatGPT thật để trả lời."
+            values[field] = match.group(1)
+        return json.dumps(self.decide(float(values['price']), float(values['ma']), float(values['rsi'])),
+                          ensure_ascii=False)
+
+    def complete(self, request):
+        self.calls += 1
+        if self.latency > 0:
+            self.sleep(self.latency)
+        return self.answer(request)
+
+    async def acomplete(self, request):
+        self.calls += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        return self.answer(request)
+
+
+def create_backend(name=None):
+    """
+    Backend theo tên (mặc định config.LLM_BACKEND)
+
+    Returns:
+        LLMBackend
+    """
+    name = (name or config.LLM_BACKEND).lower()
+    if name == 'openai':
+        return OpenAIBackend()
+    if name == 'record':
+        return RecordingBackend()
+    if name == 'replay':
+        return ReplayBackend()
+    if name == 'stub':
+        return StubBackend()
+    raise ValueError(f"LLM_BACKEND không hợp lệ: {name} (chọn một trong {', '.join(BACKENDS)})")
@@ -0,0 +1,115 @@
+"""
+Module lưu log cho GUI bằng ring buffer
+- Dung lượng cố định: log cũ nhất bị ghi đè, bộ nhớ không tăng theo thời gian chạy
+- Chỉ mục theo mức (info / success / warning / error): lọc tốn O(số dòng khớp),
+  lấy một "cửa sổ" dòng theo vị trí tốn O(kích thước cửa sổ)
+"""
+
+
+class _SeqIndex:
+    """Danh sách số thứ tự (seq) tăng dần, bỏ phần đầu O(1) khấu hao"""
+
+    def __init__(self):
+        self._items = []
+        self._head = 0
+
+    def __len__(self):
+        return len(self._items) - self._head
+
+    def append(self, seq):
+        self._items.append(seq)
+
+    def drop_before(self, first_seq):
+        """Bỏ các seq < first_seq (đã bị ghi đè trong ring buffer)"""
+        items = self._items
+        while self._head < len(items) and items[self._head] < first_seq:
+            self._head += 1
+        # Dọn phần đã bỏ khi nó chiếm quá nửa danh sách
+        if self._head > 1024 and self._head * 2 > len(items):
+            del items[:self._head]
+            self._head = 0
+
+    def slice(self, start, stop):
+        return self._items[self._head + start:self._head + stop]
+
+    def clear(self):
+        self._items = []
+        self._head = 0
+
+
+class LogStore:
+    """
+    Ring buffer các dòng log (timestamp, message, tag)
+
+    Mỗi dòng có một seq tăng dần; dòng seq còn trong bộ nhớ khi
+    first_seq <= seq < next_seq.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._records = [None] * self.capacity
+        self._indexes = {}
+        self.first_seq = 0
+        self.next_seq = 0
+
+    def __len__(self):
+        return self.next_seq - self.first_seq
+
+    def append(self, timestamp, message, tag):
+        """Thêm một dòng, trả về seq của dòng đó"""
+        seq = self.next_seq
+        self._records[seq % self.capacity] = (timestamp, message, tag)
+        self.next_seq += 1
+        if self.next_seq - self.first_seq > self.capacity:
+            self.first_seq = self.next_seq - self.capacity
+            # Dòng vừa bị ghi đè luôn là dòng cũ nhất trong chỉ mục của mức đó
+            for index in self._indexes.values():
+                index.drop_before(self.first_seq)
+        self._indexes.setdefault(tag, _SeqIndex()).append(seq)
+        return seq
+
+    def append_message(self, timestamp, message, tag):
+        """
+        Thêm một log có thể nhiều dòng: mỗi dòng là một bản ghi riêng (dòng tiếp theo
+        có timestamp rỗng), nên một bản ghi = một dòng hiển thị trong VirtualLogView
+
+        Returns:
+            list: các bản ghi (timestamp, message, tag) vừa thêm
+        """
+        lines = str(message).splitlines() or ['']
+        records = [(timestamp if i == 0 else '', line, tag) for i, line in enumerate(lines)]
+        for record in records:
+            self.append(*record)
+        return records
+
+    def get(self, seq):
+        return self._records[seq % self.capacity]
+
+    def count(self, tag=None):
+        """Số dòng còn lưu (tag=None: tất cả)"""
+        if tag is None:
+            return len(self)
+        index = self._indexes.get(tag)
+        return len(index) if index else 0
+
+    def window(self, start, stop, tag=None):
+        """
+        Các dòng ở vị trí [start, stop) trong danh sách đã lọc theo tag
+
+        Returns:
+            list: [(seq, (timestamp, message, tag)), ...]
+        """
+        start = max(0, start)
+        if tag is None:
+            stop = min(stop, len(self))
+            seqs = range(self.first_seq + start, self.first_seq + max(start, stop))
+        else:
+            index = self._indexes.get(tag)
+            seqs = index.slice(start, stop) if index else []
+        return [(seq, self.get(seq)) for seq in seqs]
+
+    def clear(self):
+        self._records = [None] * self.capacity
+        for index in self._indexes.values():
+            index.clear()
+        self.first_seq = self.next_seq
@@ -0,0 +1,161 @@
+"""
+Khung hiển thị log ảo hóa (virtualized) cho Tkinter
+- Text widget chỉ chứa các dòng đang nhìn thấy, thanh cuộn điều khiển vị trí trong LogStore
+- Log mới: chỉ chèn thêm dòng mới ở cuối và bỏ dòng đầu (khi đang bám cuối)
+- Đổi bộ lọc / cuộn: vẽ lại đúng một cửa sổ, không phụ thuộc tổng số dòng
+"""
+
+import tkinter as tk
+from collections import deque
+
+TAG_COLORS = {
+    'time': '#9CDCFE',
+    'info': '#E5E5E5',
+    'success': '#7CFC00',
+    'warning': '#FFC857',
+    'error': '#FF6B6B',
+}
+
+
+class VirtualLogView:
+    """
+    Hiển thị một cửa sổ dòng của LogStore trong Text + Scrollbar
+
+    Args:
+        parent: widget cha
+        store: LogStore
+        follow_var: tk.BooleanVar "Tự cuộn"
+    """
+
+    def __init__(self, parent, store, follow_var, **text_options):
+        self.store = store
+        self.follow_var = follow_var
+        self.tag = None        # None = tất cả
+        self.offset = 0        # vị trí dòng đầu tiên đang hiển thị (trong danh sách đã lọc)
+        self.rows = 50         # số dòng vừa khung, cập nhật khi đổi kích thước
+        self._shown = deque()  # số dòng Text của từng bản ghi đang hiển thị (luôn 1)
+        self._last_total = 0   # tổng số dòng (đã lọc) ở lần vẽ trước
+
+        self.frame = tk.Frame(parent, bg=text_options.get('bg'))
+        self.scrollbar = tk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text = tk.Text(self.frame, state='disabled', **text_options)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        for tag, color in TAG_COLORS.items():
+            self.text.tag_config(tag, foreground=color)
+
+        self.text.bind('<Configure>', self._on_resize)
+        self.text.bind('<MouseWheel>', self._on_wheel)
+        self.text.bind('<Button-4>', lambda _e: self.scroll(-3))
+        self.text.bind('<Button-5>', lambda _e: self.scroll(3))
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    # ==== Vị trí ====
+    def total(self):
+        return self.store.count(self.tag)
+
+    def _bottom_offset(self):
+        return max(0, self.total() - self.rows)
+
+    def at_bottom(self):
+        return self.offset >= self._bottom_offset()
+
+    def _update_scrollbar(self):
+        total = self.total()
+        if total <= self.rows:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.rows) / total))
+
+    # ==== Vẽ ====
+    def _insert(self, record):
+        timestamp, message, tag = record
+        # Mỗi bản ghi là một dòng (LogStore.append_message); dòng tiếp theo của một log thụt lề
+        prefix = f"[{timestamp}] " if timestamp else ' ' * 11
+        self.text.insert(tk.END, prefix, ('time',))
+        self.text.insert(tk.END, f"{message}\n", (tag,))
+        self._shown.append(1)
+
+    def render(self):
+        """Vẽ lại cửa sổ [offset, offset + rows)"""
+        self.offset = min(max(0, self.offset), self._bottom_offset())
+        self.text.config(state='normal')
+        self.text.delete('1.0', tk.END)
+        self._shown.clear()
+        for _seq, record in self.store.window(self.offset, self.offset + self.rows, self.tag):
+            self._insert(record)
+        if self.at_bottom():
+            self.text.see(tk.END)
+        self.text.config(state='disabled')
+        self._last_total = self.total()
+        self._update_scrollbar()
+
+    def append(self, records):
+        """
+        Gọi sau khi vừa thêm `records` vào store
+
+        Đang bám cuối: chèn dòng mới khớp bộ lọc rồi bỏ bớt dòng đầu.
+        Đang xem phía trên: chỉ cập nhật thanh cuộn.
+        """
+        following = self.follow_var.get() and self.offset + len(self._shown) >= self._last_total
+        self._last_total = self.total()
+        if not following:
+            self._update_scrollbar()
+            return
+        records = [record for record in records if self.tag is None or record[2] == self.tag]
+        if len(records) >= self.rows:
+            self.offset = self._bottom_offset()
+            self.render()
+            return
+        self.text.config(state='normal')
+        for record in records:
+            self._insert(record)
+        surplus_lines = 0
+        while len(self._shown) > self.rows:
+            surplus_lines += self._shown.popleft()
+        if surplus_lines:
+            self.text.delete('1.0', f'{surplus_lines + 1}.0')
+        self.text.config(state='disabled')
+        self.offset = self._bottom_offset()
+        self.text.see(tk.END)
+        self._update_scrollbar()
+
+    def set_filter(self, tag):
+        """Đổi bộ lọc (None = tất cả) và nhảy tới cuối"""
+        self.tag = tag
+        self.offset = self._bottom_offset()
+        self.render()
+
+    def clear(self):
+        self.store.clear()
+        self.offset = 0
+        self.render()
+
+    # ==== Cuộn ====
+    def scroll(self, delta_rows):
+        self.offset += delta_rows
+        self.render()
+        return 'break'
+
+    def _on_scrollbar(self, action, *args):
+        if action == 'moveto':
+            self.offset = int(float(args[0]) * self.total())
+        elif action == 'scroll':
+            amount, unit = int(args[0]), args[1]
+            self.offset += amount * (self.rows if unit == 'pages' else 1)
+        self.render()
+
+    def _on_wheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_resize(self, _event):
+        line_height = max(1, int(self.text.tk.call('font', 'metrics', self.text.cget('font'), '-linespace')))
+        rows = max(5, self.text.winfo_height() // line_height)
+        if rows != self.rows:
+            following = self.at_bottom()
+            self.rows = rows
+            if following:
+                self.offset = self._bottom_offset()
+            self.render()
@@ -12,7 +12,6 @@ Luồng hoạt động:
 ⚠️ CHỈ DÙNG BINANCE TESTNET - KHÔNG DÙNG TIỀN THẬT!
 """
 
-import time
 from datetime import datetime
 import traceback
 
@@ -20,10 +19,15 @@ import traceback
 from .data_collector import DataCollector
 from .technical_indicators import TechnicalIndicators
 from .chatgpt_advisor import ChatGPTAdvisor
+from .guarded_advisor import GuardedAdvisor
 from .trade_executor import TradeExecutor
 from .risk_manager import RiskOrderManager
 from .database_logger import DatabaseLogger
 from .reporting_monitoring import ReportingMonitoring
+from .binance_client import get_client
+from .scheduler import create_scheduler
+from .multi_symbol import MultiSymbolRunner
+from .async_pipeline import AsyncTradingPipeline
 from . import config
 
 
@@ -36,50 +40,107 @@ class TradingBot:
         """Khởi tạo tất cả components"""
         print("🚀 Khởi tạo Trading Bot...")
         
-        self.data_collector = DataCollector()
+        # Một Binance client (một connection pool) dùng chung cho mọi module
+        try:
+            self.client = get_client()
+        except Exception as e:
+            print(f"❌ Lỗi kết nối Binance: {e}")
+            self.client = None
+        # Ghi database qua hàng đợi nền: run_once không phải chờ ghi đĩa
+        self.database_logger = DatabaseLogger(client=self.client)
+        self.data_collector = DataCollector(client=self.client)
         self.indicators = TechnicalIndicators()
         self.advisor = ChatGPTAdvisor()
-        self.executor = TradeExecutor()
+        self.advisor_guard = GuardedAdvisor(self.advisor)
+        self.executor = TradeExecutor(client=self.client, db_logger=self.database_logger)
+        
+        # Danh sách symbol: symbol đầu tiên là symbol chính (stream, GUI)
+        self.symbols = list(config.TRADE_SYMBOLS) or [config.TRADE_SYMBOL]
+        self.symbol = self.symbols[0]
         
         # Các module mới
+        # Mỗi symbol một Risk Manager riêng, vốn chia đều giữa các symbol
         account_balance = self._get_account_balance()
-        self.risk_manager = RiskOrderManager(account_balance=account_balance)
-        self.database_logger = DatabaseLogger()
-        self.reporting = ReportingMonitoring()
-        
-        self.symbol = config.TRADE_SYMBOL
+        self.risk_managers = {
+            symbol: RiskOrderManager(account_balance=account_balance / len(self.symbols),
+                                     verbose=symbol == self.symbol)
+            for symbol in self.symbols
+        }
+        self.risk_manager = self.risk_managers[self.symbol]
+        self.reporting = ReportingMonitoring(client=self.client, db_logger=self.database_logger)
+        self.candle_interval = config.TRADING_CANDLE_INTERVAL
+        # Chu kỳ chạy trên asyncio (I/O đồng thời), hoặc nhiều symbol song song trên
+        # thread pool; cả hai dùng chung ngân sách request Binance
+        self.pipeline = AsyncTradingPipeline(self) if config.ASYNC_PIPELINE_ENABLED else None
+        self.runner = (MultiSymbolRunner(self, self.symbols)
+                       if self.pipeline is None and len(self.symbols) > 1 else None)
         self.running = False
         self.gui_log_callback = gui_log_callback  # Callback để log vào GUI
         
+        # Chế độ streaming: dữ liệu đến qua WebSocket, run_once đọc từ bộ nhớ
+        if config.DATA_STREAM_ENABLED:
+            self.data_collector.start_stream(self.symbol, self.candle_interval)
+        
         print("✅ Bot đã sẵn sàng!\n")
     
     def _get_account_balance(self):
         """Lấy số dư tài khoản"""
         try:
-            # Tạo executor tạm để lấy số dư
-            temp_executor = TradeExecutor()
-            balances = temp_executor.get_account_balance()
+            balances = self.executor.get_account_balance()
             return balances.get('USDT', 10000)  # Mặc định 10000 nếu không có
         except:
             return 10000
     
-    def run_once(self):
+    @staticmethod
+    def _base_asset(symbol):
+        """BTCUSDT -> BTC"""
+        return symbol[:-4] if symbol.endswith('USDT') else symbol
+    
+    def run_cycle(self):
+        """
+        Chạy một chu kỳ cho mọi symbol: qua AsyncTradingPipeline nếu bật,
+        MultiSymbolRunner nếu nhiều symbol, còn lại gọi thẳng run_once
+        
+        Returns:
+            dict: Kết quả của symbol chính (hoặc symbol đầu tiên có kết quả), kèm
+                'executed' = có symbol nào đặt lệnh và 'cycle_report' (CycleReport)
+        """
+        if self.pipeline is not None:
+            report = self.pipeline.run_cycle(self.symbols)
+        elif self.runner is not None:
+            report = self.runner.run_cycle()
+        else:
+            return self.run_once()
+        results = [report.results.get(self.symbol)] + list(report.results.values())
+        primary = next((result for result in results if result), None)
+        if primary is None:
+            return None
+        result = dict(primary)
+        result['executed'] = bool(report.executed)
+        result['cycle_report'] = report
+        return result
+    
+    def run_once(self, symbol=None):
         """
         Chạy một chu kỳ phân tích + giao dịch
         
+        Args:
+            symbol: Mã giao dịch (mặc định symbol chính)
+        
         Returns:
             dict: Kết quả phân tích
         """
+        symbol = symbol or self.symbol
         print("=" * 60)
-        print(f"📊 Chu kỳ phân tích - {datetime.now().strftime('%H:%M:%S')}")
+        print(f"📊 Chu kỳ phân tích {symbol} - {datetime.now().strftime('%H:%M:%S')}")
         print("=" * 60)
         
         try:
             # Bước 1: Thu thập dữ liệu
             print("\n1️⃣ Thu thập dữ liệu từ Binance...")
             data = self.data_collector.get_realtime_data(
-                symbol=self.symbol,
-                interval='15m'  # Dùng khung 15 phút
+                symbol=symbol,
+                interval=self.candle_interval  # Mặc định khung 15 phút
             )
             
             if data['candles'].empty:
@@ -108,91 +169,106 @@ class TradingBot:
             
             # Bước 3: ChatGPT phân tích
             print("\n3️⃣ ChatGPT đang phân tích...")
-            advice = self.advisor.analyze_market(
-                symbol=self.symbol,
-                current_price=indicators['current_price'],
-                ma=indicators['ma'],
-                rsi=indicators['rsi'],
-                atr=indicators['atr']
-            )
+            # (có deadline + circuit breaker; ChatGPT chậm / lỗi -> tín hiệu quy tắc)
+            advice = self.advisor_guard.analyze(symbol, indicators)
             
             print(f"\n🤖 KHUYẾN NGHỊ: {advice['recommendation']}")
             print(f"💬 Lý do: {advice['reason']}")
             
             # Lưu dữ liệu phân tích vào database
-            self.database_logger.save_analysis_data(indicators, advice, symbol=self.symbol)
+            self.database_logger.save_analysis_data(indicators, advice, symbol=symbol)
             
-            # Bước 4: Risk Manager kiểm tra điều kiện
-            print("\n4️⃣ Risk Manager đang kiểm tra điều kiện...")
-            
-            can_execute, reason = self.risk_manager.check_risk_conditions(indicators, advice)
-            
-            if not can_execute:
-                print(f"⏸️ KHÔNG giao dịch: {reason}")
-                if self.gui_log_callback:
-                    self.gui_log_callback(f"⏸️ KHÔNG giao dịch: {reason}")
-                should_execute = False
-            else:
-                print(f"✅ Điều kiện OK: {reason}")
-                if self.gui_log_callback:
-                    self.gui_log_callback(f"✅ Điều kiện OK: {reason}")
-                should_execute = True
-            
-            # Bước 5: Thực thi lệnh nếu đủ điều kiện
-            if should_execute and advice['recommendation'] in ['BUY', 'SELL']:
-                print("\n5️⃣ Thực thi lệnh GIAO DỊCH THẬT...")
-                print("   ⚠️ Lưu ý: Đây là giao dịch thật trên Binance Testnet")
-                if self.gui_log_callback:
-                    self.gui_log_callback(f"🔄 Đang thực thi lệnh {advice['recommendation']}...")
-                self._execute_trade(advice['recommendation'], indicators, advice)
-            else:
-                if not should_execute:
-                    print(f"\n⏸️ Tạm thời GIỮ vị thế - Không giao dịch")
-                    print(f"   Lý do: {reason if 'reason' in locals() else 'Điều kiện chưa đạt'}")
-                    if self.gui_log_callback:
-                        self.gui_log_callback(f"⏸️ Tạm thời GIỮ vị thế - Không giao dịch: {reason if 'reason' in locals() else 'Điều kiện chưa đạt'}")
-                elif advice['recommendation'] == 'HOLD':
-                    print("\n⏸️ AI khuyến nghị HOLD - Không giao dịch")
-                    if self.gui_log_callback:
-                        self.gui_log_callback("⏸️ AI khuyến nghị HOLD - Không giao dịch")
-                        self.gui_log_callback(f"⏸️ Tạm thời GIỮ vị thế - Không giao dịch: {reason if 'reason' in locals() else 'Điều kiện chưa đạt'}")
-                elif advice['recommendation'] == 'HOLD':
-                    print("\n⏸️ AI khuyến nghị HOLD - Không giao dịch")
-                    if self.gui_log_callback:
-                        self.gui_log_callback("⏸️ AI khuyến nghị HOLD - Không giao dịch")
-            
-            # Lưu kết quả
-            result = {
-                'timestamp': datetime.now(),
-                'price': indicators['current_price'],
-                'ma': indicators['ma'],
-                'rsi': indicators['rsi'],
-                'atr': indicators['atr'],
-                'recommendation': advice['recommendation'],
-                'reason': advice['reason'],
-                'executed': should_execute
-            }
-            
-            self._log_result(result)
-            
-            return result
+            # Bước 4 + 5: Risk Manager kiểm tra, thực thi lệnh, lưu kết quả
+            return self._decide_and_execute(symbol, indicators, advice)
             
         except Exception as e:
             print(f"❌ Lỗi trong chu kỳ phân tích: {e}")
             traceback.print_exc()
             return None
     
-    def _execute_trade(self, recommendation, indicators, advice):
+    def _decide_and_execute(self, symbol, indicators, advice, order_indicators=None):
+        """
+        Bước 4 + 5 của một chu kỳ: Risk Manager (trạng thái riêng của symbol)
+        kiểm tra điều kiện, đặt lệnh nếu đạt, ghi log kết quả
+
+        Args:
+            order_indicators: Chỉ báo dùng để đặt lệnh nếu khác `indicators`
+                (vd giá ticker mới hơn giá đóng nến)
+
+        Returns:
+            dict: Kết quả chu kỳ
+        """
+        # Bước 4: Risk Manager kiểm tra điều kiện
+        print("\n4️⃣ Risk Manager đang kiểm tra điều kiện...")
+        
+        # Trạng thái rủi ro riêng của symbol
+        risk_manager = self.risk_managers.get(symbol, self.risk_manager)
+        can_execute, reason = risk_manager.check_risk_conditions(indicators, advice)
+        
+        if not can_execute:
+            print(f"⏸️ KHÔNG giao dịch: {reason}")
+            if self.gui_log_callback:
+                self.gui_log_callback(f"⏸️ KHÔNG giao dịch: {reason}")
+            should_execute = False
+        else:
+            print(f"✅ Điều kiện OK: {reason}")
+            if self.gui_log_callback:
+                self.gui_log_callback(f"✅ Điều kiện OK: {reason}")
+            should_execute = True
+        
+        # Bước 5: Thực thi lệnh nếu đủ điều kiện
+        if should_execute and advice['recommendation'] in ['BUY', 'SELL']:
+            print("\n5️⃣ Thực thi lệnh GIAO DỊCH THẬT...")
+            print("   ⚠️ Lưu ý: Đây là giao dịch thật trên Binance Testnet")
+            if self.gui_log_callback:
+                self.gui_log_callback(f"🔄 Đang thực thi lệnh {advice['recommendation']}...")
+            self._execute_trade(advice['recommendation'], order_indicators or indicators, advice, symbol=symbol)
+        else:
+            if not should_execute:
+                print(f"\n⏸️ Tạm thời GIỮ vị thế - Không giao dịch")
+                print(f"   Lý do: {reason if 'reason' in locals() else 'Điều kiện chưa đạt'}")
+                if self.gui_log_callback:
+                    self.gui_log_callback(f"⏸️ Tạm thời GIỮ vị thế - Không giao dịch: {reason if 'reason' in locals() else 'Điều kiện chưa đạt'}")
+            elif advice['recommendation'] == 'HOLD':
+                print("\n⏸️ AI khuyến nghị HOLD - Không giao dịch")
+                if self.gui_log_callback:
+                    self.gui_log_callback("⏸️ AI khuyến nghị HOLD - Không giao dịch")
+                    self.gui_log_callback(f"⏸️ Tạm thời GIỮ vị thế - Không giao dịch: {reason if 'reason' in locals() else 'Điều kiện chưa đạt'}")
+            elif advice['recommendation'] == 'HOLD':
+                print("\n⏸️ AI khuyến nghị HOLD - Không giao dịch")
+                if self.gui_log_callback:
+                    self.gui_log_callback("⏸️ AI khuyến nghị HOLD - Không giao dịch")
+        
+        # Lưu kết quả
+        result = {
+            'timestamp': datetime.now(),
+            'symbol': symbol,
+            'price': indicators['current_price'],
+            'ma': indicators['ma'],
+            'rsi': indicators['rsi'],
+            'atr': indicators['atr'],
+            'recommendation': advice['recommendation'],
+            'reason': advice['reason'],
+            'executed': should_execute
+        }
+        
+        self._log_result(result)
+        
+        return result
+    
+    def _execute_trade(self, recommendation, indicators, advice, symbol=None):
         """
-        Thực thi lệnh giao dịch với Risk Manager
+        Thực thi lệnh giao dịch với Risk Manager của symbol
         """
+        symbol = symbol or self.symbol
+        base_asset = self._base_asset(symbol)
         try:
             # Lấy giá hiện tại
             current_price = indicators['current_price']
             current_atr = indicators['atr']
             
             # Risk Manager tính toán vị thế
-            position_info = self.risk_manager.calculate_position_size(
+            position_info = self.risk_managers.get(symbol, self.risk_manager).calculate_position_size(
                 entry_price=current_price,
                 signal=recommendation,
                 current_atr=current_atr
@@ -206,7 +282,7 @@ class TradingBot:
             
             # Đặt lệnh và lưu vào database
             if recommendation == 'BUY':
-                order = self.executor.place_market_buy(self.symbol, quantity)
+                order = self.executor.place_market_buy(symbol, quantity, price=current_price)
                 if order:
                     self.database_logger.save_trading_record(order, position_info)
                     # Log vào GUI nếu có callback
@@ -214,9 +290,9 @@ class TradingBot:
                         executed_qty = float(order.get('executedQty', 0))
                         cummulative_quote = float(order.get('cummulativeQuoteQty', 0))
                         avg_price = cummulative_quote / executed_qty if executed_qty > 0 else current_price
-                        self.gui_log_callback(f"✅ Lệnh MUA thành công! Order ID: {order.get('orderId')}, Số lượng: {executed_qty:.6f} BTC, Giá: ${avg_price:.2f}")
+                        self.gui_log_callback(f"✅ Lệnh MUA thành công! Order ID: {order.get('orderId')}, Số lượng: {executed_qty:.6f} {base_asset}, Giá: ${avg_price:.2f}")
             elif recommendation == 'SELL':
-                order = self.executor.place_market_sell(self.symbol, quantity)
+                order = self.executor.place_market_sell(symbol, quantity, price=current_price)
                 if order:
                     self.database_logger.save_trading_record(order, position_info)
                     # Log vào GUI nếu có callback
@@ -224,7 +300,7 @@ class TradingBot:
                         executed_qty = float(order.get('executedQty', 0))
                         cummulative_quote = float(order.get('cummulativeQuoteQty', 0))
                         avg_price = cummulative_quote / executed_qty if executed_qty > 0 else current_price
-                        self.gui_log_callback(f"✅ Lệnh BÁN thành công! Order ID: {order.get('orderId')}, Số lượng: {executed_qty:.6f} BTC, Giá: ${avg_price:.2f}")
+                        self.gui_log_callback(f"✅ Lệnh BÁN thành công! Order ID: {order.get('orderId')}, Số lượng: {executed_qty:.6f} {base_asset}, Giá: ${avg_price:.2f}")
             
         except Exception as e:
             print(f"   ❌ Lỗi thực thi: {e}")
@@ -234,6 +310,7 @@ class TradingBot:
         try:
             with open(config.LOG_FILE, 'a', encoding='utf-8') as f:
                 f.write(f"\n{result['timestamp']} | "
+                       f"{result.get('symbol', self.symbol)} | "
                        f"Price: ${result['price']:.2f} | "
                        f"RSI: {result['rsi']:.2f} | "
                        f"Advice: {result['recommendation']} | "
@@ -250,21 +327,39 @@ class TradingBot:
         """
         if interval_minutes is None:
             interval_minutes = config.TRADING_INTERVAL_MINUTES
+        scheduler = create_scheduler(interval_minutes, self.candle_interval)
         
         self.running = True
-        print(f"\n🔄 Bắt đầu chạy bot - Chu kỳ: {interval_minutes} phút")
+        print(f"\n🔄 Bắt đầu chạy bot - Chu kỳ: {scheduler.period_ms / 60_000:g} phút (theo mốc đóng nến)")
         print("   Nhấn Ctrl+C để dừng\n")
         
         try:
+            self.run_cycle()
             while self.running:
-                self.run_once()
-                
-                print(f"\n⏰ Chờ {interval_minutes} phút đến chu kỳ tiếp theo...")
-                time.sleep(interval_minutes * 60)
+                print(f"\n⏰ Chờ {scheduler.seconds_until_next():.0f}s đến mốc nến tiếp theo...")
+                tick = scheduler.wait_next(should_stop=lambda: not self.running)
+                if tick is None:
+                    break
+                print(f"⏱️ Nến đóng lúc {datetime.fromtimestamp(tick.close_ms / 1000).strftime('%H:%M:%S')}, "
+                      f"trễ {tick.drift_ms} ms")
+                self.run_cycle()
                 
         except KeyboardInterrupt:
             print("\n\n⚠️ Bot dừng bởi người dùng")
             self.running = False
+        finally:
+            self.shutdown()
+    
+    def shutdown(self):
+        """Dừng stream và ghi nốt dữ liệu còn trong hàng đợi database"""
+        self.data_collector.stop_stream()
+        if self.runner is not None:
+            self.runner.close()
+        if self.pipeline is not None:
+            self.pipeline.close()
+        self.database_logger.close()
+        self.reporting.close()
+        print("✅ Đã lưu toàn bộ dữ liệu, bot tắt an toàn")
 
 
 def main():
@@ -288,6 +383,7 @@ def main():
         root = tk.Tk()
         TradingBotGUI(root, bot)
         root.mainloop()
+        bot.shutdown()
     except Exception as e:
         print("❌ Không khởi chạy được GUI (tkinter/gui_app). Chạy chế độ CLI liên tục thay thế.")
         print(f"Lý do: {e}")
@@ -0,0 +1,273 @@
+"""
+Module nhận dữ liệu thị trường qua WebSocket (Binance Streams)
+- Đăng ký stream kline và bookTicker cho một symbol
+- Giữ bộ đệm nến (rolling buffer) và giá mới nhất trong bộ nhớ
+- Cho phép đọc dữ liệu real-time mà KHÔNG cần gọi REST API
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from websockets.asyncio.client import connect
+
+from .candle_store import klines_to_dataframe
+from . import config
+
+
+class MarketStream:
+    """
+    Stream kline + bookTicker chạy trên một thread nền
+
+    Luồng hoạt động:
+    1. seed(): nạp sẵn nến lịch sử (từ REST hoặc kho nến cục bộ)
+    2. start(): mở kết nối WebSocket, tự kết nối lại khi bị ngắt
+    3. Mỗi message cập nhật bộ đệm nến / giá mới nhất
+    4. get_candles() / get_price(): đọc từ bộ nhớ, không gọi mạng
+    """
+
+    def __init__(self, symbol, interval, buffer_size=None, url=None,
+                 reconnect_delay=None, on_candle_closed=None, backfill=None,
+                 stale_seconds=None, clock=None):
+        """
+        Args:
+            symbol: Mã giao dịch (vd: BTCUSDT)
+            interval: Khung thời gian nến (vd: 15m)
+            buffer_size: Số nến tối đa giữ trong bộ nhớ
+            url: Địa chỉ WebSocket gốc (mặc định config.BINANCE_WS_URL)
+            reconnect_delay: Số giây chờ trước khi kết nối lại
+            on_candle_closed: callback(symbol, interval, kline) khi một nến đóng
+            backfill: callback(symbol, interval, since_open_time) -> nến (DataFrame / list kline)
+                bị lỡ khi mất kết nối; gọi mỗi lần kết nối lại, trước khi đọc message mới
+            stale_seconds: Quá số giây này không có message thì coi dữ liệu là cũ
+                (mặc định config.STREAM_STALE_SECONDS)
+            clock: Hàm thời gian (giây, monotonic) - để test
+        """
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.url = url or config.BINANCE_WS_URL
+        self.reconnect_delay = (config.STREAM_RECONNECT_SECONDS
+                                if reconnect_delay is None else reconnect_delay)
+        self.on_candle_closed = on_candle_closed
+        self.backfill = backfill
+        self.stale_seconds = config.STREAM_STALE_SECONDS if stale_seconds is None else stale_seconds
+        self.clock = clock or time.monotonic
+
+        self._candles = deque(maxlen=buffer_size or config.STREAM_BUFFER_SIZE)
+        self._lock = threading.Lock()
+        self.last_price = None
+        self.best_bid = None
+        self.best_ask = None
+        self.last_update = None
+        self._last_update_at = None  # clock() của message gần nhất
+        self.messages_received = 0
+        self.backfilled = 0
+
+        self._thread = None
+        self._loop = None
+        self._stop_event = None
+        self._stopping = threading.Event()
+        self._connected = threading.Event()
+
+    @property
+    def stream_url(self):
+        """URL combined stream: <symbol>@kline_<interval>/<symbol>@bookTicker"""
+        name = self.symbol.lower()
+        return (f"{self.url.rstrip('/')}/stream?streams="
+                f"{name}@kline_{self.interval}/{name}@bookTicker")
+
+    # ==== BỘ ĐỆM NẾN ====
+    def seed(self, candles):
+        """
+        Nạp nến lịch sử vào bộ đệm
+
+        Args:
+            candles: DataFrame (định dạng DataCollector.get_candles) hoặc list kline
+        """
+        if hasattr(candles, 'itertuples'):
+            rows = [
+                [int(r.open_time), float(r.open), float(r.high), float(r.low), float(r.close),
+                 float(r.volume), int(r.close_time), float(r.quote_volume), int(r.trades),
+                 float(r.taker_buy_base), float(r.taker_buy_quote), 0]
+                for r in candles.itertuples(index=False)
+            ]
+        else:
+            rows = [list(k) for k in candles]
+
+        with self._lock:
+            for kline in rows:
+                self._apply_kline(kline)
+            if self._candles and self.last_price is None:
+                self.last_price = float(self._candles[-1][4])
+
+    def _apply_kline(self, kline):
+        """Thêm nến mới hoặc cập nhật nến đang hình thành (cùng open_time)"""
+        if self._candles:
+            last_open = self._candles[-1][0]
+            if kline[0] == last_open:
+                self._candles[-1] = kline
+                return
+            if kline[0] < last_open:
+                return  # nến cũ đến muộn - bỏ qua
+        self._candles.append(kline)
+
+    def get_candles(self, limit=None):
+        """Trả về DataFrame các nến trong bộ đệm (không gọi mạng)"""
+        with self._lock:
+            rows = list(self._candles)
+        if limit is not None:
+            rows = rows[-limit:]
+        return klines_to_dataframe(rows)
+
+    def get_price(self):
+        """Giá mới nhất nhận được (kline close hoặc giữa bid/ask)"""
+        return self.last_price
+
+    def is_connected(self):
+        return self._connected.is_set()
+
+    def age(self):
+        """Số giây từ message gần nhất (None nếu chưa nhận message nào)"""
+        if self._last_update_at is None:
+            return None
+        return self.clock() - self._last_update_at
+
+    def is_ready(self):
+        """
+        True khi dữ liệu trong bộ nhớ dùng được: đang kết nối, đã có giá và nến,
+        và message gần nhất chưa quá stale_seconds (mất kết nối -> dùng REST)
+        """
+        age = self.age()
+        return (self._connected.is_set() and self.last_price is not None and len(self._candles) > 0
+                and age is not None and age <= self.stale_seconds)
+
+    # ==== XỬ LÝ MESSAGE ====
+    def handle_message(self, raw):
+        """
+        Xử lý một message từ Binance (combined stream hoặc raw stream)
+
+        Args:
+            raw: chuỗi JSON hoặc dict đã parse
+        """
+        msg = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+        data = msg.get('data', msg)
+        self.messages_received += 1
+
+        if data.get('e') == 'kline':
+            k = data['k']
+            kline = [int(k['t']), float(k['o']), float(k['h']), float(k['l']), float(k['c']),
+                     float(k['v']), int(k['T']), float(k.get('q', 0)), int(k.get('n', 0)),
+                     float(k.get('V', 0)), float(k.get('Q', 0)), 0]
+            with self._lock:
+                self._apply_kline(kline)
+                self.last_price = kline[4]
+                self.last_update = datetime.now()
+                self._last_update_at = self.clock()
+            if k.get('x') and self.on_candle_closed:
+                try:
+                    self.on_candle_closed(self.symbol, self.interval, kline)
+                except Exception as e:
+                    print(f"⚠️ Lỗi xử lý nến đóng: {e}")
+        elif 'b' in data and 'a' in data:
+            # bookTicker: giá mua/bán tốt nhất
+            with self._lock:
+                self.best_bid = float(data['b'])
+                self.best_ask = float(data['a'])
+                self.last_price = (self.best_bid + self.best_ask) / 2
+                self.last_update = datetime.now()
+                self._last_update_at = self.clock()
+
+    def _backfill_gap(self):
+        """Nạp các nến bị lỡ khi mất kết nối (từ nến cuối trong bộ đệm tới hiện tại)"""
+        with self._lock:
+            since = self._candles[-1][0] if self._candles else None
+        if self.backfill is None or since is None:
+            return
+        try:
+            candles = self.backfill(self.symbol, self.interval, since)
+        except Exception as e:
+            print(f"⚠️ Không bù được nến bị lỡ: {e}")
+            return
+        if candles is not None and len(candles):
+            before = len(self._candles)
+            self.seed(candles)
+            self.backfilled += len(candles)
+            print(f"🔁 Đã bù {len(candles)} nến {self.symbol} {self.interval} "
+                  f"sau khi kết nối lại (bộ đệm {before} -> {len(self._candles)})")
+
+    # ==== VÒNG LẶP WEBSOCKET ====
+    async def _run(self):
+        while not (self._stopping.is_set() or self._stop_event.is_set()):
+            try:
+                async with connect(self.stream_url) as ws:
+                    # Bù nến bị lỡ (từ lúc nạp sẵn / mất kết nối) trước khi đọc message mới:
+                    # bộ đệm không bị hổng
+                    await asyncio.to_thread(self._backfill_gap)
+                    self._connected.set()
+                    print(f"✅ Đã kết nối stream {self.symbol} {self.interval}")
+                    stop_task = asyncio.ensure_future(self._stop_event.wait())
+                    try:
+                        while True:
+                            recv_task = asyncio.ensure_future(ws.recv())
+                            done, _ = await asyncio.wait(
+                                {recv_task, stop_task},
+                                return_when=asyncio.FIRST_COMPLETED
+                            )
+                            if stop_task in done:
+                                recv_task.cancel()
+                                break
+                            try:
+                                self.handle_message(recv_task.result())
+                            except (ValueError, KeyError, TypeError) as e:
+                                print(f"⚠️ Bỏ qua message stream lỗi: {e}")
+                    finally:
+                        stop_task.cancel()
+            except Exception as e:
+                self._connected.clear()
+                if self._stop_event.is_set():
+                    break
+                print(f"⚠️ Mất kết nối stream ({e}), thử lại sau {self.reconnect_delay}s...")
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), self.reconnect_delay)
+                except asyncio.TimeoutError:
+                    pass
+        self._connected.clear()
+
+    def _thread_main(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._stop_event = asyncio.Event()
+        self._loop = loop
+        try:
+            loop.run_until_complete(self._run())
+        finally:
+            loop.close()
+
+    def start(self):
+        """Bắt đầu stream trên thread nền"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._thread_main,
+                                        name=f"MarketStream-{self.symbol}", daemon=True)
+        self._thread.start()
+
+    def wait_connected(self, timeout=None):
+        """Chờ tới khi WebSocket kết nối thành công"""
+        return self._connected.wait(timeout)
+
+    def stop(self, timeout=5):
+        """Dừng stream và chờ thread kết thúc"""
+        self._stopping.set()
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:
+                pass  # loop vừa đóng
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
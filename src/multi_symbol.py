@@ -0,0 +1,109 @@
+"""
+Module chạy nhiều symbol song song trong một chu kỳ
+- Mỗi symbol chạy bot.run_once(symbol) trên một thread của pool giới hạn
+  (thời gian chủ yếu là chờ mạng: Binance, ChatGPT) - không tạo thread mới mỗi chu kỳ
+- Mọi request Binance trừ weight từ cùng một RateLimiter (xem binance_client),
+  nên tăng số thread không làm vượt giới hạn của sàn
+- Chu kỳ có hạn chót (latency SLO): symbol chưa xong bị báo trễ, chu kỳ sau
+  không chạy chồng symbol đó cho tới khi lần trước kết thúc
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from . import config
+
+
+@dataclass
+class CycleReport:
+    """Kết quả một chu kỳ nhiều symbol"""
+    results: dict                                # symbol -> dict kết quả run_once (None nếu lỗi / không có dữ liệu)
+    late: list = field(default_factory=list)     # chưa xong khi hết SLO (vẫn chạy nền)
+    busy: list = field(default_factory=list)     # bỏ qua vì lần chạy trước chưa xong
+    failed: list = field(default_factory=list)   # lỗi (exception / pipeline không ra kết quả)
+    duration: float = 0.0                        # giây
+
+    @property
+    def slo_breached(self):
+        return bool(self.late)
+
+    @property
+    def executed(self):
+        return [symbol for symbol, result in self.results.items() if result and result.get('executed')]
+
+
+class MultiSymbolRunner:
+    """
+    Chạy run_once cho danh sách symbol trên thread pool dùng chung
+
+    Ví dụ:
+        runner = MultiSymbolRunner(bot, ['BTCUSDT', 'ETHUSDT'])
+        report = runner.run_cycle()
+        print(report.results['ETHUSDT'])
+    """
+
+    def __init__(self, bot, symbols, max_workers=None, slo_seconds=None):
+        """
+        Args:
+            bot: Đối tượng có run_once(symbol=...) (TradingBot)
+            symbols: Danh sách symbol
+            max_workers: Số thread tối đa (mặc định config.MULTI_SYMBOL_WORKERS)
+            slo_seconds: Hạn chót mỗi chu kỳ (mặc định config.CYCLE_LATENCY_SLO_SECONDS)
+        """
+        self.bot = bot
+        self.symbols = list(dict.fromkeys(symbols))
+        self.max_workers = max(1, min(max_workers or config.MULTI_SYMBOL_WORKERS, len(self.symbols)))
+        self.slo_seconds = config.CYCLE_LATENCY_SLO_SECONDS if slo_seconds is None else slo_seconds
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='symbol')
+        self._running = {}  # symbol -> Future của lần chạy chưa kết thúc
+        self.last_report = None
+
+    def run_cycle(self):
+        """
+        Chạy một chu kỳ cho mọi symbol, chờ tối đa slo_seconds
+
+        Returns:
+            CycleReport
+        """
+        started = time.monotonic()
+        report = CycleReport(results={})
+        futures = {}
+        for symbol in self.symbols:
+            previous = self._running.get(symbol)
+            if previous is not None and not previous.done():
+                report.busy.append(symbol)
+                continue
+            future = self._executor.submit(self.bot.run_once, symbol=symbol)
+            self._running[symbol] = future
+            futures[future] = symbol
+
+        timeout = self.slo_seconds if self.slo_seconds and self.slo_seconds > 0 else None
+        done, pending = wait(futures, timeout=timeout)
+        for future in done:
+            symbol = futures[future]
+            error = future.exception()
+            if error is not None:
+                print(f"❌ {symbol}: {error}")
+                report.failed.append(symbol)
+                report.results[symbol] = None
+            else:
+                report.results[symbol] = future.result()
+        report.late = sorted(futures[future] for future in pending)
+        report.busy.sort()
+        report.failed.sort()
+        report.duration = time.monotonic() - started
+
+        if report.late:
+            print(f"⚠️ Chu kỳ vượt SLO {self.slo_seconds:g}s: {len(report.late)} symbol chưa xong "
+                  f"({', '.join(report.late)})")
+        if report.busy:
+            print(f"⚠️ Bỏ qua {len(report.busy)} symbol vì chu kỳ trước chưa xong: {', '.join(report.busy)}")
+        print(f"🧮 Chu kỳ {len(self.symbols)} symbol: {report.duration:.1f}s, "
+              f"đặt lệnh {len(report.executed)}, lỗi {len(report.failed)}")
+        self.last_report = report
+        return report
+
+    def close(self, wait_running=True):
+        """Dừng pool (mặc định chờ các symbol đang chạy dở)"""
+        self._executor.shutdown(wait=wait_running, cancel_futures=True)
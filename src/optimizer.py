@@ -0,0 +1,293 @@
+"""
+Module Tối ưu tham số chiến lược (parameter sweep / walk-forward)
+- Tìm kiếm lưới (grid) hoặc ngẫu nhiên (random) trên các tham số:
+  ma_period, macd_fast/slow/signal, fib_lookback, stop_loss_percent, fib_tolerance
+- Chạy song song bằng ProcessPoolExecutor, mảng nến được chia sẻ cho các tiến trình
+  con qua shared memory (không pickle lại dữ liệu cho từng cấu hình)
+- Xếp hạng theo bậc Sharpe, rồi max drawdown và profit factor
+- Walk-forward: tối ưu trên cửa sổ train, kiểm tra cấu hình tốt nhất trên cửa sổ test kế tiếp
+
+Mỗi cấu hình là một bài toán độc lập, chỉ dùng CPU nên tốc độ tăng gần tuyến tính theo số nhân.
+"""
+
+import argparse
+import itertools
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .backtester import Backtester
+from . import config
+
+
+# Cột nến được chia sẻ cho tiến trình con
+SHARED_COLUMNS = ['open_time', 'open', 'high', 'low', 'close']
+
+# Tham số truyền cho IncrementalIndicators / generate_signals_vectorized
+INDICATOR_KEYS = ('ma_period', 'rsi_period', 'atr_period', 'macd_fast', 'macd_slow',
+                  'macd_signal', 'fib_lookback')
+
+DEFAULT_GRID = {
+    'ma_period': [10, 15, 20, 30],
+    'macd_fast': [8, 12],
+    'macd_slow': [21, 26],
+    'macd_signal': [9],
+    'fib_lookback': [50, 100, 200],
+    'fib_tolerance': [0.003, 0.005, 0.01],
+    'stop_loss_percent': [1.0, 2.0, 3.0],
+}
+
+# Biến toàn cục trong tiến trình con (gắn vào shared memory một lần khi khởi tạo)
+_worker_shm = None
+_worker_data = None
+
+
+def grid_search(param_grid):
+    """Tất cả tổ hợp tham số của lưới: {'a': [1, 2], 'b': [3]} -> [{'a': 1, 'b': 3}, ...]"""
+    keys = list(param_grid)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(param_grid[k] for k in keys))]
+
+
+def random_search(param_space, n_samples, seed=None):
+    """
+    Lấy ngẫu nhiên n_samples cấu hình (không trùng) từ không gian tham số
+
+    Args:
+        param_space: dict tham số -> list giá trị hoặc tuple (min, max) cho số thực
+    """
+    rng = random.Random(seed)
+    seen = set()
+    samples = []
+    attempts = 0
+    while len(samples) < n_samples and attempts < n_samples * 20:
+        attempts += 1
+        params = {}
+        for key, values in param_space.items():
+            if isinstance(values, tuple):
+                params[key] = round(rng.uniform(*values), 4)
+            else:
+                params[key] = rng.choice(values)
+        signature = tuple(sorted(params.items()))
+        if signature not in seen:
+            seen.add(signature)
+            samples.append(params)
+    return samples
+
+
+def is_valid(params):
+    """MACD nhanh phải nhỏ hơn MACD chậm"""
+    fast = params.get('macd_fast', config.MACD_FAST)
+    slow = params.get('macd_slow', config.MACD_SLOW)
+    return fast < slow
+
+
+def rank_results(results, min_trades=1, sharpe_bucket=None):
+    """
+    Xếp hạng kết quả: Sharpe được làm tròn theo bậc sharpe_bucket (vd 1.40 và 1.55
+    cùng bậc 1.5 khi bước 0.25); cùng bậc thì drawdown thấp trước, rồi profit factor cao,
+    cuối cùng Sharpe gốc. Sharpe chênh nhau vài phần trăm không đủ để bỏ qua drawdown gấp đôi.
+
+    Args:
+        results: list dict {'params': {...}, 'sharpe', 'max_drawdown', 'profit_factor', ...}
+        min_trades: bỏ qua cấu hình có quá ít lệnh (Sharpe không có ý nghĩa)
+        sharpe_bucket: bước làm tròn Sharpe (mặc định config.OPTIMIZER_SHARPE_BUCKET, 0 = không làm tròn)
+    """
+    bucket = config.OPTIMIZER_SHARPE_BUCKET if sharpe_bucket is None else sharpe_bucket
+    eligible = [r for r in results if r.get('total_trades', 0) >= min_trades]
+
+    def score(r):
+        level = round(r['sharpe'] / bucket) if bucket else r['sharpe']
+        return (-level, r['max_drawdown'], -r['profit_factor'], -r['sharpe'])
+
+    return sorted(eligible, key=score)
+
+
+def _share_candles(candles):
+    """Copy các cột nến vào một khối shared memory (float64, shape = (cột, số nến))"""
+    data = np.vstack([candles[col].to_numpy(dtype=np.float64) for col in SHARED_COLUMNS])
+    shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    view = np.ndarray(data.shape, dtype=np.float64, buffer=shm.buf)
+    view[:] = data
+    return shm, data.shape
+
+
+def _init_worker(shm_name, shape):
+    """Khởi tạo tiến trình con: gắn vào shared memory, không copy dữ liệu"""
+    global _worker_shm, _worker_data
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_data = np.ndarray(shape, dtype=np.float64, buffer=_worker_shm.buf)
+
+
+def _candles_slice(data, start, stop):
+    frame = pd.DataFrame({col: data[i, start:stop] for i, col in enumerate(SHARED_COLUMNS)})
+    frame['open_time'] = frame['open_time'].astype(np.int64)
+    return frame
+
+
+def evaluate(candles, params, backtest_kwargs=None):
+    """
+    Backtest một cấu hình trên DataFrame nến
+
+    Returns:
+        dict: summary của Backtester + 'params'
+    """
+    indicator_params = {k: v for k, v in params.items() if k in INDICATOR_KEYS}
+    backtester = Backtester(
+        indicator_params=indicator_params,
+        fib_tolerance=params.get('fib_tolerance', 0.005),
+        stop_loss_percent=params.get('stop_loss_percent'),
+        vectorized=True,
+        **(backtest_kwargs or {})
+    )
+    summary = backtester.run(candles)['summary']
+    summary['params'] = dict(params)
+    return summary
+
+
+def _evaluate_task(task):
+    """Chạy trong tiến trình con: (params, start, stop, backtest_kwargs)"""
+    params, start, stop, backtest_kwargs = task
+    return evaluate(_candles_slice(_worker_data, start, stop), params, backtest_kwargs)
+
+
+class StrategyOptimizer:
+    """
+    Tối ưu tham số chiến lược song song
+
+    Ví dụ:
+        with StrategyOptimizer(candles, workers=8) as opt:
+            ranked = opt.search(grid_search(DEFAULT_GRID))
+            folds = opt.walk_forward(grid_search(DEFAULT_GRID), train_bars=20000, test_bars=5000)
+    """
+
+    def __init__(self, candles, workers=None, backtest_kwargs=None, min_trades=5):
+        """
+        Args:
+            candles: DataFrame nến (open_time, open, high, low, close)
+            workers: số tiến trình (mặc định config.OPTIMIZER_WORKERS)
+            backtest_kwargs: tham số thêm cho Backtester (fee_rate, slippage_bps...)
+            min_trades: số lệnh tối thiểu để một cấu hình được xếp hạng
+        """
+        self.n_bars = len(candles)
+        self.workers = workers or config.OPTIMIZER_WORKERS
+        self.backtest_kwargs = dict(backtest_kwargs or {})
+        self.min_trades = min_trades
+        self._shm, shape = _share_candles(candles)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self._shm.name, shape),
+        )
+
+    def _run(self, configs, start, stop):
+        tasks = [(params, start, stop, self.backtest_kwargs) for params in configs if is_valid(params)]
+        chunksize = max(1, len(tasks) // (self.workers * 4))
+        return list(self._executor.map(_evaluate_task, tasks, chunksize=chunksize))
+
+    def search(self, configs, start=0, stop=None):
+        """
+        Backtest tất cả cấu hình trên nến [start, stop) và trả về danh sách đã xếp hạng
+        """
+        stop = self.n_bars if stop is None else stop
+        started = time.perf_counter()
+        results = self._run(configs, start, stop)
+        print(f"✅ Đã thử {len(results)} cấu hình trên {stop - start} nến "
+              f"({time.perf_counter() - started:.1f}s, {self.workers} tiến trình)")
+        return rank_results(results, self.min_trades)
+
+    def walk_forward(self, configs, train_bars, test_bars, step_bars=None):
+        """
+        Walk-forward: với mỗi cửa sổ, chọn cấu hình tốt nhất trên đoạn train
+        rồi đánh giá nó trên đoạn test ngay sau đó (dữ liệu chưa thấy)
+
+        Returns:
+            list dict mỗi fold: {'train': (start, stop), 'test': (start, stop),
+                                 'params', 'train_summary', 'test_summary'}
+        """
+        step_bars = step_bars or test_bars
+        folds = []
+        start = 0
+        while start + train_bars + test_bars <= self.n_bars:
+            train = (start, start + train_bars)
+            test = (train[1], train[1] + test_bars)
+            ranked = self.search(configs, *train)
+            if ranked:
+                best = ranked[0]
+                test_summary = self._run([best['params']], *test)[0]
+                folds.append({
+                    'train': train, 'test': test, 'params': best['params'],
+                    'train_summary': best, 'test_summary': test_summary,
+                })
+                print(f"📊 Fold {len(folds)}: {best['params']} | Sharpe train "
+                      f"{best['sharpe']} → test {test_summary['sharpe']}")
+            start += step_bars
+        return folds
+
+    def close(self):
+        """Dừng các tiến trình con và giải phóng shared memory"""
+        self._executor.shutdown()
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def results_to_dataframe(results):
+    """Bảng kết quả: mỗi tham số một cột + các chỉ số"""
+    rows = [{**r['params'], **{k: v for k, v in r.items() if k != 'params'}} for r in results]
+    return pd.DataFrame(rows)
+
+
+def main():
+    """Tối ưu tham số trên nến đã lưu trong CandleStore"""
+    from .candle_store import CandleStore
+
+    parser = argparse.ArgumentParser(description="Tối ưu tham số chiến lược")
+    parser.add_argument('--symbol', default=config.TRADE_SYMBOL)
+    parser.add_argument('--interval', default='1m')
+    parser.add_argument('--days', type=float, default=90)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--random', type=int, default=0, help="Số cấu hình ngẫu nhiên (0 = tìm kiếm lưới)")
+    parser.add_argument('--walk-forward', type=int, nargs=2, metavar=('TRAIN', 'TEST'),
+                        help="Số nến train và test cho walk-forward")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--output', default=None, help="Lưu bảng xếp hạng ra file CSV")
+    args = parser.parse_args()
+
+    start = int((datetime.now() - timedelta(days=args.days)).timestamp() * 1000)
+    candles = CandleStore().load(args.symbol, args.interval, start_time=start)
+    if candles.empty:
+        print("⚠️ Chưa có nến trong kho. Hãy tải dữ liệu trước.")
+        return
+
+    if args.random:
+        space = dict(DEFAULT_GRID, stop_loss_percent=(0.5, 5.0), fib_tolerance=(0.002, 0.015))
+        configs = random_search(space, args.random)
+    else:
+        configs = grid_search(DEFAULT_GRID)
+
+    with StrategyOptimizer(candles, workers=args.workers) as optimizer:
+        if args.walk_forward:
+            folds = optimizer.walk_forward(configs, *args.walk_forward)
+            ranked = [fold['test_summary'] for fold in folds]
+        else:
+            ranked = optimizer.search(configs)
+
+    table = results_to_dataframe(ranked)
+    print(table.head(args.top).to_string())
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"✅ Đã lưu kết quả vào {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Module thống kê hiệu suất cộng dồn (running aggregates)
+- Bảng daily_trade_stats (migration 3) được trigger SQLite cập nhật O(1)
+  mỗi khi một giao dịch được ghi / đóng (UPDATE pnl) / xóa
+- Báo cáo N ngày = cộng các dòng tổng hợp của ngày đầy đủ + quét index
+  phần ngày lẻ ở đầu cửa sổ -> chi phí không phụ thuộc độ dài lịch sử
+- Tổng hợp tách theo symbol (migration 4): lệnh mở của mỗi cặp được định giá
+  bằng giá của chính cặp đó
+"""
+
+from dataclasses import dataclass, fields
+
+from .db_migrations import DAY_MS
+
+
+@dataclass
+class TradeStats:
+    """Tổng hợp giao dịch trong một khoảng thời gian (chỉ giao dịch entry_price > 0)"""
+    trades: int = 0
+    closed: int = 0
+    wins: int = 0
+    losses: int = 0
+    sum_win: float = 0.0
+    sum_loss: float = 0.0
+    realized_pnl: float = 0.0
+    open_qty: float = 0.0    # khối lượng ròng lệnh chưa đóng (BUY +, SELL -)
+    open_cost: float = 0.0   # giá trị vào lệnh ròng tương ứng
+
+    def __add__(self, other):
+        return TradeStats(*(getattr(self, f.name) + getattr(other, f.name) for f in fields(self)))
+
+    @property
+    def open_trades(self):
+        return self.trades - self.closed
+
+    @property
+    def avg_win(self):
+        return self.sum_win / self.wins if self.wins else 0.0
+
+    @property
+    def avg_loss(self):
+        return self.sum_loss / self.losses if self.losses else 0.0
+
+    @property
+    def win_rate(self):
+        return self.wins / self.closed * 100 if self.closed else 0.0
+
+    @property
+    def profit_factor(self):
+        """Giữ cách tính cũ của báo cáo: |avg_win / avg_loss|"""
+        return abs(self.avg_win / self.avg_loss) if self.avg_loss else 0.0
+
+    def unrealized_pnl(self, current_price):
+        """
+        Lãi/lỗ chưa chốt của các lệnh mở tại giá current_price
+
+        Σ (giá - entry) * qty (BUY) + Σ (entry - giá) * qty (SELL)
+        = giá * open_qty - open_cost
+        """
+        if not current_price or current_price <= 0:
+            return 0.0
+        return current_price * self.open_qty - self.open_cost
+
+
+_COLUMNS = ', '.join(f.name for f in fields(TradeStats))
+
+# Cùng công thức với trigger trong db_migrations, tính trực tiếp trên trading_history
+_AGGREGATES = '''
+    COUNT(*),
+    COALESCE(SUM(pnl IS NOT NULL), 0),
+    COALESCE(SUM(pnl > 0), 0),
+    COALESCE(SUM(pnl < 0), 0),
+    COALESCE(SUM(MAX(COALESCE(pnl, 0), 0)), 0),
+    COALESCE(SUM(MIN(COALESCE(pnl, 0), 0)), 0),
+    COALESCE(SUM(pnl), 0),
+    COALESCE(SUM((pnl IS NULL) * (CASE WHEN side = 'BUY' THEN 1 ELSE -1 END)
+                 * COALESCE(quantity, 0)), 0),
+    COALESCE(SUM((pnl IS NULL) * (CASE WHEN side = 'BUY' THEN 1 ELSE -1 END)
+                 * COALESCE(quantity, 0) * entry_price), 0)
+'''
+
+
+def _merge(into, rows):
+    """Cộng các dòng (symbol, *cột TradeStats) vào dict symbol -> TradeStats"""
+    for symbol, *values in rows:
+        into[symbol] = into.get(symbol, TradeStats()) + TradeStats(*values)
+    return into
+
+
+def _day_rollups(conn, first_day):
+    """Cộng các dòng tổng hợp từ ngày first_day trở đi, theo symbol"""
+    sums = ', '.join(f'SUM({f.name})' for f in fields(TradeStats))
+    rows = conn.execute(f'SELECT symbol, {sums} FROM daily_trade_stats '
+                        f'WHERE day >= ? GROUP BY symbol', (first_day,))
+    return _merge({}, rows)
+
+
+def window_stats(conn, since_ms=None, by_symbol=False):
+    """
+    Thống kê giao dịch có ts_ms >= since_ms (None = toàn bộ lịch sử)
+
+    Ngày chứa since_ms chỉ tính một phần nên được quét trực tiếp qua index
+    idx_trading_ts (tối đa một ngày dữ liệu); các ngày sau lấy từ daily_trade_stats.
+
+    Args:
+        conn: sqlite3.Connection (database đã migrate)
+        since_ms: mốc bắt đầu (epoch ms)
+        by_symbol: True = trả về dict symbol -> TradeStats
+
+    Returns:
+        TradeStats (tổng mọi symbol) hoặc dict
+    """
+    if since_ms is None:
+        per_symbol = _day_rollups(conn, first_day=-(2 ** 62))
+    else:
+        boundary_day = int(since_ms) // DAY_MS
+        next_day_ms = (boundary_day + 1) * DAY_MS
+        per_symbol = _day_rollups(conn, boundary_day + 1)
+        partial = conn.execute(
+            f'SELECT COALESCE(symbol, \'\'), {_AGGREGATES} FROM trading_history '
+            f'WHERE ts_ms >= ? AND ts_ms < ? AND entry_price > 0 '
+            f'GROUP BY COALESCE(symbol, \'\')',
+            (int(since_ms), next_day_ms))
+        _merge(per_symbol, partial)
+    if by_symbol:
+        return per_symbol
+    return sum(per_symbol.values(), TradeStats())
+
+
+def rebuild(conn):
+    """Tính lại daily_trade_stats từ đầu (dùng khi nghi ngờ tổng hợp bị lệch)"""
+    conn.execute('DELETE FROM daily_trade_stats')
+    conn.execute(f'''
+        INSERT INTO daily_trade_stats (day, symbol, {_COLUMNS})
+        SELECT ts_ms / {DAY_MS}, COALESCE(symbol, ''), {_AGGREGATES}
+        FROM trading_history
+        WHERE entry_price > 0 AND ts_ms IS NOT NULL
+        GROUP BY ts_ms / {DAY_MS}, COALESCE(symbol, '')
+    ''')
+    conn.commit()
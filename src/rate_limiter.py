@@ -0,0 +1,91 @@
+"""
+Module giới hạn tần suất gọi API (token bucket) dùng chung cho mọi thread
+- Binance tính "weight" cho từng request và khóa IP khi vượt giới hạn mỗi phút
+- Mọi request REST đi qua session chung đều trừ weight từ cùng một ngân sách,
+  khi hết thì chờ đến lúc được nạp lại thay vì bị sàn trả lỗi 429/418
+"""
+
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket an toàn đa luồng
+
+    Args:
+        capacity: Số token tối đa (cho phép dồn cục ngắn hạn)
+        refill_per_second: Tốc độ nạp lại token mỗi giây
+    """
+
+    def __init__(self, capacity, refill_per_second, clock=None):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.clock = clock or time.monotonic
+        self._tokens = self.capacity
+        self._updated = self.clock()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0  # tổng thời gian đã phải chờ (để theo dõi)
+
+    @classmethod
+    def per_minute(cls, weight_per_minute):
+        """Ngân sách kiểu Binance: weight_per_minute weight mỗi phút"""
+        return cls(capacity=weight_per_minute, refill_per_second=weight_per_minute / 60)
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def try_acquire(self, weight=1):
+        """Lấy token nếu đủ ngay, không chờ"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= weight:
+                self._tokens -= weight
+                return True
+            return False
+
+    def acquire(self, weight=1, timeout=None):
+        """
+        Chờ tới khi đủ `weight` token rồi trừ
+
+        Returns:
+            bool: False nếu quá timeout (giây) mà chưa đủ token
+        """
+        weight = min(float(weight), self.capacity)
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= weight:
+                    self._tokens -= weight
+                    return True
+                wait = (weight - self._tokens) / self.refill_per_second
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            self.waited_seconds += wait
+            time.sleep(wait)
+
+    async def acquire_async(self, weight=1):
+        """Như acquire nhưng chờ bằng asyncio.sleep (không chặn event loop)"""
+        weight = min(float(weight), self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= weight:
+                    self._tokens -= weight
+                    return True
+                wait = (weight - self._tokens) / self.refill_per_second
+            self.waited_seconds += wait
+            await asyncio.sleep(wait)
+
+    @property
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
@@ -7,13 +7,32 @@ Module Reporting & Monitoring
 """
 
 import sqlite3
-import matplotlib.pyplot as plt
+import threading
+import time
 import pandas as pd
+from dataclasses import dataclass
 from datetime import datetime
 import os
+from .binance_client import get_client, get_free_balances
+from .chart_renderer import EquityChartRenderer
+from .db_migrations import migrate, to_ms, days_ago_ms
+from .performance_stats import TradeStats, window_stats
 from . import config
 
 
+@dataclass
+class ReportSnapshot:
+    """Báo cáo hiệu suất tính một lần, dùng chung cho console / HTML / GUI"""
+    days: int
+    report: dict
+    created_at: float  # time.monotonic()
+
+    @property
+    def age(self):
+        """Số giây kể từ lúc tính"""
+        return time.monotonic() - self.created_at
+
+
 class ReportingMonitoring:
     """
     Class tạo báo cáo và giám sát
@@ -25,16 +44,101 @@ class ReportingMonitoring:
     4. Xuất báo cáo ra file
     """
     
-    def __init__(self, db_file=None):
+    def __init__(self, db_file=None, client=None, db_logger=None):
         """
         Khởi tạo Reporting & Monitoring
         
         Args:
             db_file: Đường dẫn file database (mặc định từ config)
+            client: Binance client dùng chung (mặc định binance_client.get_client())
+            db_logger: DatabaseLogger - ghi nốt hàng đợi trước khi tính báo cáo và
+                hủy snapshot mỗi khi có lệnh mới được ghi
         """
         self.db_file = db_file or config.DATABASE_FILE
+        self.client = client
+        self.db_logger = db_logger
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+        self.chart_renderer = EquityChartRenderer()
+        if db_logger is not None:
+            db_logger.add_trade_listener(self.invalidate_snapshot)
+        self._ensure_schema()
         print("✅ Reporting & Monitoring đã sẵn sàng")
+
+    def _ensure_schema(self):
+        """Đảm bảo database đã ở phiên bản mới nhất (cột ts_ms + index)"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            migrate(conn)
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Lỗi nâng cấp database: {e}")
     
+    def close(self):
+        """Tắt process vẽ biểu đồ"""
+        self.chart_renderer.close()
+
+    def _get_client(self):
+        """Client dùng chung - không tạo kết nối mới mỗi lần tạo báo cáo"""
+        if self.client is None:
+            self.client = get_client()
+        return self.client
+
+    def get_prices(self, symbols):
+        """
+        Giá hiện tại của các symbol: một symbol gọi ticker riêng, nhiều symbol
+        gọi một lần ticker toàn sàn thay vì N request
+
+        Returns:
+            dict: symbol -> giá (symbol không lấy được giá thì vắng mặt)
+        """
+        symbols = {s for s in symbols if s}
+        prices = {}
+        try:
+            if len(symbols) == 1:
+                symbol = next(iter(symbols))
+                ticker = self._get_client().get_symbol_ticker(symbol=symbol)
+                if ticker:
+                    prices[symbol] = float(ticker['price'])
+            elif symbols:
+                for ticker in self._get_client().get_all_tickers():
+                    if ticker['symbol'] in symbols:
+                        prices[ticker['symbol']] = float(ticker['price'])
+        except Exception as e:
+            print(f"⚠️ Lỗi lấy giá: {e}")
+        return prices
+
+    def get_snapshot(self, days=30, refresh=False, max_age=None):
+        """
+        Báo cáo dùng chung trong một chu kỳ: chỉ tính lại (DB + ticker + số dư +
+        một dòng performance) khi chưa có, bị hủy, khác số ngày hoặc đã quá cũ
+
+        Args:
+            days: Số ngày cần báo cáo
+            refresh: True = bắt buộc tính lại
+            max_age: Số giây tối đa (mặc định config.REPORT_SNAPSHOT_TTL_SECONDS, 0 = không giới hạn)
+
+        Returns:
+            ReportSnapshot
+        """
+        max_age = config.REPORT_SNAPSHOT_TTL_SECONDS if max_age is None else max_age
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if (refresh or snapshot is None or snapshot.days != days
+                    or (max_age and snapshot.age > max_age)):
+                if self.db_logger is not None:
+                    self.db_logger.flush(timeout=config.DB_FLUSH_TIMEOUT_SECONDS)
+                report = self.generate_performance_report(days=days)
+                snapshot = ReportSnapshot(days=days, report=report, created_at=time.monotonic())
+                # Báo cáo lỗi (rỗng) không được giữ lại
+                self._snapshot = snapshot if report else None
+            return snapshot
+
+    def invalidate_snapshot(self):
+        """Hủy snapshot hiện tại (gọi khi có lệnh giao dịch mới)"""
+        with self._snapshot_lock:
+            self._snapshot = None
+
     def generate_performance_report(self, days=7):
         """
         Tạo báo cáo hiệu suất
@@ -48,108 +152,62 @@ class ReportingMonitoring:
         try:
             conn = sqlite3.connect(self.db_file)
             cursor = conn.cursor()
+            since_ms = days_ago_ms(days)
             
-            # Lấy tất cả giao dịch có entry_price > 0 (bao gồm cả chưa đóng)
-            cursor.execute('''
-                SELECT 
-                    timestamp,
-                    pnl,
-                    entry_price,
-                    quantity,
-                    side
-                FROM trading_history
-                WHERE timestamp >= datetime('now', '-' || ? || ' days')
-                AND entry_price > 0
-                ORDER BY timestamp ASC
-            ''', (days,))
-            
-            all_trades = cursor.fetchall()
+            # Tổng hợp cộng dồn (daily_trade_stats) theo symbol - không duyệt lại từng giao dịch
+            per_symbol = window_stats(conn, since_ms, by_symbol=True)
+            stats = sum(per_symbol.values(), TradeStats())
             
-            # Tính unrealized PnL cho các giao dịch chưa đóng
-            realized_pnl = 0
-            unrealized_pnl = 0
-            winning_trades = 0
-            losing_trades = 0
-            closed_trades = 0
-            
-            # Lấy giá hiện tại để tính unrealized PnL
+            # Số dư thực tế từ Binance API (chính xác nhất)
             try:
-                from .trade_executor import TradeExecutor
-                temp_executor = TradeExecutor()
-                ticker = temp_executor.client.get_symbol_ticker(symbol='BTCUSDT')
-                current_price = float(ticker['price']) if ticker else 0.0
-            except:
-                current_price = 0.0
-            
-            for trade in all_trades:
-                timestamp, pnl, entry_price, quantity, side = trade
-                
-                if pnl is not None:
-                    # Giao dịch đã đóng
-                    closed_trades += 1
-                    realized_pnl += pnl
-                    if pnl > 0:
-                        winning_trades += 1
-                    elif pnl < 0:
-                        losing_trades += 1
-                elif current_price > 0 and entry_price > 0:
-                    # Giao dịch chưa đóng - tính unrealized PnL
-                    if side == 'BUY':
-                        unrealized = (current_price - entry_price) * quantity
-                    else:  # SELL
-                        unrealized = (entry_price - current_price) * quantity
-                    unrealized_pnl += unrealized
-            
-            total_trades = len(all_trades)
+                balances = get_free_balances(self._get_client())
+            except Exception as e:
+                print(f"⚠️ Lỗi lấy số dư: {e}")
+                balances = None
+            
+            # Một lượt lấy giá cho: cặp có lệnh mở, cặp đang trade, tài sản đang giữ
+            quote = 'USDT'
+            wanted = {s for s, st in per_symbol.items() if st.open_qty}
+            wanted.update(config.TRADE_SYMBOLS)
+            if balances:
+                wanted.update(f"{asset}{quote}" for asset, amount in balances.items()
+                              if asset != quote and amount > 0)
+            prices = self.get_prices(wanted)
+            
+            total_trades = stats.trades
+            closed_trades = stats.closed
+            winning_trades = stats.wins
+            losing_trades = stats.losses
+            realized_pnl = stats.realized_pnl
+            # Lệnh mở của mỗi cặp định giá theo giá của chính cặp đó
+            unrealized_pnl = sum(st.unrealized_pnl(prices.get(symbol, 0.0))
+                                 for symbol, st in per_symbol.items())
             total_pnl = realized_pnl + unrealized_pnl
             
-            # Tính thống kê từ các giao dịch đã đóng
-            if closed_trades > 0:
-                cursor.execute('''
-                    SELECT 
-                        AVG(CASE WHEN pnl > 0 THEN pnl END) as avg_win,
-                        AVG(CASE WHEN pnl < 0 THEN pnl END) as avg_loss
-                    FROM trading_history
-                    WHERE timestamp >= datetime('now', '-' || ? || ' days')
-                    AND pnl IS NOT NULL
-                ''', (days,))
-                avg_stats = cursor.fetchone()
-                avg_win = avg_stats[0] or 0
-                avg_loss = avg_stats[1] or 0
-                win_rate = (winning_trades / closed_trades * 100) if closed_trades > 0 else 0
-                profit_factor = abs(avg_win / avg_loss) if avg_loss != 0 else 0
-            else:
-                avg_win = 0
-                avg_loss = 0
-                win_rate = 0
-                profit_factor = 0
+            # Thống kê từ các giao dịch đã đóng
+            avg_win = stats.avg_win
+            avg_loss = stats.avg_loss
+            win_rate = stats.win_rate
+            profit_factor = stats.profit_factor
             
-            # Lấy số dư thực tế từ Binance API (chính xác nhất)
-            try:
-                from .trade_executor import TradeExecutor
-                temp_executor = TradeExecutor()
-                balances = temp_executor.get_account_balance()
-                
-                # Tính tổng giá trị tài khoản (USDT + BTC*giá hiện tại)
-                usdt_balance = balances.get('USDT', 0)
+            asset_balances = {}
+            if balances is not None:
+                # Tổng giá trị tài khoản = USDT + Σ số lượng * giá của từng tài sản
+                usdt_balance = balances.get(quote, 0)
                 btc_balance = balances.get('BTC', 0)
-                
-                # Lấy giá BTC hiện tại
-                if btc_balance > 0:
-                    try:
-                        ticker = temp_executor.client.get_symbol_ticker(symbol='BTCUSDT')
-                        btc_price = float(ticker['price']) if ticker else 0.0
-                        account_balance = usdt_balance + (btc_balance * btc_price)
-                    except:
-                        account_balance = usdt_balance + (btc_balance * current_price) if current_price > 0 else usdt_balance
-                else:
-                    account_balance = usdt_balance
+                account_balance = usdt_balance
+                for asset, amount in balances.items():
+                    price = prices.get(f"{asset}{quote}")
+                    if asset != quote and price:
+                        asset_balances[asset] = amount
+                        account_balance += amount * price
                 
                 # Nếu không lấy được từ API, fallback về tính từ PnL
                 if account_balance <= 0:
                     initial_balance = getattr(config, 'INITIAL_BALANCE', 10000)
                     account_balance = initial_balance + total_pnl
-            except Exception as e:
+            else:
+                usdt_balance = btc_balance = None
                 # Fallback: Tính từ PnL nếu không lấy được từ API
                 initial_balance = getattr(config, 'INITIAL_BALANCE', 10000)
                 account_balance = initial_balance + total_pnl
@@ -157,21 +215,23 @@ class ReportingMonitoring:
                 # Nếu có số dư trong DB thì ưu tiên dùng
                 cursor.execute('''
                     SELECT account_balance FROM performance
-                    ORDER BY timestamp DESC LIMIT 1
+                    ORDER BY ts_ms DESC LIMIT 1
                 ''')
                 latest_balance = cursor.fetchone()
                 if latest_balance and latest_balance[0]:
                     account_balance = latest_balance[0]
             
             # Lưu số dư vào database để theo dõi theo thời gian
+            now = datetime.now()
             try:
                 cursor.execute('''
                     INSERT INTO performance (
-                        timestamp, total_trades, winning_trades, losing_trades,
+                        timestamp, ts_ms, total_trades, winning_trades, losing_trades,
                         total_pnl, win_rate, avg_win, avg_loss, profit_factor, account_balance
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
-                    datetime.now().isoformat(),
+                    now.isoformat(),
+                    to_ms(now),
                     total_trades,
                     winning_trades,
                     losing_trades,
@@ -203,6 +263,18 @@ class ReportingMonitoring:
                 'avg_loss': round(avg_loss, 2),
                 'profit_factor': round(profit_factor, 2),
                 'account_balance': account_balance,
+                'usdt_balance': usdt_balance,
+                'btc_balance': btc_balance,
+                'asset_balances': asset_balances,
+                'symbols': {
+                    symbol: {
+                        'trades': st.trades,
+                        'open_trades': st.open_trades,
+                        'realized_pnl': round(st.realized_pnl, 2),
+                        'unrealized_pnl': round(st.unrealized_pnl(prices.get(symbol, 0.0)), 2),
+                    }
+                    for symbol, st in sorted(per_symbol.items()) if st.trades
+                },
                 'return_percent': round((total_pnl / account_balance * 100), 2) if account_balance > 0 else 0
             }
             
@@ -234,6 +306,8 @@ class ReportingMonitoring:
                     df = pd.DataFrame(equity_points, columns=['cycle', 'account_balance'])
             else:
                 conn = sqlite3.connect(self.db_file)
+                # Lọc theo thời gian ngay trong SQL (dùng index ts_ms) thay vì đọc cả bảng
+                since_ms = to_ms(pd.to_datetime(start_time).to_pydatetime()) if start_time else 0
                 
                 # Thử đọc từ bảng performance trước (nếu có)
                 query_perf = '''
@@ -242,23 +316,26 @@ class ReportingMonitoring:
                         account_balance,
                         total_pnl
                     FROM performance
-                    ORDER BY timestamp ASC
+                    WHERE ts_ms >= ?
+                    ORDER BY ts_ms ASC
                 '''
-                df_perf = pd.read_sql_query(query_perf, conn)
+                df_perf = pd.read_sql_query(query_perf, conn, params=(since_ms,))
                 
-                # Nếu không có dữ liệu trong performance, tính từ trading_history
+                # Nếu không có dữ liệu performance trong khoảng thời gian, tính từ trading_history
                 if df_perf.empty:
                     query_trades = '''
                         SELECT 
                             timestamp,
+                            symbol,
                             pnl,
                             entry_price,
                             quantity,
                             side
                         FROM trading_history
                         WHERE entry_price > 0
-                        ORDER BY timestamp ASC
+                        ORDER BY ts_ms ASC
                     '''
+                    # Không lọc theo start_time: số dư là tổng PnL lũy kế từ đầu
                     df_trades = pd.read_sql_query(query_trades, conn)
                     
                     if df_trades.empty:
@@ -274,12 +351,12 @@ class ReportingMonitoring:
                         df_trades['pnl_used'] = df_trades['pnl'].fillna(0)
                     else:
                         try:
-                            from .trade_executor import TradeExecutor
-                            temp_executor = TradeExecutor()
-                            ticker = temp_executor.client.get_symbol_ticker(symbol='BTCUSDT')
-                            current_price = float(ticker['price']) if ticker else 0.0
+                            prices = self.get_prices(df_trades['symbol'].dropna().unique())
                             
                             def calc_unrealized_pnl(row):
+                                current_price = prices.get(row['symbol'], 0.0)
+                                if not current_price:
+                                    return 0.0
                                 if row['side'] == 'BUY':
                                     return (current_price - row['entry_price']) * row['quantity']
                                 else:
@@ -318,71 +395,25 @@ class ReportingMonitoring:
             if 'cycle' not in df.columns:
                 df['cycle'] = range(1, len(df) + 1)
             
-            _fig, ax1 = plt.subplots(figsize=(14, 8))
-            
-            if 'account_balance' in df.columns:
-                ax1.plot(
-                    df['cycle'],
-                    df['account_balance'],
-                    color='#2ecc71',
-                    linewidth=3,
-                    solid_capstyle='round'
-                )
-                ax1.scatter(
-                    df['cycle'],
-                    df['account_balance'],
-                    color='#1abc9c',
-                    s=40,
-                    edgecolor='black',
-                    linewidths=0.5,
-                    zorder=3
-                )
-                # Marker BUY/SELL nếu có
-                if 'signal' in df.columns:
-                    buy_df = df[df['signal'].str.upper() == 'BUY'] if not df.empty else pd.DataFrame()
-                    sell_df = df[df['signal'].str.upper() == 'SELL'] if not df.empty else pd.DataFrame()
-                    if not buy_df.empty:
-                        ax1.scatter(buy_df['cycle'], buy_df['account_balance'],
-                                    marker='^', color='#00b894', s=70, edgecolor='black', linewidths=0.6, zorder=4, label='BUY')
-                        for _, row in buy_df.iterrows():
-                            ax1.annotate(f"{int(row['cycle'])}", (row['cycle'], row['account_balance']),
-                                         textcoords="offset points", xytext=(0, 6), ha='center', fontsize=8, color='#006442')
-                    if not sell_df.empty:
-                        ax1.scatter(sell_df['cycle'], sell_df['account_balance'],
-                                    marker='v', color='#e17055', s=70, edgecolor='black', linewidths=0.6, zorder=4, label='SELL')
-                        for _, row in sell_df.iterrows():
-                            ax1.annotate(f"{int(row['cycle'])}", (row['cycle'], row['account_balance']),
-                                         textcoords="offset points", xytext=(0, -10), ha='center', fontsize=8, color='#6c1a07')
-                    if not buy_df.empty or not sell_df.empty:
-                        ax1.legend(loc='upper left')
-
-                ax1.set_title('📈 Đường Cong Vốn Theo Chu Kỳ', fontsize=18, fontweight='bold')
-                ax1.set_xlabel('Chu kỳ chạy bot', fontsize=14)
-                ax1.set_ylabel('Số dư tài khoản (USDT)', fontsize=14)
-                ax1.tick_params(labelsize=12)
-                ax1.grid(True, alpha=0.3)
-                z = df['account_balance']
-                ax1.fill_between(df['cycle'], z, alpha=0.15, color='#2ecc71')
-                y_min = z.min() * 0.995 if not z.empty else 0
-                y_max = z.max() * 1.005 if not z.empty else 1
-                if y_min == y_max:
-                    delta = y_min * 0.01 if y_min != 0 else 1
-                    y_min -= delta
-                    y_max += delta
-                ax1.set_ylim(y_min, y_max)
-            
-            
-            plt.tight_layout()
-            plt.savefig(output_file, dpi=300, bbox_inches='tight')
-            print(f"✅ Đã vẽ equity curve: {output_file}")
+            if 'account_balance' not in df.columns:
+                return
+            signals = df['signal'] if 'signal' in df.columns else None
+            if self.chart_renderer.render(df['cycle'].to_numpy(), df['account_balance'].to_numpy(),
+                                          signals, output_file):
+                print(f"✅ Đã vẽ equity curve: {output_file}")
             
         except Exception as e:
             print(f"❌ Lỗi vẽ biểu đồ: {e}")
     
-    def generate_summary_report(self):
-        """Tạo báo cáo tổng hợp và in ra console"""
+    def generate_summary_report(self, snapshot=None):
+        """
+        Tạo báo cáo tổng hợp và in ra console
+
+        Args:
+            snapshot: ReportSnapshot của chu kỳ hiện tại (mặc định get_snapshot())
+        """
         try:
-            report = self.generate_performance_report(days=30)
+            report = (snapshot or self.get_snapshot(days=30)).report
             
             print("\n" + "="*60)
             print("📊 BÁO CÁO HIỆU SUẤT GIAO DỊCH (30 ngày)")
@@ -418,7 +449,7 @@ class ReportingMonitoring:
             print(f"❌ Lỗi tạo báo cáo tổng hợp: {e}")
             return {}
     
-    def export_html_report(self, output_file=None):
+    def export_html_report(self, output_file=None, snapshot=None):
         if output_file is None:
             output_file = config.REPORT_HTML_FILE
         """
@@ -426,9 +457,10 @@ class ReportingMonitoring:
         
         Args:
             output_file: Tên file output
+            snapshot: ReportSnapshot của chu kỳ hiện tại (mặc định get_snapshot())
         """
         try:
-            report = self.generate_performance_report(days=30)
+            report = (snapshot or self.get_snapshot(days=30)).report
             
             # Tính toán các giá trị
             total_pnl = report.get('total_pnl', 0)
@@ -29,18 +29,21 @@ class RiskOrderManager:
     4. Quản lý vị thế và exposure
     """
     
-    def __init__(self, account_balance=10000):
+    def __init__(self, account_balance=10000, verbose=True):
         """
         Khởi tạo Risk Manager
         
         Args:
             account_balance: Số dư tài khoản (USDT)
+            verbose: In chi tiết tính toán vị thế (tắt khi backtest)
         """
         self.account_balance = account_balance
         self.risk_percent = config.RISK_PERCENTAGE
         self.stop_loss_percent = config.STOP_LOSS_PERCENT
         self.take_profit_percent = config.TAKE_PROFIT_PERCENT
-        print("✅ Risk & Order Manager đã sẵn sàng")
+        self.verbose = verbose
+        if verbose:
+            print("✅ Risk & Order Manager đã sẵn sàng")
     
     def calculate_position_size(self, entry_price, signal, current_atr=None):
         """
@@ -98,11 +101,12 @@ class RiskOrderManager:
                 'timestamp': datetime.now()
             }
             
-            print(f"\n💰 Tính toán vị thế:")
-            print(f"   💵 Khối lượng: {result['quantity']}")
-            print(f"   ⚠️ Rủi ro: ${result['risk_amount']:.2f} ({self.risk_percent}%)")
-            print(f"   📉 Stop Loss: ${result['stop_loss']:.2f}")
-            print(f"   📈 Take Profit: ${result['take_profit']:.2f}")
+            if self.verbose:
+                print(f"\n💰 Tính toán vị thế:")
+                print(f"   💵 Khối lượng: {result['quantity']}")
+                print(f"   ⚠️ Rủi ro: ${result['risk_amount']:.2f} ({self.risk_percent}%)")
+                print(f"   📉 Stop Loss: ${result['stop_loss']:.2f}")
+                print(f"   📈 Take Profit: ${result['take_profit']:.2f}")
             
             return result
             
@@ -0,0 +1,145 @@
+"""
+Module lịch chạy bám theo thời điểm đóng nến
+- Thức dậy ngay sau khi nến đóng (+ một độ trễ nhỏ cấu hình được) thay vì
+  ngủ cố định interval_minutes * 60 giây sau mỗi chu kỳ (bị trôi dần)
+- Đo độ trễ thực tế (drift) của từng lần thức dậy
+- Chu kỳ chạy quá lâu làm lỡ mốc: bỏ qua (skip) hoặc chạy bù (catch_up)
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+
+from . import config
+from .candle_store import interval_to_ms
+
+# Nến tuần của Binance bắt đầu từ thứ Hai (epoch 1970-01-01 là thứ Năm)
+_ALIGN_ORIGIN_MS = {'1w': 4 * 86_400_000}
+
+
+@dataclass
+class Tick:
+    """Một lần thức dậy của scheduler"""
+    close_ms: int      # thời điểm đóng nến (mốc lịch)
+    fired_ms: int      # thời điểm thực sự thức dậy
+    drift_ms: int      # fired_ms - (close_ms + offset)
+    skipped: int = 0   # số mốc đã bỏ qua ngay trước lần này
+
+
+class CandleCloseScheduler:
+    """
+    Lịch chạy theo mốc đóng nến (mốc = origin + k * period)
+
+    Ví dụ:
+        scheduler = CandleCloseScheduler(interval='15m')
+        while True:
+            tick = scheduler.wait_next(stop_event=stop)
+            if tick is None:
+                break
+            bot.run_once()
+    """
+
+    def __init__(self, interval=None, period_ms=None, offset_seconds=None, missed_policy=None,
+                 clock=None):
+        """
+        Args:
+            interval: Khung nến ('1m', '15m', '1h'...) - mặc định config.TRADING_CANDLE_INTERVAL
+            period_ms: Chu kỳ tùy chọn (ms), dùng thay cho interval
+            offset_seconds: Thức dậy sau khi nến đóng bao lâu (mặc định config.SCHEDULER_CLOSE_OFFSET_SECONDS)
+            missed_policy: 'skip' (chỉ chạy cho mốc mới nhất) hoặc 'catch_up' (chạy bù từng mốc)
+            clock: Hàm trả về thời gian hiện tại (giây, epoch) - để test
+        """
+        interval = interval or config.TRADING_CANDLE_INTERVAL
+        self.period_ms = int(period_ms) if period_ms else interval_to_ms(interval)
+        self.origin_ms = 0 if period_ms else _ALIGN_ORIGIN_MS.get(interval, 0)
+        offset = config.SCHEDULER_CLOSE_OFFSET_SECONDS if offset_seconds is None else offset_seconds
+        self.offset_ms = int(offset * 1000)
+        self.missed_policy = missed_policy or config.SCHEDULER_MISSED_POLICY
+        if self.missed_policy not in ('skip', 'catch_up'):
+            raise ValueError(f"missed_policy không hợp lệ: {self.missed_policy}")
+        self.clock = clock or time.time
+        self._next_close_ms = None
+        # Thống kê
+        self.ticks = 0
+        self.skipped_ticks = 0
+        self.last_drift_ms = 0
+        self.max_drift_ms = 0
+
+    def now_ms(self):
+        return int(self.clock() * 1000)
+
+    def next_close_ms(self, now_ms):
+        """Mốc đóng nến đầu tiên sau now_ms"""
+        k = (now_ms - self.origin_ms) // self.period_ms + 1
+        return self.origin_ms + k * self.period_ms
+
+    def _due(self, now_ms):
+        """
+        Mốc kế tiếp cần chạy
+
+        Returns:
+            tuple (close_ms, skipped)
+        """
+        if self._next_close_ms is None:
+            self._next_close_ms = self.next_close_ms(now_ms)
+        close_ms = self._next_close_ms
+        skipped = 0
+        latest_due = self.next_close_ms(now_ms - self.offset_ms) - self.period_ms
+        if self.missed_policy == 'skip' and latest_due > close_ms:
+            # Đã lỡ nhiều mốc: chỉ chạy cho nến vừa đóng gần nhất
+            skipped = (latest_due - close_ms) // self.period_ms
+            close_ms = latest_due
+        return close_ms, skipped
+
+    def seconds_until_next(self):
+        close_ms, _ = self._due(self.now_ms())
+        return max(0.0, (close_ms + self.offset_ms - self.now_ms()) / 1000)
+
+    def wait_next(self, stop_event=None, should_stop=None, on_wait=None, max_sleep=1.0):
+        """
+        Chờ tới mốc kế tiếp
+
+        Args:
+            stop_event: threading.Event - set() thì dừng chờ ngay
+            should_stop: Hàm trả về True khi cần dừng (kiểm tra mỗi max_sleep giây)
+            on_wait: Hàm nhận số giây còn lại, gọi mỗi lần ngủ (vd đếm ngược trên GUI)
+            max_sleep: Thời gian ngủ tối đa mỗi lần (giây)
+
+        Returns:
+            Tick, hoặc None nếu bị dừng
+        """
+        stop_event = stop_event or threading.Event()
+        while True:
+            if stop_event.is_set() or (should_stop and should_stop()):
+                return None
+            close_ms, skipped = self._due(self.now_ms())
+            remaining = (close_ms + self.offset_ms - self.now_ms()) / 1000
+            if remaining <= 0:
+                break
+            if on_wait:
+                on_wait(remaining)
+            if stop_event.wait(min(remaining, max_sleep)):
+                return None
+
+        fired_ms = self.now_ms()
+        drift_ms = fired_ms - (close_ms + self.offset_ms)
+        self._next_close_ms = close_ms + self.period_ms
+        self.ticks += 1
+        self.skipped_ticks += skipped
+        self.last_drift_ms = drift_ms
+        self.max_drift_ms = max(self.max_drift_ms, drift_ms)
+        if skipped:
+            print(f"⚠️ Lỡ {skipped} mốc nến (chu kỳ trước chạy quá lâu), chạy cho nến mới nhất")
+        return Tick(close_ms=close_ms, fired_ms=fired_ms, drift_ms=drift_ms, skipped=skipped)
+
+
+def create_scheduler(interval_minutes=None, candle_interval=None):
+    """
+    Scheduler cho vòng lặp giao dịch
+
+    config.SCHEDULE_ON_CANDLE_CLOSE = True: thức dậy theo mốc đóng nến của candle_interval;
+    ngược lại: theo mốc cố định mỗi interval_minutes phút (vẫn không bị trôi).
+    """
+    if config.SCHEDULE_ON_CANDLE_CLOSE or not interval_minutes:
+        return CandleCloseScheduler(interval=candle_interval or config.TRADING_CANDLE_INTERVAL)
+    return CandleCloseScheduler(period_ms=float(interval_minutes) * 60_000)
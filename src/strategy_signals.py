@@ -4,9 +4,11 @@ This module provides a conservative example of how to use MACD and Fibonacci
 retracement levels to generate entry suggestions. It is intentionally simple so
 it is easy to review and test before integrating into `main` or `chatgpt_advisor`.
 """
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+import numpy as np
 import pandas as pd
 from .technical_indicators import TechnicalIndicators
+from . import indicator_kernels as kernels
 from . import config
 
 
@@ -17,72 +19,53 @@ def price_near_level(price: float, level: float, tol: float = 0.0025) -> bool:
     return abs(price - level) / max(level, 1e-8) <= tol
 
 
-def generate_signals(df: pd.DataFrame) -> Dict[str, Any]:
-    """
-    Generate combined signals using MA, RSI, ATR, MACD and Fibonacci.
+def long_ma_period(ma_period: int = None) -> int:
+    """Chu kỳ MA dài dùng để xác định xu hướng (gấp đôi MA ngắn)."""
+    ma_period = ma_period or config.MA_PERIOD
+    return max(2 * ma_period, ma_period + 1)
 
-    Args:
-        df: DataFrame with columns ['open','high','low','close'] indexed by time.
 
-    Returns:
-        dict: { 'trend': 'up'|'down'|'flat', 'macd': {...}, 'fib': {...}, 'recommendation': 'BUY'|'SELL'|'HOLD', 'entry': price, 'stop': price }
+def evaluate_rules(last_price: float, ma_s: float, ma_l: float,
+                   macd_prev: Tuple[float, float], macd_last: Tuple[float, float],
+                   fib: Dict[str, Any], fib_tolerance: float = 0.005) -> Dict[str, Any]:
     """
-    results = {}
-
-    # Basic checks
-    if len(df) < 10:
-        return {'error': 'insufficient data'}
+    Apply the trend / MACD-cross / Fibonacci rules to already computed indicator values.
 
-    close = df['close']
-    last_price = float(close.iloc[-1])
+    Shared by `generate_signals` (batch) and the backtester (incremental indicators),
+    so both paths produce the same recommendation for the same bar.
 
-    # MA-based trend: short MA vs long MA
-    ma_short = TechnicalIndicators.calculate_ma(df, period=config.MA_PERIOD)
-    ma_long = TechnicalIndicators.calculate_ma(df, period=max(2 * config.MA_PERIOD, config.MA_PERIOD + 1))
-    ma_s = ma_short.iloc[-1]
-    ma_l = ma_long.iloc[-1]
+    Args:
+        last_price: latest close
+        ma_s, ma_l: short and long moving averages
+        macd_prev, macd_last: (macd, signal) on the previous and the latest bar
+        fib: dict from TechnicalIndicators.fibonacci_retracement
+        fib_tolerance: max distance (fraction) between price and a Fibonacci level
 
+    Returns:
+        dict: {'trend', 'macd_cross', 'fib_hit', 'recommendation', 'entry', 'stop'}
+    """
     trend = 'flat'
     if ma_s > ma_l:
         trend = 'up'
     elif ma_s < ma_l:
         trend = 'down'
 
-    results['trend'] = trend
-
-    # MACD
-    macd_df = TechnicalIndicators.macd(close, fast=config.MACD_FAST, slow=config.MACD_SLOW, signal=config.MACD_SIGNAL)
-    macd_last = macd_df.iloc[-1]
-    macd_prev = macd_df.iloc[-2]
-    macd_signal = 'neutral'
     # detect cross
-    if macd_prev['macd'] <= macd_prev['signal'] and macd_last['macd'] > macd_last['signal']:
+    macd_signal = 'neutral'
+    if macd_prev[0] <= macd_prev[1] and macd_last[0] > macd_last[1]:
         macd_signal = 'bullish_cross'
-    elif macd_prev['macd'] >= macd_prev['signal'] and macd_last['macd'] < macd_last['signal']:
+    elif macd_prev[0] >= macd_prev[1] and macd_last[0] < macd_last[1]:
         macd_signal = 'bearish_cross'
 
-    results['macd'] = {
-        'macd': float(macd_last['macd']),
-        'signal': float(macd_last['signal']),
-        'hist': float(macd_last['hist']),
-        'cross': macd_signal
-    }
-
-    # Fibonacci
-    fib = TechnicalIndicators.fibonacci_retracement(df, lookback=config.FIB_LOOKBACK)
-    results['fib'] = fib
-
     # Check if price is near any common retracement levels (38.2, 50, 61.8)
     candidates = [0.382, 0.5, 0.618]
     hit_level = None
     for r in candidates:
         lvl = fib['levels'].get(r)
-        if price_near_level(last_price, lvl, tol=0.005):
+        if price_near_level(last_price, lvl, tol=fib_tolerance):
             hit_level = {'ratio': r, 'price': lvl}
             break
 
-    results['fib_hit'] = hit_level
-
     # Combine rules for a conservative recommendation
     recommendation = 'HOLD'
     entry = None
@@ -101,13 +84,151 @@ def generate_signals(df: pd.DataFrame) -> Dict[str, Any]:
         entry = last_price
         stop = fib['levels'].get(0.618, last_price * (1 + 0.02))
 
-    results['recommendation'] = recommendation
-    results['entry'] = entry
-    results['stop'] = stop
+    return {
+        'trend': trend,
+        'macd_cross': macd_signal,
+        'fib_hit': hit_level,
+        'recommendation': recommendation,
+        'entry': entry,
+        'stop': stop,
+    }
+
+
+def generate_signals(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Generate combined signals using MA, RSI, ATR, MACD and Fibonacci.
+
+    Args:
+        df: DataFrame with columns ['open','high','low','close'] indexed by time.
+
+    Returns:
+        dict: { 'trend': 'up'|'down'|'flat', 'macd': {...}, 'fib': {...}, 'recommendation': 'BUY'|'SELL'|'HOLD', 'entry': price, 'stop': price }
+    """
+    results = {}
+
+    # Basic checks
+    if len(df) < 10:
+        return {'error': 'insufficient data'}
+
+    close = df['close']
+    last_price = float(close.iloc[-1])
+
+    # MA-based trend: short MA vs long MA
+    ma_short = TechnicalIndicators.calculate_ma(df, period=config.MA_PERIOD)
+    ma_long = TechnicalIndicators.calculate_ma(df, period=long_ma_period())
+
+    # MACD
+    macd_df = TechnicalIndicators.macd(close, fast=config.MACD_FAST, slow=config.MACD_SLOW, signal=config.MACD_SIGNAL)
+    macd_last = macd_df.iloc[-1]
+    macd_prev = macd_df.iloc[-2]
+
+    # Fibonacci
+    fib = TechnicalIndicators.fibonacci_retracement(df, lookback=config.FIB_LOOKBACK)
+
+    rules = evaluate_rules(
+        last_price,
+        ma_short.iloc[-1],
+        ma_long.iloc[-1],
+        (macd_prev['macd'], macd_prev['signal']),
+        (macd_last['macd'], macd_last['signal']),
+        fib,
+    )
+
+    results['trend'] = rules['trend']
+    results['macd'] = {
+        'macd': float(macd_last['macd']),
+        'signal': float(macd_last['signal']),
+        'hist': float(macd_last['hist']),
+        'cross': rules['macd_cross']
+    }
+    results['fib'] = fib
+    results['fib_hit'] = rules['fib_hit']
+    results['recommendation'] = rules['recommendation']
+    results['entry'] = rules['entry']
+    results['stop'] = rules['stop']
 
     return results
 
 
+def generate_signals_vectorized(df: pd.DataFrame, ma_period: int = None, macd_fast: int = None,
+                                macd_slow: int = None, macd_signal: int = None,
+                                fib_lookback: int = None,
+                                fib_tolerance: float = 0.005) -> pd.DataFrame:
+    """
+    Evaluate the same rules as `generate_signals` for EVERY bar in one pass.
+
+    `generate_signals` only looks at the last bar, so building a signal series by
+    calling it on each prefix costs O(N^2). Here every indicator is computed once
+    with the NumPy kernels and the rules are applied with array operations.
+    Row i matches `generate_signals(df.iloc[:i + 1])` (rows with fewer than 10
+    bars of history are HOLD instead of an error).
+
+    Args:
+        df: DataFrame with columns ['high','low','close']
+        ma_period, macd_fast, macd_slow, macd_signal, fib_lookback: defaults from config
+        fib_tolerance: max distance (fraction) between price and a Fibonacci level
+
+    Returns:
+        DataFrame indexed like `df` with columns
+        ['trend', 'macd', 'macd_signal', 'macd_hist', 'macd_cross', 'fib_high', 'fib_low',
+         'fib_hit', 'recommendation', 'entry', 'stop'] (fib_hit = hit ratio or NaN)
+    """
+    ma_period = ma_period or config.MA_PERIOD
+    lookback = fib_lookback or config.FIB_LOOKBACK
+    close = kernels.as_float_array(df['close'])
+    n = len(close)
+
+    # Trend: short MA vs long MA (NaN compares False -> flat)
+    ma_s = kernels.sma(close, ma_period)
+    ma_l = kernels.sma(close, long_ma_period(ma_period))
+    up = ma_s > ma_l
+    down = ma_s < ma_l
+    trend = np.where(up, 'up', np.where(down, 'down', 'flat'))
+
+    # MACD cross between bar i-1 and bar i
+    macd_line, signal_line, hist = kernels.macd(close, fast=macd_fast or config.MACD_FAST,
+                                                slow=macd_slow or config.MACD_SLOW,
+                                                signal=macd_signal or config.MACD_SIGNAL)
+    prev_macd = np.concatenate(([np.nan], macd_line[:-1]))
+    prev_signal = np.concatenate(([np.nan], signal_line[:-1]))
+    bullish = (prev_macd <= prev_signal) & (macd_line > signal_line)
+    bearish = (prev_macd >= prev_signal) & (macd_line < signal_line)
+    macd_cross = np.where(bullish, 'bullish_cross', np.where(bearish, 'bearish_cross', 'neutral'))
+
+    # Fibonacci levels from the rolling swing high/low (shorter window at the start)
+    swing_high = kernels.rolling_max(df['high'], lookback, min_periods=1)
+    swing_low = kernels.rolling_min(df['low'], lookback, min_periods=1)
+    diff = swing_high - swing_low
+    fib_hit = np.full(n, np.nan)
+    for r in (0.618, 0.5, 0.382):  # reverse order: the first matching ratio wins
+        level = swing_low + diff * r
+        near = np.abs(close - level) / np.maximum(level, 1e-8) <= fib_tolerance
+        fib_hit[near] = r
+    hit = ~np.isnan(fib_hit)
+
+    enough = np.arange(n) >= 9  # generate_signals needs at least 10 bars
+    buy = enough & up & hit & bullish
+    sell = enough & down & hit & bearish
+    recommendation = np.where(sell, 'SELL', np.where(buy, 'BUY', 'HOLD'))
+    active = buy | sell
+    entry = np.where(active, close, np.nan)
+    stop = np.where(active, swing_low + diff * 0.618, np.nan)
+
+    return pd.DataFrame({
+        'trend': trend,
+        'macd': macd_line,
+        'macd_signal': signal_line,
+        'macd_hist': hist,
+        'macd_cross': macd_cross,
+        'fib_high': swing_high,
+        'fib_low': swing_low,
+        'fib_hit': fib_hit,
+        'recommendation': recommendation,
+        'entry': entry,
+        'stop': stop,
+    }, index=df.index)
+
+
 if __name__ == '__main__':
     # Quick demonstration using TechnicalIndicators' sample data
     import numpy as np
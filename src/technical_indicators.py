@@ -4,7 +4,25 @@ Phù hợp cho học sinh cấp 3 - giải thích rõ ràng từng chỉ số
 """
 
 import pandas as pd
-import pandas_ta as ta  # Thư viện tính indicators
+from . import config
+from . import indicator_kernels as kernels
+
+
+def _pandas_ta():
+    """
+    Import pandas_ta khi thật sự cần (chỉ dùng khi INDICATOR_BACKEND='pandas_ta')
+
+    pandas_ta import rất chậm nên không import sẵn ở đầu module.
+    """
+    try:
+        import pandas_ta as ta  # Thư viện tính indicators
+    except ImportError as e:
+        raise ImportError("INDICATOR_BACKEND='pandas_ta' cần cài pandas-ta: pip install pandas-ta") from e
+    return ta
+
+
+def _use_pandas_ta():
+    return getattr(config, 'INDICATOR_BACKEND', 'numpy') == 'pandas_ta'
 
 
 class TechnicalIndicators:
@@ -35,12 +53,14 @@ class TechnicalIndicators:
         """
         if ma_type == 'SMA':
             # SMA: Trung bình số học đơn giản
-            ma = df['close'].rolling(window=period).mean()
+            values = kernels.sma(df['close'], period)
+        elif _use_pandas_ta():
+            return _pandas_ta().ema(df['close'], length=period)
         else:
-            # EMA: Ưu tiên dữ liệu gần đây hơn
-            ma = ta.ema(df['close'], length=period)
+            # EMA: Ưu tiên dữ liệu gần đây hơn (khởi tạo bằng SMA như pandas_ta)
+            values = kernels.ema(df['close'], period, sma_seed=True)
         
-        return ma
+        return pd.Series(values, index=df.index)
     
     @staticmethod
     def calculate_rsi(df, period=14):
@@ -59,8 +79,10 @@ class TechnicalIndicators:
         Returns:
             Series: Giá trị RSI (0-100)
         """
-        rsi = ta.rsi(df['close'], length=period)
-        return rsi
+        if _use_pandas_ta():
+            return _pandas_ta().rsi(df['close'], length=period)
+        rsi = kernels.rsi(df['close'], period)
+        return pd.Series(rsi, index=df.index)
     
     @staticmethod
     def calculate_atr(df, period=14):
@@ -79,8 +101,10 @@ class TechnicalIndicators:
         Returns:
             Series: Giá trị ATR
         """
-        atr = ta.atr(high=df['high'], low=df['low'], close=df['close'], length=period)
-        return atr
+        if _use_pandas_ta():
+            return _pandas_ta().atr(high=df['high'], low=df['low'], close=df['close'], length=period)
+        atr = kernels.atr(df['high'], df['low'], df['close'], period)
+        return pd.Series(atr, index=df.index)
 
     @staticmethod
     def macd(df_close, fast=12, slow=26, signal=9):
@@ -101,13 +125,10 @@ class TechnicalIndicators:
         else:
             close = df_close
 
-        ema_fast = close.ewm(span=fast, adjust=False).mean()
-        ema_slow = close.ewm(span=slow, adjust=False).mean()
-        macd_line = ema_fast - ema_slow
-        signal_line = macd_line.ewm(span=signal, adjust=False).mean()
-        hist = macd_line - signal_line
+        macd_line, signal_line, hist = kernels.macd(close, fast=fast, slow=slow, signal=signal)
 
-        return pd.DataFrame({'macd': macd_line, 'signal': signal_line, 'hist': hist})
+        return pd.DataFrame({'macd': macd_line, 'signal': signal_line, 'hist': hist},
+                            index=close.index)
 
     @staticmethod
     def fibonacci_retracement(df, lookback=100):
@@ -165,8 +186,8 @@ class TechnicalIndicators:
         result_df['RSI'] = rsi
         result_df['ATR'] = atr
         
-        # Log dữ liệu cuối cùng
-        print(result_df[['close', 'MA', 'RSI', 'ATR']].tail())
+        # Log dữ liệu cuối cùng (một dòng: in cả DataFrame tốn ~10 ms mỗi chu kỳ)
+        print(f"   close={current_price:.6g} MA={ma_value:.6g} RSI={rsi_value:.2f} ATR={atr_value:.6g}")
         
         return {
             'current_price': current_price,
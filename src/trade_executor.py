@@ -5,10 +5,12 @@ CHỈ DÙNG BINANCE TESTNET - AN TOÀN cho học sinh!
 
 from binance.client import Client
 from . import config
+from .binance_client import get_client, get_free_balances
+from .db_migrations import migrate, to_ms
+from .exchange_info import ExchangeInfoCache, round_step
 import sqlite3
 from datetime import datetime
 import time
-from math import floor
 
 
 class TradeExecutor:
@@ -21,68 +23,77 @@ class TradeExecutor:
     - An toàn cho học sinh thử nghiệm
     """
     
-    def __init__(self):
-        """Khởi tạo kết nối Binance Testnet"""
+    def __init__(self, exchange_info=None, client=None, db_logger=None):
+        """
+        Khởi tạo kết nối Binance Testnet
+
+        Args:
+            exchange_info: ExchangeInfoCache dùng chung (mặc định tạo mới và tải ngay)
+            client: Binance client dùng chung (mặc định binance_client.get_client())
+            db_logger: DatabaseLogger để ghi lệnh qua hàng đợi nền (không chặn luồng đặt lệnh)
+        """
+        self._exchange_info = exchange_info
+        self.db_logger = db_logger
+        self.client = None
         try:
-            self.client = Client(
-                api_key=config.BINANCE_API_KEY,
-                api_secret=config.BINANCE_SECRET_KEY,
-                testnet=True  # QUAN TRỌNG: Chỉ dùng Testnet
-            )
+            self.client = client or get_client()
             print("✅ Trade Executor đã sẵn sàng (Testnet)")
         except Exception as e:
             print(f"❌ Lỗi khởi tạo: {e}")
+            return
+
+        # Tải filter của mọi symbol một lần để đặt lệnh không phải gọi thêm REST
+        if self._exchange_info is None:
+            try:
+                count = self.exchange_info.refresh()
+                print(f"✅ Đã tải filter của {count} symbol")
+            except Exception as e:
+                print(f"⚠️ Chưa tải được exchange info (sẽ thử lại khi đặt lệnh): {e}")
+
+    @property
+    def exchange_info(self):
+        """ExchangeInfoCache (tạo khi cần nếu lúc khởi tạo chưa kết nối được Binance)"""
+        if self._exchange_info is None:
+            if self.client is None:
+                self.client = get_client()
+            self._exchange_info = ExchangeInfoCache(self.client)
+        return self._exchange_info
     
     # ==== SYMBOL FILTER HELPERS ====
     def _get_symbol_filters(self, symbol):
-        """Lấy filter của symbol (LOT_SIZE, MIN_NOTIONAL, PRICE_FILTER)."""
-        info = self.client.get_symbol_info(symbol)
-        if not info or 'filters' not in info:
+        """Lấy filter của symbol (LOT_SIZE, MIN_NOTIONAL, PRICE_FILTER) từ cache."""
+        try:
+            filters = self.exchange_info.get(symbol)
+        except Exception as e:
+            print(f"⚠️ Không lấy được filter của {symbol}: {e}")
             return {}
-        filters = {f['filterType']: f for f in info['filters']}
-        return filters
+        return filters.raw if filters else {}
 
     def _round_step(self, value, step):
         """Làm tròn value xuống theo bước step (tránh vượt filter)."""
-        step = float(step)
-        if step <= 0:
-            return value
-        precision = int(max(0, -round(__import__('math').log10(step)))) if step < 1 else 0
-        # dùng floor để không vượt quá
-        return float(f"{floor(value / step) * step:.{precision}f}")
+        return round_step(value, step)
 
     def _adjust_quantity_for_filters(self, symbol, quantity, price):
-        """Điều chỉnh quantity theo LOT_SIZE và kiểm tra MIN_NOTIONAL.
+        """Điều chỉnh quantity theo LOT_SIZE và kiểm tra MIN_NOTIONAL (kiểm tra tại máy, không gọi REST).
 
         Returns:
             tuple (qty_ok: float, reason: str|None)
         """
         try:
-            f = self._get_symbol_filters(symbol)
-            lot = f.get('LOT_SIZE', {})
-            min_notional = f.get('MIN_NOTIONAL', {})
-
-            step_size = lot.get('stepSize', '0.00000001')
-            min_qty = float(lot.get('minQty', '0.0')) if lot else 0.0
-            max_qty = float(lot.get('maxQty', '1e30')) if lot else 1e30
-
-            # Làm tròn theo stepSize và giới hạn trong [minQty, maxQty]
-            adj_qty = self._round_step(float(quantity), step_size)
-            if adj_qty < min_qty:
-                return 0.0, f"Khối lượng sau điều chỉnh ({adj_qty}) < minQty ({min_qty})"
-            if adj_qty > max_qty:
-                adj_qty = max_qty
-
-            # Kiểm tra minNotional (giá trị lệnh tối thiểu)
-            notional = adj_qty * float(price)
-            min_notional_val = float(min_notional.get('minNotional', '0')) if min_notional else 0.0
-            if notional < min_notional_val:
-                return 0.0, f"Giá trị lệnh ({notional:.2f}) < minNotional ({min_notional_val})"
-
-            return adj_qty, None
+            filters = self.exchange_info.get(symbol)
+            if filters is None:
+                return 0.0, f"Không tìm thấy symbol {symbol} trên sàn"
+            return filters.adjust_quantity(quantity, price)
         except Exception as e:
             return 0.0, f"Lỗi điều chỉnh LOT_SIZE: {e}"
 
+    def _last_price(self, symbol, price):
+        """Giá dùng để kiểm tra minNotional: ưu tiên giá truyền vào, thiếu mới gọi ticker"""
+        if price:
+            return float(price)
+        ticker = self.client.get_symbol_ticker(symbol=symbol)
+        return float(ticker['price']) if ticker and 'price' in ticker else 0.0
+
     def get_account_balance(self):
         """
         Kiểm tra số dư tài khoản (Testnet)
@@ -91,12 +102,7 @@ class TradeExecutor:
             dict: {'USDT': 10000, 'BTC': 0.0, ...}
         """
         try:
-            account = self.client.get_account()
-            balances = {}
-            for balance in account['balances']:
-                if float(balance['free']) > 0:
-                    balances[balance['asset']] = float(balance['free'])
-            return balances
+            return get_free_balances(self.client)
         except Exception as e:
             print(f"❌ Lỗi kiểm tra số dư: {e}")
             return {}
@@ -134,21 +140,21 @@ class TradeExecutor:
         
         return quantity
     
-    def place_market_buy(self, symbol, quantity):
+    def place_market_buy(self, symbol, quantity, price=None):
         """
         Đặt lệnh MUA (Market Buy)
         
         Args:
             symbol: Mã giao dịch (vd: BTCUSDT)
             quantity: Số lượng
+            price: Giá hiện tại đã biết (bỏ qua lần gọi ticker nếu có)
         
         Returns:
             dict: Thông tin lệnh đã đặt
         """
         try:
-            # Lấy giá hiện tại (dùng ticker price) để kiểm tra minNotional
-            ticker = self.client.get_symbol_ticker(symbol=symbol)
-            last_price = float(ticker['price']) if ticker and 'price' in ticker else 0.0
+            # Giá hiện tại để kiểm tra minNotional
+            last_price = self._last_price(symbol, price)
 
             adj_qty, reason = self._adjust_quantity_for_filters(symbol, quantity, last_price)
             if adj_qty <= 0:
@@ -176,20 +182,20 @@ class TradeExecutor:
             print(f"❌ Lỗi đặt lệnh MUA: {e}")
             return None
     
-    def place_market_sell(self, symbol, quantity):
+    def place_market_sell(self, symbol, quantity, price=None):
         """
         Đặt lệnh BÁN (Market Sell)
         
         Args:
             symbol: Mã giao dịch
             quantity: Số lượng
+            price: Giá hiện tại đã biết (bỏ qua lần gọi ticker nếu có)
         
         Returns:
             dict: Thông tin lệnh đã đặt
         """
         try:
-            ticker = self.client.get_symbol_ticker(symbol=symbol)
-            last_price = float(ticker['price']) if ticker and 'price' in ticker else 0.0
+            last_price = self._last_price(symbol, price)
 
             adj_qty, reason = self._adjust_quantity_for_filters(symbol, quantity, last_price)
             if adj_qty <= 0:
@@ -226,36 +232,33 @@ class TradeExecutor:
             action: 'BUY' hoặc 'SELL'
         """
         try:
-            conn = sqlite3.connect(config.DATABASE_FILE)
-            cursor = conn.cursor()
-            
-            # Tạo bảng nếu chưa có
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS orders (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    order_id TEXT,
-                    symbol TEXT,
-                    side TEXT,
-                    quantity REAL,
-                    price REAL,
-                    status TEXT,
-                    timestamp TEXT
-                )
-            ''')
-            
-            # Thêm dữ liệu
-            cursor.execute('''
-                INSERT INTO orders (order_id, symbol, side, quantity, price, status, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            now = datetime.now()
+            sql = '''
+                INSERT INTO orders (order_id, symbol, side, quantity, price, status, timestamp, ts_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            '''
+            params = (
                 order['orderId'],
                 order['symbol'],
                 action,
                 order['executedQty'],
                 order.get('price', 0),
                 order['status'],
-                datetime.now().isoformat()
-            ))
+                now.isoformat(),
+                to_ms(now)
+            )
+
+            # Có DatabaseLogger (bảng orders đã được tạo sẵn): ghi nền, trả về ngay
+            if self.db_logger is not None:
+                self.db_logger.write(sql, params)
+                return
+
+            conn = sqlite3.connect(config.DATABASE_FILE)
+            # Tạo bảng / nâng cấp cấu trúc nếu cần
+            migrate(conn)
+            
+            # Thêm dữ liệu
+            conn.execute(sql, params)
             
             conn.commit()
             conn.close()
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from src.advice_cache import AdviceCache, make_key
+from src.chatgpt_advisor import ChatGPTAdvisor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCompletions:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        self.kwargs = kwargs
+        message = SimpleNamespace(content=self.text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_key_ignores_tiny_moves_but_not_regime_changes():
+    base = make_key('BTCUSDT', 43250, 42800, 72.5, 250, price_pct=0.25, rsi_width=2)
+    assert make_key('btcusdt', 43251, 42801, 72.6, 250.1, price_pct=0.25, rsi_width=2) == base
+    assert make_key('BTCUSDT', 43250, 42800, 64.0, 250, price_pct=0.25, rsi_width=2) != base
+    assert make_key('BTCUSDT', 44500, 42800, 72.5, 250, price_pct=0.25, rsi_width=2) != base
+    assert make_key('ETHUSDT', 43250, 42800, 72.5, 250, price_pct=0.25, rsi_width=2) != base
+    assert make_key('BTCUSDT', float('nan'), 42800, 72.5, 250) is None
+
+
+def test_lru_ttl_and_persistence(tmp_path):
+    db_file = str(tmp_path / 'cache.db')
+    clock = FakeClock()
+    cache = AdviceCache(db_file=db_file, ttl_seconds=60, max_entries=2, clock=clock)
+    cache.put('a', {'recommendation': 'BUY'})
+    cache.put('b', {'recommendation': 'SELL'})
+    assert cache.get('a')['recommendation'] == 'BUY'   # a mới dùng -> b bị loại trước
+    cache.put('c', {'recommendation': 'HOLD'})
+    assert cache.get('b') is None and cache.evictions == 1
+
+    # Khởi động lại: nạp từ SQLite
+    reloaded = AdviceCache(db_file=db_file, ttl_seconds=60, max_entries=2, clock=clock)
+    assert reloaded.get('a')['recommendation'] == 'BUY'
+    assert reloaded.get('c')['recommendation'] == 'HOLD'
+
+    clock.now += 61
+    assert reloaded.get('a') is None and reloaded.expirations == 1
+    assert reloaded.stats()['hits'] == 2
+
+
+def test_advisor_reuses_cached_advice(tmp_path):
+    advisor = ChatGPTAdvisor(cache=AdviceCache(db_file=str(tmp_path / 'cache.db')))
+    completions = FakeCompletions('{"recommendation": "BUY", "confidence": 80, "reason": "RSI cao"}')
+    advisor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    first = advisor.analyze_market('BTCUSDT', 43250, 42800, 72.5, 250)
+    second = advisor.analyze_market('BTCUSDT', 43251, 42800, 72.5, 250)
+    assert completions.calls == 1
+    assert second['recommendation'] == first['recommendation'] == 'BUY'
+    assert second['cached'] and 'cached' not in first
+
+    # Lỗi API không được cache
+    advisor.client = None
+    assert advisor.analyze_market('ETHUSDT', 2300, 2250, 50, 30)['confidence'] == 0
+    assert advisor.cache.stats()['entries'] == 1
+
+
+def test_advisor_requests_and_validates_structured_output():
+    advisor = ChatGPTAdvisor(cache=AdviceCache(db_file=''))
+    completions = FakeCompletions('{"recommendation": "sell", "confidence": 140, "reason": "Giá dưới MA"}')
+    advisor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    advice = advisor.analyze_market('BTCUSDT', 43250, 42800, 72.5, 250)
+    assert (advice['recommendation'], advice['confidence'], advice['reason']) == ('SELL', 100, 'Giá dưới MA')
+    assert completions.kwargs['response_format']['type'] == 'json_schema'
+    assert completions.kwargs['max_tokens'] <= 200
+
+    # Văn bản tự do (kể cả có chữ "Mua") không còn được đoán thành BUY
+    completions.text = 'KHÔNG ĐƯỢC khuyến nghị Mua/Bán, độ tin cậy 90%'
+    advice = advisor.analyze_market('ETHUSDT', 2300, 2250, 50, 30)
+    assert advice['source'] == 'error' and advice['recommendation'] == 'HOLD'
+    assert advisor.cache.stats()['entries'] == 1
+
+
+def test_async_put_persists_off_the_event_loop(tmp_path):
+    db_file = str(tmp_path / 'cache.db')
+    cache = AdviceCache(db_file=db_file)
+    persisted_on = []
+    persist = cache._persist
+
+    def recording_persist(*args):
+        persisted_on.append(threading.current_thread())
+        persist(*args)
+
+    cache._persist = recording_persist
+
+    async def scenario():
+        await cache.put_many_async([('a', {'recommendation': 'BUY'}), ('b', {'recommendation': 'SELL'})])
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(scenario())
+    assert len(persisted_on) == 1 and persisted_on[0] is not loop_thread
+    assert AdviceCache(db_file=db_file).get('b')['recommendation'] == 'SELL'
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.async_pipeline import AsyncTradingPipeline
+from src.guarded_advisor import GuardedAdvisor
+from src.technical_indicators import TechnicalIndicators
+
+DELAY = 0.3
+
+
+def make_klines(count=100, start_ms=1_700_000_000_000):
+    klines = []
+    for i in range(count):
+        price = 43000 + (i % 7) * 10
+        klines.append([start_ms + i * 900_000, str(price), str(price + 20), str(price - 20),
+                       str(price + 5), '1.5', start_ms + (i + 1) * 900_000 - 1, '65000', 10,
+                       '0.7', '30000', '0'])
+    return klines
+
+
+class FakeAsyncBinance:
+    """AsyncClient giả: mỗi request chờ DELAY giây"""
+
+    async def get_symbol_ticker(self, symbol):
+        await asyncio.sleep(DELAY)
+        return {'price': '43100.0'}
+
+    async def get_klines(self, **params):
+        await asyncio.sleep(DELAY)
+        return make_klines()
+
+
+class FakeAdvisor:
+    def __init__(self, delay=DELAY):
+        self.delay = delay
+        self.async_client = None
+
+    async def analyze_market_async(self, symbol, current_price, ma, rsi, atr):
+        await asyncio.sleep(self.delay)
+        return {'recommendation': 'BUY', 'reason': 'test', 'confidence': 80}
+
+    @staticmethod
+    def _error_advice(reason):
+        return {'recommendation': 'HOLD', 'reason': reason, 'confidence': 0}
+
+
+def make_bot(advisor):
+    saved = []
+
+    def decide(symbol, indicators, advice, order_indicators=None):
+        return {'symbol': symbol, 'recommendation': advice['recommendation'],
+                'reason': advice['reason'], 'order_price': order_indicators['current_price'],
+                'executed': advice['recommendation'] == 'BUY'}
+
+    return SimpleNamespace(
+        candle_interval='15m',
+        data_collector=SimpleNamespace(candle_store=None, client=None,
+                                       _stream_for=lambda symbol, interval: None),
+        indicators=TechnicalIndicators(),
+        advisor=advisor,
+        advisor_guard=GuardedAdvisor(advisor),
+        database_logger=SimpleNamespace(save_analysis_data=lambda ind, adv, symbol: saved.append(symbol)),
+        _decide_and_execute=decide,
+        saved=saved,
+    )
+
+
+@pytest.fixture
+def pipeline_factory():
+    pipelines = []
+
+    def factory(advisor, **kwargs):
+        pipeline = AsyncTradingPipeline(make_bot(advisor), binance_client=FakeAsyncBinance(),
+                                        advice_mode='concurrent', **kwargs)
+        pipelines.append(pipeline)
+        return pipeline
+
+    yield factory
+    for pipeline in pipelines:
+        pipeline.close()
+
+
+def test_ticker_and_klines_fetched_concurrently(pipeline_factory):
+    pipeline = pipeline_factory(FakeAdvisor())
+    result = pipeline.run_once('BTCUSDT')
+    assert result['recommendation'] == 'BUY'
+    assert result['order_price'] == 43100.0  # lệnh dùng giá ticker mới nhất
+    assert result['stage_ms']['market'] < 1.6 * DELAY * 1000
+    assert pipeline.bot.saved == ['BTCUSDT']
+
+
+def test_advisor_timeout_falls_back_to_rules(pipeline_factory):
+    pipeline = pipeline_factory(FakeAdvisor(delay=5), timeouts={'advisor': 0.05})
+    started = time.monotonic()
+    result = pipeline.run_once('BTCUSDT')
+    assert time.monotonic() - started < 5
+    assert result['reason'].startswith('Dự phòng')
+    assert pipeline.bot.advisor_guard.fallbacks == 1
+
+
+def test_symbols_run_concurrently(pipeline_factory):
+    pipeline = pipeline_factory(FakeAdvisor())
+    symbols = [f'SYM{i}USDT' for i in range(10)]
+    started = time.monotonic()
+    report = pipeline.run_cycle(symbols)
+    elapsed = time.monotonic() - started
+    assert sorted(report.results) == sorted(symbols)
+    assert len(report.executed) == 10 and not report.late
+    # market (DELAY) + advisor (DELAY), không phải 10 lần
+    assert elapsed < 4 * DELAY + 1.0
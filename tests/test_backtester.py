@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from src.backtester import Backtester, PERFORMANCE_COLUMNS, TRADE_COLUMNS, compute_metrics
+
+
+START = 1_700_000_000_000
+STEP = 60_000
+
+
+def make_candles(n=3000, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.standard_normal(n) * 20)
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    open_time = START + np.arange(n) * STEP
+    return pd.DataFrame({
+        'open_time': open_time,
+        'open': open_,
+        'high': np.maximum(open_, close) + rng.random(n) * 10,
+        'low': np.minimum(open_, close) - rng.random(n) * 10,
+        'close': close,
+        'volume': 1.0,
+        'close_time': open_time + STEP - 1,
+    })
+
+
+def test_backtest_outputs_database_schemas():
+    candles = make_candles()
+    result = Backtester(symbol='BTCUSDT', initial_balance=10000).run(candles)
+
+    trades, equity, summary = result['trades'], result['equity'], result['summary']
+    assert list(trades.columns) == TRADE_COLUMNS
+    assert list(equity.columns) == PERFORMANCE_COLUMNS
+    assert len(equity) == len(candles)
+    assert summary['total_trades'] == len(trades) > 0
+    # Số dư cuối = vốn ban đầu + tổng PnL các lệnh (đã gồm phí)
+    assert equity['account_balance'].iloc[-1] == round(10000 + trades['pnl'].sum(), 2)
+    assert set(trades['status']) <= {'STOP_LOSS', 'TAKE_PROFIT', 'SIGNAL_EXIT', 'END_OF_DATA'}
+
+
+def test_fees_reduce_pnl():
+    candles = make_candles()
+    free = Backtester(fee_rate=0.0, slippage_bps=0).run(candles)['summary']
+    costly = Backtester(fee_rate=0.001, slippage_bps=5).run(candles)['summary']
+    assert costly['total_pnl'] < free['total_pnl']
+
+
+def test_compute_metrics():
+    metrics = compute_metrics([100, 110, 99, 120], [10, -11, 21])
+    assert metrics['max_drawdown'] == 10.0
+    assert metrics['profit_factor'] == round(31 / 11, 3)
+    assert metrics['win_rate'] == 66.67
+    assert metrics['return_percent'] == 20.0
+
+
+def test_vectorized_mode_matches_event_driven():
+    candles = make_candles()
+    params = {'ma_period': 10, 'fib_lookback': 50}
+    event = Backtester(indicator_params=params).run(candles)
+    vector = Backtester(indicator_params=params, vectorized=True).run(candles)
+    pd.testing.assert_frame_equal(event['trades'], vector['trades'])
+    assert event['summary']['sharpe'] == vector['summary']['sharpe']
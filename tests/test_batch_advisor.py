@@ -0,0 +1,125 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import openai
+
+from src.advice_cache import AdviceCache
+from src.batch_advisor import AdviceBatcher, BatchAdvisor, RetryPolicy, parse_batch_response, snapshot
+from src.chatgpt_advisor import ChatGPTAdvisor
+
+
+def completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class FakeBatchCompletions:
+    """Trả lời prompt gộp: BUY cho mọi symbol có trong prompt, chờ delay giây"""
+
+    def __init__(self, delay=0.2, rate_limited=0):
+        self.delay = delay
+        self.rate_limited = rate_limited
+        self.calls = 0
+
+    async def create(self, messages, **kwargs):
+        self.calls += 1
+        if self.rate_limited:
+            self.rate_limited -= 1
+            # Response giả (không phụ thuộc thư viện HTTP của từng phiên bản openai)
+            response = SimpleNamespace(status_code=429, headers={'retry-after': '0.05'}, request=None)
+            raise openai.RateLimitError('rate limited', response=response, body=None)
+        await asyncio.sleep(self.delay)
+        lines = messages[-1]['content'].split('\n')
+        symbols = [line.split(':')[0] for line in lines if 'RSI=' in line]
+        return completion(json.dumps({s: {'recommendation': 'BUY', 'confidence': 75, 'reason': 'ok'}
+                                      for s in symbols}))
+
+
+def make_advisor():
+    return ChatGPTAdvisor(cache=AdviceCache(db_file=''))
+
+
+def fake_client(completions):
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+def test_parse_batch_response_validates_entries():
+    text = json.dumps({'btcusdt': {'recommendation': 'sell', 'confidence': 140, 'reason': 'x'},
+                       'ETHUSDT': {'recommendation': 'MAYBE'}})
+    parsed = parse_batch_response(text, ['BTCUSDT', 'ETHUSDT', 'BNBUSDT'])
+    assert list(parsed) == ['BTCUSDT']
+    assert parsed['BTCUSDT']['recommendation'] == 'SELL' and parsed['BTCUSDT']['confidence'] == 100
+    assert parse_batch_response('không phải JSON', ['BTCUSDT']) == {}
+
+
+def test_packed_batch_of_50_symbols_costs_two_requests():
+    advisor = make_advisor()
+    completions = FakeBatchCompletions()
+    batch = BatchAdvisor(advisor, mode='packed', batch_size=25)
+    snapshots = [snapshot(f'SYM{i}USDT', 100 + i, 99, 55, 1.5) for i in range(50)]
+
+    started = time.monotonic()
+    results = asyncio.run(batch.analyze_async(snapshots, client=fake_client(completions)))
+    elapsed = time.monotonic() - started
+    assert completions.calls == 2
+    assert elapsed < 2 * completions.delay
+    assert len(results) == 50 and all(r['recommendation'] == 'BUY' for r in results.values())
+
+    # Lần sau: toàn bộ lấy từ cache
+    again = asyncio.run(batch.analyze_async(snapshots, client=fake_client(completions)))
+    assert completions.calls == 2 and all(r.get('cached') for r in again.values())
+
+
+def test_rate_limit_is_retried_with_shared_cooldown():
+    advisor = make_advisor()
+    completions = FakeBatchCompletions(delay=0, rate_limited=1)
+    retry = RetryPolicy(max_retries=2, base_delay=0.01)
+    batch = BatchAdvisor(advisor, mode='packed', retry=retry)
+    snapshots = [snapshot('BTCUSDT', 43250, 42800, 60, 250)]
+
+    results = asyncio.run(batch.analyze_async(snapshots, client=fake_client(completions)))
+    assert results['BTCUSDT']['recommendation'] == 'BUY'
+    assert retry.retries == 1 and completions.calls == 2
+    assert retry.cooldown_until > 0  # 429: các request khác cũng chờ
+
+
+def test_concurrent_mode_maps_one_request_per_symbol():
+    advisor = make_advisor()
+    calls = []
+
+    async def create(messages, **kwargs):
+        calls.append(messages[-1]['content'])
+        await asyncio.sleep(0.1)
+        return completion('{"recommendation": "HOLD", "confidence": 50, "reason": "ok"}')
+
+    batch = BatchAdvisor(advisor, mode='concurrent', max_concurrency=10)
+    snapshots = [snapshot(f'SYM{i}USDT', 100 + i * 5, 99, 40 + i, 1.5) for i in range(10)]
+    started = time.monotonic()
+    results = asyncio.run(batch.analyze_async(snapshots, client=fake_client(SimpleNamespace(create=create))))
+    assert time.monotonic() - started < 0.5
+    assert len(calls) == 10 and set(results) == {s['symbol'] for s in snapshots}
+
+
+def test_batcher_keeps_and_cancels_running_batches():
+
+    class SlowBatchAdvisor:
+        batch_size = 25
+        advisor = make_advisor()
+
+        async def analyze_async(self, snapshots):
+            await asyncio.sleep(60)
+
+    async def scenario():
+        batcher = AdviceBatcher(SlowBatchAdvisor(), window_ms=1)
+        calls = [asyncio.create_task(batcher.analyze(s, 100, 99, 50, 1.5)) for s in ('BTCUSDT', 'ETHUSDT')]
+        await asyncio.sleep(0.05)
+        assert len(batcher._tasks) == 1  # batch đang chạy được giữ tham chiếu
+        batcher.cancel()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        await asyncio.sleep(0)
+        return batcher, results
+
+    batcher, results = asyncio.run(scenario())
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+    assert not batcher._tasks
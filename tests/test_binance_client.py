@@ -0,0 +1,30 @@
+from src import binance_client
+from src.binance_client import get_client, get_free_balances, set_client
+from src.data_collector import DataCollector
+from src.exchange_info import ExchangeInfoCache
+from src.trade_executor import TradeExecutor
+
+
+class FakeAccountClient:
+    def get_account(self):
+        return {'balances': [{'asset': 'USDT', 'free': '150.5'}, {'asset': 'ETH', 'free': '0.0'}]}
+
+    def get_exchange_info(self):
+        return {'symbols': []}
+
+
+def test_components_share_one_client(monkeypatch):
+    monkeypatch.setattr(binance_client, '_client', None)
+    monkeypatch.setattr('src.config.CANDLE_STORE_ENABLED', False)
+    fake = FakeAccountClient()
+    set_client(fake)
+
+    assert get_client() is fake
+    collector = DataCollector()
+    executor = TradeExecutor(exchange_info=ExchangeInfoCache(fake))
+    assert collector.client is fake and executor.client is fake
+    assert executor.get_account_balance() == {'USDT': 150.5}
+
+
+def test_get_free_balances_skips_empty_assets():
+    assert get_free_balances(FakeAccountClient()) == {'USDT': 150.5}
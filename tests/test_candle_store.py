@@ -0,0 +1,75 @@
+from src.candle_store import CandleStore, interval_to_ms
+
+
+class FakeKlineClient:
+    """Trả về kline giả lập từ một chuỗi nến cố định, ghi lại các lần gọi."""
+
+    def __init__(self, n_bars, interval='15m', start=1_700_000_000_000):
+        step = interval_to_ms(interval)
+        self.klines = []
+        for i in range(n_bars):
+            t = start + i * step
+            price = 100.0 + i
+            self.klines.append([t, str(price), str(price + 1), str(price - 1), str(price + 0.5),
+                                '10', t + step - 1, '1000', 5, '4', '400', '0'])
+        self.calls = []
+
+    def get_klines(self, symbol, interval, limit=500, startTime=None, endTime=None):
+        self.calls.append({'startTime': startTime, 'endTime': endTime, 'limit': limit})
+        rows = self.klines
+        if startTime is not None:
+            rows = [k for k in rows if k[0] >= startTime][:limit]
+        elif endTime is not None:
+            rows = [k for k in rows if k[0] <= endTime][-limit:]
+        else:
+            rows = rows[-limit:]
+        return rows
+
+
+def test_sync_fetches_only_new_candles(tmp_path):
+    store = CandleStore(db_file=str(tmp_path / 'candles.db'))
+    client = FakeKlineClient(100)
+    client.klines, future = client.klines[:98], client.klines[98:]
+
+    assert store.sync(client, 'BTCUSDT', '15m', limit=50) == 50
+    assert len(store.load('BTCUSDT', '15m')) == 50
+
+    # Hai nến mới xuất hiện: chỉ tải từ open_time cuối cùng trở đi
+    client.klines += future
+    fetched = store.sync(client, 'BTCUSDT', '15m', limit=50)
+    assert client.calls[-1]['startTime'] == client.klines[97][0]
+    assert fetched == 3  # nến cuối (tải lại) + 2 nến mới
+
+    df = store.load('BTCUSDT', '15m', limit=50)
+    assert len(df) == 50
+    assert df['open_time'].is_monotonic_increasing
+    assert df['open_time'].iloc[-1] == client.klines[-1][0]
+    assert df['close'].iloc[-1] == float(client.klines[-1][4])
+
+
+def test_sync_backfills_when_store_is_short(tmp_path):
+    store = CandleStore(db_file=str(tmp_path / 'candles.db'))
+    client = FakeKlineClient(300)
+
+    store.sync(client, 'BTCUSDT', '15m', limit=20)
+    store.sync(client, 'BTCUSDT', '15m', limit=120)
+
+    _, _, count = store.get_time_range('BTCUSDT', '15m')
+    assert count == 120
+    assert client.calls[-1]['endTime'] is not None
+
+
+def test_backfill_stops_once_history_is_exhausted(tmp_path):
+    store = CandleStore(db_file=str(tmp_path / 'candles.db'))
+    client = FakeKlineClient(30)  # sàn chỉ có 30 nến
+
+    store.sync(client, 'BTCUSDT', '15m', limit=20)
+    store.sync(client, 'BTCUSDT', '15m', limit=100)
+    assert client.calls[-1]['endTime'] is not None
+    assert store.get_time_range('BTCUSDT', '15m')[2] == 30
+
+    calls = len(client.calls)
+    for _ in range(3):
+        store.sync(client, 'BTCUSDT', '15m', limit=100)
+    assert all(call['endTime'] is None for call in client.calls[calls:])
+    assert len(client.calls) == calls + 3  # mỗi chu kỳ chỉ một lần gọi startTime
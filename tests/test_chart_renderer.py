@@ -0,0 +1,54 @@
+import numpy as np
+
+from src import chart_renderer
+from src.chart_renderer import EquityChartRenderer, downsample, lttb_indices
+
+
+def test_lttb_keeps_shape():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 500) * 100 + 10_000
+    y[4321] = 20_000  # đỉnh nhọn phải được giữ lại
+    idx = lttb_indices(x, y, 500)
+    assert len(idx) == 500
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert 4321 in idx
+    assert len(lttb_indices(x[:100], y[:100], 500)) == 100
+
+
+def test_downsample_keeps_trade_markers():
+    n = 5000
+    cycles = np.arange(1, n + 1, dtype=float)
+    balances = 10_000 + np.cumsum(np.random.default_rng(0).normal(0, 5, n))
+    signals = np.array([''] * n, dtype=object)
+    signals[[10, 2500, 4998]] = ['BUY', 'SELL', 'BUY']
+    c, b, s = downsample(cycles, balances, signals, 300)
+    assert len(c) <= 303
+    assert set(c[s != '']) == {11.0, 2501.0, 4999.0}
+
+
+def test_renderer_skips_unchanged_input_and_reuses_figure(tmp_path):
+    output = str(tmp_path / 'equity.png')
+    renderer = EquityChartRenderer(use_process=False, width_px=400, height_px=300, dpi=50)
+    points = [(i, 10_000 + i * 3, 'BUY' if i % 7 == 0 else 'HOLD') for i in range(1, 2000)]
+    cycles, balances, signals = zip(*points)
+
+    assert renderer.render(cycles, balances, signals, output)
+    assert not renderer.render(cycles, balances, signals, output)
+    assert renderer.render(cycles + (2000,), balances + (16_000,), signals + ('SELL',), output)
+    assert renderer.renders == 2
+    assert len(chart_renderer._figures) == 1
+    with open(output, 'rb') as f:
+        assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+
+
+def test_renderer_in_worker_process(tmp_path):
+    output = str(tmp_path / 'equity.png')
+    renderer = EquityChartRenderer(use_process=True, width_px=300, height_px=200, dpi=50)
+    try:
+        assert renderer.render([1, 2, 3], [10_000, 10_050, 10_020], ['', 'BUY', ''], output)
+        assert renderer.use_process
+    finally:
+        renderer.close()
+    with open(output, 'rb') as f:
+        assert f.read(8) == b'\x89PNG\r\n\x1a\n'
@@ -0,0 +1,86 @@
+import threading
+from types import SimpleNamespace
+
+from src.advice_cache import AdviceCache
+from src.chatgpt_advisor import ChatGPTAdvisor
+from src.conversation_memory import ConversationMemory, count_tokens
+
+SYSTEM = "Bạn là trợ lý giao dịch AI thân thiện."
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.requests = []
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        if kwargs['messages'][0]['content'].startswith('Tóm tắt'):
+            text = '- Người dùng hỏi về RSI, MA và ATR.'
+        else:
+            text = 'Trả lời khá dài về chỉ báo kỹ thuật. ' * 20
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def wait_for_summaries():
+    for thread in threading.enumerate():
+        if thread.name == 'chat-summary':
+            thread.join()
+
+
+def test_prompt_size_stays_bounded_with_static_prefix():
+    advisor = ChatGPTAdvisor(cache=AdviceCache(db_file=''))
+    completions = FakeCompletions()
+    advisor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    memory = ConversationMemory(SYSTEM, max_history_tokens=600, keep_recent_tokens=300)
+
+    for i in range(30):
+        advisor.chat_with_user(memory, f"Câu hỏi số {i}: RSI và MA nói gì?")
+        wait_for_summaries()
+
+    chats = [r for r in completions.requests if 'extra_body' in r]
+    assert len(chats) == 30
+    assert all(r['messages'][0] == {'role': 'system', 'content': SYSTEM} for r in chats)
+    assert len({r['extra_body']['prompt_cache_key'] for r in chats}) == 1
+    sizes = [sum(count_tokens(m['content']) for m in r['messages']) for r in chats]
+    assert max(sizes[10:]) < 800  # không tăng theo số lượt
+    assert memory.summarized_turns > 0 and 'RSI' in memory.summary
+    assert memory.history_tokens <= 600
+
+
+def test_compaction_falls_back_to_extractive_summary():
+    memory = ConversationMemory(SYSTEM, max_history_tokens=100, keep_recent_tokens=40, summary_max_tokens=80)
+    for i in range(6):
+        memory.add(f"Câu hỏi {i} về ATR", "Trả lời " * 20)
+
+    def failing(previous, messages):
+        raise RuntimeError('API lỗi')
+
+    assert memory.compact(failing)
+    assert len(memory) == 2 and 'Câu hỏi' in memory.summary
+    messages = memory.messages('Tiếp theo?')
+    assert messages[1]['content'].startswith('Tóm tắt') and messages[-1]['content'] == 'Tiếp theo?'
+
+
+def test_compaction_does_not_block_readers_and_keeps_new_turns():
+    memory = ConversationMemory(SYSTEM, max_history_tokens=100, keep_recent_tokens=40)
+    for i in range(6):
+        memory.add(f"Câu hỏi {i} về ATR", "Trả lời " * 20)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_summarizer(previous, messages):
+        started.set()
+        release.wait(5)  # như một lượt gọi API chậm
+        return f"- Đã hỏi {len(messages)} tin nhắn về ATR"
+
+    worker = threading.Thread(target=memory.compact, args=(slow_summarizer,))
+    worker.start()
+    assert started.wait(5)
+    messages = memory.messages('Câu hỏi mới?')  # không chờ summarizer
+    assert len(messages) == 1 + 12 + 1
+    memory.add('Câu hỏi 6 về ATR', 'Trả lời mới')
+    release.set()
+    worker.join(5)
+
+    assert memory.summary == '- Đã hỏi 10 tin nhắn về ATR'
+    assert [m['content'] for m in memory.messages()[-2:]] == ['Câu hỏi 6 về ATR', 'Trả lời mới']
+    assert len(memory) == 4 and memory.summarized_turns == 10
@@ -0,0 +1,97 @@
+import sqlite3
+import threading
+
+from src import config
+from src.database_logger import DatabaseLogger
+from src.exchange_info import ExchangeInfoCache
+from src.trade_executor import TradeExecutor
+
+
+INDICATORS = {'current_price': 43250.0, 'ma': 42800.0, 'rsi': 55.0, 'atr': 250.0}
+ADVICE = {'recommendation': 'BUY', 'reason': 'test', 'confidence': 70}
+ORDER = {'orderId': 7, 'symbol': 'BTCUSDT', 'side': 'BUY', 'executedQty': '0.01',
+         'cummulativeQuoteQty': '432.5', 'status': 'FILLED'}
+
+
+def count(db_file, table):
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_write_behind_flush_and_close(tmp_path):
+    db_file = str(tmp_path / 'history.db')
+    logger = DatabaseLogger(db_file=db_file, async_writes=True)
+    for _ in range(50):
+        logger.save_analysis_data(INDICATORS, ADVICE)
+    logger.save_trading_record(ORDER)
+    assert logger.flush(timeout=5)
+    assert count(db_file, 'analysis_data') == 50
+    assert count(db_file, 'trading_history') == 1
+
+    logger.save_analysis_data(INDICATORS, ADVICE)
+    logger.close()  # ghi nốt hàng đợi trước khi đóng
+    assert count(db_file, 'analysis_data') == 51
+
+    conn = sqlite3.connect(db_file)
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    conn.close()
+
+
+def test_sync_mode_and_executor_orders(tmp_path):
+    db_file = str(tmp_path / 'history.db')
+    logger = DatabaseLogger(db_file=db_file, async_writes=False)
+    executor = TradeExecutor(exchange_info=ExchangeInfoCache(None), client=object(), db_logger=logger)
+    executor._save_order(ORDER, 'BUY')
+    logger.save_trading_record(ORDER)
+    assert count(db_file, 'orders') == 1
+    assert count(db_file, 'trading_history') == 1
+    logger.close()
+
+
+def test_dead_writer_falls_back_to_sync_writes(tmp_path, monkeypatch):
+    real_connect = DatabaseLogger._connect
+
+    def connect(self):
+        if threading.current_thread().name == 'db-writer':
+            raise sqlite3.OperationalError('unable to open database file')
+        return real_connect(self)
+
+    monkeypatch.setattr(DatabaseLogger, '_connect', connect)
+    db_file = str(tmp_path / 'history.db')
+    logger = DatabaseLogger(db_file=db_file, async_writes=True)
+    logger._writer.join(5)
+    assert not logger._writer.is_alive()
+
+    for _ in range(3):
+        logger.save_analysis_data(INDICATORS, ADVICE)
+    assert logger.flush(timeout=1)  # không chờ vô hạn thread đã chết
+    assert count(db_file, 'analysis_data') == 3
+    logger.close()
+
+
+def test_full_queue_overflows_to_sync_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'DB_WRITE_QUEUE_SIZE', 1)
+    monkeypatch.setattr(config, 'DB_WRITE_PUT_TIMEOUT', 0.01)
+    release = threading.Event()
+    real_connect = DatabaseLogger._connect
+
+    def connect(self):
+        if threading.current_thread().name == 'db-writer':
+            release.wait(5)  # thread nền bị kẹt (ổ đĩa chậm)
+        return real_connect(self)
+
+    monkeypatch.setattr(DatabaseLogger, '_connect', connect)
+    db_file = str(tmp_path / 'history.db')
+    logger = DatabaseLogger(db_file=db_file, async_writes=True)
+    for _ in range(5):
+        logger.save_analysis_data(INDICATORS, ADVICE)  # không bị chặn khi hàng đợi đầy
+    assert count(db_file, 'analysis_data') == 4  # 1 dòng còn trong hàng đợi
+    assert not logger.flush(timeout=0.1)
+
+    release.set()
+    assert logger.flush(timeout=5)
+    assert count(db_file, 'analysis_data') == 5
+    logger.close()
@@ -0,0 +1,62 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+from src.database_logger import DatabaseLogger
+from src.db_migrations import SCHEMA_VERSION, get_version, migrate, to_ms
+
+
+def make_legacy_db(path):
+    """Database kiểu cũ: chưa có user_version, chưa có ts_ms"""
+    conn = sqlite3.connect(path)
+    migrate(conn, target=1)
+    conn.execute('PRAGMA user_version = 0')
+    stamps = [(datetime.now() - timedelta(days=d)).isoformat() for d in (30, 3, 1)]
+    conn.executemany(
+        "INSERT INTO trading_history (timestamp, symbol, side, quantity, entry_price, pnl) "
+        "VALUES (?, 'BTCUSDT', 'BUY', 0.01, 43000, ?)",
+        [(ts, i * 1.5) for i, ts in enumerate(stamps)])
+    conn.commit()
+    conn.close()
+    return stamps
+
+
+def test_legacy_database_upgraded_in_place(tmp_path):
+    db_file = str(tmp_path / 'legacy.db')
+    stamps = make_legacy_db(db_file)
+
+    DatabaseLogger(db_file=db_file, async_writes=False).close()
+
+    conn = sqlite3.connect(db_file)
+    assert get_version(conn) == SCHEMA_VERSION
+    rows = conn.execute('SELECT timestamp, ts_ms FROM trading_history ORDER BY id').fetchall()
+    assert [ts_ms for _, ts_ms in rows] == [to_ms(ts) for ts in stamps]
+
+    # INSERT không có ts_ms (code cũ) vẫn được trigger điền
+    now = datetime.now().isoformat()
+    conn.execute("INSERT INTO performance (timestamp, account_balance) VALUES (?, 10000)", (now,))
+    conn.commit()
+    assert conn.execute('SELECT ts_ms FROM performance').fetchone()[0] == to_ms(now)
+
+    # Truy vấn báo cáo dùng index phủ, không quét bảng
+    plan = ' '.join(row[-1] for row in conn.execute(
+        'EXPLAIN QUERY PLAN SELECT ts_ms, pnl, entry_price, quantity, side FROM trading_history '
+        'WHERE ts_ms >= ? AND entry_price > 0 ORDER BY ts_ms', (0,)))
+    assert 'COVERING INDEX idx_trading_ts' in plan
+    conn.close()
+
+    # Chạy lại migration không làm gì thêm
+    conn = sqlite3.connect(db_file)
+    assert migrate(conn) == []
+    conn.close()
+
+
+def test_performance_feedback_uses_epoch_range(tmp_path):
+    db_file = str(tmp_path / 'legacy.db')
+    make_legacy_db(db_file)
+    logger = DatabaseLogger(db_file=db_file, async_writes=False)
+    logger.write("INSERT INTO performance (timestamp, total_trades, account_balance) VALUES (?, 3, 10000)",
+                 (datetime.now().isoformat(),))
+    feedback = logger.get_performance_feedback()
+    logger.close()
+    assert feedback['account_balance'] == 10000
+    assert feedback['recent_activity'] == 2  # giao dịch 30 ngày trước không tính
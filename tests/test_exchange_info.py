@@ -0,0 +1,83 @@
+from src.exchange_info import ExchangeInfoCache, round_step, step_precision
+from src.trade_executor import TradeExecutor
+
+
+BTC_FILTERS = [
+    {'filterType': 'PRICE_FILTER', 'minPrice': '0.01', 'maxPrice': '1000000.00', 'tickSize': '0.01'},
+    {'filterType': 'LOT_SIZE', 'minQty': '0.00001000', 'maxQty': '9000.00000000', 'stepSize': '0.00001000'},
+    {'filterType': 'NOTIONAL', 'minNotional': '5.00000000'},
+]
+
+
+class FakeExchangeClient:
+    def __init__(self):
+        self.exchange_info_calls = 0
+        self.orders = []
+
+    def get_exchange_info(self):
+        self.exchange_info_calls += 1
+        return {'symbols': [{'symbol': 'BTCUSDT', 'filters': BTC_FILTERS}]}
+
+    def get_symbol_info(self, symbol):
+        raise AssertionError("get_symbol_info không được gọi khi đặt lệnh")
+
+    def get_symbol_ticker(self, symbol):
+        raise AssertionError("get_symbol_ticker không được gọi khi đã có giá")
+
+    def create_order(self, **kwargs):
+        self.orders.append(kwargs)
+        return {'orderId': 1, 'symbol': kwargs['symbol'], 'executedQty': kwargs['quantity'],
+                'status': 'FILLED'}
+
+
+def test_round_step_and_precision():
+    assert step_precision('0.00001000') == 5
+    assert step_precision('1.00000000') == 0
+    assert round_step(0.3, '0.1') == 0.3
+    assert round_step(0.0123456, '0.00001000') == 0.01234
+
+
+def test_cache_parses_filters_and_refreshes_on_ttl():
+    client = FakeExchangeClient()
+    cache = ExchangeInfoCache(client, ttl=3600)
+    btc = cache.get('BTCUSDT')
+    cache.get('BTCUSDT')
+    assert client.exchange_info_calls == 1
+    assert btc.qty_precision == 5 and btc.min_notional == 5.0
+    assert btc.round_price(43000.129) == 43000.12
+    assert btc.adjust_quantity(0.0001, 40000)[0] == 0.0  # 4 USDT < minNotional
+    assert cache.get('ETHUSDT') is None
+
+    cache.ttl = 0
+    cache._loaded_at -= 1
+    cache.get('BTCUSDT')
+    assert client.exchange_info_calls == 2
+
+
+def test_market_order_validated_locally(monkeypatch, tmp_path):
+    monkeypatch.setattr('src.config.DATABASE_FILE', str(tmp_path / 'orders.db'))
+    client = FakeExchangeClient()
+    executor = TradeExecutor(exchange_info=ExchangeInfoCache(client))
+    executor.client = client
+
+    order = executor.place_market_buy('BTCUSDT', 0.0123456, price=43000.0)
+    assert order is not None
+    assert client.orders[0]['quantity'] == 0.01234
+    assert client.exchange_info_calls == 1
+
+
+def test_executor_without_client_loads_filters_lazily(monkeypatch, tmp_path):
+    monkeypatch.setattr('src.config.DATABASE_FILE', str(tmp_path / 'orders.db'))
+
+    def offline():
+        raise ConnectionError('Binance không phản hồi')
+
+    monkeypatch.setattr('src.trade_executor.get_client', offline)
+    executor = TradeExecutor()
+    assert executor._get_symbol_filters('BTCUSDT') == {}  # không AttributeError
+    assert executor.place_market_buy('BTCUSDT', 0.01, price=43000.0) is None
+
+    client = FakeExchangeClient()
+    monkeypatch.setattr('src.trade_executor.get_client', lambda: client)
+    assert executor._get_symbol_filters('BTCUSDT')['LOT_SIZE']['stepSize'] == '0.00001000'
+    assert executor.place_market_buy('BTCUSDT', 0.0123456, price=43000.0) is not None
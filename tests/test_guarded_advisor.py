@@ -0,0 +1,131 @@
+import sqlite3
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from src.advice_cache import AdviceCache
+from src.chatgpt_advisor import ChatGPTAdvisor
+from src.database_logger import DatabaseLogger
+from src.guarded_advisor import CircuitBreaker, GuardedAdvisor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeAdvisor:
+    def __init__(self):
+        self.calls = 0
+        self.fail = True
+        self.source = 'llm'
+
+    def analyze_market(self, symbol, current_price, ma, rsi, atr, timeout=None):
+        self.calls += 1
+        if self.fail:
+            return {'recommendation': 'HOLD', 'reason': 'APITimeoutError', 'confidence': 0, 'source': 'error'}
+        return {'recommendation': 'BUY', 'reason': 'ok', 'confidence': 80, 'source': self.source}
+
+
+def make_indicators():
+    close = pd.Series(100 + np.cumsum(np.full(60, 0.5)))
+    candles = pd.DataFrame({'open': close, 'high': close + 1, 'low': close - 1, 'close': close})
+    return {'current_price': float(close.iloc[-1]), 'ma': 110.0, 'rsi': 60.0, 'atr': 1.0, 'raw_data': candles}
+
+
+def test_breaker_opens_skips_llm_and_recovers():
+    clock = FakeClock()
+    advisor = FakeAdvisor()
+    guard = GuardedAdvisor(advisor, breaker=CircuitBreaker(failure_threshold=2, reset_seconds=30, clock=clock))
+    indicators = make_indicators()
+
+    for _ in range(2):
+        assert guard.analyze('BTCUSDT', indicators)['source'] == 'fallback'
+    assert guard.breaker.state == 'open'
+
+    # Đang ngắt: không gọi ChatGPT nữa
+    advice = guard.analyze('BTCUSDT', indicators)
+    assert advisor.calls == 2
+    assert advice['source'] == 'fallback' and 'circuit breaker' in advice['reason']
+
+    # Hết thời gian ngắt: một lời gọi thử, thành công thì đóng lại
+    clock.now = 31
+    advisor.fail = False
+    assert guard.analyze('BTCUSDT', indicators)['recommendation'] == 'BUY'
+    assert guard.breaker.state == 'closed'
+    assert guard.stats()['fallbacks'] == 3
+
+
+def test_cache_hit_does_not_consume_half_open_probe():
+    clock = FakeClock()
+    advisor = ChatGPTAdvisor(cache=AdviceCache(db_file=''))
+    completions = SimpleNamespace(calls=0, fail=True)
+
+    def create(**kwargs):
+        completions.calls += 1
+        if completions.fail:
+            raise TimeoutError('ChatGPT không phản hồi')
+        text = '{"recommendation": "SELL", "confidence": 70, "reason": "ok"}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+    advisor.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)),
+                                     with_options=lambda **_: advisor.client)
+    guard = GuardedAdvisor(advisor, breaker=CircuitBreaker(failure_threshold=2, reset_seconds=30, clock=clock))
+    cached = make_indicators()
+    fresh = dict(cached, rsi=20.0)
+    advisor._remember(advisor._cache_key('BTCUSDT', cached['current_price'], cached['ma'], cached['rsi'],
+                                         cached['atr']),
+                      {'recommendation': 'BUY', 'reason': 'cũ', 'confidence': 80, 'source': 'llm'})
+
+    for _ in range(2):
+        assert guard.analyze('BTCUSDT', fresh)['source'] == 'fallback'
+    assert guard.breaker.state == 'open'
+    assert guard.analyze('BTCUSDT', cached)['source'] == 'cache'  # cache dùng được cả khi đang ngắt
+
+    clock.now = 31
+    for _ in range(3):
+        assert guard.analyze('BTCUSDT', cached)['source'] == 'cache'
+    assert guard.breaker.state == 'half_open' and completions.calls == 2
+
+    # Lượt thử half-open vẫn còn cho lời gọi ChatGPT thật
+    completions.fail = False
+    assert guard.analyze('BTCUSDT', fresh)['recommendation'] == 'SELL'
+    assert guard.breaker.state == 'closed'
+
+
+def test_cache_result_from_advisor_releases_probe():
+    clock = FakeClock()
+    advisor = FakeAdvisor()
+    guard = GuardedAdvisor(advisor, breaker=CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=clock))
+    indicators = make_indicators()
+    guard.analyze('BTCUSDT', indicators)
+    clock.now = 31
+    advisor.fail, advisor.source = False, 'cache'
+    assert guard.analyze('BTCUSDT', indicators)['source'] == 'cache'
+    assert guard.breaker.state == 'half_open'
+    advisor.source = 'llm'
+    assert guard.analyze('BTCUSDT', indicators)['source'] == 'llm'
+    assert guard.breaker.state == 'closed'
+
+
+def test_fallback_is_recorded_in_analysis_data(tmp_path):
+    db_file = str(tmp_path / 'history.db')
+    logger = DatabaseLogger(db_file=db_file, async_writes=False)
+    guard = GuardedAdvisor(FakeAdvisor())
+    indicators = make_indicators()
+    advice = guard.analyze('BTCUSDT', indicators)
+    logger.save_analysis_data(indicators, advice, symbol='BTCUSDT')
+    logger.close()
+
+    conn = sqlite3.connect(db_file)
+    try:
+        source, reason = conn.execute('SELECT source, reason FROM analysis_data').fetchone()
+    finally:
+        conn.close()
+    assert source == 'fallback'
+    assert 'APITimeoutError' in reason
@@ -0,0 +1,59 @@
+import threading
+
+from src.gui_bus import GuiEventBus
+
+
+class FakeRoot:
+    """Thay Tk root: chỉ ghi nhận callback của after()"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def after(self, delay_ms, callback):
+        self.jobs.append(callback)
+        return len(self.jobs)
+
+    def after_cancel(self, job):
+        pass
+
+
+def test_drain_batches_and_coalesces():
+    bus = GuiEventBus(FakeRoot(), interval_ms=10, max_events=1000)
+    logs, cycles, calls = [], [], []
+    bus.subscribe('log', lambda items: logs.append(list(items)), batch=True)
+    bus.subscribe('cycle', cycles.append, coalesce=True)
+    bus.subscribe('click', lambda: calls.append(1))
+
+    workers = [threading.Thread(target=lambda n=n: [bus.post('log', f'{n}-{i}') for i in range(100)])
+               for n in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    for cycle in range(1, 6):
+        bus.post('cycle', cycle)
+    bus.post('click')
+    bus.post('click')
+
+    assert bus.drain() == 407
+    assert len(logs) == 1 and len(logs[0]) == 400   # một lần chèn cho cả lô
+    assert cycles == [5]                            # chỉ trạng thái mới nhất
+    assert calls == [1, 1]                          # sự kiện thường giữ nguyên
+    assert bus.drain() == 0
+
+
+def test_drain_is_bounded_per_tick():
+    root = FakeRoot()
+    bus = GuiEventBus(root, interval_ms=10, max_events=50)
+    seen = []
+    bus.subscribe('log', lambda items: seen.extend(items), batch=True)
+    for i in range(120):
+        bus.post('log', i)
+
+    bus.start()
+    ticks = 0
+    while len(seen) < 120:
+        root.jobs[-1]()
+        ticks += 1
+    assert ticks == 3
+    assert [args[0] for args in seen] == list(range(120))
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+import pytest
 
 from src.technical_indicators import TechnicalIndicators
 from src.strategy_signals import generate_signals
@@ -40,3 +41,88 @@ def test_generate_signals_runs():
     sig = generate_signals(df)
     assert 'recommendation' in sig
     assert sig['recommendation'] in ('BUY', 'SELL', 'HOLD') or 'error' in sig
+
+
+def test_incremental_matches_batch():
+    from src.incremental_indicators import IncrementalIndicators
+
+    df = make_series(300)
+    engine = IncrementalIndicators(ma_period=15, rsi_period=14, atr_period=14, fib_lookback=50)
+    for i in range(len(df)):
+        row = df.iloc[i]
+        engine.update(row['high'], row['low'], row['close'])
+        if i in (20, 100, len(df) - 1):
+            window = df.iloc[:i + 1]
+            batch = TechnicalIndicators.get_all_indicators(window, ma_period=15, rsi_period=14, atr_period=14)
+            macd_df = TechnicalIndicators.macd(window['close'])
+            fib = TechnicalIndicators.fibonacci_retracement(window, lookback=50)
+            values = engine.values()
+            assert np.isclose(values['ma'], batch['ma'])
+            assert np.isclose(values['rsi'], batch['rsi'])
+            assert np.isclose(values['atr'], batch['atr'])
+            assert np.isclose(values['macd']['macd'], macd_df['macd'].iloc[-1])
+            assert np.isclose(values['macd']['signal'], macd_df['signal'].iloc[-1])
+            assert values['fib']['high'] == fib['high'] and values['fib']['low'] == fib['low']
+
+
+def _assert_close(actual, expected):
+    expected = np.asarray(expected, dtype=float)
+    assert np.array_equal(np.isnan(actual), np.isnan(expected))
+    mask = ~np.isnan(expected)
+    assert np.allclose(actual[mask], expected[mask], rtol=1e-9, atol=1e-9)
+
+
+def test_numpy_kernels_match_pandas_formulas():
+    from src import indicator_kernels as kernels
+
+    df = make_series(2000)
+    close = df['close']
+
+    def rma(s, n):
+        return s.ewm(alpha=1.0 / n, min_periods=n).mean()
+
+    diff = close.diff()
+    gain, loss = diff.clip(lower=0), diff.clip(upper=0).abs()
+    prev_close = close.shift(1)
+    tr = pd.concat([df['high'] - df['low'], (df['high'] - prev_close).abs(),
+                    (df['low'] - prev_close).abs()], axis=1).max(axis=1)
+    tr.iloc[0] = np.nan
+    macd_ref = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+
+    _assert_close(kernels.sma(close, 15), close.rolling(15).mean())
+    _assert_close(kernels.ema(close, 26), close.ewm(span=26, adjust=False).mean())
+    _assert_close(kernels.rsi(close, 14), 100 * rma(gain, 14) / (rma(gain, 14) + rma(loss, 14)))
+    _assert_close(kernels.atr(df['high'], df['low'], close, 14), rma(tr, 14))
+    _assert_close(kernels.macd(close)[0], macd_ref)
+    _assert_close(kernels.rolling_max(df['high'], 50), df['high'].rolling(50).max())
+    _assert_close(kernels.rolling_min(df['low'], 50, min_periods=1), df['low'].rolling(50, min_periods=1).min())
+
+
+def test_numpy_backend_matches_pandas_ta():
+    ta = pytest.importorskip('pandas_ta')
+    df = make_series(500)
+    _assert_close(TechnicalIndicators.calculate_rsi(df, 14).to_numpy(), ta.rsi(df['close'], length=14))
+    _assert_close(TechnicalIndicators.calculate_atr(df, 14).to_numpy(),
+                  ta.atr(high=df['high'], low=df['low'], close=df['close'], length=14))
+    _assert_close(TechnicalIndicators.calculate_ma(df, 20, ma_type='EMA').to_numpy(), ta.ema(df['close'], length=20))
+
+
+def test_vectorized_signals_match_generate_signals():
+    from src.strategy_signals import generate_signals_vectorized
+
+    signals = 0
+    for seed in (0, 3):
+        df = make_series(400, seed=seed)
+        vec = generate_signals_vectorized(df)
+        for i in range(10, len(df) + 1):
+            sig = generate_signals(df.iloc[:i])
+            row = vec.iloc[i - 1]
+            hit = sig['fib_hit']['ratio'] if sig['fib_hit'] else None
+            assert row['trend'] == sig['trend']
+            assert row['macd_cross'] == sig['macd']['cross']
+            assert (None if np.isnan(row['fib_hit']) else row['fib_hit']) == hit
+            assert row['recommendation'] == sig['recommendation']
+            if sig['stop'] is not None:
+                assert row['stop'] == pytest.approx(sig['stop'])
+        signals += (vec['recommendation'] != 'HOLD').sum()
+    assert signals > 0
@@ -0,0 +1,73 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from src.advice_cache import AdviceCache
+from src.batch_advisor import BatchAdvisor, snapshot
+from src.chatgpt_advisor import ChatGPTAdvisor
+from src.llm_backend import LLMBackend, RecordingBackend, ReplayBackend, StubBackend, prompt_hash
+
+
+def make_advisor(backend):
+    return ChatGPTAdvisor(cache=AdviceCache(db_file=''), backend=backend)
+
+
+def test_stub_answers_from_prompt_with_injected_latency():
+    sleeps = []
+    advisor = make_advisor(StubBackend(latency_ms=250, sleep=sleeps.append))
+    oversold = advisor.analyze_market('BTCUSDT', 43250, 42800, 25.0, 250)
+    overbought = advisor.analyze_market('ETHUSDT', 2300, 2250, 78.0, 30)
+    assert (oversold['recommendation'], overbought['recommendation']) == ('BUY', 'SELL')
+    assert oversold['source'] == 'llm' and 50 <= oversold['confidence'] <= 90
+    assert sleeps == [0.25, 0.25]
+
+    # Prompt gộp nhiều symbol cũng được trả lời theo từng symbol
+    batch = BatchAdvisor(advisor, mode='packed')
+    results = batch.analyze([snapshot(f'SYM{i}USDT', 100 + i, 99, 50, 1.5) for i in range(5)])
+    assert len(results) == 5 and all(r['recommendation'] == 'BUY' for r in results.values())
+
+
+def test_record_then_replay_offline(tmp_path):
+    path = str(tmp_path / 'recordings.jsonl')
+    recorder = make_advisor(RecordingBackend(path, inner=StubBackend()))
+    recorded = recorder.analyze_market('BTCUSDT', 43250, 42800, 55.0, 250)
+
+    with open(path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    assert len(entries) == 1
+    assert json.loads(entries[0]['response'])['recommendation'] == recorded['recommendation']
+
+    replay = ReplayBackend(path)
+    advisor = make_advisor(replay)
+    started = time.perf_counter()
+    replayed = advisor.analyze_market('BTCUSDT', 43250, 42800, 55.0, 250)
+    assert time.perf_counter() - started < 0.05
+    assert replayed['recommendation'] == recorded['recommendation']
+    assert replay.hits == 1
+
+    # Prompt chưa ghi: lỗi như lỗi API (GuardedAdvisor sẽ dùng tín hiệu quy tắc)
+    missing = advisor.analyze_market('ETHUSDT', 2300, 2250, 50.0, 30)
+    assert missing['source'] == 'error' and replay.misses == 1
+
+
+def test_prompt_hash_ignores_transport_options():
+    request = {'model': 'gpt-4o-mini', 'messages': [{'role': 'user', 'content': 'x'}], 'max_tokens': 120}
+    assert prompt_hash(request) == prompt_hash(dict(request, timeout=8))
+    assert prompt_hash(request) != prompt_hash(dict(request, model='gpt-4o'))
+
+
+def test_async_client_uses_backend():
+    advisor = make_advisor(StubBackend())
+    advice = asyncio.run(advisor.analyze_market_async('BTCUSDT', 43250, 42800, 25.0, 250,
+                                                      client=advisor.backend.async_client()))
+    assert advice['recommendation'] == 'BUY'
+
+
+def test_backend_must_implement_complete():
+    class Incomplete(LLMBackend):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,65 @@
+from src.log_store import LogStore
+
+TAGS = ('info', 'success', 'warning', 'error')
+
+
+def test_ring_buffer_keeps_latest_lines():
+    store = LogStore(capacity=100)
+    for i in range(250):
+        store.append('12:00:00', f'line {i}', TAGS[i % 4])
+    assert len(store) == 100
+    assert store.first_seq == 150
+    lines = [record[1] for _, record in store.window(0, 100)]
+    assert lines == [f'line {i}' for i in range(150, 250)]
+
+
+def test_filtered_window_matches_full_scan():
+    store = LogStore(capacity=1000)
+    for i in range(5000):
+        store.append('12:00:00', f'line {i}', TAGS[(i * 7) % 5 % 4])
+    kept = [(seq, store.get(seq)) for seq in range(store.first_seq, store.next_seq)]
+    for tag in TAGS:
+        expected = [(seq, rec) for seq, rec in kept if rec[2] == tag]
+        assert store.count(tag) == len(expected)
+        assert store.window(0, store.count(tag), tag) == expected
+        assert store.window(10, 30, tag) == expected[10:30]
+
+
+def test_clear():
+    store = LogStore(capacity=10)
+    for i in range(5):
+        store.append('12:00:00', str(i), 'error')
+    store.clear()
+    assert len(store) == 0 and store.count('error') == 0
+    store.append('12:00:01', 'x', 'error')
+    assert store.window(0, 10, 'error')[0][1][1] == 'x'
+
+
+def test_window_cost_independent_of_history():
+    class CountingStore(LogStore):
+        reads = 0
+
+        def get(self, seq):
+            self.reads += 1
+            return super().get(seq)
+
+    store = CountingStore(capacity=10_000)
+    for i in range(300_000):
+        store.append('12:00:00', 'msg', 'error' if i % 100 == 0 else 'info')
+    assert store.count('error') == 100
+    # Chỉ mục của mức được dọn cùng ring buffer: không giữ seq của các dòng đã bị ghi đè
+    assert all(len(index._items) <= 2 * max(len(index), 1024) for index in store._indexes.values())
+
+    errors = store.window(store.count('error') - 50, store.count('error'), 'error')
+    latest = store.window(len(store) - 50, len(store))
+    assert store.reads == 100  # chỉ đọc đúng các dòng trong cửa sổ
+    assert [seq for seq, _ in errors] == list(range(295_000, 300_000, 100))
+    assert [seq for seq, _ in latest] == list(range(299_950, 300_000))
+
+
+def test_multiline_message_is_one_record_per_line():
+    store = LogStore(capacity=10)
+    records = store.append_message('12:00:00', 'Báo cáo\n  Lệnh: 3\n  PnL: 1.5', 'info')
+    assert records == [('12:00:00', 'Báo cáo', 'info'), ('', '  Lệnh: 3', 'info'), ('', '  PnL: 1.5', 'info')]
+    assert len(store) == 3 and store.count('info') == 3
+    assert store.append_message('12:00:01', '', 'info') == [('12:00:01', '', 'info')]
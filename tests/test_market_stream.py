@@ -0,0 +1,153 @@
+import asyncio
+import json
+import threading
+import time
+
+from websockets.asyncio.server import serve
+
+from src.market_stream import MarketStream
+
+
+START = 1_700_000_000_000
+STEP = 15 * 60_000
+
+
+def kline_msg(open_time, close, closed):
+    return json.dumps({
+        'stream': 'btcusdt@kline_15m',
+        'data': {
+            'e': 'kline', 'E': open_time + 1, 's': 'BTCUSDT',
+            'k': {'t': open_time, 'T': open_time + STEP - 1, 's': 'BTCUSDT', 'i': '15m',
+                  'o': '100.0', 'c': str(close), 'h': str(close + 1), 'l': '99.0',
+                  'v': '5', 'n': 10, 'x': closed, 'q': '500', 'V': '2', 'Q': '200'},
+        },
+    })
+
+
+def book_msg(bid, ask):
+    return json.dumps({
+        'stream': 'btcusdt@bookTicker',
+        'data': {'u': 1, 's': 'BTCUSDT', 'b': str(bid), 'B': '1', 'a': str(ask), 'A': '1'},
+    })
+
+
+# Chuỗi message "ghi lại" được server thay thế phát lại theo đúng thứ tự
+RECORDED = [
+    kline_msg(START, 101.0, False),
+    kline_msg(START, 102.0, True),
+    kline_msg(START + STEP, 103.0, False),
+    book_msg(103.5, 104.5),
+]
+
+
+class ReplayServer:
+    """Server WebSocket cục bộ phát lại các message đã ghi cho mỗi client."""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.paths = []
+        self.port = None
+        self._ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._stop = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    async def _handler(self, ws):
+        self.paths.append(ws.request.path)
+        for msg in self.messages:
+            await ws.send(msg)
+        await ws.wait_closed()
+
+    async def _main(self):
+        self._stop = asyncio.Event()
+        async with serve(self._handler, '127.0.0.1', 0) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await self._stop.wait()
+
+    def _run(self):
+        self._loop.run_until_complete(self._main())
+
+    def __enter__(self):
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(5)
+
+
+def test_stream_replays_into_memory_buffer():
+    closed = []
+    with ReplayServer(RECORDED) as server:
+        stream = MarketStream('BTCUSDT', '15m', url=f'ws://127.0.0.1:{server.port}',
+                              on_candle_closed=lambda s, i, k: closed.append(k))
+        stream.start()
+        try:
+            deadline = time.time() + 5
+            while stream.messages_received < len(RECORDED) and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            stream.stop()
+
+    assert server.paths == ['/stream?streams=btcusdt@kline_15m/btcusdt@bookTicker']
+    df = stream.get_candles()
+    assert list(df['open_time']) == [START, START + STEP]
+    assert list(df['close']) == [102.0, 103.0]
+    assert len(closed) == 1 and closed[0][4] == 102.0
+    assert stream.get_price() == 104.0
+    assert stream.best_bid == 103.5 and stream.best_ask == 104.5
+
+
+def raw_kline(open_time, close):
+    return [open_time, 1, 2, 0.5, close, 1, open_time + STEP - 1, 1, 1, 1, 1, 0]
+
+
+def test_seed_then_update_forming_candle():
+    now = [0.0]
+    stream = MarketStream('BTCUSDT', '15m', buffer_size=3, stale_seconds=30, clock=lambda: now[0])
+    stream.seed([raw_kline(START + i * STEP, 1.5) for i in range(3)])
+    assert not stream.is_ready()  # chưa có message từ stream
+
+    stream._connected.set()
+    stream.handle_message(kline_msg(START + 2 * STEP, 110.0, False))
+    stream.handle_message(kline_msg(START + 3 * STEP, 111.0, False))
+
+    df = stream.get_candles()
+    assert list(df['close']) == [1.5, 110.0, 111.0]
+    assert stream.is_ready()
+
+    now[0] = 31.0
+    assert not stream.is_ready()  # quá lâu không có message: dữ liệu cũ
+    stream.handle_message(book_msg(111.0, 112.0))
+    assert stream.is_ready()
+    stream._connected.clear()
+    assert not stream.is_ready()  # mất kết nối
+
+
+def test_reconnect_backfills_missed_klines():
+    calls = []
+
+    def backfill(symbol, interval, since):
+        calls.append((symbol, interval, since))
+        return [raw_kline(START + i * STEP, 50.0 + i) for i in range(3)]
+
+    # Bộ đệm dừng ở nến START; stream chỉ phát tiếp từ nến START + 3*STEP
+    messages = [kline_msg(START + 3 * STEP, 104.0, False)]
+    with ReplayServer(messages) as server:
+        stream = MarketStream('BTCUSDT', '15m', url=f'ws://127.0.0.1:{server.port}', backfill=backfill)
+        stream.seed([raw_kline(START, 1.5)])
+        stream.start()
+        try:
+            deadline = time.time() + 5
+            while stream.messages_received < len(messages) and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            stream.stop()
+
+    assert calls == [('BTCUSDT', '15m', START)]
+    df = stream.get_candles()
+    assert list(df['open_time']) == [START + i * STEP for i in range(4)]
+    assert list(df['close']) == [50.0, 51.0, 52.0, 104.0]
+    assert stream.backfilled == 3
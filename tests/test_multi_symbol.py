@@ -0,0 +1,59 @@
+import threading
+
+from src.binance_client import request_weight
+from src.multi_symbol import MultiSymbolRunner
+from src.rate_limiter import RateLimiter
+
+
+class FakeBot:
+    """Bot giả: mỗi symbol trả kết quả ngay, 'SLOWUSDT' chờ tới khi được thả"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def run_once(self, symbol=None):
+        self.calls.append(symbol)
+        if symbol == 'SLOWUSDT':
+            self.release.wait(5)
+        if symbol == 'BADUSDT':
+            raise RuntimeError('boom')
+        return {'symbol': symbol, 'executed': symbol == 'ETHUSDT'}
+
+
+def test_runner_collects_results_and_reports_late_symbols():
+    bot = FakeBot()
+    runner = MultiSymbolRunner(bot, ['BTCUSDT', 'ETHUSDT', 'BADUSDT', 'SLOWUSDT'],
+                               max_workers=4, slo_seconds=0.2)
+    report = runner.run_cycle()
+    assert report.results['BTCUSDT'] == {'symbol': 'BTCUSDT', 'executed': False}
+    assert report.executed == ['ETHUSDT']
+    assert report.failed == ['BADUSDT'] and report.results['BADUSDT'] is None
+    assert report.late == ['SLOWUSDT'] and report.slo_breached
+
+    # Symbol chậm vẫn đang chạy: chu kỳ sau không chạy chồng
+    report = runner.run_cycle()
+    assert report.busy == ['SLOWUSDT']
+    assert bot.calls.count('SLOWUSDT') == 1
+    bot.release.set()
+    runner.close()
+
+
+def test_rate_limiter_waits_for_refill():
+    now = [0.0]
+    limiter = RateLimiter(capacity=10, refill_per_second=2, clock=lambda: now[0])
+    assert limiter.try_acquire(8)
+    assert not limiter.try_acquire(5)
+    now[0] += 1.5  # nạp lại 3 token
+    assert limiter.available == 5
+    assert limiter.try_acquire(5)
+    assert not limiter.acquire(4, timeout=0)
+
+
+def test_request_weight_by_endpoint():
+    base = 'https://testnet.binance.vision'
+    assert request_weight(f'{base}/api/v3/klines?symbol=BTCUSDT&interval=15m') == 2
+    assert request_weight(f'{base}/api/v3/ticker/price?symbol=BTCUSDT') == 2
+    assert request_weight(f'{base}/api/v3/ticker/price') == 4
+    assert request_weight(f'{base}/api/v3/account?timestamp=1') == 20
+    assert request_weight(f'{base}/api/v3/order') == 1
@@ -0,0 +1,47 @@
+from src.optimizer import DEFAULT_GRID, StrategyOptimizer, evaluate, grid_search, random_search, rank_results
+from tests.test_backtester import make_candles
+
+
+GRID = {'ma_period': [10, 20], 'fib_lookback': [50, 100], 'fib_tolerance': [0.005, 0.01]}
+
+
+def test_grid_and_random_search():
+    configs = grid_search(GRID)
+    assert len(configs) == 8
+    assert {'ma_period': 10, 'fib_lookback': 50, 'fib_tolerance': 0.005} in configs
+
+    samples = random_search({'ma_period': [10, 20], 'stop_loss_percent': (1.0, 3.0)}, 5, seed=1)
+    assert len(samples) == 5
+    assert all(1.0 <= s['stop_loss_percent'] <= 3.0 for s in samples)
+
+
+def test_rank_results_orders_by_sharpe_bucket_then_drawdown():
+    results = [
+        {'params': 'a', 'sharpe': 1.0, 'max_drawdown': 5, 'profit_factor': 1.2, 'total_trades': 10},
+        {'params': 'b', 'sharpe': 2.0, 'max_drawdown': 9, 'profit_factor': 1.1, 'total_trades': 10},
+        {'params': 'c', 'sharpe': 1.0, 'max_drawdown': 3, 'profit_factor': 1.0, 'total_trades': 10},
+        {'params': 'd', 'sharpe': 9.0, 'max_drawdown': 1, 'profit_factor': 9.0, 'total_trades': 1},
+        {'params': 'e', 'sharpe': 2.05, 'max_drawdown': 20, 'profit_factor': 1.5, 'total_trades': 10},
+    ]
+    # e nhỉnh hơn b về Sharpe nhưng cùng bậc (bước 0.25) và drawdown gấp đôi -> xếp sau b
+    assert [r['params'] for r in rank_results(results, min_trades=2)] == ['b', 'e', 'c', 'a']
+    assert [r['params'] for r in rank_results(results, min_trades=2, sharpe_bucket=0)] == ['e', 'b', 'c', 'a']
+
+
+def test_parallel_search_matches_serial():
+    candles = make_candles(4000)
+    configs = grid_search(GRID)
+    with StrategyOptimizer(candles, workers=2, min_trades=0) as optimizer:
+        ranked = optimizer.search(configs)
+        folds = optimizer.walk_forward(configs, train_bars=2000, test_bars=1000)
+
+    serial = rank_results([evaluate(candles, params) for params in configs], min_trades=0)
+    assert [r['params'] for r in ranked] == [r['params'] for r in serial]
+    assert [r['sharpe'] for r in ranked] == [r['sharpe'] for r in serial]
+    assert [f['test'] for f in folds] == [(2000, 3000), (3000, 4000)]
+
+
+def test_default_grid_varies_stop_loss():
+    configs = grid_search(DEFAULT_GRID)
+    assert {c['stop_loss_percent'] for c in configs} == {1.0, 2.0, 3.0}
+    assert len(configs) == 432
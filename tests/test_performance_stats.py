@@ -0,0 +1,103 @@
+import random
+import sqlite3
+
+import pytest
+
+from src.db_migrations import DAY_MS, migrate, now_ms
+from src.performance_stats import TradeStats, rebuild, window_stats
+
+
+def brute_force(conn, since_ms, current_price):
+    """Cách tính cũ của báo cáo: duyệt từng giao dịch trong cửa sổ"""
+    rows = conn.execute('SELECT pnl, entry_price, quantity, side FROM trading_history '
+                        'WHERE ts_ms >= ? AND entry_price > 0', (since_ms,)).fetchall()
+    closed = [pnl for pnl, *_ in rows if pnl is not None]
+    wins = [p for p in closed if p > 0]
+    losses = [p for p in closed if p < 0]
+    unrealized = sum((current_price - entry) * qty if side == 'BUY' else (entry - current_price) * qty
+                     for pnl, entry, qty, side in rows if pnl is None)
+    return {
+        'trades': len(rows), 'closed': len(closed), 'wins': len(wins), 'losses': len(losses),
+        'realized_pnl': sum(closed), 'unrealized_pnl': unrealized,
+        'avg_win': sum(wins) / len(wins) if wins else 0.0,
+        'avg_loss': sum(losses) / len(losses) if losses else 0.0,
+    }
+
+
+def summarize(stats, current_price):
+    return {
+        'trades': stats.trades, 'closed': stats.closed, 'wins': stats.wins, 'losses': stats.losses,
+        'realized_pnl': stats.realized_pnl, 'unrealized_pnl': stats.unrealized_pnl(current_price),
+        'avg_win': stats.avg_win, 'avg_loss': stats.avg_loss,
+    }
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'stats.db'))
+    migrate(conn)
+    rng = random.Random(3)
+    end = now_ms()
+    rows = []
+    for _ in range(600):
+        ts = end - rng.randint(0, 40 * DAY_MS)
+        pnl = rng.choice([None, round(rng.uniform(-50, 50), 2), 0.0])
+        entry = rng.choice([0.0, rng.uniform(40000, 45000)])
+        rows.append(('x', ts, rng.choice(['BUY', 'SELL']), rng.uniform(0.001, 0.05), entry, pnl))
+    conn.executemany('INSERT INTO trading_history (timestamp, ts_ms, side, quantity, entry_price, pnl) '
+                     'VALUES (?, ?, ?, ?, ?, ?)', rows)
+    # Đóng một số lệnh, xóa một số lệnh: trigger phải trừ / cộng lại đúng
+    conn.execute('UPDATE trading_history SET pnl = 12.5 WHERE pnl IS NULL AND id % 3 = 0')
+    conn.execute('DELETE FROM trading_history WHERE id % 11 = 0')
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize('days', [0.5, 1, 7, 30, 365])
+def test_window_stats_match_full_scan(conn, days):
+    since = now_ms() - int(days * DAY_MS)
+    expected = brute_force(conn, since, 43500.0)
+    got = summarize(window_stats(conn, since), 43500.0)
+    assert got.keys() == expected.keys()
+    for key in expected:
+        assert got[key] == pytest.approx(expected[key], abs=1e-6), key
+
+
+def test_rollups_survive_rebuild(conn):
+    before = window_stats(conn)
+    rebuild(conn)
+    after = window_stats(conn)
+    for name in ('trades', 'closed', 'wins', 'losses'):
+        assert getattr(after, name) == getattr(before, name)
+    assert after.realized_pnl == pytest.approx(before.realized_pnl)
+    assert after.open_cost == pytest.approx(before.open_cost)
+
+
+def test_legacy_insert_without_ts_ms_is_counted(conn):
+    before = window_stats(conn, now_ms() - DAY_MS)
+    conn.execute("INSERT INTO trading_history (timestamp, side, quantity, entry_price, pnl) "
+                 "VALUES (datetime('now', 'localtime'), 'BUY', 0.01, 43000, 5.0)")
+    conn.commit()
+    after = window_stats(conn, now_ms() - DAY_MS)
+    assert after.trades == before.trades + 1
+    assert after.wins == before.wins + 1
+
+
+def test_empty_stats():
+    stats = TradeStats()
+    assert stats.win_rate == 0 and stats.profit_factor == 0 and stats.unrealized_pnl(43000) == 0
+
+
+def test_stats_split_by_symbol(conn):
+    since = now_ms() - 7 * DAY_MS
+    conn.execute("INSERT INTO trading_history (timestamp, ts_ms, symbol, side, quantity, entry_price) "
+                 "VALUES ('x', ?, 'ETHUSDT', 'BUY', 2, 2000)", (now_ms(),))
+    conn.execute("UPDATE trading_history SET symbol = 'ETHUSDT' WHERE id % 5 = 0")
+    conn.commit()
+    per_symbol = window_stats(conn, since, by_symbol=True)
+    assert set(per_symbol) == {'', 'ETHUSDT'}
+    assert sum(per_symbol.values(), TradeStats()).trades == window_stats(conn, since).trades
+    eth = conn.execute("SELECT COUNT(*) FROM trading_history WHERE symbol = 'ETHUSDT' "
+                       "AND ts_ms >= ? AND entry_price > 0", (since,)).fetchone()[0]
+    assert per_symbol['ETHUSDT'].trades == eth
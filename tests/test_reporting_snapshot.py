@@ -0,0 +1,75 @@
+import sqlite3
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from src.database_logger import DatabaseLogger
+from src.db_migrations import to_ms
+from src.reporting_monitoring import ReportingMonitoring
+
+
+ORDER = {'orderId': 7, 'symbol': 'BTCUSDT', 'side': 'BUY', 'executedQty': '0.01',
+         'cummulativeQuoteQty': '432.5', 'status': 'FILLED'}
+
+
+class CountingClient:
+    """Client giả: đếm số lần gọi REST"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_symbol_ticker(self, symbol):
+        self.calls += 1
+        return {'price': '43500.0'}
+
+    def get_account(self):
+        self.calls += 1
+        return {'balances': [{'asset': 'USDT', 'free': '9500'}, {'asset': 'BTC', 'free': '0.01'}]}
+
+
+def performance_rows(db_file):
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM performance').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_snapshot_shared_by_renderers_and_invalidated_by_trade(tmp_path):
+    db_file = str(tmp_path / 'history.db')
+    client = CountingClient()
+    logger = DatabaseLogger(db_file=db_file, async_writes=True)
+    reporting = ReportingMonitoring(db_file=db_file, client=client, db_logger=logger)
+
+    snapshot = reporting.get_snapshot(days=30, refresh=True)
+    calls = client.calls
+    assert reporting.generate_summary_report(snapshot=snapshot) == snapshot.report
+    reporting.export_html_report(output_file=str(tmp_path / 'report.html'))
+    assert reporting.get_snapshot(days=30) is snapshot
+    assert client.calls == calls
+    assert performance_rows(db_file) == 1
+    assert snapshot.report['account_balance'] == 9500 + 0.01 * 43500
+
+    # Lệnh mới (ghi qua hàng đợi nền) hủy snapshot; lần tính sau thấy lệnh đó
+    logger.save_trading_record(ORDER)
+    fresh = reporting.get_snapshot(days=30)
+    assert fresh is not snapshot
+    assert fresh.report['total_trades'] == 1
+    assert performance_rows(db_file) == 2
+    logger.close()
+
+
+def test_equity_curve_falls_back_to_trades_when_window_has_no_performance(tmp_path):
+    db_file = str(tmp_path / 'history.db')
+    logger = DatabaseLogger(db_file=db_file, async_writes=False)
+    reporting = ReportingMonitoring(db_file=db_file, client=CountingClient(), db_logger=logger)
+    yesterday = datetime.now() - timedelta(days=1)
+    logger.write('INSERT INTO performance (timestamp, ts_ms, account_balance, total_pnl) VALUES (?, ?, ?, ?)',
+                 (yesterday.isoformat(), to_ms(yesterday), 9000.0, 0.0))
+    logger.save_trading_record(ORDER)
+
+    rendered = []
+    reporting.chart_renderer = SimpleNamespace(render=lambda *args: rendered.append(args) or True)
+    reporting.plot_equity_curve(output_file=str(tmp_path / 'equity.png'),
+                                start_time=datetime.now() - timedelta(hours=1))
+    assert len(rendered) == 1 and len(rendered[0][1]) == 1  # vẽ từ trading_history
+    logger.close()
@@ -0,0 +1,75 @@
+import pytest
+
+from src.scheduler import CandleCloseScheduler
+
+MIN = 60_000
+
+
+class FakeTime:
+    """Đồng hồ giả + Event giả: wait() tua đồng hồ thay vì ngủ thật"""
+
+    def __init__(self, now_ms):
+        self.now = now_ms / 1000
+
+    def clock(self):
+        return self.now
+
+    def is_set(self):
+        return False
+
+    def wait(self, seconds):
+        self.now += seconds
+        return False
+
+
+def make(now_ms, **kwargs):
+    fake = FakeTime(now_ms)
+    scheduler = CandleCloseScheduler(interval='15m', offset_seconds=1, clock=fake.clock, **kwargs)
+    return scheduler, fake
+
+
+def test_wakes_right_after_candle_close():
+    scheduler, fake = make(1_700_000_123_456)
+    for _ in range(3):
+        tick = scheduler.wait_next(stop_event=fake)
+        assert tick.close_ms % (15 * MIN) == 0
+        assert tick.fired_ms == tick.close_ms + 1000
+        assert 0 <= tick.drift_ms < 5
+        fake.now += 40  # chu kỳ chạy 40 giây
+    assert scheduler.ticks == 3 and scheduler.skipped_ticks == 0
+
+
+def test_skip_missed_ticks():
+    scheduler, fake = make(10 * 15 * MIN + 5)
+    first = scheduler.wait_next(stop_event=fake)
+    fake.now += 50 * 60  # chu kỳ chạy 50 phút: bỏ 2 mốc, chạy cho mốc thứ 3
+    tick = scheduler.wait_next(stop_event=fake)
+    assert tick.skipped == 2
+    assert tick.close_ms == first.close_ms + 3 * 15 * MIN
+    nxt = scheduler.wait_next(stop_event=fake)
+    assert nxt.close_ms == tick.close_ms + 15 * MIN
+
+
+def test_catch_up_runs_every_missed_tick():
+    scheduler, fake = make(10 * 15 * MIN + 5, missed_policy='catch_up')
+    first = scheduler.wait_next(stop_event=fake)
+    fake.now += 50 * 60
+    closes = [scheduler.wait_next(stop_event=fake).close_ms for _ in range(4)]
+    assert closes == [first.close_ms + k * 15 * MIN for k in range(1, 5)]
+
+
+def test_stop_and_countdown():
+    scheduler, fake = make(1_700_000_000_000)
+    seen = []
+    calls = iter([False, False, True])
+    assert scheduler.wait_next(stop_event=fake, should_stop=lambda: next(calls), on_wait=seen.append) is None
+    assert len(seen) == 2 and seen[0] > seen[1]
+
+
+def test_weekly_candles_align_to_monday():
+    scheduler = CandleCloseScheduler(interval='1w', offset_seconds=0)
+    # 2024-01-01 là thứ Hai
+    monday = 1_704_067_200_000
+    assert scheduler.next_close_ms(monday - 1) == monday
+    with pytest.raises(ValueError):
+        CandleCloseScheduler(interval='15m', missed_policy='later')